@@ -1,9 +1,10 @@
 """アプリケーション層のインターフェース定義モジュール"""
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Union
 
-from ..domain.entities import Prompt, VLMModel, VLMResponse
-from ..domain.value_objects import ModelParameters, VLMRequest
+from ..domain.entities import Job, Prompt, VLMModel, VLMResponse, VLMResponseChunk
+from ..domain.value_objects import ImageInput, ModelParameters, VLMRequest
 
 
 class VLMClientInterface(ABC):
@@ -25,6 +26,89 @@ class VLMClientInterface(ABC):
             VLMProcessingError: VLMの処理中にエラーが発生した場合
         """
         pass
+    
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        VLMにリクエストを送信し、生成されたテキストを断片ごとに返す
+        
+        デフォルトではレスポンス全体を1つの断片として返す。
+        ストリーミングに対応したクライアントはこのメソッドをオーバーライドする。
+        
+        Args:
+            request: VLMリクエスト
+            
+        Yields:
+            VLMレスポンスの断片
+            
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        response = await self.generate_response(request)
+        yield VLMResponseChunk(
+            model_id=response.model_id,
+            text=response.text,
+            index=0,
+            finish_reason="stop",
+            tokens_used=response.tokens_used,
+            metadata=response.metadata
+        )
+    
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        複数のリクエストをまとめて処理する
+        
+        デフォルトでは各リクエストを並行して個別に処理する。
+        バッチ推論に対応したクライアントはこのメソッドをオーバーライドする。
+        
+        Args:
+            requests: VLMリクエストのリスト
+            
+        Returns:
+            リクエストと同じ順序のVLMレスポンスまたは例外のリスト
+        """
+        return await asyncio.gather(
+            *(self.generate_response(request) for request in requests),
+            return_exceptions=True
+        )
+    
+    def get_stats(self) -> Dict[str, any]:
+        """
+        クライアントの統計情報を取得する
+        
+        Returns:
+            統計情報の辞書
+        """
+        return {}
+    
+    def memory_footprint(self) -> int:
+        """
+        ロードしたモデルが占有するメモリ量の見積もりを取得する
+        
+        デフォルトでは0（リモートのモデルなど、プロセス内のメモリを使用しない）。
+        
+        Returns:
+            メモリ量（バイト）
+        """
+        return 0
+    
+    async def open(self):
+        """
+        クライアントが使用するリソース（接続プールなど）を確保する
+        
+        デフォルトでは何もしない。
+        """
+        pass
+    
+    async def close(self):
+        """
+        クライアントが使用するリソースを解放する
+        
+        デフォルトでは何もしない。
+        """
+        pass
 
 
 class VLMRepositoryInterface(ABC):
@@ -67,4 +151,141 @@ class VLMRepositoryInterface(ABC):
         Raises:
             VLMModelNotFoundError: 指定されたモデルが見つからない場合
         """
-        pass
\ No newline at end of file
+        pass
+    
+    def get_models_version(self) -> Optional[int]:
+        """
+        モデルの登録のバージョンを取得する
+        
+        モデルが登録・削除・変更されるたびに変わる値で、モデル一覧のキャッシュの無効化に使用する。
+        
+        Returns:
+            バージョン（変更を追跡しない場合はNone）
+        """
+        return None
+    
+    async def get_stats(self) -> Dict[str, Dict[str, any]]:
+        """
+        生成済みクライアントの統計情報をモデルごとに取得する
+        
+        Returns:
+            モデルIDをキーとする統計情報の辞書
+        """
+        return {}
+    
+    async def list_resident_models(self) -> List[Dict[str, any]]:
+        """
+        ロード済みのモデルとそのメモリ使用量などの状態を取得する
+        
+        Returns:
+            ロード済みモデルの状態の辞書のリスト
+        """
+        return []
+    
+    async def load_model(self, model_id: str):
+        """
+        モデルをロードし、常駐させる
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        await self.get_client_for_model(model_id)
+    
+    async def unload_model(self, model_id: str) -> bool:
+        """
+        モデルをアンロードし、メモリを解放する
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            アンロードした場合はTrue、ロードされていなかった場合はFalse
+        """
+        return False
+
+
+class JobStoreInterface(ABC):
+    """非同期ジョブの保存先のインターフェース"""
+    
+    @abstractmethod
+    async def save(self, job: Job):
+        """
+        ジョブを保存する（既存のジョブは上書きする）
+        
+        Args:
+            job: ジョブ
+        """
+        pass
+    
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """
+        指定されたIDのジョブを取得する
+        
+        Args:
+            job_id: ジョブのID
+            
+        Returns:
+            ジョブ（存在しない場合はNone）
+        """
+        pass
+    
+    @abstractmethod
+    async def list_unfinished(self) -> List[Job]:
+        """
+        処理が終了していないジョブを作成順に取得する
+        
+        Returns:
+            待機中または実行中のジョブのリスト
+        """
+        pass
+    
+    async def close(self):
+        """
+        保存先が使用するリソースを解放する
+        
+        デフォルトでは何もしない。
+        """
+        pass
+
+
+class TokenizerInterface(ABC):
+    """モデルごとのトークン数を計算するトークナイザーのインターフェース"""
+    
+    @abstractmethod
+    async def count_tokens(self, model_id: str, texts: List[str]) -> List[int]:
+        """
+        モデルのトークナイザーでテキストごとのトークン数を数える
+        
+        Args:
+            model_id: VLMモデルのID
+            texts: テキストのリスト
+            
+        Returns:
+            テキストと同じ順序のトークン数のリスト
+        """
+        pass
+
+
+class ImageProcessorInterface(ABC):
+    """モデルに渡す画像を前処理するプロセッサーのインターフェース"""
+    
+    @abstractmethod
+    async def preprocess(self, model_id: str, images: List[ImageInput]) -> List[ImageInput]:
+        """
+        モデルの設定に従って画像をデコード・縮小・再エンコードする
+        
+        Args:
+            model_id: VLMモデルのID
+            images: 画像のリスト
+            
+        Returns:
+            画像と同じ順序の前処理済み画像のリスト
+            
+        Raises:
+            InvalidImageError: 画像をデコードできない場合
+        """
+        pass
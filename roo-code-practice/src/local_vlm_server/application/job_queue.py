@@ -0,0 +1,278 @@
+"""非同期ジョブキューの定義モジュール"""
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from ..domain.entities import Job
+from ..domain.exceptions import (
+    DomainException,
+    JobNotFoundError,
+    JobQueueFullError,
+    VLMOverloadedError,
+)
+from ..domain.value_objects import JobStatus, VLMRequest
+from .interfaces import JobStoreInterface
+from .services import VLMService
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    生成リクエストをジョブとして受け付け、ワーカータスクで順に処理するキュー
+
+    ジョブはpriorityの大きい順、同じ優先度の場合は投入順に処理される。
+    ジョブの状態は保存先に記録され、永続的な保存先を使用すると
+    再起動時に未完了のジョブが再投入される。
+    """
+
+    def __init__(
+        self,
+        service: VLMService,
+        store: JobStoreInterface,
+        workers: int = 2,
+        max_pending: int = 1000,
+        max_retries: int = 30
+    ):
+        """
+        初期化
+
+        Args:
+            service: VLMサービス
+            store: ジョブの保存先
+            workers: ジョブを並行に処理するワーカー数
+            max_pending: 受け付け可能な未完了ジョブの最大数
+            max_retries: モデルが過負荷の場合にジョブを再試行する最大回数
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+        self._service = service
+        self._store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._sequence = itertools.count()
+        self._start_lock = asyncio.Lock()
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def started(self) -> bool:
+        """ワーカーが起動済みかどうか"""
+        return bool(self._worker_tasks)
+
+    async def start(self):
+        """未完了のジョブを保存先から復元し、ワーカーを起動する"""
+        async with self._start_lock:
+            if self._worker_tasks:
+                return
+
+            self._queue = asyncio.PriorityQueue()
+            recovered = await self._store.list_unfinished()
+            for job in recovered:
+                # 前回の実行中に停止したジョブは最初からやり直す
+                if job.status == JobStatus.RUNNING:
+                    job.status = JobStatus.PENDING
+                    job.started_at = None
+                    await self._store.save(job)
+                self._enqueue(job)
+            if recovered:
+                logger.info(f"Recovered {len(recovered)} unfinished job(s)")
+
+            self._worker_tasks = [
+                asyncio.create_task(self._work(), name=f"job-worker-{i}")
+                for i in range(self.workers)
+            ]
+            logger.info(f"Started job queue with {self.workers} worker(s)")
+
+    async def stop(self):
+        """ワーカーを停止する（実行中のジョブは次回起動時に再実行される）"""
+        async with self._start_lock:
+            tasks, self._worker_tasks = self._worker_tasks, []
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._jobs.clear()
+            self._events.clear()
+            self._queue = None
+
+    async def submit(self, request: VLMRequest, priority: int = 0) -> Job:
+        """
+        ジョブを投入する
+
+        Args:
+            request: VLMリクエスト
+            priority: 優先度（大きいほど先に処理される）
+
+        Returns:
+            投入されたジョブ
+
+        Raises:
+            InvalidPromptError: 無効なプロンプトが指定された場合
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            JobQueueFullError: 未完了のジョブが上限に達している場合
+        """
+        await self._service.validate_request(request.model_id, request.prompt_text)
+        await self.start()
+        if len(self._jobs) >= self.max_pending:
+            raise JobQueueFullError(self.max_pending)
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            request=request,
+            priority=priority,
+            created_at=time.time()
+        )
+        await self._store.save(job)
+        self._enqueue(job)
+        logger.debug(f"Submitted job {job.id} for model {request.model_id}")
+        return job
+
+    async def get(self, job_id: str) -> Job:
+        """
+        ジョブを取得する
+
+        Args:
+            job_id: ジョブのID
+
+        Returns:
+            ジョブ
+
+        Raises:
+            JobNotFoundError: 指定されたジョブが見つからない場合
+        """
+        job = self._jobs.get(job_id) or await self._store.get(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        """
+        ジョブの終了を最大timeout秒待ってから取得する（ロングポーリング）
+
+        Args:
+            job_id: ジョブのID
+            timeout: 最大待ち時間（秒）
+
+        Returns:
+            ジョブ（タイムアウトした場合は未完了の状態）
+
+        Raises:
+            JobNotFoundError: 指定されたジョブが見つからない場合
+        """
+        job = await self.get(job_id)
+        event = self._events.get(job_id)
+        if job.is_finished or event is None or timeout <= 0:
+            return job
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return job
+        return await self.get(job_id)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        ジョブキューの統計情報を取得する
+
+        Returns:
+            待機中・実行中・完了済みのジョブ数を含む統計情報の辞書
+        """
+        running = sum(1 for job in self._jobs.values() if job.status == JobStatus.RUNNING)
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": len(self._jobs) - running,
+            "running": running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+    def _enqueue(self, job: Job):
+        """
+        ジョブを優先度付きキューに入れる
+
+        Args:
+            job: ジョブ
+        """
+        self._jobs[job.id] = job
+        self._events[job.id] = asyncio.Event()
+        self._queue.put_nowait((-job.priority, next(self._sequence), job.id))
+
+    async def _work(self):
+        """キューからジョブを取り出して処理し続けるワーカー"""
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Unexpected error while running job {job_id}")
+
+    async def _run(self, job: Job):
+        """
+        ジョブを実行し、結果を保存する
+
+        モデルが過負荷の場合は推奨された時間だけ待ってから再試行する。
+        再試行がmax_retries回に達した場合や、待つとリクエストの期限を過ぎる場合は失敗とする。
+
+        Args:
+            job: ジョブ
+        """
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        await self._store.save(job)
+
+        request = job.request
+        retries = 0
+        while True:
+            try:
+                job.response = await self._service.process_prompt(
+                    model_id=request.model_id,
+                    prompt_text=request.prompt_text,
+                    parameters=request.parameters,
+                    use_cache=request.use_cache,
+                    priority=job.priority,
+                    deadline=request.deadline,
+                    images=request.images
+                )
+                job.status = JobStatus.SUCCEEDED
+                self.succeeded += 1
+            except VLMOverloadedError as e:
+                expires = request.deadline is not None and time.time() + e.retry_after >= request.deadline
+                if retries < self.max_retries and not expires:
+                    retries += 1
+                    logger.info(f"Model busy for job {job.id}; retry {retries} in {e.retry_after}s")
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                logger.warning(f"Giving up job {job.id} after {retries} retries: {e}")
+                job.error = {"error": e.__class__.__name__, "message": str(e)}
+                job.status = JobStatus.FAILED
+                self.failed += 1
+            except Exception as e:
+                error_type = e.__class__.__name__ if isinstance(e, DomainException) else "InternalServerError"
+                job.error = {"error": error_type, "message": str(e)}
+                job.status = JobStatus.FAILED
+                self.failed += 1
+            break
+
+        job.finished_at = time.time()
+        await self._store.save(job)
+        self._jobs.pop(job.id, None)
+        event = self._events.pop(job.id, None)
+        if event is not None:
+            event.set()
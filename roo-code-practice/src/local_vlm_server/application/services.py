@@ -1,23 +1,59 @@
 """アプリケーションサービスの定義モジュール"""
-from typing import List, Optional
+import asyncio
+import dataclasses
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 
-from ..domain.entities import Prompt, VLMModel, VLMResponse
-from ..domain.exceptions import InvalidPromptError, VLMModelNotFoundError
-from ..domain.value_objects import ModelParameters, VLMRequest
-from .interfaces import VLMRepositoryInterface
+from ..domain.entities import Prompt, VLMModel, VLMResponse, VLMResponseChunk
+from ..domain.exceptions import (
+    DeadlineExceededError,
+    InvalidPromptError,
+    VLMModelNotFoundError,
+    VLMProcessingError,
+)
+from ..domain.value_objects import ImageInput, ModelParameters, VLMRequest
+from .interfaces import (
+    ImageProcessorInterface,
+    TokenizerInterface,
+    VLMClientInterface,
+    VLMRepositoryInterface,
+)
+from .single_flight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
 
 
 class VLMService:
     """VLMサービスクラス"""
     
-    def __init__(self, repository: VLMRepositoryInterface):
+    def __init__(
+        self,
+        repository: VLMRepositoryInterface,
+        coalesce_requests: bool = True,
+        batch_concurrency: int = 8,
+        tokenizer: Optional[TokenizerInterface] = None,
+        image_processor: Optional[ImageProcessorInterface] = None
+    ):
         """
         初期化
         
         Args:
             repository: VLMリポジトリ
+            coalesce_requests: 実行中の同一リクエストへの相乗りを行うかどうか
+            batch_concurrency: 一括処理でモデルごとに同時に実行する最大リクエスト数
+            tokenizer: トークン数を計算するトークナイザー（オプション）
+            image_processor: 画像を前処理するプロセッサー（オプション。指定しない場合は画像をそのまま渡す）
         """
+        if batch_concurrency < 1:
+            raise ValueError("batch_concurrency must be at least 1")
         self._repository = repository
+        self._coalesce_requests = coalesce_requests
+        self._tokenizer = tokenizer
+        self._image_processor = image_processor
+        self._batch_concurrency = batch_concurrency
+        self._single_flight = SingleFlight()
+        self._coalesced: Dict[str, int] = {}
     
     async def get_available_models(self) -> List[VLMModel]:
         """
@@ -28,6 +64,15 @@ class VLMService:
         """
         return await self._repository.get_all_models()
     
+    def get_models_version(self) -> Optional[int]:
+        """
+        モデルの登録のバージョンを取得する
+        
+        Returns:
+            モデルが登録・削除・変更されるたびに変わる値（変更を追跡しない場合はNone）
+        """
+        return self._repository.get_models_version()
+    
     async def get_model_by_id(self, model_id: str) -> Optional[VLMModel]:
         """
         指定されたIDのVLMモデルを取得する
@@ -40,11 +85,90 @@ class VLMService:
         """
         return await self._repository.get_model_by_id(model_id)
     
+    async def get_stats(self) -> Dict[str, Dict[str, any]]:
+        """
+        モデルごとのクライアント統計情報を取得する
+        
+        Returns:
+            モデルIDをキーとする統計情報の辞書
+        """
+        stats = await self._repository.get_stats()
+        for model_id, coalesced in self._coalesced.items():
+            stats.setdefault(model_id, {})["coalescing"] = {"coalesced": coalesced}
+        return stats
+    
+    async def get_model_residency(self) -> List[Tuple[VLMModel, Optional[Dict[str, any]]]]:
+        """
+        登録済みのVLMモデルとそのロード状態を取得する
+        
+        Returns:
+            VLMモデルと常駐状態の辞書（ロードされていない場合はNone）のタプルのリスト
+        """
+        models = await self._repository.get_all_models()
+        resident = {
+            entry["model_id"]: entry
+            for entry in await self._repository.list_resident_models()
+        }
+        return [(model, resident.get(model.id)) for model in models]
+    
+    async def load_model(self, model_id: str):
+        """
+        VLMモデルをロードし、常駐させる
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            ModelTooLargeError: モデルがメモリ予算より大きい場合
+            VLMOverloadedError: 他のモデルをアンロードしてもメモリ予算内にロードできない場合
+        """
+        if not await self._repository.get_model_by_id(model_id):
+            raise VLMModelNotFoundError(model_id)
+        await self._repository.load_model(model_id)
+    
+    async def unload_model(self, model_id: str) -> bool:
+        """
+        VLMモデルをアンロードする（次のリクエスト時に再ロードされる）
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            アンロードした場合はTrue、ロードされていなかった場合はFalse
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        if not await self._repository.get_model_by_id(model_id):
+            raise VLMModelNotFoundError(model_id)
+        return await self._repository.unload_model(model_id)
+    
+    async def validate_request(self, model_id: str, prompt_text: str):
+        """
+        プロンプトとモデルの存在を検証する（モデルの呼び出しは行わない）
+        
+        Args:
+            model_id: 使用するVLMモデルのID
+            prompt_text: プロンプトテキスト
+            
+        Raises:
+            InvalidPromptError: 無効なプロンプトが指定された場合
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        self._validate_prompt(prompt_text)
+        if not await self._repository.get_model_by_id(model_id):
+            raise VLMModelNotFoundError(model_id)
+    
     async def process_prompt(
         self, 
         model_id: str, 
         prompt_text: str, 
-        parameters: Optional[ModelParameters] = None
+        parameters: Optional[ModelParameters] = None,
+        use_cache: bool = True,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        images: Optional[Sequence[ImageInput]] = None
     ) -> VLMResponse:
         """
         プロンプトを処理し、VLMからのレスポンスを取得する
@@ -53,32 +177,329 @@ class VLMService:
             model_id: 使用するVLMモデルのID
             prompt_text: プロンプトテキスト
             parameters: モデルパラメータ（オプション）
+            use_cache: レスポンスキャッシュを使用するかどうか
+            priority: 優先度（大きいほど先に処理される）
+            deadline: 処理を開始しなければならない期限（UNIX時間、オプション）
+            images: プロンプトと一緒に渡す画像（オプション）
             
         Returns:
             VLMレスポンス
             
         Raises:
             InvalidPromptError: 無効なプロンプトが指定された場合
+            InvalidImageError: 画像をデコードできない場合
             VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            DeadlineExceededError: 処理を開始する前に期限を過ぎた場合
             VLMConnectionError: VLMとの接続に問題がある場合
             VLMProcessingError: VLMの処理中にエラーが発生した場合
         """
-        if not prompt_text or not prompt_text.strip():
-            raise InvalidPromptError("Prompt text cannot be empty")
+        client, request = await self._prepare_request(
+            model_id, prompt_text, parameters, use_cache=use_cache, priority=priority, deadline=deadline,
+            images=images
+        )
         
-        # モデルの存在確認
-        model = await self._repository.get_model_by_id(model_id)
-        if not model:
+        return await self._generate(client, request)
+    
+    async def process_prompts(
+        self, 
+        requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        複数のプロンプトをまとめて処理する
+        
+        リクエストをモデルごとにまとめ、モデルの確認とクライアントの取得を
+        モデルごとに1回だけ行う。各モデルのリクエストは優先度の高い順に
+        最大batch_concurrency件ずつ並行に処理される。1件の失敗は他のリクエストに影響しない。
+        
+        Args:
+            requests: VLMリクエストのリスト
+            
+        Returns:
+            リクエストと同じ順序のVLMレスポンス、または失敗したリクエストの例外のリスト
+        """
+        results: List[Union[VLMResponse, Exception]] = [None] * len(requests)
+        groups: Dict[str, List[int]] = {}
+        for index, request in enumerate(requests):
+            groups.setdefault(request.model_id, []).append(index)
+        
+        await asyncio.gather(*(
+            self._process_group(model_id, indices, requests, results)
+            for model_id, indices in groups.items()
+        ))
+        return results
+    
+    async def _process_group(
+        self, 
+        model_id: str, 
+        indices: List[int], 
+        requests: List[VLMRequest], 
+        results: List[Union[VLMResponse, Exception]]
+    ):
+        """
+        同じモデルを対象とするリクエストを並行数を制限して処理する
+        
+        Args:
+            model_id: VLMモデルのID
+            indices: 処理するリクエストの位置のリスト
+            requests: VLMリクエストのリスト
+            results: 結果を書き込むリスト
+        """
+        try:
+            client = await self._get_client(model_id)
+        except Exception as e:
+            for index in indices:
+                results[index] = e
+            return
+        
+        semaphore = asyncio.Semaphore(self._batch_concurrency)
+        # セマフォは待機した順に枠を譲るため、優先度の高いリクエストから待機させる
+        indices = sorted(indices, key=lambda index: -requests[index].priority)
+        
+        async def run(index: int):
+            request = requests[index]
+            try:
+                self._validate_prompt(request.prompt_text)
+                if request.images:
+                    request = dataclasses.replace(
+                        request, images=await self._preprocess_images(model_id, request.images)
+                    )
+                async with semaphore:
+                    results[index] = await self._generate(client, request)
+            except Exception as e:
+                results[index] = e
+        
+        await asyncio.gather(*(run(index) for index in indices))
+    
+    async def _generate(self, client: VLMClientInterface, request: VLMRequest) -> VLMResponse:
+        """
+        クライアントでレスポンスを生成する（実行中の同一リクエストがあれば結果を共有する）
+        
+        Args:
+            client: VLMクライアント
+            request: VLMリクエスト
+            
+        Returns:
+            VLMレスポンス
+            
+        Raises:
+            DeadlineExceededError: 処理を開始する前に期限を過ぎた場合
+        """
+        model_id = request.model_id
+        if request.is_expired():
+            raise DeadlineExceededError(model_id)
+        if not self._coalesce_requests:
+            return await self._with_token_counts(await client.generate_response(request))
+        
+        # 同じモデル・プロンプト・パラメータ・優先度のリクエストが実行中ならその結果を共有する
+        leader = False
+        
+        def start():
+            nonlocal leader
+            leader = True
+            return client.generate_response(request)
+        
+        try:
+            response, shared = await self._single_flight.do(request.coalescing_key(), start)
+        except DeadlineExceededError:
+            # 共有した処理が先行リクエストの期限で失敗した場合、自分の期限内であれば単独で実行し直す
+            if leader or request.is_expired():
+                raise
+            return await self._with_token_counts(await client.generate_response(request))
+        if shared:
+            self._coalesced[model_id] = self._coalesced.get(model_id, 0) + 1
+        return await self._with_token_counts(response)
+    
+    async def _with_token_counts(self, response: VLMResponse) -> VLMResponse:
+        """
+        バックエンドが報告しなかったプロンプトと生成結果のトークン数をトークナイザーで補完する
+        
+        Args:
+            response: VLMレスポンス
+            
+        Returns:
+            トークン数を補完したVLMレスポンス（補完できない場合は元のレスポンス）
+        """
+        if self._tokenizer is None or (
+            response.prompt_tokens is not None and response.completion_tokens is not None
+        ):
+            return response
+        
+        try:
+            prompt_tokens, completion_tokens = await self._tokenizer.count_tokens(
+                response.model_id, [response.prompt.text, response.text]
+            )
+        except Exception:
+            logger.exception(f"Failed to count tokens for model {response.model_id}")
+            return response
+        return dataclasses.replace(
+            response,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tokens_used=prompt_tokens + completion_tokens
+        )
+    
+    async def count_tokens(self, model_id: str, texts: List[str]) -> List[int]:
+        """
+        モデルのトークナイザーでテキストごとのトークン数を数える（モデルの呼び出しは行わない）
+        
+        Args:
+            model_id: VLMモデルのID
+            texts: テキストのリスト
+            
+        Returns:
+            テキストと同じ順序のトークン数のリスト
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            VLMProcessingError: トークナイザーが設定されていない場合
+        """
+        if not await self._repository.get_model_by_id(model_id):
             raise VLMModelNotFoundError(model_id)
+        if self._tokenizer is None:
+            raise VLMProcessingError(model_id, "no tokenizer is configured")
+        return await self._tokenizer.count_tokens(model_id, texts)
+    
+    async def process_prompt_stream(
+        self, 
+        model_id: str, 
+        prompt_text: str, 
+        parameters: Optional[ModelParameters] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        images: Optional[Sequence[ImageInput]] = None
+    ) -> AsyncIterator[VLMResponseChunk]:
+        """
+        プロンプトを処理し、VLMからのレスポンスを断片ごとに返すイテレータを取得する
         
-        # クライアントの取得
-        client = await self._repository.get_client_for_model(model_id)
+        入力の検証はイテレータを返す前に行われるため、無効なリクエストは
+        ストリーミング開始前に例外となる。
+        
+        Args:
+            model_id: 使用するVLMモデルのID
+            prompt_text: プロンプトテキスト
+            parameters: モデルパラメータ（オプション）
+            priority: 優先度（大きいほど先に処理される）
+            deadline: 処理を開始しなければならない期限（UNIX時間、オプション）
+            images: プロンプトと一緒に渡す画像（オプション）
+            
+        Returns:
+            VLMレスポンスの断片を返す非同期イテレータ
+            
+        Raises:
+            InvalidPromptError: 無効なプロンプトが指定された場合
+            InvalidImageError: 画像をデコードできない場合
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            DeadlineExceededError: 期限を過ぎている場合
+        """
+        client, request = await self._prepare_request(
+            model_id, prompt_text, parameters, priority=priority, deadline=deadline, images=images
+        )
+        if request.is_expired():
+            raise DeadlineExceededError(model_id)
+        
+        return client.generate_stream(request)
+    
+    async def _prepare_request(
+        self, 
+        model_id: str, 
+        prompt_text: str, 
+        parameters: Optional[ModelParameters] = None,
+        use_cache: bool = True,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        images: Optional[Sequence[ImageInput]] = None
+    ) -> Tuple[VLMClientInterface, VLMRequest]:
+        """
+        プロンプトを検証し、クライアントとリクエストを準備する
+        
+        Args:
+            model_id: 使用するVLMモデルのID
+            prompt_text: プロンプトテキスト
+            parameters: モデルパラメータ（オプション）
+            use_cache: レスポンスキャッシュを使用するかどうか
+            priority: 優先度
+            deadline: 処理を開始しなければならない期限（UNIX時間）
+            images: プロンプトと一緒に渡す画像
+            
+        Returns:
+            VLMクライアントとVLMリクエストのタプル
+            
+        Raises:
+            InvalidPromptError: 無効なプロンプトが指定された場合
+            InvalidImageError: 画像をデコードできない場合
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        self._validate_prompt(prompt_text)
+        client = await self._get_client(model_id)
+        preprocessed = await self._preprocess_images(model_id, images)
         
-        # リクエストの作成と送信
+        # リクエストの作成
         request = VLMRequest(
             prompt_text=prompt_text,
             model_id=model_id,
-            parameters=parameters
+            parameters=parameters,
+            use_cache=use_cache,
+            priority=priority,
+            deadline=deadline,
+            images=preprocessed
         )
         
-        return await client.generate_response(request)
\ No newline at end of file
+        return client, request
+    
+    async def _preprocess_images(
+        self, 
+        model_id: str, 
+        images: Optional[Sequence[ImageInput]]
+    ) -> Tuple[ImageInput, ...]:
+        """
+        モデルの設定に従って画像を前処理する
+        
+        Args:
+            model_id: VLMモデルのID
+            images: 画像のリスト
+            
+        Returns:
+            前処理済み画像のタプル（画像プロセッサーがない場合は元の画像）
+            
+        Raises:
+            InvalidImageError: 画像をデコードできない場合
+        """
+        if not images:
+            return ()
+        if self._image_processor is None:
+            return tuple(images)
+        return tuple(await self._image_processor.preprocess(model_id, list(images)))
+    
+    def _validate_prompt(self, prompt_text: str):
+        """
+        プロンプトを検証する
+        
+        Args:
+            prompt_text: プロンプトテキスト
+            
+        Raises:
+            InvalidPromptError: 無効なプロンプトが指定された場合
+        """
+        if not prompt_text or not prompt_text.strip():
+            raise InvalidPromptError("Prompt text cannot be empty")
+    
+    async def _get_client(self, model_id: str) -> VLMClientInterface:
+        """
+        モデルの存在を確認し、クライアントを取得する
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            VLMクライアント
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        # モデルの存在確認
+        model = await self._repository.get_model_by_id(model_id)
+        if not model:
+            raise VLMModelNotFoundError(model_id)
+        
+        # クライアントの取得
+        return await self._repository.get_client_for_model(model_id)
\ No newline at end of file
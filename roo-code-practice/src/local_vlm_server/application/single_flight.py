@@ -0,0 +1,75 @@
+"""同一リクエストの重複実行を防ぐシングルフライトの定義モジュール"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    同じキーで同時に実行される処理を1回にまとめるクラス
+
+    あるキーの処理が実行中に同じキーで呼び出された場合、新たに実行せず
+    実行中の処理の結果（または例外）を共有する。
+    呼び出し元の一部がキャンセルされても処理は継続し、全員がキャンセルされた
+    場合にだけ処理自体をキャンセルする。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    def in_flight(self) -> int:
+        """
+        実行中の処理の数を取得する
+
+        Returns:
+            実行中のキーの数
+        """
+        return len(self._in_flight)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        キーに対応する処理を実行する、または実行中の処理の結果を待つ
+
+        Args:
+            key: 処理を識別するキー
+            func: 処理を行うコルーチンを返す関数
+
+        Returns:
+            処理結果と、実行中の処理を共有したかどうかのタプル
+        """
+        future = self._in_flight.get(key)
+        shared = future is not None
+        if not shared:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        # 待機中の呼び出し元がキャンセルされても共有中の処理は継続させる
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future), shared
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+                # 結果を待つ呼び出し元がいなくなった処理は中断する
+                if not future.done():
+                    future.cancel()
+
+    def _forget(self, key: str, future: asyncio.Future):
+        """
+        完了した処理を実行中の一覧から取り除く
+
+        Args:
+            key: 処理を識別するキー
+            future: 完了した処理
+        """
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # 待機者が全員キャンセルされた場合の未取得例外の警告を防ぐ
+        if not future.cancelled():
+            future.exception()
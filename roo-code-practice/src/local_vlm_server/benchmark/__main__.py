@@ -0,0 +1,8 @@
+"""ベンチマークのエントリーポイント（python -m src.local_vlm_server.benchmark）"""
+import sys
+
+from .runner import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""レスポンスのエンコードのオーバーヘッドを計測するベンチマークの定義モジュール
+
+APIスキーマを経由する従来のエンコードと、ドメインオブジェクトから直接JSONにする
+エンコードの1リクエストあたりの時間を、短い生成と長い生成のそれぞれで比較する。
+
+    python -m src.local_vlm_server.benchmark.encoding --iterations 20000
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from ..domain.entities import Prompt, VLMModel, VLMResponse
+from ..interface.api.responses import ORJSON_AVAILABLE, ModelsListCache, encode_vlm_response
+from ..interface.api.routes import _to_response_schema
+from ..interface.api.schemas import ModelsListResponseSchema, VLMModelSchema, VLMResponseSchema
+
+
+# 計測する生成の大きさ（生成されたトークン数）
+GENERATION_SIZES: Dict[str, int] = {
+    "small": 16,
+    "large": 4096,
+}
+
+
+def make_response(completion_tokens: int) -> VLMResponse:
+    """
+    指定したトークン数の生成を模したVLMレスポンスを作成する
+
+    Args:
+        completion_tokens: 生成されたトークン数
+
+    Returns:
+        VLMレスポンス
+    """
+    text = " ".join(f"token{i % 1000}" for i in range(completion_tokens))
+    return VLMResponse(
+        model_id="synthetic-fast",
+        prompt=Prompt(text="Describe the benchmark request", parameters={"temperature": 0.7}),
+        text=text,
+        tokens_used=completion_tokens + 8,
+        prompt_tokens=8,
+        completion_tokens=completion_tokens,
+        metadata={"model": "synthetic-fast", "finish_reason": "stop", "latency_ms": 12.5, "cached": False},
+    )
+
+
+def make_models(count: int) -> List[VLMModel]:
+    """
+    モデル一覧の計測に使用するVLMモデルを作成する
+
+    Args:
+        count: モデル数
+
+    Returns:
+        VLMモデルのリスト
+    """
+    return [
+        VLMModel(
+            id=f"model-{i}",
+            name=f"Model {i}",
+            description="Synthetic benchmark model",
+            parameters={"context_length": 8192, "vision": True},
+        )
+        for i in range(count)
+    ]
+
+
+def _time_per_call(function: Callable[[], object], iterations: int, repeats: int) -> float:
+    """
+    関数の1回あたりの実行時間を計測する
+
+    Args:
+        function: 計測する関数
+        iterations: 1回の計測で呼び出す回数
+        repeats: 計測の繰り返し回数
+
+    Returns:
+        1回あたりの実行時間の中央値（マイクロ秒）
+    """
+    samples = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        samples.append((time.perf_counter() - started_at) / iterations * 1e6)
+    return statistics.median(samples)
+
+
+def run_encoding_benchmark(iterations: int = 10000, repeats: int = 5, models: int = 8) -> Dict[str, any]:
+    """
+    レスポンスのエンコード時間を計測する
+
+    /generateのレスポンスについて以下を比較する。
+    - schema_jsonable: スキーマに変換し、jsonable_encoderとjson.dumpsでエンコードする
+      （FastAPIのデフォルトのエンコード）
+    - schema_dump_json: スキーマに変換し、レスポンスモデルとして検証してからPydanticでエンコードする
+      （新しいFastAPIでレスポンスモデルを指定した場合のエンコード）
+    - direct: ドメインオブジェクトから直接エンコードする
+
+    /modelsのレスポンスについては、スキーマに変換してエンコードする場合と、
+    エンコード済みの本文をキャッシュから取得する場合を比較する。
+
+    Args:
+        iterations: 1回の計測でエンコードする回数
+        repeats: 計測の繰り返し回数
+        models: モデル一覧のモデル数
+
+    Returns:
+        1リクエストあたりの時間（マイクロ秒）と、直接のエンコードで削減された時間を含む辞書
+    """
+    response_adapter = TypeAdapter(VLMResponseSchema)
+    generate = {}
+    for size, completion_tokens in GENERATION_SIZES.items():
+        vlm_response = make_response(completion_tokens)
+        timings = {
+            "schema_jsonable": _time_per_call(
+                lambda: JSONResponse(jsonable_encoder(_to_response_schema(vlm_response))).body,
+                iterations, repeats
+            ),
+            "schema_dump_json": _time_per_call(
+                lambda: response_adapter.dump_json(
+                    response_adapter.validate_python(_to_response_schema(vlm_response), from_attributes=True)
+                ),
+                iterations, repeats
+            ),
+            "direct": _time_per_call(lambda: encode_vlm_response(vlm_response), iterations, repeats),
+        }
+        generate[size] = {
+            "completion_tokens": completion_tokens,
+            "body_bytes": len(encode_vlm_response(vlm_response)),
+            "us_per_request": timings,
+            "saved_us_per_request": {
+                baseline: timings[baseline] - timings["direct"]
+                for baseline in ("schema_jsonable", "schema_dump_json")
+            },
+        }
+
+    model_list = make_models(models)
+    cache = ModelsListCache()
+    cache.put(1, model_list)
+    list_timings = {
+        "schema": _time_per_call(
+            lambda: ModelsListResponseSchema(
+                models=[
+                    VLMModelSchema(
+                        id=model.id,
+                        name=model.name,
+                        description=model.description,
+                        parameters=model.parameters
+                    )
+                    for model in model_list
+                ]
+            ).model_dump_json(),
+            iterations, repeats
+        ),
+        "cached": _time_per_call(lambda: cache.get(1), iterations, repeats),
+    }
+
+    return {
+        "encoder": "orjson" if ORJSON_AVAILABLE else "json",
+        "iterations": iterations,
+        "repeats": repeats,
+        "generate": generate,
+        "models": {
+            "models": models,
+            "us_per_request": list_timings,
+            "saved_us_per_request": list_timings["schema"] - list_timings["cached"],
+        },
+        "python": platform.python_version(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    コマンドラインからエンコードのベンチマークを実行し、結果のJSONを出力する
+
+    Args:
+        argv: コマンドライン引数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Local VLM Server response encoding benchmark")
+    parser.add_argument("--iterations", type=int, default=10000, help="1回の計測でエンコードする回数")
+    parser.add_argument("--repeats", type=int, default=5, help="計測の繰り返し回数")
+    parser.add_argument("--models", type=int, default=8, help="モデル一覧のモデル数")
+    parser.add_argument("--output", help="結果のJSONを書き込むファイル（省略時は標準出力）")
+    args = parser.parse_args(argv)
+
+    report = run_encoding_benchmark(args.iterations, args.repeats, args.models)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""ベンチマーク用の合成レイテンシを返すVLMクライアントの定義モジュール"""
+import asyncio
+import math
+import random
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from ..domain.exceptions import VLMConnectionError
+from ..domain.value_objects import ModelParameters, VLMRequest
+from ..infrastructure.vlm_clients.base import BaseVLMClient
+
+
+class LatencyDistribution:
+    """
+    合成レイテンシの分布
+
+    平均mean_msを共通のパラメータとし、"constant"は常に平均値、"uniform"は0から平均の2倍、
+    "exponential"は指数分布、"lognormal"はsigmaを形状パラメータとする対数正規分布から値を取る。
+    """
+
+    DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+    def __init__(
+        self,
+        distribution: str = "constant",
+        mean_ms: float = 50.0,
+        sigma: float = 0.5,
+        min_ms: float = 0.0,
+        max_ms: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        初期化
+
+        Args:
+            distribution: 分布の種類
+            mean_ms: 平均レイテンシ（ミリ秒）
+            sigma: 対数正規分布の形状パラメータ（大きいほど裾が重い）
+            min_ms: レイテンシの下限（ミリ秒）
+            max_ms: レイテンシの上限（ミリ秒、Noneの場合は無制限）
+            seed: 乱数のシード
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.sigma = sigma
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """
+        レイテンシを1つ取り出す
+
+        Returns:
+            レイテンシ（秒）
+        """
+        if self.mean_ms <= 0:
+            value = 0.0
+        elif self.distribution == "constant":
+            value = self.mean_ms
+        elif self.distribution == "uniform":
+            value = self._random.uniform(0.0, 2 * self.mean_ms)
+        elif self.distribution == "exponential":
+            value = self._random.expovariate(1.0 / self.mean_ms)
+        else:
+            # 平均がmean_msになるよう位置パラメータを決める
+            mu = math.log(self.mean_ms) - self.sigma ** 2 / 2
+            value = self._random.lognormvariate(mu, self.sigma)
+        value = max(self.min_ms, value)
+        if self.max_ms is not None:
+            value = min(self.max_ms, value)
+        return value / 1000.0
+
+
+class SyntheticVLMClient(BaseVLMClient):
+    """
+    モデルを使わずに設定した分布のレイテンシとトークン生成速度を再現するVLMクライアント
+
+    1リクエストの処理時間は、プロンプトの処理時間（latencyの分布から取る）と
+    出力トークン数をtokens_per_secondで割った生成時間の合計とする。
+    一括処理はバッチ推論を模して、1回分のプロンプト処理時間と最長の生成時間で全件を返す。
+    """
+
+    def __init__(self, model_id: str, config: Optional[Dict[str, any]] = None):
+        """
+        初期化
+
+        Args:
+            model_id: VLMモデルのID
+            config: クライアント設定
+                - latency: プロンプトの処理時間の分布（LatencyDistributionの引数）
+                - tokens_per_second: 1秒あたりの生成トークン数（Noneの場合は生成時間なし）
+                - output_tokens: 出力トークン数（max_tokensを超えない）
+                - error_rate: VLMConnectionErrorを送出する確率
+                - seed: 乱数のシード
+        """
+        super().__init__(model_id, config)
+        seed = self.config.get("seed")
+        self.latency = LatencyDistribution(**{"seed": seed, **self.config.get("latency", {})})
+        self.tokens_per_second = self.config.get("tokens_per_second")
+        self.output_tokens = self.config.get("output_tokens", 32)
+        self.error_rate = self.config.get("error_rate", 0.0)
+        self._random = random.Random(seed)
+
+    def _completion_tokens(self, request: VLMRequest) -> int:
+        """リクエストの出力トークン数を決める"""
+        parameters = request.parameters or ModelParameters()
+        return min(self.output_tokens, parameters.max_tokens)
+
+    def _decode_seconds(self, tokens: int) -> float:
+        """トークンの生成時間（秒）を計算する"""
+        if not self.tokens_per_second:
+            return 0.0
+        return tokens / self.tokens_per_second
+
+    def _maybe_fail(self):
+        """設定した確率で接続エラーを送出する"""
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise VLMConnectionError(self.model_id, "synthetic failure")
+
+    def _response_data(self, request: VLMRequest, tokens: int) -> Dict[str, any]:
+        """出力トークン数に応じたレスポンスデータを作成する"""
+        prompt_tokens = len(request.prompt_text) // 4
+        return {
+            "text": " ".join(["token"] * tokens),
+            "tokens_used": prompt_tokens + tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": tokens,
+            "metadata": {"synthetic": True},
+        }
+
+    async def _execute_request(self, request: VLMRequest) -> Dict[str, any]:
+        """
+        合成レイテンシだけ待ってからレスポンスデータを返す
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            レスポンスデータの辞書
+
+        Raises:
+            VLMConnectionError: error_rateの確率で発生させる接続エラー
+        """
+        tokens = self._completion_tokens(request)
+        await asyncio.sleep(self.latency.sample() + self._decode_seconds(tokens))
+        self._maybe_fail()
+        return self._response_data(request, tokens)
+
+    async def _execute_stream(self, request: VLMRequest) -> AsyncIterator[Dict[str, any]]:
+        """
+        プロンプトの処理時間の後、トークン生成速度に合わせて1トークンずつ返す
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            断片データの辞書
+        """
+        tokens = self._completion_tokens(request)
+        await asyncio.sleep(self.latency.sample())
+        self._maybe_fail()
+        interval = self._decode_seconds(1)
+        for index in range(tokens):
+            if interval:
+                await asyncio.sleep(interval)
+            yield {"text": "token" if index == 0 else " token", "finish_reason": None}
+        data = self._response_data(request, tokens)
+        yield {
+            "text": "",
+            "finish_reason": "stop",
+            "tokens_used": data["tokens_used"],
+            "metadata": data["metadata"],
+        }
+
+    async def _execute_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[Dict[str, any], Exception]]:
+        """
+        1回分のプロンプト処理時間と最長の生成時間だけ待ってから全件のレスポンスデータを返す
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            リクエストと同じ順序のレスポンスデータの辞書または例外のリスト
+        """
+        tokens = [self._completion_tokens(request) for request in requests]
+        await asyncio.sleep(self.latency.sample() + self._decode_seconds(max(tokens, default=0)))
+        results: List[Union[Dict[str, any], Exception]] = []
+        for request, count in zip(requests, tokens):
+            try:
+                self._maybe_fail()
+                results.append(self._response_data(request, count))
+            except VLMConnectionError as e:
+                results.append(e)
+        return results
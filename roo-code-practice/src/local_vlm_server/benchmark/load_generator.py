@@ -0,0 +1,266 @@
+"""一定のリクエストレートまたは同時実行数で負荷をかける非同期負荷生成器の定義モジュール"""
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, cast
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """
+    最近接順位法で百分位数を計算する
+
+    Args:
+        values: 値のリスト
+        p: 百分位（0〜100）
+
+    Returns:
+        百分位数（値がない場合はNone）
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(len(ordered) * p / 100) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(values: Sequence[float]) -> Dict[str, any]:
+    """
+    秒単位の値の分布をミリ秒単位で要約する
+
+    Args:
+        values: 値のリスト（秒）
+
+    Returns:
+        件数・平均・p50・p95・p99・最大値の辞書（ミリ秒、値がない場合はNone）
+    """
+    def to_ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(values),
+        "mean": to_ms(sum(values) / len(values)) if values else None,
+        "p50": to_ms(percentile(values, 50)),
+        "p95": to_ms(percentile(values, 95)),
+        "p99": to_ms(percentile(values, 99)),
+        "max": to_ms(max(values, default=None)),
+    }
+
+
+class EventLoopLagMonitor:
+    """
+    イベントループの遅延を計測するモニター
+
+    interval秒ごとにスリープし、予定より遅れて再開した時間を遅延として記録する。
+    同期的な処理がイベントループを塞ぐと遅延が大きくなる。
+    """
+
+    def __init__(self, interval: float = 0.01):
+        """
+        初期化
+
+        Args:
+            interval: 計測間隔（秒）
+        """
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        """遅延を計測し続ける"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        """計測を開始する"""
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """計測を終了する"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+@dataclass
+class RequestRecord:
+    """1件のリクエストの計測結果"""
+    endpoint: str
+    status: int
+    latency: float
+
+
+class LoadGenerator:
+    """
+    エンドポイントの比率に従ってリクエストを送り、レイテンシとスループットを計測する負荷生成器
+
+    modeが"closed"の場合はconcurrency個のワーカーがそれぞれ前のレスポンスを待ってから
+    次のリクエストを送る（クローズドループ）。"open"の場合はレスポンスを待たずに
+    毎秒rps件の一定間隔でリクエストを送る（オープンループ）。オープンループのレイテンシは
+    予定した送信時刻から計測するため、サーバーが詰まって送信が遅れた分も含まれる。
+    最初のwarmup秒に開始したリクエストは集計しない。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[int]],
+        mix: Dict[str, float],
+        mode: str = "closed",
+        concurrency: int = 16,
+        rps: Optional[float] = None,
+        duration: float = 10.0,
+        warmup: float = 0.0,
+        lag_interval: float = 0.01,
+        seed: Optional[int] = None
+    ):
+        """
+        初期化
+
+        Args:
+            send: エンドポイント名を受け取ってリクエストを送り、HTTPステータスコードを返す関数
+            mix: エンドポイント名をキーとするリクエストの比率
+            mode: "closed"または"open"
+            concurrency: クローズドループのワーカー数
+            rps: オープンループの1秒あたりのリクエスト数
+            duration: 計測時間（秒、ウォームアップを含まない）
+            warmup: 集計しないウォームアップ時間（秒）
+            lag_interval: イベントループの遅延の計測間隔（秒）
+            seed: エンドポイントを選ぶ乱数のシード
+        """
+        if mode not in ("closed", "open"):
+            raise ValueError(f"Unknown load mode: {mode}")
+        if mode == "open" and (rps is None or rps <= 0):
+            raise ValueError("rps must be a positive number for open-loop load")
+        if not mix or any(weight < 0 for weight in mix.values()) or sum(mix.values()) <= 0:
+            raise ValueError("mix must contain at least one positive weight")
+        self.send = send
+        self.mix = mix
+        self.mode = mode
+        self.concurrency = concurrency
+        self.rps = rps
+        self.duration = duration
+        self.warmup = warmup
+        self.lag_interval = lag_interval
+        self._random = random.Random(seed)
+        self._endpoints = list(mix)
+        self._weights = [mix[endpoint] for endpoint in self._endpoints]
+        self.records: List[RequestRecord] = []
+
+    def _choose(self) -> str:
+        """比率に従って次のエンドポイントを選ぶ"""
+        return self._random.choices(self._endpoints, self._weights)[0]
+
+    async def _issue(self, endpoint: str, started_at: float, measure_from: float):
+        """
+        リクエストを1件送って結果を記録する
+
+        Args:
+            endpoint: エンドポイント名
+            started_at: レイテンシの起点（time.perf_counter()）
+            measure_from: 集計を開始する時刻（time.perf_counter()）
+        """
+        try:
+            status = await self.send(endpoint)
+        except Exception:
+            # 接続できなかった場合などはステータスコード0として記録する
+            status = 0
+        if started_at >= measure_from:
+            self.records.append(RequestRecord(endpoint, status, time.perf_counter() - started_at))
+
+    async def _run_closed(self, measure_from: float, end_at: float):
+        """クローズドループで負荷をかける"""
+        async def worker():
+            while time.perf_counter() < end_at:
+                await self._issue(self._choose(), time.perf_counter(), measure_from)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _run_open(self, started_at: float, measure_from: float, end_at: float):
+        """オープンループで負荷をかける"""
+        tasks = []
+        # オープンループではrpsが正の値であることを__init__で検証済み
+        rps = cast(float, self.rps)
+        interval = 1.0 / rps
+        for sequence in range(int((end_at - started_at) * rps)):
+            scheduled = started_at + sequence * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(self._issue(self._choose(), scheduled, measure_from)))
+        await asyncio.gather(*tasks)
+
+    async def run(self) -> Dict[str, any]:
+        """
+        負荷をかけて計測結果を集計する
+
+        Returns:
+            計測結果の辞書
+        """
+        self.records = []
+        monitor = EventLoopLagMonitor(self.lag_interval)
+        started_at = time.perf_counter()
+        measure_from = started_at + self.warmup
+        end_at = measure_from + self.duration
+        monitor.start()
+        try:
+            if self.mode == "closed":
+                await self._run_closed(measure_from, end_at)
+            else:
+                await self._run_open(started_at, measure_from, end_at)
+        finally:
+            await monitor.stop()
+        # 最後のレスポンスを待った時間も含める
+        elapsed = max(time.perf_counter(), end_at) - measure_from
+        lag_samples = monitor.samples[int(self.warmup / self.lag_interval):]
+        return self._report(elapsed, lag_samples)
+
+    def _report(self, elapsed: float, lag_samples: List[float]) -> Dict[str, any]:
+        """
+        計測結果を集計する
+
+        Args:
+            elapsed: 集計対象の時間（秒）
+            lag_samples: イベントループの遅延の標本（秒）
+
+        Returns:
+            計測結果の辞書
+        """
+        succeeded = [record for record in self.records if 200 <= record.status < 300]
+        status_codes: Dict[str, int] = {}
+        for record in self.records:
+            status_codes[str(record.status)] = status_codes.get(str(record.status), 0) + 1
+
+        endpoints = {}
+        for endpoint in self._endpoints:
+            records = [record for record in self.records if record.endpoint == endpoint]
+            endpoint_succeeded = [record for record in records if 200 <= record.status < 300]
+            endpoints[endpoint] = {
+                "requests": len(records),
+                "errors": len(records) - len(endpoint_succeeded),
+                "throughput_rps": round(len(endpoint_succeeded) / elapsed, 3),
+                "latency_ms": summarize_latencies([record.latency for record in endpoint_succeeded]),
+            }
+
+        return {
+            "mode": self.mode,
+            "concurrency": self.concurrency if self.mode == "closed" else None,
+            "target_rps": self.rps if self.mode == "open" else None,
+            "duration_seconds": round(elapsed, 3),
+            "warmup_seconds": self.warmup,
+            "requests": len(self.records),
+            "errors": len(self.records) - len(succeeded),
+            "throughput_rps": round(len(succeeded) / elapsed, 3),
+            "status_codes": status_codes,
+            "latency_ms": summarize_latencies([record.latency for record in succeeded]),
+            "endpoints": endpoints,
+            "event_loop_lag_ms": summarize_latencies(lag_samples),
+        }
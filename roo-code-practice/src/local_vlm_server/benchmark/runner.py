@@ -0,0 +1,258 @@
+"""合成クライアントでアプリケーションを起動し、負荷をかけて結果をJSONで出力するベンチマークの定義モジュール"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI
+
+from ..application.services import VLMService
+from ..domain.entities import VLMModel
+from ..infrastructure.tokenizers import TokenizerService
+from ..infrastructure.vlm_repository import VLMRepository
+from ..interface.api.dependencies import (
+    get_tokenizer_service,
+    get_vlm_repository,
+    get_vlm_service,
+)
+from ..interface.main import app
+from .fake_clients import SyntheticVLMClient
+from .load_generator import LoadGenerator
+
+
+logger = logging.getLogger(__name__)
+
+
+# 合成クライアントのクライアントタイプ
+SYNTHETIC_CLIENT_TYPE = "synthetic"
+
+# シナリオを指定しない場合に使用するシナリオ
+DEFAULT_SCENARIO: Dict[str, any] = {
+    "models": [
+        {
+            "id": "synthetic-fast",
+            "config": {
+                "latency": {"distribution": "lognormal", "mean_ms": 20.0, "sigma": 0.5},
+                "tokens_per_second": 500.0,
+                "output_tokens": 16,
+                "seed": 0,
+                "concurrency": {"max_concurrency": 32, "max_queue": 1024, "queue_timeout": 30.0},
+            },
+        },
+    ],
+    "prompt": "Describe the benchmark request",
+    "batch_size": 4,
+}
+
+
+@asynccontextmanager
+async def benchmark_app(scenario: Dict[str, any]) -> AsyncIterator[FastAPI]:
+    """
+    シナリオの合成モデルを登録したリポジトリでアプリケーションを使用できるようにする
+
+    アプリケーションの依存関係をベンチマーク用のリポジトリとサービスに差し替え、
+    終了時に元に戻す。
+
+    Args:
+        scenario: ベンチマークのシナリオ
+            - models: 合成モデルのリスト（id, configの辞書。configはSyntheticVLMClientと
+              ラッパーのクライアント設定）
+
+    Yields:
+        FastAPIアプリケーション
+    """
+    repository = VLMRepository()
+    repository.register_client_factory(SYNTHETIC_CLIENT_TYPE, SyntheticVLMClient)
+    for model in scenario["models"]:
+        repository.register_model(
+            VLMModel(id=model["id"], name=model.get("name", model["id"])),
+            SYNTHETIC_CLIENT_TYPE,
+            model.get("config", {})
+        )
+    tokenizer = TokenizerService(repository.get_tokenizer_config)
+    service = VLMService(repository, tokenizer=tokenizer)
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_vlm_repository] = lambda: repository
+    app.dependency_overrides[get_tokenizer_service] = lambda: tokenizer
+    app.dependency_overrides[get_vlm_service] = lambda: service
+    try:
+        for model in scenario["models"]:
+            await repository.get_client_for_model(model["id"])
+        yield app
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
+        await repository.close()
+
+
+def make_sender(
+    client: httpx.AsyncClient,
+    scenario: Dict[str, any]
+) -> Callable[[str], Awaitable[int]]:
+    """
+    エンドポイント名に応じたリクエストを送る関数を作成する
+
+    同じプロンプトの同時リクエストが1回の生成にまとめられないよう、
+    プロンプトには通し番号を付ける。
+
+    Args:
+        client: HTTPクライアント
+        scenario: ベンチマークのシナリオ（models, prompt, batch_size）
+
+    Returns:
+        エンドポイント名（"generate", "batch", "models"）を受け取ってHTTPステータスコードを返す関数
+    """
+    model_ids = [model["id"] for model in scenario["models"]]
+    prompt = scenario.get("prompt", DEFAULT_SCENARIO["prompt"])
+    batch_size = scenario.get("batch_size", DEFAULT_SCENARIO["batch_size"])
+    sequence = itertools.count()
+
+    def prompt_request() -> Dict[str, any]:
+        n = next(sequence)
+        return {"model_id": model_ids[n % len(model_ids)], "prompt": f"{prompt} #{n}"}
+
+    async def send(endpoint: str) -> int:
+        if endpoint == "generate":
+            response = await client.post("/api/v1/generate", json=prompt_request())
+        elif endpoint == "batch":
+            response = await client.post(
+                "/api/v1/generate/batch",
+                json={"requests": [prompt_request() for _ in range(batch_size)]}
+            )
+        elif endpoint == "models":
+            response = await client.get("/api/v1/models")
+        else:
+            raise ValueError(f"Unknown benchmark endpoint: {endpoint}")
+        await response.aread()
+        return response.status_code
+
+    return send
+
+
+def _git_commit() -> Optional[str]:
+    """現在のgitのコミットを取得する（取得できない場合はNone）"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, check=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+async def run_benchmark(
+    scenario: Optional[Dict[str, any]] = None,
+    mix: Optional[Dict[str, float]] = None,
+    url: Optional[str] = None,
+    **load_options
+) -> Dict[str, any]:
+    """
+    ベンチマークを実行する
+
+    urlを指定しない場合は、シナリオの合成モデルを登録したアプリケーションに
+    プロセス内で（ASGI経由で）リクエストを送る。この場合、計測したイベントループの遅延は
+    サーバーのイベントループの遅延である。
+
+    Args:
+        scenario: ベンチマークのシナリオ（省略時はDEFAULT_SCENARIO）
+        mix: エンドポイント名をキーとするリクエストの比率（省略時はgenerateのみ）
+        url: 負荷をかける起動済みサーバーのURL
+        **load_options: LoadGeneratorの引数（mode, concurrency, rps, duration, warmupなど）
+
+    Returns:
+        計測結果の辞書
+    """
+    scenario = scenario or DEFAULT_SCENARIO
+    mix = mix or {"generate": 1.0}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+            report = await LoadGenerator(make_sender(client, scenario), mix, **load_options).run()
+    else:
+        async with benchmark_app(scenario) as application:
+            transport = httpx.ASGITransport(app=application)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", limits=limits, timeout=60.0
+            ) as client:
+                report = await LoadGenerator(make_sender(client, scenario), mix, **load_options).run()
+
+    report["target"] = url or "in-process"
+    report["mix"] = mix
+    report["scenario"] = scenario if not url else None
+    report["commit"] = _git_commit()
+    report["python"] = platform.python_version()
+    return report
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    """"generate=8,batch=1,models=1"の形式のエンドポイントの比率を解析する"""
+    mix = {}
+    for item in value.split(","):
+        endpoint, _, weight = item.partition("=")
+        mix[endpoint.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    コマンドラインからベンチマークを実行し、結果のJSONを出力する
+
+    Args:
+        argv: コマンドライン引数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Local VLM Server load benchmark")
+    parser.add_argument("--scenario", help="合成モデルを定義したシナリオのJSONファイル")
+    parser.add_argument("--url", help="負荷をかける起動済みサーバーのURL（省略時はプロセス内で起動する）")
+    parser.add_argument("--mix", default="generate=1", help="エンドポイントの比率（例: generate=8,batch=1,models=1）")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed", help="負荷のかけ方")
+    parser.add_argument("--concurrency", type=int, default=16, help="クローズドループの同時実行数")
+    parser.add_argument("--rps", type=float, help="オープンループの1秒あたりのリクエスト数")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=1.0, help="集計しないウォームアップ時間（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="エンドポイントを選ぶ乱数のシード")
+    parser.add_argument("--output", help="結果のJSONを書き込むファイル（省略時は標準出力）")
+    parser.add_argument("--log-level", default="WARNING", help="サーバーのログレベル")
+    args = parser.parse_args(argv)
+
+    # リクエストごとのログ出力が計測結果に影響しないよう、ログを抑制する
+    logging.getLogger().setLevel(args.log_level)
+    scenario = None
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as f:
+            scenario = json.load(f)
+
+    try:
+        report = asyncio.run(run_benchmark(
+            scenario,
+            _parse_mix(args.mix),
+            args.url,
+            mode=args.mode,
+            concurrency=args.concurrency,
+            rps=args.rps,
+            duration=args.duration,
+            warmup=args.warmup,
+            seed=args.seed
+        ))
+    except ValueError as e:
+        parser.error(str(e))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
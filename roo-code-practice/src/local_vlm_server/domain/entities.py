@@ -2,6 +2,8 @@
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+from .value_objects import JobStatus, VLMRequest
+
 
 @dataclass
 class VLMModel:
@@ -31,4 +33,36 @@ class VLMResponse:
     prompt: Prompt
     text: str
     tokens_used: int
-    metadata: Optional[Dict[str, any]] = None
\ No newline at end of file
+    metadata: Optional[Dict[str, any]] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+@dataclass
+class VLMResponseChunk:
+    """ストリーミング生成中にVLMから届くレスポンスの断片を表すエンティティ"""
+    model_id: str
+    text: str
+    index: int
+    finish_reason: Optional[str] = None
+    tokens_used: int = 0
+    metadata: Optional[Dict[str, any]] = None
+
+
+@dataclass
+class Job:
+    """非同期に処理される生成ジョブを表すエンティティ"""
+    id: str
+    request: VLMRequest
+    priority: int = 0
+    status: JobStatus = JobStatus.PENDING
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    response: Optional[VLMResponse] = None
+    error: Optional[Dict[str, any]] = None
+    
+    @property
+    def is_finished(self) -> bool:
+        """ジョブの処理が終了しているかどうか"""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
\ No newline at end of file
@@ -32,6 +32,15 @@ class InvalidPromptError(DomainException):
         super().__init__(message)
 
 
+class InvalidImageError(DomainException):
+    """無効な画像が指定された場合の例外"""
+    def __init__(self, reason: str = None):
+        message = "Invalid image provided"
+        if reason:
+            message += f": {reason}"
+        super().__init__(message)
+
+
 class VLMProcessingError(DomainException):
     """VLMの処理中にエラーが発生した場合の例外"""
     def __init__(self, model_id: str, details: str = None):
@@ -39,4 +48,66 @@ class VLMProcessingError(DomainException):
         message = f"Error processing request with VLM model '{model_id}'"
         if details:
             message += f": {details}"
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+
+class VLMOverloadedError(DomainException):
+    """VLMモデルが混雑しておりリクエストを受け付けられない場合の例外"""
+    def __init__(self, model_id: str, retry_after: float = 1.0, details: str = None):
+        self.model_id = model_id
+        self.retry_after = retry_after
+        message = f"VLM model '{model_id}' is overloaded"
+        if details:
+            message += f": {details}"
+        super().__init__(message)
+
+
+class ModelTooLargeError(DomainException):
+    """VLMモデルがメモリ予算より大きく、ロードできない場合の例外"""
+    def __init__(self, model_id: str, memory_bytes: int, memory_budget_bytes: int):
+        self.model_id = model_id
+        self.memory_bytes = memory_bytes
+        self.memory_budget_bytes = memory_budget_bytes
+        super().__init__(
+            f"VLM model '{model_id}' needs {memory_bytes} bytes, "
+            f"which exceeds the {memory_budget_bytes} byte memory budget"
+        )
+
+
+class DeadlineExceededError(DomainException):
+    """リクエストの期限までに処理を開始できなかった場合の例外"""
+    def __init__(self, model_id: str):
+        self.model_id = model_id
+        super().__init__(f"Request deadline for VLM model '{model_id}' has passed")
+
+
+class RequestCancelledError(DomainException):
+    """クライアントが切断したため処理を中断した場合の例外"""
+    def __init__(self, details: str = None):
+        message = "Request was cancelled"
+        if details:
+            message += f": {details}"
+        super().__init__(message)
+
+
+class JobNotFoundError(DomainException):
+    """指定されたジョブが見つからない場合の例外"""
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        super().__init__(f"Job with ID '{job_id}' not found")
+
+
+class JobQueueFullError(DomainException):
+    """ジョブキューが満杯でジョブを受け付けられない場合の例外"""
+    def __init__(self, max_pending: int, retry_after: float = 1.0):
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        super().__init__(f"Job queue is full ({max_pending} pending jobs)")
+
+
+class RateLimitExceededError(DomainException):
+    """APIキーのレート制限を超えた場合の例外"""
+    def __init__(self, api_key: str, retry_after: float = 1.0):
+        self.api_key = api_key
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded; retry after {retry_after:.2f}s")
\ No newline at end of file
@@ -1,7 +1,12 @@
 """ドメイン値オブジェクトの定義モジュール"""
-from dataclasses import dataclass
+import base64
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Dict, Optional
+from functools import cached_property
+from typing import Dict, Optional, Tuple
 
 
 class VLMType(Enum):
@@ -12,6 +17,14 @@ class VLMType(Enum):
     CUSTOM = auto()
 
 
+class JobStatus(str, Enum):
+    """非同期ジョブの状態を表す列挙型"""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 @dataclass(frozen=True)
 class ModelParameters:
     """モデルパラメータを表す値オブジェクト"""
@@ -32,9 +45,90 @@ class ModelParameters:
         }
 
 
+@dataclass(frozen=True)
+class ImageInput:
+    """VLMに渡す画像を表す値オブジェクト"""
+    # エンコードされた画像データ（PNGやJPEGなど）
+    data: bytes = field(repr=False)
+    media_type: str = "image/png"
+    width: Optional[int] = None
+    height: Optional[int] = None
+    
+    @cached_property
+    def digest(self) -> str:
+        """
+        画像データの内容から計算したハッシュ値
+        
+        Returns:
+            16進数のハッシュ文字列
+        """
+        return hashlib.blake2b(self.data, digest_size=16).hexdigest()
+    
+    def to_base64(self) -> str:
+        """画像データをBase64文字列に変換"""
+        return base64.b64encode(self.data).decode("ascii")
+    
+    def to_data_url(self) -> str:
+        """画像データをdata URLに変換"""
+        return f"data:{self.media_type};base64,{self.to_base64()}"
+
+
 @dataclass(frozen=True)
 class VLMRequest:
     """VLMリクエストを表す値オブジェクト"""
     prompt_text: str
     model_id: str
-    parameters: Optional[ModelParameters] = None
\ No newline at end of file
+    parameters: Optional[ModelParameters] = None
+    use_cache: bool = True
+    # 優先度（大きいほど先に処理される）
+    priority: int = 0
+    # 処理を開始しなければならない期限（UNIX時間、Noneの場合は無期限）
+    deadline: Optional[float] = None
+    # プロンプトと一緒に渡す画像
+    images: Tuple[ImageInput, ...] = ()
+    
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """
+        処理を開始する期限を過ぎているかどうかを判定する
+        
+        Args:
+            now: 現在時刻（UNIX時間、省略時は現在時刻）
+            
+        Returns:
+            期限を過ぎている場合はTrue
+        """
+        if self.deadline is None:
+            return False
+        return (time.time() if now is None else now) >= self.deadline
+    
+    def cache_key(self) -> str:
+        """
+        モデル・プロンプト・パラメータ・画像から決まるリクエストのキーを取得する
+        
+        パラメータ未指定の場合はデフォルトパラメータと同じキーになる。
+        
+        Returns:
+            リクエストを一意に識別するハッシュ文字列
+        """
+        parameters = self.parameters or ModelParameters()
+        key = [self.model_id, self.prompt_text, parameters.to_dict()]
+        # 画像は内容のハッシュ値だけをキーに含める
+        if self.images:
+            key.append([image.digest for image in self.images])
+        payload = json.dumps(
+            key,
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def coalescing_key(self) -> str:
+        """
+        実行中のリクエストの結果を共有できるかどうかを判定するキーを取得する
+        
+        優先度が異なるリクエストは待ち行列での位置が異なるため、cache_key()に優先度を加える。
+        
+        Returns:
+            リクエストのキーと優先度から決まる文字列
+        """
+        return f"{self.cache_key()}:{self.priority}"
\ No newline at end of file
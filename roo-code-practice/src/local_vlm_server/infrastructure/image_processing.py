@@ -0,0 +1,454 @@
+"""画像入力の読み込みと前処理（デコード・縮小・再エンコード）の定義モジュール"""
+import asyncio
+import base64
+import binascii
+import importlib.util
+import io
+import logging
+import os
+import struct
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+from ..application.interfaces import ImageProcessorInterface
+from ..application.single_flight import SingleFlight
+from ..domain.exceptions import InvalidImageError
+from ..domain.value_objects import ImageInput
+
+
+logger = logging.getLogger(__name__)
+
+
+# 画像データの先頭のバイト列とメディアタイプ
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# Pillowの保存形式とメディアタイプ
+_FORMATS = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+
+# Pillowが利用できるかどうか
+_PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+# 画像の前処理のデフォルト設定
+DEFAULT_IMAGE_CONFIG: Dict[str, any] = {
+    # 長辺の最大ピクセル数（超える場合は縦横比を保って縮小する。Noneの場合は縮小しない）
+    "max_size": 1024,
+    # 再エンコードする形式（"png", "jpeg", "webp"。Noneの場合は元の形式）
+    "format": None,
+    # デコードを許可する最大ピクセル数（巨大な画像による過剰なメモリ使用を防ぐ）
+    "max_pixels": 50_000_000,
+}
+
+
+def detect_media_type(data: bytes) -> Optional[str]:
+    """
+    画像データの先頭のバイト列からメディアタイプを判定する
+
+    Args:
+        data: 画像データ
+
+    Returns:
+        メディアタイプ（対応していない形式の場合はNone）
+    """
+    for signature, media_type in _SIGNATURES:
+        if data.startswith(signature):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def read_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    画像全体をデコードせずにヘッダーから幅と高さを読み取る
+
+    Args:
+        data: 画像データ
+
+    Returns:
+        幅と高さのタプル（読み取れない場合はNone）
+    """
+    try:
+        media_type = detect_media_type(data)
+        if media_type == "image/png":
+            return struct.unpack(">II", data[16:24])
+        if media_type == "image/gif":
+            return struct.unpack("<HH", data[6:10])
+        if media_type == "image/jpeg":
+            return _read_jpeg_size(data)
+        if media_type == "image/webp":
+            return _read_webp_size(data)
+    except struct.error:
+        pass
+    return None
+
+
+def _read_jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """JPEGのSOFマーカーから幅と高さを読み取る"""
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        # SOF0〜SOF15（DHT・JPG・DACを除く）に画像の大きさが含まれる
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        offset += 2 + length
+    return None
+
+
+def _read_webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """WebPのチャンクヘッダーから幅と高さを読み取る"""
+    chunk = data[12:16]
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+
+def preprocess_image(
+    data: bytes,
+    max_size: Optional[int] = None,
+    output_format: Optional[str] = None,
+    max_pixels: Optional[int] = None
+) -> Tuple[bytes, str, int, int]:
+    """
+    画像をデコードし、長辺がmax_sizeを超える場合は縮小して再エンコードする
+
+    ワーカープロセスでも実行できるよう、モジュールレベルの関数として定義する。
+    Pillowがインストールされていない場合は、ヘッダーを検証して元の画像をそのまま返す。
+
+    Args:
+        data: 画像データ
+        max_size: 長辺の最大ピクセル数
+        output_format: 再エンコードする形式（Noneの場合は元の形式）
+        max_pixels: デコードを許可する最大ピクセル数
+
+    Returns:
+        画像データ・メディアタイプ・幅・高さのタプル
+
+    Raises:
+        ValueError: 対応していない形式、または壊れた画像の場合
+    """
+    media_type = detect_media_type(data)
+    if media_type is None:
+        raise ValueError("unsupported image format")
+    size = read_image_size(data)
+    if size is None or not all(size):
+        raise ValueError(f"cannot read the size of the {media_type} image")
+    if max_pixels and size[0] * size[1] > max_pixels:
+        raise ValueError(f"image has too many pixels ({size[0]}x{size[1]})")
+
+    if not _PILLOW_AVAILABLE:
+        return data, media_type, size[0], size[1]
+
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            resized = bool(max_size) and max(image.size) > max_size
+            target_format = (output_format or image.format or "png").lower()
+            if not resized and _FORMATS.get(target_format) == media_type:
+                return data, media_type, image.width, image.height
+
+            if resized:
+                image.thumbnail((max_size, max_size), Image.LANCZOS)
+            if target_format == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format=target_format.upper())
+            return buffer.getvalue(), _FORMATS.get(target_format, media_type), image.width, image.height
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"cannot decode the {media_type} image: {e}") from e
+
+
+def decode_base64_image(value: str, max_bytes: Optional[int] = None) -> ImageInput:
+    """
+    Base64文字列またはdata URLから画像を作成する
+
+    Args:
+        value: Base64文字列、または"data:image/png;base64,..."の形式のdata URL
+        max_bytes: 画像データの最大バイト数
+
+    Returns:
+        画像
+
+    Raises:
+        InvalidImageError: デコードできない場合、または対応していない形式の場合
+    """
+    if value.startswith("data:"):
+        header, _, value = value.partition(",")
+        if not header.endswith(";base64"):
+            raise InvalidImageError("data URL must be base64-encoded")
+    # デコード後のサイズを先に見積もり、巨大な入力をデコードしない
+    if max_bytes is not None and len(value) * 3 // 4 > max_bytes:
+        raise InvalidImageError(f"image exceeds {max_bytes} bytes")
+    try:
+        data = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidImageError(f"invalid base64 data: {e}") from e
+    return image_from_bytes(data)
+
+
+def read_image_file(
+    location: str,
+    allowed_dirs: Sequence[str],
+    max_bytes: Optional[int] = None
+) -> ImageInput:
+    """
+    ローカルファイルの画像を読み込む（ブロッキングするため、スレッドで呼び出すこと）
+
+    Args:
+        location: "file://"のURLまたはファイルパス
+        allowed_dirs: 読み込みを許可するディレクトリのリスト
+        max_bytes: 画像データの最大バイト数
+
+    Returns:
+        画像
+
+    Raises:
+        InvalidImageError: 許可されていない場所のファイル、読み込めないファイル、
+            または対応していない形式の場合
+    """
+    parsed = urlparse(location)
+    if parsed.scheme == "file":
+        path = unquote(parsed.path)
+    elif parsed.scheme:
+        raise InvalidImageError(f"unsupported image URL scheme: {parsed.scheme}")
+    else:
+        path = location
+
+    # シンボリックリンクや".."で許可されたディレクトリの外を読まないよう、実際のパスで判定する
+    real_path = os.path.realpath(path)
+    if not any(
+        os.path.commonpath([real_path, os.path.realpath(directory)]) == os.path.realpath(directory)
+        for directory in allowed_dirs
+    ):
+        raise InvalidImageError(f"reading {path} is not allowed")
+    try:
+        if max_bytes is not None and os.path.getsize(real_path) > max_bytes:
+            raise InvalidImageError(f"image exceeds {max_bytes} bytes")
+        with open(real_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise InvalidImageError(f"cannot read {path}: {e.strerror}") from e
+    return image_from_bytes(data)
+
+
+def image_from_bytes(data: bytes, max_bytes: Optional[int] = None) -> ImageInput:
+    """
+    画像データの形式を判定して画像を作成する
+
+    Args:
+        data: 画像データ
+        max_bytes: 画像データの最大バイト数
+
+    Returns:
+        画像
+
+    Raises:
+        InvalidImageError: 大きすぎる場合、または対応していない形式の場合
+    """
+    if max_bytes is not None and len(data) > max_bytes:
+        raise InvalidImageError(f"image exceeds {max_bytes} bytes")
+    media_type = detect_media_type(data)
+    if media_type is None:
+        raise InvalidImageError("unsupported image format")
+    return ImageInput(data=data, media_type=media_type)
+
+
+class ImageProcessor(ImageProcessorInterface):
+    """
+    画像の前処理をワーカープールで実行し、結果をキャッシュするプロセッサー
+
+    デコードや縮小はCPUを使う同期処理のため、イベントループの外（スレッドまたはプロセス）で行う。
+    前処理済みの画像は元画像の内容のハッシュ値と前処理の設定をキーとするLRUキャッシュに保持し、
+    同じ画像を繰り返し送るリクエスト（同じ画像への複数の質問など）で前処理をやり直さない。
+    同じ画像の前処理が実行中の場合は、その結果を共有する。
+    """
+
+    def __init__(
+        self,
+        config_provider: Callable[[str], Optional[Dict[str, any]]],
+        max_entries: int = 256,
+        max_cache_bytes: int = 256 * 1024 * 1024,
+        workers: int = 2,
+        mode: str = "thread"
+    ):
+        """
+        初期化
+
+        Args:
+            config_provider: モデルIDから画像の前処理設定を取得する関数
+            max_entries: キャッシュする画像の最大件数
+            max_cache_bytes: キャッシュする画像データの合計の最大バイト数
+            workers: ワーカー数
+            mode: "thread"または"process"
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self._config_provider = config_provider
+        self.max_entries = max_entries
+        self.max_cache_bytes = max_cache_bytes
+        self.workers = workers
+        self.mode = mode
+        self._pool: Optional[Executor] = None
+        self._cache: "OrderedDict[str, ImageInput]" = OrderedDict()
+        self._cache_bytes = 0
+        self._single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if not _PILLOW_AVAILABLE:
+            logger.warning("Pillow is not installed; images are validated but not resized")
+
+    def _get_pool(self) -> Executor:
+        """ワーカープールを取得する（初回に作成する）"""
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="image-preprocess"
+                )
+        return self._pool
+
+    async def preprocess(self, model_id: str, images: List[ImageInput]) -> List[ImageInput]:
+        """
+        モデルの設定に従って画像を前処理する
+
+        Args:
+            model_id: VLMモデルのID
+            images: 画像のリスト
+
+        Returns:
+            画像と同じ順序の前処理済み画像のリスト
+
+        Raises:
+            InvalidImageError: 画像をデコードできない場合
+        """
+        if not images:
+            return []
+        config = {**DEFAULT_IMAGE_CONFIG, **(self._config_provider(model_id) or {})}
+        return list(await asyncio.gather(*(
+            self._preprocess_one(image, config) for image in images
+        )))
+
+    async def _preprocess_one(self, image: ImageInput, config: Dict[str, any]) -> ImageInput:
+        """
+        キャッシュを確認し、なければワーカーで画像を前処理する
+
+        Args:
+            image: 画像
+            config: 画像の前処理設定
+
+        Returns:
+            前処理済み画像
+        """
+        key = f"{image.digest}:{config['max_size']}:{config['format']}:{config['max_pixels']}"
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        processed, shared = await self._single_flight.do(key, lambda: self._run(key, image, config))
+        if shared:
+            self.coalesced += 1
+        return processed
+
+    async def _run(self, key: str, image: ImageInput, config: Dict[str, any]) -> ImageInput:
+        """
+        ワーカーで画像を前処理し、結果をキャッシュに格納する
+
+        Args:
+            key: キャッシュのキー
+            image: 画像
+            config: 画像の前処理設定
+
+        Returns:
+            前処理済み画像
+
+        Raises:
+            InvalidImageError: 画像をデコードできない場合
+        """
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        try:
+            data, media_type, width, height = await loop.run_in_executor(
+                self._get_pool(),
+                preprocess_image,
+                image.data,
+                config["max_size"],
+                config["format"],
+                config["max_pixels"]
+            )
+        except ValueError as e:
+            raise InvalidImageError(str(e)) from e
+
+        processed = ImageInput(data=data, media_type=media_type, width=width, height=height)
+        self._store(key, processed)
+        return processed
+
+    def _store(self, key: str, image: ImageInput):
+        """
+        前処理済み画像をキャッシュに格納し、上限を超えた分を古い順に取り除く
+
+        Args:
+            key: キャッシュのキー
+            image: 前処理済み画像
+        """
+        if len(image.data) > self.max_cache_bytes:
+            return
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous.data)
+        self._cache[key] = image
+        self._cache_bytes += len(image.data)
+        while len(self._cache) > self.max_entries or self._cache_bytes > self.max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted.data)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            "entries": len(self._cache),
+            "bytes": self._cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "resize_available": _PILLOW_AVAILABLE,
+        }
+
+    def close(self):
+        """ワーカープールを終了する"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,216 @@
+"""非同期ジョブの保存先の定義モジュール"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from ..application.interfaces import JobStoreInterface
+from ..domain.entities import Job
+from ..domain.value_objects import JobStatus
+from .serialization import request_from_dict, request_to_dict, response_from_dict, response_to_dict
+
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryJobStore(JobStoreInterface):
+    """
+    プロセス内のメモリにジョブを保持する保存先
+
+    終了したジョブは最大max_finished件まで保持し、古いものから破棄する。
+    """
+
+    def __init__(self, max_finished: int = 10000):
+        """
+        初期化
+
+        Args:
+            max_finished: 保持する終了済みジョブの最大数
+        """
+        self.max_finished = max_finished
+        self._unfinished: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+
+    async def save(self, job: Job):
+        """ジョブを保存し、上限を超えた古い終了済みジョブを破棄する"""
+        if not job.is_finished:
+            self._unfinished[job.id] = job
+            return
+
+        self._unfinished.pop(job.id, None)
+        self._finished[job.id] = job
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """指定されたIDのジョブを取得する"""
+        return self._unfinished.get(job_id) or self._finished.get(job_id)
+
+    async def list_unfinished(self) -> List[Job]:
+        """処理が終了していないジョブを作成順に取得する"""
+        return sorted(self._unfinished.values(), key=lambda job: job.created_at)
+
+
+class SQLiteJobStore(JobStoreInterface):
+    """
+    SQLiteファイルにジョブを保存する保存先
+
+    プロセスの再起動後も未完了のジョブと終了済みジョブの結果が保持される。
+    終了したジョブは最大max_finished件まで保持し、作成日時の古いものから破棄する。
+    ブロッキングするDB操作はスレッドで実行し、イベントループを止めない。
+    """
+
+    def __init__(self, path: str, max_finished: int = 10000):
+        """
+        初期化
+
+        Args:
+            path: SQLiteデータベースファイルのパス
+            max_finished: 保持する終了済みジョブの最大数
+        """
+        self.path = path
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at "
+                "ON jobs (status, created_at)"
+            )
+        logger.info(f"Opened SQLite job store at {path}")
+
+    async def save(self, job: Job):
+        """ジョブを保存する"""
+        await asyncio.to_thread(self._save, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """指定されたIDのジョブを取得する"""
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def list_unfinished(self) -> List[Job]:
+        """処理が終了していないジョブを作成順に取得する"""
+        return await asyncio.to_thread(self._list_unfinished)
+
+    async def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def _save(self, job: Job):
+        """ジョブを同期的に保存し、上限を超えた古い終了済みジョブを破棄する"""
+        payload = json.dumps(_job_to_dict(job), ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, created_at, payload) VALUES (?, ?, ?, ?)",
+                (job.id, job.status.value, job.created_at, payload)
+            )
+            if job.is_finished:
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE id IN ("
+                    "SELECT id FROM jobs WHERE status IN (?, ?) "
+                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value, self.max_finished)
+                )
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        """ジョブを同期的に取得する"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _job_from_dict(json.loads(row[0])) if row else None
+
+    def _list_unfinished(self) -> List[Job]:
+        """処理が終了していないジョブを同期的に取得する"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JobStatus.PENDING.value, JobStatus.RUNNING.value)
+            ).fetchall()
+        return [_job_from_dict(json.loads(row[0])) for row in rows]
+
+
+def _job_to_dict(job: Job) -> Dict[str, any]:
+    """
+    ジョブをJSONに変換可能な辞書にする
+
+    Args:
+        job: ジョブ
+
+    Returns:
+        ジョブの辞書
+    """
+    return {
+        "id": job.id,
+        "request": request_to_dict(job.request),
+        "priority": job.priority,
+        "status": job.status.value,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "response": response_to_dict(job.response) if job.response else None,
+        "error": job.error,
+    }
+
+
+def _job_from_dict(data: Dict[str, any]) -> Job:
+    """
+    辞書からジョブを復元する
+
+    Args:
+        data: ジョブの辞書
+
+    Returns:
+        ジョブ
+    """
+    response = data["response"]
+    return Job(
+        id=data["id"],
+        # リクエストの優先度はジョブの優先度で処理する
+        request=request_from_dict({**data["request"], "priority": data["priority"]}),
+        priority=data["priority"],
+        status=JobStatus(data["status"]),
+        created_at=data["created_at"],
+        started_at=data["started_at"],
+        finished_at=data["finished_at"],
+        response=response_from_dict(response) if response is not None else None,
+        error=data["error"]
+    )
+
+
+def create_job_store(config: Dict[str, any]) -> JobStoreInterface:
+    """
+    設定からジョブの保存先を作成する
+
+    Args:
+        config: 保存先の設定
+            - backend: "memory"（デフォルト）または"sqlite"
+            - max_finished: 保持する終了済みジョブの最大数
+            - path: SQLiteデータベースファイルのパス（sqliteの場合）
+
+    Returns:
+        ジョブの保存先
+
+    Raises:
+        ValueError: 未知のバックエンドが指定された場合
+    """
+    backend = config.get("backend", "memory")
+    if backend == "memory":
+        return InMemoryJobStore(config.get("max_finished", 10000))
+    if backend == "sqlite":
+        return SQLiteJobStore(config.get("path", "jobs.sqlite3"), config.get("max_finished", 10000))
+    raise ValueError(f"Unknown job store backend: {backend}")
@@ -0,0 +1,365 @@
+"""メトリクス収集用のプリミティブ定義モジュール"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+
+# バッチサイズ用のデフォルトバケット
+DEFAULT_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# 待ち時間・レイテンシ用のデフォルトバケット（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 生成速度（トークン/秒）用のデフォルトバケット
+DEFAULT_THROUGHPUT_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# スキーマ変換などの短い処理時間用のバケット（秒）
+FAST_LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+class Histogram:
+    """固定バケットのヒストグラム"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        初期化
+
+        Args:
+            buckets: バケットの上限値のシーケンス
+        """
+        self.buckets = tuple(sorted(buckets))
+        # 最後の要素は+Infバケット
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        値を記録する
+
+        Args:
+            value: 観測値
+        """
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, any]:
+        """
+        現在の集計値を取得する
+
+        Returns:
+            累積バケット数・件数・合計値の辞書
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class Counter:
+    """単調増加するカウンタ"""
+
+    def __init__(self):
+        """初期化"""
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        """
+        値を増やす
+
+        Args:
+            amount: 増加量
+        """
+        self.value += amount
+
+
+class Gauge:
+    """増減する現在値"""
+
+    def __init__(self):
+        """初期化"""
+        self.value = 0.0
+
+    def set(self, value: float):
+        """
+        値を設定する
+
+        Args:
+            value: 現在値
+        """
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        """値を増やす"""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        """値を減らす"""
+        self.value -= amount
+
+
+class MetricFamily:
+    """
+    同じ名前でラベル値ごとに値を持つメトリクスの集合
+
+    labels()で取得した子メトリクスは同じラベル値に対して常に同じオブジェクトとなる。
+    リクエストごとの処理では子メトリクスを事前に取得して保持しておくことで、
+    記録時の割り当てをなくすことができる。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        """
+        初期化
+
+        Args:
+            name: メトリクス名
+            documentation: メトリクスの説明
+            kind: "counter"、"gauge"または"histogram"
+            labelnames: ラベル名のシーケンス
+            buckets: ヒストグラムのバケット（histogramの場合）
+        """
+        if kind not in ("counter", "gauge", "histogram"):
+            raise ValueError(f"Unknown metric type: {kind}")
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], any] = {}
+
+    def labels(self, *values: str):
+        """
+        ラベル値に対応する子メトリクスを取得する（存在しない場合は作成する）
+
+        Args:
+            *values: ラベル名と同じ順序のラベル値
+
+        Returns:
+            Counter、GaugeまたはHistogram
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            if self.kind == "counter":
+                child = Counter()
+            elif self.kind == "gauge":
+                child = Gauge()
+            else:
+                child = Histogram(self.buckets)
+            self._children[values] = child
+        return child
+
+    def render(self, lines: List[str]):
+        """
+        Prometheusのテキスト形式で出力する
+
+        Args:
+            lines: 出力行を追加するリスト
+        """
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self._children.items():
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(child.buckets, child._counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [f'le="{_format_value(bound)}"'])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{inf_labels} {child.count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、まとめて出力するレジストリ"""
+
+    def __init__(self):
+        """初期化"""
+        self._families: Dict[str, MetricFamily] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        """カウンタを登録する"""
+        return self._register(MetricFamily(name, documentation, "counter", labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        """ゲージを登録する"""
+        return self._register(MetricFamily(name, documentation, "gauge", labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> MetricFamily:
+        """ヒストグラムを登録する"""
+        return self._register(MetricFamily(name, documentation, "histogram", labelnames, buckets))
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        """
+        メトリクスを登録する
+
+        Args:
+            family: メトリクス
+
+        Returns:
+            登録したメトリクス
+
+        Raises:
+            ValueError: 同じ名前のメトリクスが登録済みの場合
+        """
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def render(self) -> str:
+        """
+        登録されたすべてのメトリクスをPrometheusのテキスト形式で出力する
+
+        Returns:
+            テキスト形式のメトリクス
+        """
+        lines: List[str] = []
+        for family in self._families.values():
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """ラベル値をエスケープする"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: List[str]) -> str:
+    """ラベルの一覧を{...}の形式にする"""
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    """数値を出力用の文字列にする"""
+    if value == int(value):
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
+
+
+# サーバー全体で共有するメトリクスレジストリ
+REGISTRY = MetricsRegistry()
+
+REQUESTS_TOTAL = REGISTRY.counter(
+    "vlm_requests_total",
+    "Number of generation requests received per model.",
+    ("model", "mode")
+)
+REQUEST_ERRORS_TOTAL = REGISTRY.counter(
+    "vlm_request_errors_total",
+    "Number of failed generation requests per model and domain exception type.",
+    ("model", "error")
+)
+CANCELLED_REQUESTS_TOTAL = REGISTRY.counter(
+    "vlm_cancelled_requests_total",
+    "Generation requests abandoned before completion, e.g. because the client disconnected.",
+    ("model", "mode")
+)
+REQUEST_DURATION_SECONDS = REGISTRY.histogram(
+    "vlm_request_duration_seconds",
+    "End-to-end client latency per model including cache, queueing and batching.",
+    ("model", "mode")
+)
+EXECUTE_DURATION_SECONDS = REGISTRY.histogram(
+    "vlm_execute_duration_seconds",
+    "Time spent in the model backend per model, excluding queueing.",
+    ("model", "mode")
+)
+GENERATED_TOKENS_TOTAL = REGISTRY.counter(
+    "vlm_generated_tokens_total",
+    "Number of tokens reported by the model backend.",
+    ("model",)
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "vlm_tokens_per_second",
+    "Backend generation throughput per request.",
+    ("model",),
+    DEFAULT_THROUGHPUT_BUCKETS
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "vlm_queue_wait_seconds",
+    "Time requests spend waiting before reaching the model backend.",
+    ("model", "stage")
+)
+IN_FLIGHT_REQUESTS = REGISTRY.gauge(
+    "vlm_in_flight_requests",
+    "Number of requests currently holding an admission slot.",
+    ("model",)
+)
+QUEUED_REQUESTS = REGISTRY.gauge(
+    "vlm_queued_requests",
+    "Number of requests waiting for an admission slot.",
+    ("model",)
+)
+QUEUED_REQUESTS_BY_PRIORITY = REGISTRY.gauge(
+    "vlm_queued_requests_by_priority",
+    "Number of requests waiting for an admission slot, by request priority.",
+    ("model", "priority")
+)
+DEADLINE_EXPIRED_TOTAL = REGISTRY.counter(
+    "vlm_deadline_expired_total",
+    "Requests dropped because their deadline passed before they reached the model backend.",
+    ("model",)
+)
+SCHEMA_CONVERSION_SECONDS = REGISTRY.histogram(
+    "vlm_schema_conversion_seconds",
+    "Time spent converting between API schemas and domain objects in routes.",
+    ("route",),
+    FAST_LATENCY_BUCKETS
+)
+MODEL_EVICTIONS_TOTAL = REGISTRY.counter(
+    "vlm_model_evictions_total",
+    "Number of times a model was unloaded to make room for another within the memory budget.",
+    ("model",)
+)
+PREFILL_TOKENS_SAVED_TOTAL = REGISTRY.counter(
+    "vlm_prefill_tokens_saved_total",
+    "Number of prompt tokens whose evaluation was skipped by restoring a cached prefix state.",
+    ("model",)
+)
+RETRIES_TOTAL = REGISTRY.counter(
+    "vlm_retries_total",
+    "Number of times a request was retried after a transient backend failure.",
+    ("model",)
+)
+CIRCUIT_BREAKER_STATE = REGISTRY.gauge(
+    "vlm_circuit_breaker_state",
+    "Circuit breaker state per model (0 = closed, 1 = half-open, 2 = open).",
+    ("model",)
+)
+CIRCUIT_BREAKER_REJECTIONS_TOTAL = REGISTRY.counter(
+    "vlm_circuit_breaker_rejections_total",
+    "Requests failed fast because the model's circuit breaker was open.",
+    ("model",)
+)
+HEDGED_REQUESTS_TOTAL = REGISTRY.counter(
+    "vlm_hedged_requests_total",
+    "Duplicate requests sent to a second replica after the hedge delay, by which attempt won.",
+    ("model", "winner")
+)
@@ -0,0 +1,249 @@
+"""モデルを保持するプロセス（モデルホスト）とAPIワーカーのプロセス間通信を定義するモジュール
+
+APIワーカーとモデルホストはUnixドメインソケットで接続し、4バイトのビッグエンディアンの長さに
+続くUTF-8のJSONをメッセージとして送受信する。1つの接続で複数のリクエストを同時に扱えるよう、
+メッセージにはリクエストごとのidを付ける。
+
+APIワーカーからモデルホストへのメッセージ:
+    {"id": 1, "op": "generate", "request": {...}}  レスポンスを1回で受け取る
+    {"id": 2, "op": "stream", "request": {...}}    レスポンスを断片ごとに受け取る
+    {"id": 3, "op": "stats"}                       クライアントの統計情報を受け取る
+    {"id": 2, "op": "cancel"}                      処理中のリクエストを中断する
+
+モデルホストからAPIワーカーへのメッセージ:
+    {"id": 1, "response": {...}}
+    {"id": 2, "chunk": {...}} ... {"id": 2, "end": true}
+    {"id": 3, "stats": {...}}
+    {"id": 1, "error": {"type": ..., "message": ..., "attributes": {...}}}
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import quote
+
+from .serialization import (
+    chunk_to_dict,
+    error_to_dict,
+    request_from_dict,
+    response_to_dict,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# メッセージの長さを表すヘッダー
+_HEADER = struct.Struct(">I")
+
+# 1つのメッセージの最大バイト数（画像を含むリクエストを想定する）
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+class _WorkerDisconnected(Exception):
+    """応答の送信中にAPIワーカーが切断した場合の例外"""
+
+
+def encode_message(message: Dict[str, any]) -> bytes:
+    """
+    メッセージを長さのヘッダー付きのバイト列にする
+
+    Args:
+        message: メッセージの辞書
+
+    Returns:
+        送信するバイト列
+    """
+    payload = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, any]]:
+    """
+    メッセージを1つ受信する
+
+    Args:
+        reader: ストリームリーダー
+
+    Returns:
+        メッセージの辞書（接続が閉じられた場合はNone）
+
+    Raises:
+        ConnectionError: メッセージの途中で接続が閉じられた場合や、メッセージが大きすぎる場合
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionError("connection closed in the middle of a message header") from e
+
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"message of {length} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit")
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("connection closed in the middle of a message") from e
+    return json.loads(payload)
+
+
+def socket_path_for(socket_dir: str, model_id: str) -> str:
+    """
+    モデルホストのソケットのパスを取得する
+
+    Args:
+        socket_dir: ソケットを置くディレクトリ
+        model_id: VLMモデルのID
+
+    Returns:
+        ソケットのパス（モデルIDの"/"や":"はエスケープする）
+    """
+    return os.path.join(socket_dir, f"{quote(model_id, safe='')}.sock")
+
+
+class ModelHostServer:
+    """
+    1つのモデルのクライアントをUnixドメインソケットでAPIワーカーに提供するサーバー
+
+    リクエストはリポジトリから取得したクライアント（バッチング・同時実行数制限・キャッシュを含む）で
+    処理するため、複数のAPIワーカーからのリクエストが1つのモデルでまとめてスケジューリングされる。
+    APIワーカーが切断した場合やリクエストを中断した場合は、処理中の生成をキャンセルする。
+    """
+
+    def __init__(self, repository, model_id: str, socket_path: str):
+        """
+        初期化
+
+        Args:
+            repository: モデルを登録したVLMリポジトリ
+            model_id: 提供するVLMモデルのID
+            socket_path: 待ち受けるUnixドメインソケットのパス
+        """
+        self.repository = repository
+        self.model_id = model_id
+        self.socket_path = socket_path
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connection_tasks = set()
+
+    async def start(self):
+        """ソケットで待ち受けを開始する（前回のソケットファイルが残っている場合は置き換える）"""
+        if self._server is not None:
+            return
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection,
+            path=self.socket_path,
+            limit=MAX_MESSAGE_BYTES
+        )
+        # 同じユーザーのプロセスだけが接続できるようにする
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Model host for {self.model_id} listening on {self.socket_path}")
+
+    async def stop(self):
+        """待ち受けを終了し、処理中のリクエストをキャンセルする"""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.close()
+        for task in list(self._connection_tasks):
+            task.cancel()
+        await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+        await server.wait_closed()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        logger.info(f"Model host for {self.model_id} stopped")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        APIワーカーからの接続を処理する
+
+        Args:
+            reader: ストリームリーダー
+            writer: ストリームライター
+        """
+        self._connection_tasks.add(asyncio.current_task())
+        self.connections += 1
+        tasks: Dict[int, asyncio.Task] = {}
+        write_lock = asyncio.Lock()
+
+        async def send(message: Dict[str, any]):
+            async with write_lock:
+                try:
+                    writer.write(encode_message(message))
+                    await writer.drain()
+                except (ConnectionError, OSError) as e:
+                    raise _WorkerDisconnected() from e
+
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                request_id = message.get("id")
+                if message.get("op") == "cancel":
+                    task = tasks.get(request_id)
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                task = asyncio.create_task(self._run(request_id, message, send))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, request_id=request_id: tasks.pop(request_id, None))
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Closing connection to model host for {self.model_id}: {e}")
+        finally:
+            # 切断したワーカーのリクエストは結果を返せないため生成を中断する
+            for task in list(tasks.values()):
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.connections -= 1
+            self._connection_tasks.discard(asyncio.current_task())
+
+    async def _run(
+        self,
+        request_id: int,
+        message: Dict[str, any],
+        send: Callable[[Dict[str, any]], Awaitable[None]]
+    ):
+        """
+        1つのリクエストを処理して結果を送信する
+
+        Args:
+            request_id: リクエストのid
+            message: 受信したメッセージ
+            send: メッセージを送信する関数
+        """
+        try:
+            client = await self.repository.get_client_for_model(self.model_id)
+            op = message.get("op")
+            if op == "generate":
+                response = await client.generate_response(request_from_dict(message["request"]))
+                await send({"id": request_id, "response": response_to_dict(response)})
+            elif op == "stream":
+                async for chunk in client.generate_stream(request_from_dict(message["request"])):
+                    await send({"id": request_id, "chunk": chunk_to_dict(chunk)})
+                await send({"id": request_id, "end": True})
+            elif op == "stats":
+                await send({"id": request_id, "stats": client.get_stats()})
+            else:
+                raise ValueError(f"Unknown operation {op!r}")
+        except asyncio.CancelledError:
+            raise
+        except _WorkerDisconnected:
+            pass
+        except Exception as e:
+            try:
+                await send({"id": request_id, "error": error_to_dict(e)})
+            except _WorkerDisconnected:
+                pass
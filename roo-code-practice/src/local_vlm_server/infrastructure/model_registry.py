@@ -0,0 +1,278 @@
+"""設定ファイルからモデルを登録するモデルレジストリの定義モジュール"""
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..domain.entities import VLMModel
+
+
+logger = logging.getLogger(__name__)
+
+
+# Python 3.11以降は標準ライブラリのtomllib、それ以前はtomliでTOMLを読み込む
+_TOML_MODULE = "tomllib" if sys.version_info >= (3, 11) else "tomli"
+_TOML_AVAILABLE = importlib.util.find_spec(_TOML_MODULE) is not None
+_YAML_AVAILABLE = importlib.util.find_spec("yaml") is not None
+
+# モデルのエントリのうちクライアント設定に含めないキー
+_MODEL_FIELDS = ("id", "name", "description", "parameters", "client_type")
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """モデルレジストリに記述されたモデルの定義"""
+    model: VLMModel
+    client_type: str
+    config: Dict[str, any] = field(default_factory=dict)
+
+
+def parse_registry(data: Dict[str, any], source: str = "<registry>") -> List[ModelSpec]:
+    """
+    モデルレジストリの内容からモデルの定義を作成する
+
+    Args:
+        data: モデルレジストリの内容（modelsにモデルのエントリのリストを持つ辞書）
+        source: エラーメッセージに表示する読み込み元
+            各エントリには以下を指定する
+            - id: モデルID
+            - client_type: クライアントタイプ（"llama"、"gpt"、"ollama"など）
+            - name, description, parameters: モデルの情報（オプション）
+            - その他のキー: クライアント設定（concurrency, batching, cacheなど）
+
+    Returns:
+        モデルの定義のリスト
+
+    Raises:
+        ValueError: モデルレジストリの形式が正しくない場合
+    """
+    entries = (data or {}).get("models", [])
+    if not isinstance(entries, list):
+        raise ValueError(f"{source}: 'models' must be a list of model entries")
+
+    specs = []
+    seen = set()
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{source}: models[{i}] must be a table")
+        model_id = entry.get("id")
+        client_type = entry.get("client_type")
+        if not model_id or not isinstance(model_id, str):
+            raise ValueError(f"{source}: models[{i}] has no 'id'")
+        if not client_type or not isinstance(client_type, str):
+            raise ValueError(f"{source}: model {model_id} has no 'client_type'")
+        if model_id in seen:
+            raise ValueError(f"{source}: model {model_id} is defined more than once")
+        seen.add(model_id)
+
+        specs.append(ModelSpec(
+            model=VLMModel(
+                id=model_id,
+                name=entry.get("name", model_id),
+                description=entry.get("description"),
+                parameters=entry.get("parameters")
+            ),
+            client_type=client_type,
+            config={key: value for key, value in entry.items() if key not in _MODEL_FIELDS}
+        ))
+    return specs
+
+
+def load_registry_file(path: str) -> List[ModelSpec]:
+    """
+    モデルレジストリのファイルを読み込む
+
+    拡張子が.tomlの場合はTOML、.yamlまたは.ymlの場合はYAMLとして読み込む。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        モデルの定義のリスト
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        ValueError: ファイルの形式が正しくない場合や、読み込みに必要なパッケージがない場合
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as f:
+        content = f.read()
+
+    if extension == ".toml":
+        if not _TOML_AVAILABLE:
+            raise ValueError(f"{path}: the tomli package is required to read TOML on Python < 3.11")
+        toml = importlib.import_module(_TOML_MODULE)
+        try:
+            data = toml.loads(content.decode("utf-8"))
+        except toml.TOMLDecodeError as e:
+            raise ValueError(f"{path}: {e}") from e
+    elif extension in (".yaml", ".yml"):
+        if not _YAML_AVAILABLE:
+            raise ValueError(f"{path}: the PyYAML package is required to read YAML")
+        import yaml
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: {e}") from e
+    else:
+        raise ValueError(f"{path}: unsupported registry format {extension!r} (use .toml or .yaml)")
+
+    if data is not None and not isinstance(data, dict):
+        raise ValueError(f"{path}: the registry must be a mapping with a 'models' list")
+    return parse_registry(data, source=path)
+
+
+class ModelRegistryWatcher:
+    """
+    モデルレジストリのファイルを監視し、変更されたらリポジトリに反映するクラス
+
+    ファイルの更新時刻と大きさを一定間隔で確認する。読み込みに失敗した場合は
+    ログに記録し、それまでのモデルの登録をそのまま使い続ける。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        repository,
+        poll_interval: float = 2.0,
+        model_ids: Optional[List[str]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            path: モデルレジストリのファイルのパス
+            repository: 反映先のVLMリポジトリ（apply_registryを持つもの）
+            poll_interval: ファイルの変更を確認する間隔（秒）
+            model_ids: 反映するモデルIDのリスト（Noneの場合はすべてのモデル。
+                1つのモデルだけを保持するモデルホストで使用する）
+        """
+        self.path = path
+        self.repository = repository
+        self.poll_interval = poll_interval
+        self.model_ids = set(model_ids) if model_ids is not None else None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._signature: Optional[Tuple[float, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        # 監視タスクと手動の再読み込みが同時に反映しないためのロック
+        self._lock = asyncio.Lock()
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        """
+        ファイルの更新時刻と大きさを取得する
+
+        Returns:
+            (更新時刻, 大きさ)のタプル（ファイルがない場合はNone）
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def reload(self, warm: bool = True) -> Dict[str, List[str]]:
+        """
+        ファイルを読み込んでリポジトリに反映する
+
+        Args:
+            warm: 追加・変更されたモデルのクライアントを反映前に作成しておくかどうか
+
+        新しい設定のクライアントのロードに失敗したモデルがある場合は、ファイルが変わっていなくても
+        次の確認で再び読み込む。
+
+        Returns:
+            追加・削除・変更されたモデルIDと、変更の反映に失敗したモデルIDの辞書
+            （added, removed, updated, failed）
+
+        Raises:
+            OSError: ファイルを読み込めない場合
+            ValueError: ファイルの形式が正しくない場合
+        """
+        async with self._lock:
+            signature = self._stat()
+            try:
+                specs = await asyncio.to_thread(load_registry_file, self.path)
+                if self.model_ids is not None:
+                    specs = [spec for spec in specs if spec.model.id in self.model_ids]
+                changes = await self.repository.apply_registry(specs, warm=warm)
+            except (OSError, ValueError) as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # 同じ内容のファイルを繰り返し読み込まないよう、失敗した時点の状態を記録する
+                self._signature = signature
+                raise
+
+            self.reloads += 1
+            if changes.get("failed"):
+                # 古い設定のまま動いているモデルがあるため、次の確認で再び反映を試みる
+                self._signature = None
+                self.last_error = f"Failed to reload models: {changes['failed']}"
+            else:
+                self._signature = signature
+                self.last_error = None
+            logger.info(
+                f"Loaded model registry {self.path}: "
+                + ", ".join(f"{kind} {ids}" for kind, ids in changes.items())
+            )
+            return changes
+
+    async def check(self) -> bool:
+        """
+        ファイルが変更されていれば再読み込みする
+
+        Returns:
+            再読み込みした場合はTrue
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            await self.reload()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to reload model registry {self.path}; keeping current models: {e}")
+            return False
+        return True
+
+    async def _watch(self):
+        """ファイルの変更を一定間隔で確認する"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception(f"Error while reloading model registry {self.path}")
+
+    async def start(self):
+        """ファイルの監視を開始する"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._watch(), name="model-registry-watcher")
+        logger.info(f"Watching model registry {self.path} every {self.poll_interval}s")
+
+    async def stop(self):
+        """ファイルの監視を停止する"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        監視の統計情報を取得する
+
+        Returns:
+            再読み込みの成功・失敗回数と最後のエラーを含む辞書
+        """
+        return {
+            "path": self.path,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,298 @@
+"""ロード済みモデルのメモリ常駐を管理するモジュール"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ..application.interfaces import VLMClientInterface
+from ..domain.exceptions import ModelTooLargeError, VLMOverloadedError
+from .metrics import MODEL_EVICTIONS_TOTAL
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResidentModel:
+    """メモリに常駐しているモデル"""
+    model_id: str
+    client: VLMClientInterface
+    memory_bytes: int
+    pinned: bool
+    loaded_at: float
+    last_used: float
+
+
+class ModelResidencyManager:
+    """
+    ロード済みモデルのメモリ使用量を追跡し、メモリ予算を超えないよう管理するクラス
+
+    新しいモデルを常駐させる際に予算が足りない場合は、固定（pinned）されていない
+    モデルを最も長く使われていないものから順にアンロードする。
+    アンロードするモデルに処理中のリクエストがある場合は、完了を待ってから解放する。
+    """
+
+    def __init__(self, memory_budget_bytes: Optional[int] = None, drain_timeout: float = 30.0):
+        """
+        初期化
+
+        Args:
+            memory_budget_bytes: 常駐モデル全体のメモリ予算（バイト、Noneの場合は無制限）
+            drain_timeout: アンロード時に処理中のリクエストの完了を待つ最大時間（秒）
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.drain_timeout = drain_timeout
+        self._resident: "OrderedDict[str, ResidentModel]" = OrderedDict()
+        self.evictions = 0
+
+    @property
+    def used_bytes(self) -> int:
+        """常駐モデルのメモリ使用量の合計（バイト）"""
+        return sum(entry.memory_bytes for entry in self._resident.values())
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._resident
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def get(self, model_id: str) -> Optional[VLMClientInterface]:
+        """
+        常駐しているモデルのクライアントを取得し、最終使用時刻を更新する
+
+        Args:
+            model_id: VLMモデルのID
+
+        Returns:
+            VLMクライアント（常駐していない場合はNone）
+        """
+        entry = self._resident.get(model_id)
+        if entry is None:
+            return None
+        self._resident.move_to_end(model_id)
+        entry.last_used = time.time()
+        return entry.client
+
+    def clients(self) -> Dict[str, VLMClientInterface]:
+        """
+        常駐しているモデルのクライアントを取得する（最終使用時刻は更新しない）
+
+        Returns:
+            モデルIDをキーとするVLMクライアントの辞書
+        """
+        return {model_id: entry.client for model_id, entry in self._resident.items()}
+
+    def fits(self, memory_bytes: int) -> bool:
+        """
+        アンロードせずに追加のメモリを確保できるかどうかを判定する
+
+        Args:
+            memory_bytes: 追加で必要なメモリ量（バイト）
+
+        Returns:
+            予算内に収まる場合はTrue
+        """
+        if self.memory_budget_bytes is None:
+            return True
+        return self.used_bytes + memory_bytes <= self.memory_budget_bytes
+
+    async def admit(self, model_id: str, client: VLMClientInterface, pinned: bool = False):
+        """
+        モデルを常駐モデルとして登録する（必要に応じて他のモデルをアンロードする）
+
+        メモリの予約は呼び出し時点で同期的に行われるため、並行して登録されても
+        予算を超えることはない。
+
+        Args:
+            model_id: VLMモデルのID
+            client: VLMクライアント
+            pinned: アンロードの対象外とするかどうか
+
+        Raises:
+            ModelTooLargeError: モデルがメモリ予算より大きい場合
+            VLMOverloadedError: 他のモデルをアンロードしても予算内に収まらない場合
+        """
+        memory_bytes = client.memory_footprint()
+        victims = self._select_victims(model_id, memory_bytes)
+        for victim in victims:
+            del self._resident[victim.model_id]
+
+        now = time.time()
+        self._resident[model_id] = ResidentModel(
+            model_id=model_id,
+            client=client,
+            memory_bytes=memory_bytes,
+            pinned=pinned,
+            loaded_at=now,
+            last_used=now
+        )
+
+        for victim in victims:
+            logger.info(
+                f"Evicting model {victim.model_id} ({victim.memory_bytes} bytes) to make room for {model_id}"
+            )
+            self.evictions += 1
+            MODEL_EVICTIONS_TOTAL.labels(victim.model_id).inc()
+            await self._release(victim)
+
+    async def replace(
+        self,
+        model_id: str,
+        client: VLMClientInterface,
+        pinned: bool = False
+    ) -> Optional[VLMClientInterface]:
+        """
+        常駐しているモデルのクライアントを新しいクライアントに置き換える
+
+        置き換えた時点から新しいリクエストは新しいクライアントに渡る。
+        古いクライアントのリソースの解放は呼び出し元が行う。
+
+        Args:
+            model_id: VLMモデルのID
+            client: 新しいVLMクライアント
+            pinned: アンロードの対象外とするかどうか
+
+        Returns:
+            置き換えた古いVLMクライアント（常駐していなかった場合はNone）
+
+        Raises:
+            ModelTooLargeError: モデルがメモリ予算より大きい場合（古いクライアントは常駐したままになる）
+            VLMOverloadedError: 他のモデルをアンロードしても予算内に収まらない場合
+                （古いクライアントは常駐したままになる）
+        """
+        previous = self._resident.pop(model_id, None)
+        try:
+            await self.admit(model_id, client, pinned=pinned)
+        except (ModelTooLargeError, VLMOverloadedError):
+            if previous is not None:
+                self._resident[model_id] = previous
+            raise
+        return previous.client if previous else None
+
+    def discard(self, model_id: str) -> Optional[VLMClientInterface]:
+        """
+        モデルを常駐モデルの一覧から取り除く（リソースの解放は呼び出し元が行う）
+
+        Args:
+            model_id: VLMモデルのID
+
+        Returns:
+            取り除いたVLMクライアント（常駐していなかった場合はNone）
+        """
+        entry = self._resident.pop(model_id, None)
+        return entry.client if entry else None
+
+    async def evict(self, model_id: str) -> bool:
+        """
+        モデルをアンロードし、メモリを解放する
+
+        Args:
+            model_id: VLMモデルのID
+
+        Returns:
+            アンロードした場合はTrue、常駐していなかった場合はFalse
+        """
+        entry = self._resident.pop(model_id, None)
+        if entry is None:
+            return False
+        await self._release(entry)
+        return True
+
+    async def evict_all(self):
+        """すべてのモデルをアンロードする"""
+        entries = list(self._resident.values())
+        self._resident.clear()
+        await asyncio.gather(*(self._release(entry) for entry in entries))
+
+    def snapshot(self) -> List[Dict[str, any]]:
+        """
+        常駐しているモデルの状態を最も長く使われていない順に取得する
+
+        Returns:
+            常駐モデルの状態の辞書のリスト
+        """
+        return [
+            {
+                "model_id": entry.model_id,
+                "memory_bytes": entry.memory_bytes,
+                "pinned": entry.pinned,
+                "loaded_at": entry.loaded_at,
+                "last_used": entry.last_used,
+                "in_flight": getattr(entry.client, "in_flight", 0),
+            }
+            for entry in self._resident.values()
+        ]
+
+    def _select_victims(self, model_id: str, memory_bytes: int) -> List[ResidentModel]:
+        """
+        予算内に収めるためにアンロードするモデルを選ぶ
+
+        Args:
+            model_id: 追加するVLMモデルのID
+            memory_bytes: 追加で必要なメモリ量（バイト）
+
+        Returns:
+            アンロードするモデルのリスト（最も長く使われていない順）
+
+        Raises:
+            ModelTooLargeError: モデルがメモリ予算より大きい場合（待っても収まることはない）
+            VLMOverloadedError: 他のモデルをアンロードしても予算内に収まらない場合
+        """
+        if self.memory_budget_bytes is None:
+            return []
+        if memory_bytes > self.memory_budget_bytes:
+            raise ModelTooLargeError(model_id, memory_bytes, self.memory_budget_bytes)
+
+        available = self.memory_budget_bytes - self.used_bytes
+        victims = []
+        for entry in self._resident.values():
+            if available >= memory_bytes:
+                break
+            if entry.pinned or entry.model_id == model_id:
+                continue
+            victims.append(entry)
+            available += entry.memory_bytes
+
+        if available < memory_bytes:
+            raise VLMOverloadedError(
+                model_id,
+                details=(
+                    f"model needs {memory_bytes} bytes but only {available} of the "
+                    f"{self.memory_budget_bytes} byte memory budget can be freed"
+                )
+            )
+        return victims
+
+    async def _release(self, entry: ResidentModel):
+        """
+        アンロードするモデルのリソースを解放する
+
+        Args:
+            entry: アンロードするモデル
+        """
+        await self.release_client(entry.model_id, entry.client)
+
+    async def release_client(self, model_id: str, client: VLMClientInterface):
+        """
+        処理中のリクエストの完了を待ってからクライアントのリソースを解放する
+
+        Args:
+            model_id: VLMモデルのID
+            client: 解放するVLMクライアント
+        """
+        wait_idle = getattr(client, "wait_idle", None)
+        if wait_idle is not None:
+            try:
+                await asyncio.wait_for(wait_idle(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Model {model_id} still has in-flight requests after "
+                    f"{self.drain_timeout}s; unloading anyway"
+                )
+        try:
+            await client.close()
+        except Exception:
+            logger.exception(f"Error closing client for model {model_id}")
+        logger.info(f"Unloaded model {model_id}")
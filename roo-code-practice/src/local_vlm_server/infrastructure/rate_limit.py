@@ -0,0 +1,334 @@
+"""APIキーごとのトークンバケットによるレート制限の定義モジュール"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..domain.exceptions import RateLimitExceededError
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    """トークンバケットの補充速度・容量と、今回消費する量"""
+    name: str
+    rate: float
+    capacity: float
+    cost: float
+
+
+def _refill(level: float, updated_at: float, spec: BucketSpec, now: float) -> float:
+    """
+    経過時間に応じてバケットを補充した後の残量を計算する
+
+    Args:
+        level: 前回更新時の残量
+        updated_at: 前回更新時刻（UNIX時間）
+        spec: バケットの仕様
+        now: 現在時刻（UNIX時間）
+
+    Returns:
+        補充後の残量（容量を超えない）
+    """
+    return min(spec.capacity, level + max(0.0, now - updated_at) * spec.rate)
+
+
+def _take(
+    levels: Dict[str, Tuple[float, float]],
+    specs: List[BucketSpec],
+    now: float
+) -> Tuple[bool, float, Dict[str, Tuple[float, float]]]:
+    """
+    すべてのバケットから消費できる場合だけ消費する
+
+    1回の消費量が容量を超える場合は容量に切り詰める（満杯のバケットからは常に消費できる）。
+
+    Args:
+        levels: バケット名をキーとする(残量, 更新時刻)の辞書（存在しないバケットは満杯とみなす）
+        specs: バケットの仕様のリスト
+        now: 現在時刻（UNIX時間）
+
+    Returns:
+        (消費できたかどうか, 再試行までの待ち時間（秒）, 更新後の(残量, 更新時刻)の辞書)
+    """
+    refilled = {}
+    retry_after = 0.0
+    for spec in specs:
+        level, updated_at = levels.get(spec.name, (spec.capacity, now))
+        level = _refill(level, updated_at, spec, now)
+        refilled[spec.name] = level
+        cost = min(spec.cost, spec.capacity)
+        if level < cost:
+            retry_after = max(retry_after, (cost - level) / spec.rate)
+
+    if retry_after > 0:
+        return False, retry_after, {name: (level, now) for name, level in refilled.items()}
+    return True, 0.0, {
+        spec.name: (refilled[spec.name] - min(spec.cost, spec.capacity), now)
+        for spec in specs
+    }
+
+
+class RateLimitStore(ABC):
+    """トークンバケットの状態の保存先のインターフェース"""
+
+    @abstractmethod
+    async def take(self, key: str, specs: List[BucketSpec]) -> Tuple[bool, float]:
+        """
+        キーのすべてのバケットから消費できる場合だけ不可分に消費する
+
+        Args:
+            key: バケットの所有者（APIキー）
+            specs: バケットの仕様のリスト
+
+        Returns:
+            (消費できたかどうか, 再試行までの待ち時間（秒）)
+        """
+        pass
+
+    async def close(self):
+        """
+        保存先が使用するリソースを解放する
+
+        デフォルトでは何もしない。
+        """
+        pass
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    プロセス内のメモリにバケットの状態を保持する保存先
+
+    イベントループ上で同期的に更新するため、ロックは不要。
+    APIキーはクライアントが自由に指定できるため、最も長く使われていないキーから順に、
+    満杯まで補充されたバケット（存在しない場合と同じ状態）を破棄する。
+    それでもmax_keysを超える場合は、最も長く使われていないキーを破棄する。
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        """
+        初期化
+
+        Args:
+            max_keys: 状態を保持する最大のキー数
+        """
+        self.max_keys = max_keys
+        # キーごとの(バケット名をキーとする(残量, 更新時刻)の辞書, バケットの仕様のリスト)
+        self._levels: "OrderedDict[str, Tuple[Dict[str, Tuple[float, float]], List[BucketSpec]]]" = (
+            OrderedDict()
+        )
+
+    async def take(self, key: str, specs: List[BucketSpec]) -> Tuple[bool, float]:
+        """キーのすべてのバケットから消費できる場合だけ消費する"""
+        now = time.time()
+        levels, _ = self._levels.get(key, ({}, specs))
+        allowed, retry_after, levels = _take(levels, specs, now)
+        self._levels[key] = (levels, specs)
+        self._levels.move_to_end(key)
+        self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now: float):
+        """
+        使われていないキーのバケットを破棄する
+
+        Args:
+            now: 現在時刻（UNIX時間）
+        """
+        while self._levels:
+            key, (levels, specs) = next(iter(self._levels.items()))
+            refilled = all(_refill(*levels[spec.name], spec, now) >= spec.capacity for spec in specs)
+            if not refilled and len(self._levels) <= self.max_keys:
+                break
+            del self._levels[key]
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    SQLiteファイルにバケットの状態を保存する保存先
+
+    同じファイルを指定した複数のワーカープロセスで制限を共有する。
+    BEGIN IMMEDIATEで書き込みロックを取ってから読み書きするため、
+    プロセス間でも消費は不可分に行われる。
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path: SQLiteデータベースファイルのパス
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (key, bucket)
+                )
+                """
+            )
+
+    def _take_sync(self, key: str, specs: List[BucketSpec]) -> Tuple[bool, float]:
+        """バケットの状態を読み込んで消費し、書き戻す（スレッドで実行する）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT bucket, level, updated_at FROM rate_limit_buckets WHERE key = ?",
+                    (key,)
+                ).fetchall()
+                allowed, retry_after, levels = _take(
+                    {bucket: (level, updated_at) for bucket, level, updated_at in rows},
+                    specs,
+                    time.time()
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, bucket, level, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(key, bucket, level, updated_at) for bucket, (level, updated_at) in levels.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, retry_after
+
+    async def take(self, key: str, specs: List[BucketSpec]) -> Tuple[bool, float]:
+        """キーのすべてのバケットから消費できる場合だけ消費する"""
+        return await asyncio.to_thread(self._take_sync, key, specs)
+
+    async def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_rate_limit_store(config: Dict[str, any]) -> RateLimitStore:
+    """
+    設定からバケットの状態の保存先を作成する
+
+    Args:
+        config: 保存先の設定
+            - backend: "memory"（デフォルト）または"sqlite"
+            - max_keys: 状態を保持する最大のキー数（memoryの場合）
+            - path: SQLiteデータベースファイルのパス（sqliteの場合）
+
+    Returns:
+        バケットの状態の保存先
+
+    Raises:
+        ValueError: 未知のバックエンドが指定された場合
+    """
+    backend = config.get("backend", "memory")
+    if backend == "memory":
+        return InMemoryRateLimitStore(config.get("max_keys", 100000))
+    if backend == "sqlite":
+        return SQLiteRateLimitStore(config.get("path", "rate_limits.sqlite3"))
+    raise ValueError(f"Unknown rate limit store backend: {backend}")
+
+
+class RateLimiter:
+    """
+    APIキーごとに1秒あたりのリクエスト数と1分あたりのトークン数を制限するレート制限器
+
+    それぞれトークンバケットで管理し、両方から消費できる場合だけリクエストを受け付ける。
+    制限値はAPIキーごとに上書きできる。Noneの制限は適用しない。
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        tenants: Optional[Dict[str, Dict[str, Optional[float]]]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            store: バケットの状態の保存先
+            requests_per_second: 1秒あたりのリクエスト数の上限
+            burst: 連続して受け付けられるリクエスト数（省略時はrequests_per_secondと同じ）
+            tokens_per_minute: 1分あたりのトークン数の上限
+            tenants: APIキーをキーとする制限値の上書き
+                （requests_per_second, burst, tokens_per_minuteの辞書）
+        """
+        self.store = store
+        self._default = {
+            "requests_per_second": requests_per_second,
+            "burst": burst,
+            "tokens_per_minute": tokens_per_minute,
+        }
+        self._tenants = tenants or {}
+        self.rejected = 0
+
+    def _limits(self, api_key: str) -> Dict[str, Optional[float]]:
+        """APIキーに適用する制限値を取得する"""
+        return {**self._default, **self._tenants.get(api_key, {})}
+
+    def limits_tokens(self, api_key: str) -> bool:
+        """
+        APIキーにトークン数の制限が適用されるかどうかを判定する
+
+        呼び出し元はFalseの場合にトークン数の計算を省略できる。
+
+        Args:
+            api_key: APIキー
+
+        Returns:
+            トークン数の制限がある場合はTrue
+        """
+        return self._limits(api_key)["tokens_per_minute"] is not None
+
+    async def acquire(self, api_key: str, requests: int = 1, tokens: int = 0):
+        """
+        リクエストとトークンの枠を消費する
+
+        Args:
+            api_key: APIキー
+            requests: リクエスト数
+            tokens: 見積もったトークン数
+
+        Raises:
+            RateLimitExceededError: 制限を超えた場合
+        """
+        limits = self._limits(api_key)
+        specs = []
+        if limits["requests_per_second"] is not None:
+            specs.append(BucketSpec(
+                "requests",
+                limits["requests_per_second"],
+                limits["burst"] or limits["requests_per_second"],
+                requests
+            ))
+        if limits["tokens_per_minute"] is not None:
+            specs.append(BucketSpec(
+                "tokens",
+                limits["tokens_per_minute"] / 60.0,
+                limits["tokens_per_minute"],
+                tokens
+            ))
+        if not specs:
+            return
+
+        allowed, retry_after = await self.store.take(api_key, specs)
+        if not allowed:
+            self.rejected += 1
+            logger.warning(f"Rate limit exceeded for API key {api_key[:8]}...; retry after {retry_after:.2f}s")
+            raise RateLimitExceededError(api_key, retry_after)
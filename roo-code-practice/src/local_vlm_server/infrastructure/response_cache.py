@@ -0,0 +1,259 @@
+"""VLMレスポンスキャッシュのバックエンド定義モジュール"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+
+from ..domain.entities import Prompt, VLMResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheBackend(ABC):
+    """レスポンスキャッシュのバックエンドのインターフェース"""
+
+    def __init__(self):
+        """初期化"""
+        self.evictions = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[VLMResponse]:
+        """
+        キャッシュからレスポンスを取得する
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            キャッシュされたVLMレスポンス（存在しないか期限切れの場合はNone）
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, response: VLMResponse):
+        """
+        レスポンスをキャッシュに保存する
+
+        Args:
+            key: キャッシュキー
+            response: VLMレスポンス
+        """
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """
+        キャッシュされているエントリ数を取得する
+
+        Returns:
+            エントリ数
+        """
+        pass
+
+    def close(self):
+        """バックエンドのリソースを解放する（解放するリソースがない場合は何もしない）"""
+        pass
+
+
+class InMemoryResponseCache(ResponseCacheBackend):
+    """LRUとTTLで管理するインメモリのレスポンスキャッシュ"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 600.0):
+        """
+        初期化
+
+        Args:
+            max_entries: 保持する最大エントリ数
+            ttl_seconds: エントリの有効期間（秒、Noneの場合は無期限）
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Optional[float], VLMResponse]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[VLMResponse]:
+        """キャッシュからレスポンスを取得し、LRU順序を更新する"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    async def set(self, key: str, response: VLMResponse):
+        """レスポンスを保存し、上限を超えた古いエントリを追い出す"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def size(self) -> int:
+        """キャッシュされているエントリ数を取得する"""
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCacheBackend):
+    """
+    SQLiteファイルに保存するディスク上のレスポンスキャッシュ
+
+    プロセスの再起動後もキャッシュが保持される。
+    ブロッキングするDB操作はスレッドで実行し、イベントループを止めない。
+    エントリ数は開いたときに一度だけ数え、以降は保存・削除のたびに更新する。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100000,
+        ttl_seconds: Optional[float] = 86400.0
+    ):
+        """
+        初期化
+
+        Args:
+            path: SQLiteデータベースファイルのパス
+            max_entries: 保持する最大エントリ数
+            ttl_seconds: エントリの有効期間（秒、Noneの場合は無期限）
+        """
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_last_access "
+                "ON response_cache (last_access)"
+            )
+            self._count = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        logger.info(f"Opened SQLite response cache at {path}")
+
+    async def get(self, key: str) -> Optional[VLMResponse]:
+        """キャッシュからレスポンスを取得する"""
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, response: VLMResponse):
+        """レスポンスをキャッシュに保存する"""
+        await asyncio.to_thread(self._set, key, response)
+
+    def size(self) -> int:
+        """キャッシュされているエントリ数を取得する"""
+        return self._count
+
+    def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> Optional[VLMResponse]:
+        """キャッシュからレスポンスを同期的に取得する"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._count -= 1
+                self.evictions += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?",
+                (now, key)
+            )
+
+        data = json.loads(payload)
+        data["prompt"] = Prompt(**data["prompt"])
+        return VLMResponse(**data)
+
+    def _set(self, key: str, response: VLMResponse):
+        """レスポンスを同期的に保存し、上限を超えた古いエントリを追い出す"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        payload = json.dumps(asdict(response), ensure_ascii=False)
+        with self._lock:
+            with self._conn:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM response_cache WHERE key = ?", (key,)
+                ).fetchone() is not None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, payload, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now)
+                )
+                count = self._count if exists else self._count + 1
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    overflow = self._conn.execute(
+                        "DELETE FROM response_cache WHERE key IN ("
+                        "SELECT key FROM response_cache ORDER BY last_access LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+                    count -= overflow
+                    self.evictions += overflow
+            # トランザクションがコミットされた場合だけエントリ数を更新する
+            self._count = count
+
+
+def create_response_cache(config: Dict[str, any]) -> ResponseCacheBackend:
+    """
+    設定からレスポンスキャッシュのバックエンドを作成する
+
+    Args:
+        config: キャッシュ設定
+            - backend: "memory"（デフォルト）または"sqlite"
+            - max_entries: 保持する最大エントリ数
+            - ttl_seconds: エントリの有効期間（秒）
+            - path: SQLiteデータベースファイルのパス（sqliteの場合）
+
+    Returns:
+        レスポンスキャッシュのバックエンド
+
+    Raises:
+        ValueError: 未知のバックエンドが指定された場合
+    """
+    backend = config.get("backend", "memory")
+    options = {
+        name: config[name]
+        for name in ("max_entries", "ttl_seconds")
+        if name in config
+    }
+    if backend == "memory":
+        return InMemoryResponseCache(**options)
+    if backend == "sqlite":
+        return SQLiteResponseCache(config.get("path", "response_cache.sqlite3"), **options)
+    raise ValueError(f"Unknown response cache backend: {backend}")
@@ -0,0 +1,173 @@
+"""ドメインオブジェクトとJSONに変換可能な辞書の相互変換を定義するモジュール"""
+import base64
+from dataclasses import asdict
+from typing import Dict
+
+from ..domain import exceptions
+from ..domain.entities import Prompt, VLMResponse, VLMResponseChunk
+from ..domain.exceptions import DomainException, VLMProcessingError
+from ..domain.value_objects import ImageInput, ModelParameters, VLMRequest
+
+
+# 例外の属性のうち、プロセス間で受け渡すもの
+_ERROR_ATTRIBUTES = (
+    "model_id", "retry_after", "job_id", "max_pending", "api_key", "memory_bytes", "memory_budget_bytes"
+)
+
+
+def request_to_dict(request: VLMRequest) -> Dict[str, any]:
+    """
+    VLMリクエストをJSONに変換可能な辞書にする
+
+    Args:
+        request: VLMリクエスト
+
+    Returns:
+        リクエストの辞書（画像はBase64文字列にする）
+    """
+    return {
+        "prompt_text": request.prompt_text,
+        "model_id": request.model_id,
+        "parameters": request.parameters.to_dict() if request.parameters else None,
+        "use_cache": request.use_cache,
+        "priority": request.priority,
+        "deadline": request.deadline,
+        "images": [
+            {
+                "data": image.to_base64(),
+                "media_type": image.media_type,
+                "width": image.width,
+                "height": image.height,
+            }
+            for image in request.images
+        ],
+    }
+
+
+def request_from_dict(data: Dict[str, any]) -> VLMRequest:
+    """
+    辞書からVLMリクエストを復元する
+
+    Args:
+        data: リクエストの辞書
+
+    Returns:
+        VLMリクエスト
+    """
+    parameters = data.get("parameters")
+    return VLMRequest(
+        prompt_text=data["prompt_text"],
+        model_id=data["model_id"],
+        parameters=ModelParameters(**parameters) if parameters else None,
+        use_cache=data.get("use_cache", True),
+        priority=data.get("priority", 0),
+        deadline=data.get("deadline"),
+        images=tuple(
+            ImageInput(
+                data=base64.b64decode(image["data"]),
+                media_type=image["media_type"],
+                width=image.get("width"),
+                height=image.get("height")
+            )
+            for image in data.get("images", [])
+        )
+    )
+
+
+def response_to_dict(response: VLMResponse) -> Dict[str, any]:
+    """
+    VLMレスポンスをJSONに変換可能な辞書にする
+
+    Args:
+        response: VLMレスポンス
+
+    Returns:
+        レスポンスの辞書
+    """
+    return asdict(response)
+
+
+def response_from_dict(data: Dict[str, any]) -> VLMResponse:
+    """
+    辞書からVLMレスポンスを復元する
+
+    Args:
+        data: レスポンスの辞書
+
+    Returns:
+        VLMレスポンス
+    """
+    return VLMResponse(**{**data, "prompt": Prompt(**data["prompt"])})
+
+
+def chunk_to_dict(chunk: VLMResponseChunk) -> Dict[str, any]:
+    """
+    レスポンスの断片をJSONに変換可能な辞書にする
+
+    Args:
+        chunk: レスポンスの断片
+
+    Returns:
+        断片の辞書
+    """
+    return asdict(chunk)
+
+
+def chunk_from_dict(data: Dict[str, any]) -> VLMResponseChunk:
+    """
+    辞書からレスポンスの断片を復元する
+
+    Args:
+        data: 断片の辞書
+
+    Returns:
+        レスポンスの断片
+    """
+    return VLMResponseChunk(**data)
+
+
+def error_to_dict(error: Exception) -> Dict[str, any]:
+    """
+    例外をJSONに変換可能な辞書にする
+
+    Args:
+        error: 例外
+
+    Returns:
+        例外のクラス名・メッセージ・属性の辞書
+    """
+    return {
+        "type": error.__class__.__name__,
+        "message": str(error),
+        "attributes": {
+            name: getattr(error, name)
+            for name in _ERROR_ATTRIBUTES
+            if hasattr(error, name)
+        },
+    }
+
+
+def error_from_dict(data: Dict[str, any], model_id: str) -> Exception:
+    """
+    辞書から例外を復元する
+
+    ドメイン例外は同じクラスの例外として、メッセージと属性をそのまま復元する。
+    それ以外の例外はVLMProcessingErrorにする。
+
+    Args:
+        data: 例外の辞書
+        model_id: ドメイン例外でない場合に使うVLMモデルのID
+
+    Returns:
+        例外
+    """
+    error_class = getattr(exceptions, data.get("type", ""), None)
+    if not (isinstance(error_class, type) and issubclass(error_class, DomainException)):
+        return VLMProcessingError(model_id, f"{data.get('type')}: {data.get('message')}")
+
+    # コンストラクタの引数はクラスごとに異なるため、メッセージと属性を直接設定する
+    error = error_class.__new__(error_class)
+    Exception.__init__(error, data.get("message", ""))
+    for name, value in data.get("attributes", {}).items():
+        setattr(error, name, value)
+    return error
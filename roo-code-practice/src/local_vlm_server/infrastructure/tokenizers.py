@@ -0,0 +1,281 @@
+"""モデルごとのトークナイザーとトークン数の計算の定義モジュール"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import math
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..application.interfaces import TokenizerInterface
+
+
+logger = logging.getLogger(__name__)
+
+
+# 1文字がおおよそ1トークン以上になる文字（ひらがな・カタカナ・CJK統合漢字・全角記号・ハングル）
+_WIDE_CHARACTERS = re.compile(
+    "[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+
+# 英数字の単語、または空白以外の記号1文字
+_WORD_OR_SYMBOL = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+
+class Tokenizer(ABC):
+    """テキストのトークン数を数えるトークナイザーのインターフェース"""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """
+        テキストのトークン数を数える
+
+        Args:
+            text: テキスト
+
+        Returns:
+            トークン数
+        """
+        pass
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    トークナイザーが利用できない場合に使用する近似トークナイザー
+
+    日本語などの全角文字は1文字を1トークン、英数字の単語は4文字を1トークン、
+    記号は1文字を1トークンとして数える。
+    """
+
+    def count(self, text: str) -> int:
+        """
+        テキストのトークン数を近似的に数える
+
+        Args:
+            text: テキスト
+
+        Returns:
+            トークン数
+        """
+        wide = len(_WIDE_CHARACTERS.findall(text))
+        narrow = _WIDE_CHARACTERS.sub(" ", text)
+        return wide + sum(
+            math.ceil(len(word) / 4) if word[0].isalnum() or word[0] == "_" else 1
+            for word in _WORD_OR_SYMBOL.findall(narrow)
+        )
+
+
+class LlamaTokenizer(Tokenizer):
+    """llama-cppの語彙のみをロードしたトークナイザー"""
+
+    def __init__(self, model_path: str):
+        """
+        初期化
+
+        Args:
+            model_path: モデルファイルのパス
+        """
+        import llama_cpp
+
+        self._model = llama_cpp.Llama(model_path=model_path, vocab_only=True, verbose=False)
+
+    def count(self, text: str) -> int:
+        """テキストのトークン数を数える"""
+        return len(self._model.tokenize(text.encode("utf-8"), add_bos=False))
+
+
+class TiktokenTokenizer(Tokenizer):
+    """tiktokenのエンコーディングを使用するトークナイザー"""
+
+    def __init__(self, model_name: Optional[str] = None, encoding: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            model_name: モデル名（エンコーディングの選択に使用）
+            encoding: エンコーディング名（指定された場合はmodel_nameより優先）
+        """
+        import tiktoken
+
+        if encoding:
+            self._encoding = tiktoken.get_encoding(encoding)
+        else:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model_name or "")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        """テキストのトークン数を数える"""
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """Hugging Face tokenizersのトークナイザー"""
+
+    def __init__(self, path: Optional[str] = None, name: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            path: tokenizer.jsonのパス
+            name: Hugging Face Hubのモデル名（pathが指定されていない場合に使用）
+        """
+        from tokenizers import Tokenizer as HFTokenizer
+
+        if path:
+            self._tokenizer = HFTokenizer.from_file(path)
+        else:
+            self._tokenizer = HFTokenizer.from_pretrained(name)
+
+    def count(self, text: str) -> int:
+        """テキストのトークン数を数える"""
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def create_tokenizer(config: Optional[Dict[str, any]] = None) -> Tokenizer:
+    """
+    設定に応じたトークナイザーを作成する
+
+    必要なライブラリやファイルが利用できない場合は近似トークナイザーを返す。
+
+    Args:
+        config: トークナイザー設定
+            - backend: "llama"、"tiktoken"、"huggingface"または"heuristic"
+            - model_path: llamaのモデルファイルのパス
+            - model_name, encoding: tiktokenのモデル名・エンコーディング名
+            - path, name: huggingfaceのtokenizer.jsonのパス・モデル名
+
+    Returns:
+        トークナイザー
+    """
+    config = config or {}
+    backend = config.get("backend", "heuristic")
+
+    if backend == "llama":
+        model_path = config.get("model_path")
+        if model_path and os.path.exists(model_path) and importlib.util.find_spec("llama_cpp"):
+            return LlamaTokenizer(model_path)
+    elif backend == "tiktoken":
+        if importlib.util.find_spec("tiktoken"):
+            return TiktokenTokenizer(config.get("model_name"), config.get("encoding"))
+    elif backend == "huggingface":
+        if importlib.util.find_spec("tokenizers") and (config.get("path") or config.get("name")):
+            return HuggingFaceTokenizer(config.get("path"), config.get("name"))
+    elif backend != "heuristic":
+        raise ValueError(f"Unknown tokenizer backend: {backend}")
+
+    if backend != "heuristic":
+        logger.warning(f"Tokenizer backend {backend} is not available; using heuristic token counts")
+    return HeuristicTokenizer()
+
+
+class TokenizerService(TokenizerInterface):
+    """
+    モデルごとのトークナイザーを一度だけロードし、トークン数を計算するサービス
+
+    同じテキストのトークン数はLRUキャッシュに保持し、繰り返し現れるプロンプト
+    （共通のシステムプロンプトなど）を再度トークナイズしない。
+    キャッシュのキーにはテキストそのものではなくハッシュ値を使用する。
+    """
+
+    def __init__(
+        self,
+        config_provider: Callable[[str], Optional[Dict[str, any]]],
+        max_entries: int = 4096
+    ):
+        """
+        初期化
+
+        Args:
+            config_provider: モデルIDからトークナイザー設定を取得する関数
+            max_entries: キャッシュするトークン数の最大件数
+        """
+        self._config_provider = config_provider
+        self.max_entries = max_entries
+        self._tokenizers: Dict[str, Tokenizer] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def _get_tokenizer(self, model_id: str) -> Tokenizer:
+        """
+        モデルのトークナイザーを取得する（初回はスレッドでロードする）
+
+        Args:
+            model_id: VLMモデルのID
+
+        Returns:
+            トークナイザー
+        """
+        tokenizer = self._tokenizers.get(model_id)
+        if tokenizer is not None:
+            return tokenizer
+
+        lock = self._load_locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            tokenizer = self._tokenizers.get(model_id)
+            if tokenizer is None:
+                config = self._config_provider(model_id)
+                tokenizer = await asyncio.to_thread(create_tokenizer, config)
+                self._tokenizers[model_id] = tokenizer
+                logger.info(f"Loaded {tokenizer.__class__.__name__} for model {model_id}")
+        return tokenizer
+
+    def invalidate(self, model_id: str):
+        """
+        モデルのトークナイザーとキャッシュしたトークン数を破棄する
+
+        次にトークン数を数えるときに、現在の設定でトークナイザーをロードし直す。
+
+        Args:
+            model_id: VLMモデルのID
+        """
+        self._tokenizers.pop(model_id, None)
+        for key in [key for key in self._counts if key[0] == model_id]:
+            del self._counts[key]
+
+    async def count_tokens(self, model_id: str, texts: List[str]) -> List[int]:
+        """
+        テキストごとのトークン数を数える
+
+        Args:
+            model_id: VLMモデルのID
+            texts: テキストのリスト
+
+        Returns:
+            テキストと同じ順序のトークン数のリスト
+        """
+        tokenizer = await self._get_tokenizer(model_id)
+        keys = [(model_id, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()) for text in texts]
+        counts: List[Optional[int]] = []
+        misses = []
+        for i, key in enumerate(keys):
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+            else:
+                misses.append(i)
+            counts.append(count)
+        if not misses:
+            return counts
+
+        # 長いテキストのトークナイズでイベントループを止めないよう、キャッシュにないテキストはスレッドで数える
+        # （近似トークナイザーは軽量なためそのまま数える）
+        miss_texts = [texts[i] for i in misses]
+        if isinstance(tokenizer, HeuristicTokenizer):
+            miss_counts = [tokenizer.count(text) for text in miss_texts]
+        else:
+            miss_counts = await asyncio.to_thread(lambda: [tokenizer.count(text) for text in miss_texts])
+        self.misses += len(misses)
+        for i, count in zip(misses, miss_counts):
+            counts[i] = count
+            self._counts[keys[i]] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return counts
@@ -0,0 +1,330 @@
+"""同時実行数を制限するVLMクライアントラッパーの定義モジュール"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse, VLMResponseChunk
+from ...domain.exceptions import DeadlineExceededError, VLMOverloadedError
+from ...domain.value_objects import VLMRequest
+from ..metrics import (
+    DEADLINE_EXPIRED_TOTAL,
+    IN_FLIGHT_REQUESTS,
+    QUEUE_WAIT_SECONDS,
+    QUEUED_REQUESTS,
+    QUEUED_REQUESTS_BY_PRIORITY,
+)
+from .base import DelegatingVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class _Waiter:
+    """実行枠を待つリクエスト（sort_keyの小さい順に実行枠を譲る）"""
+    sort_key: Tuple[float, int]
+    future: asyncio.Future = field(compare=False)
+    priority: int = field(compare=False)
+    deadline: Optional[float] = field(compare=False)
+
+
+class AdmissionControlledVLMClient(DelegatingVLMClient):
+    """
+    モデルごとの同時実行数を制限し、過負荷時にリクエストを早期に拒否するVLMクライアント
+
+    同時実行数がmax_concurrencyに達している間、リクエストは最大max_queue件まで
+    待機キューに入る。キューが満杯の場合や、queue_timeout秒以内に実行枠を
+    得られなかった場合はVLMOverloadedErrorを送出する。
+
+    待機キューではリクエストのpriorityが大きいものから実行枠を譲る。
+    aging_secondsを指定すると、待ち時間aging_seconds秒ごとに優先度1段階分だけ
+    前に進むため、低い優先度のリクエストも待ち続けることはない。
+    期限（deadline）を過ぎたリクエストは実行せずにDeadlineExceededErrorを送出する。
+    """
+
+    def __init__(
+        self,
+        client: VLMClientInterface,
+        max_concurrency: int = 1,
+        max_queue: int = 16,
+        queue_timeout: Optional[float] = 30.0,
+        aging_seconds: Optional[float] = 1.0
+    ):
+        """
+        初期化
+
+        Args:
+            client: 委譲先のVLMクライアント
+            max_concurrency: 同時に実行できる最大リクエスト数
+            max_queue: 実行待ちにできる最大リクエスト数
+            queue_timeout: 実行枠を待つ最大時間（秒、Noneの場合は無制限）
+            aging_seconds: 優先度1段階分に相当する待ち時間（秒、Noneの場合は厳密な優先度順）
+        """
+        super().__init__(client)
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if aging_seconds is not None and aging_seconds <= 0:
+            raise ValueError("aging_seconds must be positive")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.aging_seconds = aging_seconds
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._queued_by_priority: Dict[int, int] = {}
+        self._average_duration = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.expired = 0
+        model_id = self.model_id or ""
+        self._queue_wait_metric = QUEUE_WAIT_SECONDS.labels(model_id, "admission")
+        self._in_flight_metric = IN_FLIGHT_REQUESTS.labels(model_id)
+        self._queued_metric = QUEUED_REQUESTS.labels(model_id)
+        self._expired_metric = DEADLINE_EXPIRED_TOTAL.labels(model_id)
+        # 優先度ごとの子メトリクスは初めて使われたときに作り、以降は使い回す
+        self._queued_by_priority_metrics: Dict[int, Any] = {}
+
+    def retry_after(self) -> float:
+        """
+        再試行までの推奨待ち時間を見積もる
+
+        Returns:
+            待機中のリクエストが捌けるまでの見込み時間（秒、最小1秒）
+        """
+        backlog = len(self._waiters) + 1
+        return max(1.0, math.ceil(self._average_duration * backlog / self.max_concurrency))
+
+    def _sort_key(self, priority: int, enqueued_at: float) -> Tuple[float, int]:
+        """
+        待機キューでの順序を決めるキーを計算する
+
+        すべてのリクエストは同じ速さで年を取るため、キーは待機開始時に一度だけ計算すればよい。
+
+        Args:
+            priority: 優先度
+            enqueued_at: 待機を開始した時刻（イベントループの時刻）
+
+        Returns:
+            小さいほど先に実行枠を得るキー
+        """
+        if self.aging_seconds is None:
+            return (-priority, next(self._sequence))
+        return (enqueued_at - priority * self.aging_seconds, next(self._sequence))
+
+    def _expire(self) -> DeadlineExceededError:
+        """
+        期限切れで破棄したリクエストを記録する
+
+        Returns:
+            呼び出し元に送出する例外
+        """
+        self.expired += 1
+        self._expired_metric.inc()
+        logger.info(f"Dropped request to {self.model_id}: deadline has passed")
+        return DeadlineExceededError(self.model_id)
+
+    def _track_queued(self, priority: int, delta: int):
+        """優先度ごとの待機件数を更新する"""
+        count = self._queued_by_priority.get(priority, 0) + delta
+        if count:
+            self._queued_by_priority[priority] = count
+        else:
+            self._queued_by_priority.pop(priority, None)
+        self._queued_metric.inc(delta)
+        metric = self._queued_by_priority_metrics.get(priority)
+        if metric is None:
+            metric = QUEUED_REQUESTS_BY_PRIORITY.labels(self.model_id or "", str(priority))
+            self._queued_by_priority_metrics[priority] = metric
+        metric.inc(delta)
+
+    async def _acquire(self, priority: int = 0, deadline: Optional[float] = None):
+        """
+        実行枠を獲得する
+
+        Args:
+            priority: 優先度（大きいほど先に実行枠を得る）
+            deadline: 実行を開始しなければならない期限（UNIX時間）
+
+        Raises:
+            VLMOverloadedError: 待機キューが満杯、または待機がタイムアウトした場合
+            DeadlineExceededError: 実行枠を得る前に期限を過ぎた場合
+        """
+        if deadline is not None and time.time() >= deadline:
+            raise self._expire()
+
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            self._in_flight_metric.inc()
+            self._queue_wait_metric.observe(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"Rejected request to {self.model_id}: queue is full")
+            raise VLMOverloadedError(self.model_id, self.retry_after(), "queue is full")
+
+        loop = asyncio.get_running_loop()
+        enqueued_at = loop.time()
+        waiter = _Waiter(self._sort_key(priority, enqueued_at), loop.create_future(), priority, deadline)
+        heapq.heappush(self._waiters, waiter)
+        self._track_queued(priority, 1)
+
+        timeout = self.queue_timeout
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.time())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            if deadline is not None and time.time() >= deadline:
+                raise self._expire()
+            self.timed_out += 1
+            logger.warning(f"Rejected request to {self.model_id}: queue wait timed out")
+            raise VLMOverloadedError(self.model_id, self.retry_after(), "queue wait timed out")
+        except asyncio.CancelledError:
+            # 実行枠を譲り受けた直後にキャンセルされた場合は枠を返却する
+            future = waiter.future
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            self._track_queued(priority, -1)
+            self._queue_wait_metric.observe(loop.time() - enqueued_at)
+        self.admitted += 1
+
+    def _release(self):
+        """
+        実行枠を返却し、待機中のリクエストがあれば最も優先度の高いものに枠を譲る
+
+        期限を過ぎたリクエストには枠を譲らずにDeadlineExceededErrorで待機を終了させる。
+        """
+        now = time.time()
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                continue
+            if waiter.deadline is not None and now >= waiter.deadline:
+                waiter.future.set_exception(self._expire())
+                continue
+            waiter.future.set_result(None)
+            return
+        self._active -= 1
+        self._in_flight_metric.dec()
+
+    @asynccontextmanager
+    async def _slot(self, priority: int = 0, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        実行枠を保持する間だけ処理を行うコンテキストマネージャ
+
+        Args:
+            priority: 優先度
+            deadline: 実行を開始しなければならない期限（UNIX時間）
+        """
+        await self._acquire(priority, deadline)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        try:
+            yield
+        finally:
+            duration = loop.time() - started_at
+            self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+            self._release()
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        実行枠を獲得してからレスポンスを生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+
+        Raises:
+            VLMOverloadedError: モデルが過負荷の場合
+            DeadlineExceededError: 実行を開始する前に期限を過ぎた場合
+        """
+        async with self._slot(request.priority, request.deadline):
+            return await self._client.generate_response(request)
+
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        実行枠を獲得し、ストリーミングが終わるまで保持する
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            VLMレスポンスの断片
+
+        Raises:
+            VLMOverloadedError: モデルが過負荷の場合
+            DeadlineExceededError: 実行を開始する前に期限を過ぎた場合
+        """
+        async with self._slot(request.priority, request.deadline):
+            async for chunk in self._client.generate_stream(request):
+                yield chunk
+
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        1つの実行枠でバッチを処理する
+
+        バッチ内で最も高い優先度で実行枠を待ち、すべてのリクエストの期限を
+        過ぎた場合だけ破棄する。
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            VLMレスポンスまたは例外のリスト
+
+        Raises:
+            VLMOverloadedError: モデルが過負荷の場合
+            DeadlineExceededError: すべてのリクエストの期限を過ぎた場合
+        """
+        deadlines = [request.deadline for request in requests]
+        deadline = None if None in deadlines else max(deadlines, default=None)
+        priority = max((request.priority for request in requests), default=0)
+        async with self._slot(priority, deadline):
+            return await self._client.generate_batch(requests)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        同時実行制御の統計情報を取得する
+
+        Returns:
+            実行中・待機中の件数と拒否件数を含む統計情報の辞書
+        """
+        stats = super().get_stats()
+        stats["admission"] = {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "queued_by_priority": {
+                str(priority): count
+                for priority, count in sorted(self._queued_by_priority.items(), reverse=True)
+            },
+            "aging_seconds": self.aging_seconds,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "expired": self.expired,
+        }
+        return stats
@@ -1,12 +1,20 @@
 """VLMクライアントの基底クラス定義モジュール"""
+import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional, Union
 
 from ...application.interfaces import VLMClientInterface
-from ...domain.entities import Prompt, VLMResponse
-from ...domain.exceptions import VLMConnectionError, VLMProcessingError
+from ...domain.entities import Prompt, VLMResponse, VLMResponseChunk
+from ...domain.exceptions import DeadlineExceededError, VLMConnectionError, VLMProcessingError
 from ...domain.value_objects import ModelParameters, VLMRequest
+from ..metrics import (
+    DEADLINE_EXPIRED_TOTAL,
+    EXECUTE_DURATION_SECONDS,
+    GENERATED_TOKENS_TOTAL,
+    TOKENS_PER_SECOND,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +33,15 @@ class BaseVLMClient(VLMClientInterface, ABC):
         """
         self.model_id = model_id
         self.config = config or {}
+        
+        # リクエストごとの記録で割り当てが発生しないよう、メトリクスを事前に取得しておく
+        self._execute_duration = {
+            mode: EXECUTE_DURATION_SECONDS.labels(model_id, mode)
+            for mode in ("single", "stream", "batch")
+        }
+        self._generated_tokens = GENERATED_TOKENS_TOTAL.labels(model_id)
+        self._tokens_per_second = TOKENS_PER_SECOND.labels(model_id)
+        self._deadline_expired = DEADLINE_EXPIRED_TOTAL.labels(model_id)
         logger.info(f"Initialized {self.__class__.__name__} for model {model_id}")
     
     @abstractmethod
@@ -44,6 +61,122 @@ class BaseVLMClient(VLMClientInterface, ABC):
         """
         pass
     
+    async def _execute_stream(self, request: VLMRequest) -> AsyncIterator[Dict[str, any]]:
+        """
+        VLMリクエストを実行し、生成されたテキストを断片ごとに返す
+        
+        デフォルトでは_execute_requestの結果全体を1つの断片として返す。
+        ストリーミングに対応したバックエンドはこのメソッドをオーバーライドする。
+        
+        Args:
+            request: VLMリクエスト
+            
+        Yields:
+            断片データの辞書（text, finish_reason, tokens_used, metadata）
+            
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        response_data = await self._execute_request(request)
+        yield {
+            "text": response_data.get("text", ""),
+            "finish_reason": "stop",
+            "tokens_used": response_data.get("tokens_used", 0),
+            "metadata": response_data.get("metadata")
+        }
+    
+    async def _execute_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[Dict[str, any], Exception]]:
+        """
+        複数のVLMリクエストをまとめて実行する
+        
+        デフォルトでは_execute_requestを並行して呼び出す。
+        バッチ推論に対応したバックエンドはこのメソッドをオーバーライドする。
+        
+        Args:
+            requests: VLMリクエストのリスト
+            
+        Returns:
+            リクエストと同じ順序のレスポンスデータの辞書または例外のリスト
+        """
+        return await asyncio.gather(
+            *(self._execute_request(request) for request in requests),
+            return_exceptions=True
+        )
+    
+    def _build_response(self, request: VLMRequest, response_data: Dict[str, any]) -> VLMResponse:
+        """
+        レスポンスデータからVLMレスポンスを作成する
+        
+        Args:
+            request: VLMリクエスト
+            response_data: レスポンスデータの辞書
+            
+        Returns:
+            VLMレスポンス
+        """
+        prompt = Prompt(text=request.prompt_text)
+        return VLMResponse(
+            model_id=self.model_id,
+            prompt=prompt,
+            text=response_data.get("text", ""),
+            tokens_used=response_data.get("tokens_used", 0),
+            metadata=response_data.get("metadata"),
+            prompt_tokens=response_data.get("prompt_tokens"),
+            completion_tokens=response_data.get("completion_tokens")
+        )
+    
+    def _record_execution(self, mode: str, elapsed: float, tokens: int):
+        """
+        バックエンドでの実行時間と生成トークン数をメトリクスに記録する
+        
+        Args:
+            mode: 実行モード（"single"、"stream"または"batch"）
+            elapsed: 実行時間（秒）
+            tokens: 生成されたトークン数
+        """
+        self._execute_duration[mode].observe(elapsed)
+        if tokens:
+            self._generated_tokens.inc(tokens)
+            if elapsed > 0:
+                self._tokens_per_second.observe(tokens / elapsed)
+    
+    def _check_deadline(self, request: VLMRequest):
+        """
+        期限を過ぎたリクエストをバックエンドで実行する前に破棄する
+        
+        Args:
+            request: VLMリクエスト
+            
+        Raises:
+            DeadlineExceededError: 期限を過ぎている場合
+        """
+        if request.is_expired():
+            self._deadline_expired.inc()
+            logger.info(f"Dropped request to {self.model_id}: deadline has passed")
+            raise DeadlineExceededError(self.model_id)
+    
+    def _to_domain_error(self, error: Exception) -> Exception:
+        """
+        例外をログに記録し、ドメイン例外に変換する
+        
+        Args:
+            error: 発生した例外
+            
+        Returns:
+            ドメイン例外
+        """
+        if isinstance(error, VLMConnectionError):
+            logger.error(f"Connection error with {self.model_id}: {str(error)}")
+            return error
+        if isinstance(error, VLMProcessingError):
+            logger.error(f"Processing error with {self.model_id}: {str(error)}")
+            return error
+        logger.error(f"Unexpected error with {self.model_id}: {error!r}")
+        return VLMProcessingError(self.model_id, str(error))
+    
     async def generate_response(self, request: VLMRequest) -> VLMResponse:
         """
         VLMにリクエストを送信し、レスポンスを生成する
@@ -55,9 +188,11 @@ class BaseVLMClient(VLMClientInterface, ABC):
             VLMレスポンス
             
         Raises:
+            DeadlineExceededError: 期限を過ぎている場合
             VLMConnectionError: VLMとの接続に問題がある場合
             VLMProcessingError: VLMの処理中にエラーが発生した場合
         """
+        self._check_deadline(request)
         try:
             logger.debug(f"Sending request to {self.model_id}: {request.prompt_text[:50]}...")
             
@@ -65,17 +200,13 @@ class BaseVLMClient(VLMClientInterface, ABC):
             parameters = request.parameters or ModelParameters()
             
             # リクエストの実行
+            started_at = time.perf_counter()
             response_data = await self._execute_request(request)
+            elapsed = time.perf_counter() - started_at
             
             # レスポンスの作成
-            prompt = Prompt(text=request.prompt_text)
-            response = VLMResponse(
-                model_id=self.model_id,
-                prompt=prompt,
-                text=response_data.get("text", ""),
-                tokens_used=response_data.get("tokens_used", 0),
-                metadata=response_data.get("metadata")
-            )
+            response = self._build_response(request, response_data)
+            self._record_execution("single", elapsed, response.tokens_used)
             
             logger.debug(f"Received response from {self.model_id}: {response.text[:50]}...")
             return response
@@ -88,4 +219,169 @@ class BaseVLMClient(VLMClientInterface, ABC):
             raise
         except Exception as e:
             logger.exception(f"Unexpected error with {self.model_id}")
-            raise VLMProcessingError(self.model_id, str(e))
\ No newline at end of file
+            raise VLMProcessingError(self.model_id, str(e))
+    
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        VLMにリクエストを送信し、生成されたテキストを届いた順に返す
+        
+        Args:
+            request: VLMリクエスト
+            
+        Yields:
+            VLMレスポンスの断片
+            
+        Raises:
+            DeadlineExceededError: 期限を過ぎている場合
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        self._check_deadline(request)
+        logger.debug(f"Sending streaming request to {self.model_id}: {request.prompt_text[:50]}...")
+        
+        index = 0
+        tokens_used = 0
+        started_at = time.perf_counter()
+        try:
+            async for chunk_data in self._execute_stream(request):
+                tokens_used += chunk_data.get("tokens_used", 0)
+                yield VLMResponseChunk(
+                    model_id=self.model_id,
+                    text=chunk_data.get("text", ""),
+                    index=index,
+                    finish_reason=chunk_data.get("finish_reason"),
+                    tokens_used=chunk_data.get("tokens_used", 0),
+                    metadata=chunk_data.get("metadata")
+                )
+                index += 1
+        except (VLMConnectionError, VLMProcessingError) as e:
+            raise self._to_domain_error(e)
+        except Exception as e:
+            logger.exception(f"Unexpected error while streaming from {self.model_id}")
+            raise VLMProcessingError(self.model_id, str(e))
+        
+        self._record_execution("stream", time.perf_counter() - started_at, tokens_used)
+        logger.debug(f"Finished streaming {index} chunks from {self.model_id}")
+    
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        複数のリクエストを1回のバックエンド呼び出しで処理する
+        
+        Args:
+            requests: VLMリクエストのリスト
+            
+        Returns:
+            リクエストと同じ順序のVLMレスポンスまたはドメイン例外のリスト
+            （期限を過ぎたリクエストは実行せずにDeadlineExceededError）
+        """
+        now = time.time()
+        expired = [request.is_expired(now) for request in requests]
+        if any(expired):
+            self._deadline_expired.inc(sum(expired))
+            live = [request for request, is_expired in zip(requests, expired) if not is_expired]
+            responses = iter(await self.generate_batch(live) if live else [])
+            return [
+                DeadlineExceededError(self.model_id) if is_expired else next(responses)
+                for is_expired in expired
+            ]
+        
+        logger.debug(f"Sending batch of {len(requests)} requests to {self.model_id}")
+        started_at = time.perf_counter()
+        try:
+            results = await self._execute_batch(requests)
+        except Exception as e:
+            error = self._to_domain_error(e)
+            return [error] * len(requests)
+        elapsed = time.perf_counter() - started_at
+        
+        responses = [
+            self._to_domain_error(result) if isinstance(result, Exception)
+            else self._build_response(request, result)
+            for request, result in zip(requests, results)
+        ]
+        self._record_execution(
+            "batch",
+            elapsed,
+            sum(response.tokens_used for response in responses if isinstance(response, VLMResponse))
+        )
+        return responses
+
+
+class DelegatingVLMClient(VLMClientInterface):
+    """別のVLMクライアントに処理を委譲するラッパーの基底クラス"""
+    
+    def __init__(self, client: VLMClientInterface):
+        """
+        初期化
+        
+        Args:
+            client: 委譲先のVLMクライアント
+        """
+        self._client = client
+    
+    @property
+    def model_id(self) -> Optional[str]:
+        """委譲先クライアントのモデルID"""
+        return getattr(self._client, "model_id", None)
+    
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        委譲先のクライアントでレスポンスを生成する
+        
+        Args:
+            request: VLMリクエスト
+            
+        Returns:
+            VLMレスポンス
+        """
+        return await self._client.generate_response(request)
+    
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        委譲先のクライアントでレスポンスをストリーミング生成する
+        
+        Args:
+            request: VLMリクエスト
+            
+        Yields:
+            VLMレスポンスの断片
+        """
+        async for chunk in self._client.generate_stream(request):
+            yield chunk
+    
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        委譲先のクライアントで複数のリクエストを処理する
+        
+        Args:
+            requests: VLMリクエストのリスト
+            
+        Returns:
+            VLMレスポンスまたは例外のリスト
+        """
+        return await self._client.generate_batch(requests)
+    
+    def get_stats(self) -> Dict[str, any]:
+        """
+        委譲先クライアントの統計情報を取得する
+        
+        Returns:
+            統計情報の辞書
+        """
+        return self._client.get_stats()
+    
+    def memory_footprint(self) -> int:
+        """委譲先クライアントのメモリ使用量の見積もりを取得する"""
+        return self._client.memory_footprint()
+    
+    async def open(self):
+        """委譲先クライアントのリソースを確保する"""
+        await self._client.open()
+    
+    async def close(self):
+        """委譲先クライアントのリソースを解放する"""
+        await self._client.close()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""動的バッチングを行うVLMクライアントラッパーの定義モジュール"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse
+from ...domain.value_objects import VLMRequest
+from ..metrics import DEFAULT_LATENCY_BUCKETS, DEFAULT_SIZE_BUCKETS, QUEUE_WAIT_SECONDS, Histogram
+from .base import DelegatingVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingVLMClient(DelegatingVLMClient):
+    """
+    同時に到着したリクエストをまとめてバックエンドに送るVLMクライアント
+
+    リクエストは最大max_wait_msミリ秒、または最大max_batch_size件まで
+    キューに溜められ、1回のgenerate_batch呼び出しとして実行される。
+    """
+
+    def __init__(
+        self,
+        client: VLMClientInterface,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0
+    ):
+        """
+        初期化
+
+        Args:
+            client: 委譲先のVLMクライアント
+            max_batch_size: 1バッチあたりの最大リクエスト数
+            max_wait_ms: バッチが揃うのを待つ最大時間（ミリ秒）
+        """
+        super().__init__(client)
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[VLMRequest, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._batch_size_histogram = Histogram(DEFAULT_SIZE_BUCKETS)
+        self._queue_wait_histogram = Histogram(DEFAULT_LATENCY_BUCKETS)
+        self._queue_wait_metric = QUEUE_WAIT_SECONDS.labels(self.model_id or "", "batching")
+        logger.info(
+            f"Enabled batching for model {self.model_id} "
+            f"(max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})"
+        )
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        リクエストをバッチキューに追加し、結果を待つ
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future, loop.time()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """キューに溜まったリクエストをバッチとして送信する"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+
+            # 待機中にキャンセルされたリクエストは送信しない
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                task = loop.create_task(self._run_batch(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            # 残りが1バッチに満たない場合は次のタイマーまで待つ
+            if 0 < len(self._pending) < self.max_batch_size:
+                self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+                break
+
+    async def _run_batch(self, batch: List[Tuple[VLMRequest, asyncio.Future, float]]):
+        """
+        バッチを実行し、結果を待機中のコルーチンに分配する
+
+        Args:
+            batch: リクエスト・Future・キュー投入時刻のタプルのリスト
+        """
+        now = asyncio.get_running_loop().time()
+        self._batch_size_histogram.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self._queue_wait_histogram.observe(now - enqueued_at)
+            self._queue_wait_metric.observe(now - enqueued_at)
+
+        requests = [request for request, _, _ in batch]
+        execution = asyncio.ensure_future(self._client.generate_batch(requests))
+        futures = [future for _, future, _ in batch]
+
+        def abandon_if_unwanted(_):
+            # バッチ内のすべての呼び出し元がキャンセルされた場合は実行を中断する
+            if not execution.done() and all(future.done() for future in futures):
+                execution.cancel()
+
+        for future in futures:
+            future.add_done_callback(abandon_if_unwanted)
+        try:
+            results = await asyncio.shield(execution)
+        except asyncio.CancelledError:
+            if not execution.cancelled():
+                # このタスク自体がキャンセルされた場合
+                execution.cancel()
+                raise
+            logger.debug(f"Abandoned a batch for model {self.model_id}: all callers were cancelled")
+            return
+        except Exception as e:
+            logger.exception(f"Batch execution failed for model {self.model_id}")
+            results = [e] * len(batch)
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        バッチングの統計情報を取得する
+
+        Returns:
+            バッチサイズとキュー待ち時間のヒストグラムを含む統計情報の辞書
+        """
+        stats = super().get_stats()
+        stats["batching"] = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": len(self._pending),
+            "batch_size": self._batch_size_histogram.snapshot(),
+            "queue_wait_seconds": self._queue_wait_histogram.snapshot(),
+        }
+        return stats
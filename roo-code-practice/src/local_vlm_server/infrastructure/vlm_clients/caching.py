@@ -0,0 +1,113 @@
+"""決定的な生成結果をキャッシュするVLMクライアントラッパーの定義モジュール"""
+import asyncio
+import dataclasses
+import logging
+from typing import Dict
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse
+from ...domain.value_objects import ModelParameters, VLMRequest
+from ..response_cache import ResponseCacheBackend
+from .base import DelegatingVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class CachingVLMClient(DelegatingVLMClient):
+    """
+    モデル・プロンプト・パラメータをキーにレスポンスをキャッシュするVLMクライアント
+
+    サンプリング温度がmax_temperatureを超えるリクエストは結果が決定的でないため
+    キャッシュを使用しない。
+    """
+
+    def __init__(
+        self,
+        client: VLMClientInterface,
+        backend: ResponseCacheBackend,
+        max_temperature: float = 0.0
+    ):
+        """
+        初期化
+
+        Args:
+            client: 委譲先のVLMクライアント
+            backend: レスポンスキャッシュのバックエンド
+            max_temperature: キャッシュを使用する最大のサンプリング温度
+        """
+        super().__init__(client)
+        self.backend = backend
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def _is_cacheable(self, request: VLMRequest) -> bool:
+        """
+        リクエストがキャッシュ対象かどうかを判定する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            キャッシュ対象の場合はTrue
+        """
+        if not request.use_cache:
+            return False
+        parameters = request.parameters or ModelParameters()
+        return parameters.temperature <= self.max_temperature
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        キャッシュを参照し、ヒットしなければ委譲先でレスポンスを生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス（キャッシュヒット時はメタデータにcached=Trueが付く）
+        """
+        if not self._is_cacheable(request):
+            self.bypasses += 1
+            return await self._client.generate_response(request)
+
+        key = request.cache_key()
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"Response cache hit for model {self.model_id}")
+            return dataclasses.replace(
+                cached,
+                metadata={**(cached.metadata or {}), "cached": True}
+            )
+
+        self.misses += 1
+        response = await self._client.generate_response(request)
+        await self.backend.set(key, response)
+        return response
+
+    async def close(self):
+        """キャッシュのバックエンドと委譲先クライアントのリソースを解放する"""
+        # SQLiteの接続を閉じる間、書き込み中のスレッドを待つことがあるためスレッドで実行する
+        await asyncio.to_thread(self.backend.close)
+        await super().close()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            ヒット・ミス・バイパス・追い出し件数を含む統計情報の辞書
+        """
+        stats = super().get_stats()
+        stats["cache"] = {
+            "backend": self.backend.__class__.__name__,
+            "max_temperature": self.max_temperature,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": self.backend.evictions,
+        }
+        return stats
@@ -0,0 +1,259 @@
+"""ブロッキングするモデル呼び出しを専用ワーカーで実行するエグゼキュータの定義モジュール"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, TypeVar
+
+from ...domain.exceptions import VLMOverloadedError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# ストリーミング終了を表す番兵
+_END_OF_STREAM = object()
+
+# 停止したエグゼキュータのレプリカを待っている呼び出し元を起こす番兵
+_STOPPED = object()
+
+# プロセスワーカー内に常駐するモデル
+_worker_model: Any = None
+
+
+def _load_worker_model(loader: Callable[[], Any]):
+    """プロセスワーカーの起動時にモデルをロードする"""
+    global _worker_model
+    _worker_model = loader()
+
+
+def _call_worker_model(fn: Callable[..., T], args: tuple) -> T:
+    """プロセスワーカーに常駐するモデルで関数を実行する"""
+    return fn(_worker_model, *args)
+
+
+def _warm_up_worker() -> bool:
+    """プロセスワーカーを起動させるための空の処理"""
+    return _worker_model is not None
+
+
+class ModelExecutor:
+    """
+    同期的なモデル呼び出しをイベントループの外で実行するエグゼキュータ
+
+    モデルは起動時に一度だけロードされ、ワーカーに常駐する。
+    replicas個のモデルを保持し、最大replicas件のリクエストを並列に実行する。
+
+    - thread: スレッドプールを使用し、各レプリカのモデルをプロセス内に保持する
+    - process: プロセスプールを使用し、各ワーカープロセスがモデルを1つずつ保持する
+      （GILを解放しないモデル向け。loaderと実行する関数はpickle可能である必要がある）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        replicas: int = 1,
+        mode: str = "thread"
+    ):
+        """
+        初期化
+
+        Args:
+            name: エグゼキュータの名前（ログやスレッド名に使用）
+            loader: モデルをロードして返す関数
+            replicas: 常駐させるモデルのレプリカ数
+            mode: "thread"または"process"
+        """
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.name = name
+        self.replicas = replicas
+        self.mode = mode
+        self._loader = loader
+        self._pool: Optional[Executor] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._models: List[Any] = []
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        """モデルがロード済みかどうか"""
+        return self._pool is not None
+
+    async def start(self):
+        """ワーカーを起動し、レプリカ数分のモデルをロードする"""
+        async with self._start_lock:
+            if self._pool is not None:
+                return
+
+            loop = asyncio.get_running_loop()
+            logger.info(f"Loading {self.replicas} replica(s) of {self.name} in {self.mode} workers")
+            if self.mode == "thread":
+                pool = ThreadPoolExecutor(
+                    max_workers=self.replicas,
+                    thread_name_prefix=f"model-{self.name}"
+                )
+                self._models = list(await asyncio.gather(*(
+                    loop.run_in_executor(pool, self._loader)
+                    for _ in range(self.replicas)
+                )))
+                self._idle = asyncio.Queue()
+                for model in self._models:
+                    self._idle.put_nowait(model)
+            else:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.replicas,
+                    initializer=_load_worker_model,
+                    initargs=(self._loader,)
+                )
+                # ワーカープロセスを起動させ、モデルのロードを完了させる
+                await asyncio.gather(*(
+                    loop.run_in_executor(pool, _warm_up_worker)
+                    for _ in range(self.replicas)
+                ))
+            self._pool = pool
+            logger.info(f"Loaded {self.name}")
+
+    async def shutdown(self):
+        """
+        ワーカーを停止し、常駐しているモデルを解放する
+
+        レプリカの返却を待っている呼び出し元はVLMOverloadedErrorで終了させる。
+        """
+        async with self._start_lock:
+            if self._pool is None:
+                return
+
+            pool, self._pool = self._pool, None
+            if self._idle is not None:
+                # 番兵は受け取った呼び出し元が戻すため、待っているすべての呼び出し元に届く
+                self._idle.put_nowait(_STOPPED)
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+            self._models = []
+            self._idle = None
+            logger.info(f"Unloaded {self.name}")
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """
+        常駐しているモデルの1つを使って関数をワーカーで実行する
+
+        Args:
+            fn: 第1引数にモデルを受け取る関数
+            *args: 関数に渡す残りの引数
+
+        Returns:
+            関数の戻り値
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+
+        if self.mode == "process":
+            return await loop.run_in_executor(self._pool, _call_worker_model, fn, args)
+
+        model = await self._acquire()
+        future = self._pool.submit(fn, model, *args)
+        self._release_model_when_done(future, model)
+        return await asyncio.wrap_future(future)
+
+    async def stream(self, fn: Callable[..., Iterator[T]], *args) -> AsyncIterator[T]:
+        """
+        常駐しているモデルの1つを使って同期イテレータをワーカーで実行し、要素を順に返す
+
+        processモードではワーカーから逐次受け取れないため、全要素が揃ってから返す。
+        threadモードでは呼び出し元が途中で読み出しをやめると、ワーカーは次の要素を
+        受け取った時点でイテレータを閉じて処理を打ち切る。
+
+        Args:
+            fn: 第1引数にモデルを受け取り、イテレータを返す関数
+            *args: 関数に渡す残りの引数
+
+        Yields:
+            イテレータの要素
+        """
+        await self.start()
+
+        if self.mode == "process":
+            for item in await self.run(_collect, fn, *args):
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+
+        def produce(model):
+            iterator = fn(model, *args)
+            try:
+                for item in iterator:
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                # ジェネレータを閉じ、モデル側の生成処理を終了させる
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                loop.call_soon_threadsafe(queue.put_nowait, _END_OF_STREAM)
+
+        model = await self._acquire()
+        producer = self._pool.submit(produce, model)
+        self._release_model_when_done(producer, model)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
+    async def _acquire(self) -> Any:
+        """
+        空いているモデルのレプリカを借りる（threadモードのみ）
+
+        Returns:
+            モデル
+
+        Raises:
+            VLMOverloadedError: レプリカを待っている間にエグゼキュータが停止した場合
+        """
+        idle = self._idle
+        model = await idle.get()
+        if model is _STOPPED or self._pool is None:
+            # 停止後に返却されたレプリカや番兵は、後から待つ呼び出し元のために戻す
+            idle.put_nowait(model)
+            raise VLMOverloadedError(
+                self.name, details="model was unloaded while waiting for a replica"
+            )
+        return model
+
+    def _release_model_when_done(self, future: Future, model: Any):
+        """
+        ワーカーでの処理が実際に終わった時点でモデルのレプリカを返却する
+
+        呼び出し元がキャンセルされてもワーカーの処理は継続するため、
+        処理の完了を待ってから次のリクエストにモデルを貸し出す。
+
+        Args:
+            future: ワーカーでの処理
+            model: 借りていたモデル
+        """
+        loop = asyncio.get_running_loop()
+        idle = self._idle
+
+        def release(_):
+            loop.call_soon_threadsafe(idle.put_nowait, model)
+
+        future.add_done_callback(release)
+
+
+def _collect(model: Any, fn: Callable[..., Iterator[T]], *args) -> List[T]:
+    """ワーカー内でイテレータの全要素をリストに集める"""
+    return list(fn(model, *args))
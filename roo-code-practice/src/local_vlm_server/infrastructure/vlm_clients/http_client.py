@@ -0,0 +1,187 @@
+"""HTTPでモデルサーバーを呼び出すVLMクライアントの基底クラスの定義モジュール"""
+import importlib.util
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from ...domain.exceptions import VLMConnectionError, VLMProcessingError
+from .base import BaseVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+# 接続の問題とみなすバックエンドのHTTPステータスコード
+_UNAVAILABLE_STATUS_CODES = {502, 503, 504}
+
+
+class HTTPVLMClient(BaseVLMClient):
+    """
+    HTTPでモデルサーバーを呼び出すVLMクライアントの基底クラス
+
+    接続プールを持つHTTPクライアントをopen()で作成し、リクエスト間でキープアライブ接続を再利用する。
+    """
+
+    # ログに表示するバックエンドの名前
+    backend_name = "HTTP"
+
+    # api_baseが設定されていない場合の接続先
+    default_api_base = "http://localhost:8000"
+
+    def __init__(
+        self,
+        model_id: str,
+        config: Optional[Dict[str, any]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        初期化
+
+        Args:
+            model_id: VLMモデルのID
+            config: クライアント設定（オプション）
+                - api_base: APIのベースURL
+                - api_key: APIキー
+                - model_name: APIに送信するモデル名（デフォルトはmodel_id）
+                - timeout: タイムアウト秒数、またはconnect/read/write/poolごとの辞書
+                - pool: 接続プールの設定（max_connections, max_keepalive_connections,
+                  keepalive_expiry）
+                - http2: HTTP/2を使用するかどうか（h2パッケージが必要）
+            transport: HTTPトランスポート（テスト用のスタブサーバーなど）
+        """
+        super().__init__(model_id, config)
+        self.api_base = self.config.get("api_base", self.default_api_base)
+        self.api_key = self.config.get("api_key")
+        self.model_name = self.config.get("model_name", model_id)
+        self.timeout = self._build_timeout(self.config.get("timeout", 60.0))
+        self.limits = self._build_limits(self.config.get("pool", {}))
+        self.http2 = bool(self.config.get("http2", False))
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            self.http2 = False
+        self._transport = transport
+
+        # HTTPクライアントはopen()で作成し、リクエスト間で接続を再利用する
+        self.client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _build_timeout(timeout: any) -> httpx.Timeout:
+        """
+        設定値からタイムアウトを作成する
+
+        Args:
+            timeout: タイムアウト秒数、またはconnect/read/write/poolごとの辞書
+
+        Returns:
+            httpxのタイムアウト
+        """
+        if isinstance(timeout, dict):
+            phases = {
+                name: timeout[name]
+                for name in ("connect", "read", "write", "pool")
+                if name in timeout
+            }
+            return httpx.Timeout(timeout.get("default", 60.0), **phases)
+        return httpx.Timeout(timeout)
+
+    @staticmethod
+    def _build_limits(pool: Dict[str, any]) -> httpx.Limits:
+        """
+        設定値から接続プールの上限を作成する
+
+        Args:
+            pool: 接続プールの設定
+
+        Returns:
+            httpxの接続プール上限
+        """
+        return httpx.Limits(
+            max_connections=pool.get("max_connections", 100),
+            max_keepalive_connections=pool.get("max_keepalive_connections", 20),
+            keepalive_expiry=pool.get("keepalive_expiry", 30.0)
+        )
+
+    def _build_headers(self) -> Dict[str, str]:
+        """
+        すべてのリクエストに付けるヘッダーを作成する
+
+        Returns:
+            ヘッダーの辞書（APIキーが設定されている場合はAuthorizationヘッダーを含む）
+        """
+        headers = {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    async def open(self):
+        """キープアライブ接続を共有するHTTPクライアントを作成する"""
+        if self.client is not None:
+            return
+
+        self.client = httpx.AsyncClient(
+            base_url=self.api_base,
+            headers=self._build_headers(),
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            transport=self._transport
+        )
+        logger.info(
+            f"Opened HTTP connection pool for {self.backend_name} model {self.model_id} at {self.api_base}"
+        )
+
+    async def close(self):
+        """HTTPクライアントを閉じ、プール中の接続を解放する"""
+        if self.client is None:
+            return
+
+        await self.client.aclose()
+        self.client = None
+        logger.info(f"Closed HTTP connection pool for {self.backend_name} model {self.model_id}")
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """
+        HTTPクライアントを取得する（未作成の場合は作成する）
+
+        Returns:
+            HTTPクライアント
+        """
+        if self.client is None:
+            await self.open()
+        return self.client
+
+    def _convert_error(self, error: Exception) -> Exception:
+        """
+        HTTP通信の例外をドメイン例外に変換する
+
+        Args:
+            error: 発生した例外
+
+        Returns:
+            ドメイン例外
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            return self._status_error(error.response)
+        if isinstance(error, httpx.TransportError):
+            return VLMConnectionError(self.model_id, f"{error.__class__.__name__}: {error}")
+        return VLMProcessingError(self.model_id, str(error))
+
+    def _status_error(self, response: httpx.Response, message: Optional[str] = None) -> Exception:
+        """
+        エラーのステータスコードのレスポンスをドメイン例外に変換する
+
+        Args:
+            response: HTTPレスポンス
+            message: バックエンドが返したエラーメッセージ
+
+        Returns:
+            一時的に利用できないステータスコードの場合はVLMConnectionError、
+            それ以外はVLMProcessingError
+        """
+        details = f"HTTP {response.status_code} from {response.request.url}"
+        if message:
+            details += f": {message}"
+        if response.status_code in _UNAVAILABLE_STATUS_CODES:
+            return VLMConnectionError(self.model_id, details)
+        return VLMProcessingError(self.model_id, details)
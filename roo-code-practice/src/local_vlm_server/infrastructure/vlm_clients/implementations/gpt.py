@@ -1,93 +1,195 @@
 """GPT VLMクライアントの実装モジュール"""
-import asyncio
+import json
 import logging
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
 
 from ....domain.exceptions import VLMConnectionError, VLMProcessingError
-from ....domain.value_objects import VLMRequest
-from ..base import BaseVLMClient
+from ....domain.value_objects import ModelParameters, VLMRequest
+from ..http_client import HTTPVLMClient
 
 
 logger = logging.getLogger(__name__)
 
 
-class GPTVLMClient(BaseVLMClient):
-    """GPT VLMクライアント"""
-    
-    def __init__(self, model_id: str, config: Optional[Dict[str, any]] = None):
+class GPTVLMClient(HTTPVLMClient):
+    """OpenAI互換のChat Completions APIを使用するGPT VLMクライアント"""
+
+    backend_name = "GPT"
+
+    def __init__(
+        self,
+        model_id: str,
+        config: Optional[Dict[str, any]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """
         初期化
-        
+
         Args:
             model_id: VLMモデルのID
             config: クライアント設定（オプション）
                 - api_base: APIのベースURL
                 - api_key: APIキー
+                - model_name: APIに送信するモデル名（デフォルトはmodel_id）
+                - chat_path: Chat Completions APIのパス
+                - timeout: タイムアウト秒数、またはconnect/read/write/poolごとの辞書
+                - pool: 接続プールの設定（max_connections, max_keepalive_connections,
+                  keepalive_expiry）
+                - http2: HTTP/2を使用するかどうか（h2パッケージが必要）
+            transport: HTTPトランスポート（テスト用のスタブサーバーなど）
         """
-        super().__init__(model_id, config)
-        self.api_base = self.config.get("api_base", "http://localhost:8000")
-        self.api_key = self.config.get("api_key")
-        
-        # 実際の実装では、ここでHTTPクライアントを初期化する
-        # self.client = httpx.AsyncClient(...)
-        self.client = None
+        super().__init__(model_id, config, transport)
+        self.chat_path = self.config.get("chat_path", "/v1/chat/completions")
         logger.info(f"Initialized GPTVLMClient for model {model_id}")
-    
+
+    def _build_payload(self, request: VLMRequest, stream: bool) -> Dict[str, any]:
+        """
+        Chat Completions APIのリクエストボディを作成する
+
+        Args:
+            request: VLMリクエスト
+            stream: ストリーミングで受け取るかどうか
+
+        Returns:
+            リクエストボディの辞書
+        """
+        parameters = request.parameters or ModelParameters()
+        content = request.prompt_text
+        if request.images:
+            # 画像がある場合はテキストと画像のパートからなるコンテンツにする
+            content = [{"type": "text", "text": request.prompt_text}] + [
+                {"type": "image_url", "image_url": {"url": image.to_data_url()}}
+                for image in request.images
+            ]
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": content}],
+            "stream": stream,
+            **parameters.to_dict()
+        }
+
+    def _build_metadata(self, request: VLMRequest, finish_reason: Optional[str]) -> Dict[str, any]:
+        """
+        レスポンスのメタデータを作成する
+
+        Args:
+            request: VLMリクエスト
+            finish_reason: 生成終了の理由
+
+        Returns:
+            メタデータの辞書
+        """
+        parameters = request.parameters
+        return {
+            "model": self.model_id,
+            "max_tokens": parameters.max_tokens if parameters else 1024,
+            "temperature": parameters.temperature if parameters else 0.7,
+            "finish_reason": finish_reason
+        }
+
     async def _execute_request(self, request: VLMRequest) -> Dict[str, any]:
         """
         GPTモデルにリクエストを実行する
-        
+
         Args:
             request: VLMリクエスト
-            
+
         Returns:
             レスポンスデータの辞書
-            
+
         Raises:
             VLMConnectionError: VLMとの接続に問題がある場合
             VLMProcessingError: VLMの処理中にエラーが発生した場合
         """
         try:
-            # 実際の実装では、ここでAPIにリクエストを送信する
-            # response = await self.client.post(...)
-            
-            # モックの実装（実際のAPI呼び出しの代わり）
             logger.debug(f"Executing request to GPT model {self.model_id}")
-            
-            # 非同期処理をシミュレート
-            await asyncio.sleep(0.3)
-            
-            # モックレスポンスの生成
-            parameters = request.parameters
-            max_tokens = parameters.max_tokens if parameters else 1024
-            temperature = parameters.temperature if parameters else 0.7
-            
-            # プロンプトに基づいた簡単なレスポンス生成
-            prompt_lower = request.prompt_text.lower()
-            if "hello" in prompt_lower or "こんにちは" in prompt_lower:
-                response_text = "こんにちは！GPTモデルです。どのようにお手伝いできますか？"
-            elif "help" in prompt_lower or "助けて" in prompt_lower:
-                response_text = "どのようなことでお困りですか？具体的に教えていただければ、お手伝いします。"
-            else:
-                response_text = f"あなたのプロンプト「{request.prompt_text[:30]}...」を受け取りました。GPTモデルからの応答です。"
-            
-            # トークン数の計算（実際には文字数÷4程度）
-            tokens_used = len(response_text) // 4
-            
+
+            client = await self._get_client()
+            response = await client.post(
+                self.chat_path,
+                json=self._build_payload(request, stream=False)
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            choice = data["choices"][0]
+            response_text = choice["message"]["content"] or ""
+
+            # usageが返されない場合は文字数÷4程度で見積もる
+            # （プロンプトと生成結果のトークン数はサービス層でトークナイザーにより補完される）
+            usage = data.get("usage") or {}
+            tokens_used = usage.get("total_tokens", len(response_text) // 4)
+
             return {
                 "text": response_text,
                 "tokens_used": tokens_used,
-                "metadata": {
-                    "model": self.model_id,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "finish_reason": "stop"
-                }
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "metadata": self._build_metadata(request, choice.get("finish_reason"))
             }
-            
+
+        except (VLMConnectionError, VLMProcessingError):
+            raise
+        except Exception as e:
+            logger.error(f"Error executing request to GPT model {self.model_id}: {e!r}")
+            raise self._convert_error(e)
+
+    async def _execute_stream(self, request: VLMRequest) -> AsyncIterator[Dict[str, any]]:
+        """
+        GPTモデルにリクエストを実行し、サーバー送信イベントで届く断片を順に返す
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            断片データの辞書
+
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        try:
+            logger.debug(f"Executing streaming request to GPT model {self.model_id}")
+
+            client = await self._get_client()
+            received = []
+            async with client.stream(
+                "POST",
+                self.chat_path,
+                json=self._build_payload(request, stream=True)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    event = json.loads(data)
+                    if not event.get("choices"):
+                        continue
+                    choice = event["choices"][0]
+                    text = (choice.get("delta") or {}).get("content") or ""
+                    finish_reason = choice.get("finish_reason")
+                    received.append(text)
+
+                    if finish_reason is None:
+                        yield {"text": text}
+                        continue
+
+                    usage = event.get("usage") or {}
+                    yield {
+                        "text": text,
+                        "finish_reason": finish_reason,
+                        "tokens_used": usage.get("total_tokens", len("".join(received)) // 4),
+                        "metadata": self._build_metadata(request, finish_reason)
+                    }
+
+        except (VLMConnectionError, VLMProcessingError):
+            raise
         except Exception as e:
-            logger.exception(f"Error executing request to GPT model {self.model_id}")
-            if "Connection" in str(e):
-                raise VLMConnectionError(self.model_id, str(e))
-            else:
-                raise VLMProcessingError(self.model_id, str(e))
\ No newline at end of file
+            logger.error(f"Error executing streaming request to GPT model {self.model_id}: {e!r}")
+            raise self._convert_error(e)
@@ -1,90 +1,735 @@
 """LLaMA VLMクライアントの実装モジュール"""
 import asyncio
+import functools
+import importlib.util
 import logging
-from typing import Dict, Optional
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 
-from ....domain.exceptions import VLMConnectionError, VLMProcessingError
-from ....domain.value_objects import VLMRequest
+from ....domain.exceptions import VLMOverloadedError, VLMProcessingError
+from ....domain.value_objects import ModelParameters, VLMRequest
+from ...metrics import PREFILL_TOKENS_SAVED_TOTAL
 from ..base import BaseVLMClient
+from ..executor import ModelExecutor
+from ..prefix_cache import load_prefix_caching_model
 
 
 logger = logging.getLogger(__name__)
 
 
+class MockLlamaModel:
+    """
+    llama-cpp-pythonが利用できない環境で使用するモックモデル
+
+    llama_cpp.Llamaのcreate_completion・create_chat_completionと同じ形式の結果を返し、
+    推論時間の分だけ呼び出し元のスレッドをブロックする。
+    接頭辞キャッシュで使用するtokenize・eval・save_state・load_state・resetも
+    同じ形式で持ち、評価済みのトークン列を状態として保持する。
+    stopping_criteriaが真を返すと、llama_cppと同様に生成を途中で打ち切る。
+    """
+
+    def __init__(self, latency: float = 0.5):
+        """
+        初期化
+
+        Args:
+            latency: 1回の推論にかかる時間（秒）
+        """
+        self.latency = latency
+        self.input_ids: List[int] = []
+        self.evaluated_tokens = 0
+        self.aborted = 0
+
+    def tokenize(self, text: bytes) -> List[int]:
+        """4バイトを1トークンとみなしてトークン列に変換する"""
+        return [int.from_bytes(text[i:i + 4], "little") for i in range(0, len(text), 4)]
+
+    def eval(self, tokens: List[int]):
+        """トークン列を評価し、評価済みのトークン列に追加する"""
+        self.input_ids.extend(tokens)
+        self.evaluated_tokens += len(tokens)
+
+    def reset(self):
+        """評価済みのトークン列を破棄する"""
+        self.input_ids = []
+
+    def save_state(self) -> List[int]:
+        """評価済みのトークン列を状態として保存する"""
+        return list(self.input_ids)
+
+    def load_state(self, state: List[int]):
+        """保存した状態を復元する"""
+        self.input_ids = list(state)
+
+    def _prefill(self, prompt: str) -> List[int]:
+        """
+        評価済みのトークン列と一致しない部分だけを評価する（llama_cppと同じ接頭辞の再利用）
+
+        Args:
+            prompt: プロンプト
+
+        Returns:
+            プロンプトのトークン列
+        """
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        matched = 0
+        for cached, token in zip(self.input_ids, tokens):
+            if cached != token:
+                break
+            matched += 1
+        # 生成のために少なくとも最後のトークンは評価し直す
+        matched = min(matched, len(tokens) - 1) if tokens else 0
+        self.input_ids = self.input_ids[:matched]
+        self.eval(tokens[matched:])
+        return tokens
+
+    def create_completion(
+        self,
+        prompt: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        frequency_penalty: float = 0.0,
+        presence_penalty: float = 0.0,
+        stream: bool = False,
+        stopping_criteria=None
+    ):
+        """
+        プロンプトに対するモックの補完結果を生成する
+
+        Args:
+            prompt: プロンプト
+            max_tokens: 最大トークン数
+            temperature: サンプリング温度
+            top_p: nucleus samplingの閾値
+            frequency_penalty: 頻度ペナルティ
+            presence_penalty: 存在ペナルティ
+            stream: 断片ごとに返すかどうか
+            stopping_criteria: トークンを生成するごとに呼び出され、真を返すと生成を打ち切る関数
+
+        Returns:
+            補完結果の辞書（streamがTrueの場合は断片の辞書のイテレータ）
+        """
+        # プロンプトに基づいた簡単なレスポンス生成
+        prompt_lower = prompt.lower()
+        if "hello" in prompt_lower or "こんにちは" in prompt_lower:
+            text = "こんにちは！LLaMAモデルです。どのようにお手伝いできますか？"
+        elif "help" in prompt_lower or "助けて" in prompt_lower:
+            text = "どのようなことでお困りですか？具体的に教えていただければ、お手伝いします。"
+        else:
+            text = f"あなたのプロンプト「{prompt[:30]}...」を受け取りました。LLaMAモデルからの応答です。"
+
+        prompt_token_ids = self._prefill(prompt)
+        if stream:
+            return self._stream(text)
+
+        # 4文字を1トークンとみなし、トークンごとに生成をシミュレートする
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+        delay = self.latency / len(pieces)
+        generated = []
+        for piece in pieces:
+            time.sleep(delay)
+            generated.append(piece)
+            if stopping_criteria is not None and stopping_criteria(self.input_ids, None):
+                self.aborted += 1
+                break
+        text = "".join(generated)
+
+        # トークン数の計算（実際には文字数÷4程度）
+        prompt_tokens = len(prompt_token_ids)
+        completion_tokens = len(text) // 4
+        return {
+            "choices": [{"text": text, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def create_completion_batch(
+        self,
+        prompts: List[str],
+        parameters_list: List[Dict[str, any]],
+        stopping_criteria=None
+    ) -> List[Dict[str, any]]:
+        """
+        複数のプロンプトを1回のバッチ推論として補完する（推論時間はバッチ全体で1回分）
+
+        Args:
+            prompts: プロンプトのリスト
+            parameters_list: プロンプトごとのcreate_completionのパラメータのリスト
+            stopping_criteria: トークンを生成するごとに呼び出され、真を返すと生成を打ち切る関数
+
+        Returns:
+            プロンプトと同じ順序の補完結果の辞書のリスト
+        """
+        latency, self.latency = self.latency, self.latency / len(prompts)
+        try:
+            return [
+                self.create_completion(prompt, stopping_criteria=stopping_criteria, **parameters)
+                for prompt, parameters in zip(prompts, parameters_list)
+            ]
+        finally:
+            self.latency = latency
+
+    def create_chat_completion(
+        self,
+        messages: List[Dict[str, any]],
+        stream: bool = False,
+        **parameters
+    ):
+        """
+        メッセージに対するモックのチャット補完結果を生成する
+
+        メッセージのテキストをプロンプトとし、画像は枚数だけを応答に含める。
+
+        Args:
+            messages: メッセージのリスト（contentは文字列、またはtext・image_urlのパートのリスト）
+            stream: 断片ごとに返すかどうか
+            **parameters: create_completionに渡すパラメータ
+
+        Returns:
+            チャット補完結果の辞書（streamがTrueの場合は断片の辞書のイテレータ）
+        """
+        texts = []
+        images = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                texts.append(content)
+                continue
+            for part in content:
+                if part["type"] == "text":
+                    texts.append(part["text"])
+                elif part["type"] == "image_url":
+                    images += 1
+        prompt = f"[{images} image(s)] " + "\n".join(texts)
+
+        completion = self.create_completion(prompt, stream=stream, **parameters)
+        if stream:
+            return (
+                {
+                    "choices": [{
+                        "delta": {"content": event["choices"][0]["text"]},
+                        "finish_reason": event["choices"][0]["finish_reason"]
+                    }]
+                }
+                for event in completion
+            )
+        choice = completion["choices"][0]
+        return {
+            "choices": [{
+                "message": {"role": "assistant", "content": choice["text"]},
+                "finish_reason": choice["finish_reason"]
+            }],
+            "usage": completion["usage"]
+        }
+
+    def _stream(self, text: str) -> Iterator[Dict[str, any]]:
+        """
+        4文字を1トークンとみなし、トークンごとに生成をシミュレートする
+
+        Args:
+            text: 生成するテキスト
+
+        Yields:
+            断片の辞書
+        """
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+        delay = self.latency / len(pieces)
+        for i, piece in enumerate(pieces):
+            time.sleep(delay)
+            is_last = i == len(pieces) - 1
+            yield {"choices": [{"text": piece, "finish_reason": "stop" if is_last else None}]}
+
+
+def load_llama_model(
+    model_path: Optional[str],
+    context_size: int = 2048,
+    gpu_layers: int = 0,
+    mock_latency: float = 0.5,
+    clip_model_path: Optional[str] = None
+):
+    """
+    LLaMAモデルをロードする
+
+    llama-cpp-pythonがインストールされ、モデルファイルが存在する場合はそれを使用し、
+    そうでない場合はモックモデルを返す。
+
+    Args:
+        model_path: モデルファイルのパス
+        context_size: コンテキストサイズ
+        gpu_layers: GPUレイヤー数
+        mock_latency: モックモデルの推論時間（秒）
+        clip_model_path: 画像を埋め込むCLIPモデル（mmproj）のファイルのパス（画像を扱うモデルのみ）
+
+    Returns:
+        create_completionとcreate_chat_completionを持つモデル
+    """
+    if model_path and os.path.exists(model_path) and importlib.util.find_spec("llama_cpp"):
+        import llama_cpp
+
+        chat_handler = None
+        if clip_model_path:
+            from llama_cpp.llama_chat_format import Llava15ChatHandler
+
+            chat_handler = Llava15ChatHandler(clip_model_path=clip_model_path, verbose=False)
+        return llama_cpp.Llama(
+            model_path=model_path,
+            n_ctx=context_size,
+            n_gpu_layers=gpu_layers,
+            chat_handler=chat_handler,
+            verbose=False
+        )
+
+    logger.warning(f"llama_cpp or model file {model_path} is not available; using mock model")
+    return MockLlamaModel(latency=mock_latency)
+
+
+class _StopWhenCancelled:
+    """呼び出し元がキャンセルされた時点でllama_cppの生成を打ち切るstopping_criteria"""
+
+    def __init__(self, cancelled: threading.Event):
+        """
+        初期化
+
+        Args:
+            cancelled: 呼び出し元のキャンセルを通知するイベント
+        """
+        self.cancelled = cancelled
+
+    def __call__(self, input_ids, logits) -> bool:
+        """生成したトークンごとに呼び出され、キャンセルされていれば真を返す"""
+        return self.cancelled.is_set()
+
+
+def _complete(
+    model,
+    prompt: str,
+    parameters: Dict[str, any],
+    cancelled: Optional[threading.Event] = None
+) -> Dict[str, any]:
+    """ワーカー内でモデルの補完を実行する（cancelledがセットされると生成を打ち切る）"""
+    if cancelled is not None:
+        parameters = {**parameters, "stopping_criteria": _StopWhenCancelled(cancelled)}
+    return model.create_completion(prompt, **parameters)
+
+
+def _with_usage(model, prompt: str, events: Iterator[Dict[str, any]]) -> Iterator[Dict[str, any]]:
+    """
+    ストリーミングの最後の断片に、非ストリーミングと同じ形式のトークン数（usage）を付ける
+
+    llama_cppのストリーミングはusageを返さないため、プロンプトをトークナイズした数と
+    断片の数（1断片1トークン）から計算する。画像の埋め込みのトークンは含まない。
+    """
+    completion_tokens = 0
+    for event in events:
+        completion_tokens += 1
+        if event["choices"][0].get("finish_reason") is not None:
+            prompt_tokens = len(model.tokenize(prompt.encode("utf-8")))
+            event = {
+                **event,
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+        yield event
+
+
+def _complete_stream(model, prompt: str, parameters: Dict[str, any]) -> Iterator[Dict[str, any]]:
+    """ワーカー内でモデルの補完をストリーミングで実行する"""
+    return _with_usage(model, prompt, model.create_completion(prompt, stream=True, **parameters))
+
+
+def _complete_batch(
+    model,
+    items: List[Tuple[str, List[str], Dict[str, any]]],
+    cancelled: Optional[threading.Event] = None
+) -> List[Union[Dict[str, any], Exception]]:
+    """
+    ワーカー内で複数のリクエストを1つのレプリカでまとめて実行する
+
+    画像を含まないリクエストは、モデルがバッチ推論（create_completion_batch）に対応していれば
+    1回の呼び出しで補完する。対応していない場合（llama_cpp）と画像を含むリクエストは、
+    同じレプリカで順に補完する。
+
+    Args:
+        model: モデル
+        items: プロンプト・画像のdata URLのリスト・パラメータのタプルのリスト
+        cancelled: セットされると生成を打ち切るイベント
+
+    Returns:
+        リクエストと同じ順序の補完結果の辞書または例外のリスト
+    """
+    results: List[Union[Dict[str, any], Exception, None]] = [None] * len(items)
+    texts = [i for i, (_, image_urls, _) in enumerate(items) if not image_urls]
+    create_batch = getattr(model, "create_completion_batch", None)
+    if create_batch is not None and len(texts) > 1:
+        stopping_criteria = _StopWhenCancelled(cancelled) if cancelled is not None else None
+        try:
+            completions = create_batch(
+                [items[i][0] for i in texts], [items[i][2] for i in texts], stopping_criteria=stopping_criteria
+            )
+        except Exception as e:
+            completions = [e] * len(texts)
+        for i, completion in zip(texts, completions):
+            results[i] = completion
+
+    for i, (prompt, image_urls, parameters) in enumerate(items):
+        if results[i] is not None:
+            continue
+        try:
+            if image_urls:
+                results[i] = _chat(model, prompt, image_urls, parameters, cancelled)
+            else:
+                results[i] = _complete(model, prompt, parameters, cancelled)
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _user_message(prompt: str, image_urls: List[str]) -> Dict[str, any]:
+    """プロンプトと画像のdata URLからユーザーメッセージを作成する"""
+    return {
+        "role": "user",
+        "content": [{"type": "image_url", "image_url": {"url": url}} for url in image_urls]
+        + [{"type": "text", "text": prompt}]
+    }
+
+
+def _chat(
+    model,
+    prompt: str,
+    image_urls: List[str],
+    parameters: Dict[str, any],
+    cancelled: Optional[threading.Event] = None
+) -> Dict[str, any]:
+    """
+    ワーカー内で画像を含むチャット補完を実行し、create_completionと同じ形式にして返す
+    （cancelledがセットされると生成を打ち切る）
+    """
+    if cancelled is not None:
+        parameters = {**parameters, "stopping_criteria": _StopWhenCancelled(cancelled)}
+    completion = model.create_chat_completion([_user_message(prompt, image_urls)], **parameters)
+    choice = completion["choices"][0]
+    return {
+        "choices": [{"text": choice["message"]["content"] or "", "finish_reason": choice["finish_reason"]}],
+        "usage": completion.get("usage")
+    }
+
+
+def _chat_stream(
+    model, prompt: str, image_urls: List[str], parameters: Dict[str, any]
+) -> Iterator[Dict[str, any]]:
+    """ワーカー内で画像を含むチャット補完をストリーミングで実行し、create_completionと同じ形式の断片を返す"""
+    events = model.create_chat_completion([_user_message(prompt, image_urls)], stream=True, **parameters)
+    return _with_usage(model, prompt, (
+        {
+            "choices": [{
+                "text": event["choices"][0].get("delta", {}).get("content") or "",
+                "finish_reason": event["choices"][0].get("finish_reason")
+            }]
+        }
+        for event in events
+    ))
+
+
 class LlamaVLMClient(BaseVLMClient):
-    """LLaMA VLMクライアント"""
-    
+    """
+    LLaMA VLMクライアント
+
+    モデルの推論はイベントループをブロックするため、ModelExecutorの
+    専用ワーカーで実行する。モデルはopen()時（または最初のリクエスト時）に
+    一度だけロードされ、close()まで常駐する。
+    """
+
     def __init__(self, model_id: str, config: Optional[Dict[str, any]] = None):
         """
         初期化
-        
+
         Args:
             model_id: VLMモデルのID
             config: クライアント設定（オプション）
                 - model_path: モデルファイルのパス
                 - context_size: コンテキストサイズ
                 - gpu_layers: GPUレイヤー数
+                - replicas: 常駐させるモデルのレプリカ数（並列に推論できる数）
+                - executor: "thread"または"process"
+                - mock_latency: モックモデルの推論時間（秒）
+                - clip_model_path: 画像を埋め込むCLIPモデル（mmproj）のファイルのパス
+                - memory_mb: 1レプリカあたりのメモリ使用量（省略時はモデルファイルのサイズ）
+                - prefix_cache: 接頭辞キャッシュの設定（block_size, max_entries, min_hits）
         """
         super().__init__(model_id, config)
         self.model_path = self.config.get("model_path")
         self.context_size = self.config.get("context_size", 2048)
         self.gpu_layers = self.config.get("gpu_layers", 0)
-        
-        # 実際の実装では、ここでllama-cpp-pythonなどのライブラリを使用してモデルをロードする
-        # self.model = llama_cpp.Llama(...)
-        self.model = None
+        loader = functools.partial(
+            load_llama_model,
+            self.model_path,
+            self.context_size,
+            self.gpu_layers,
+            self.config.get("mock_latency", 0.5),
+            self.config.get("clip_model_path")
+        )
+        self.prefix_cache = self.config.get("prefix_cache")
+        if self.prefix_cache:
+            loader = functools.partial(load_prefix_caching_model, loader, self.prefix_cache)
+        self.prefix_cache_hits = 0
+        self.prefill_tokens_saved = 0
+        self._prefill_tokens_saved = PREFILL_TOKENS_SAVED_TOTAL.labels(model_id)
+        self.executor = ModelExecutor(
+            name=model_id,
+            loader=loader,
+            replicas=self.config.get("replicas", 1),
+            mode=self.config.get("executor", "thread")
+        )
         logger.info(f"Initialized LlamaVLMClient for model {model_id}")
-    
+
+    def memory_footprint(self) -> int:
+        """
+        常駐させるモデルのメモリ使用量を見積もる
+
+        Returns:
+            レプリカ数分のメモリ使用量（バイト）
+        """
+        memory_mb = self.config.get("memory_mb")
+        if memory_mb is not None:
+            per_replica = int(memory_mb * 1024 * 1024)
+        elif self.model_path and os.path.exists(self.model_path):
+            per_replica = os.path.getsize(self.model_path)
+        else:
+            per_replica = 0
+        return per_replica * self.executor.replicas
+
+    async def open(self):
+        """モデルをロードし、ワーカーに常駐させる"""
+        await self.executor.start()
+
+    async def close(self):
+        """ワーカーを停止し、モデルを解放する"""
+        await self.executor.shutdown()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        クライアントの統計情報を取得する
+
+        Returns:
+            接頭辞キャッシュが有効な場合はその統計情報を含む辞書
+        """
+        if not self.prefix_cache:
+            return {}
+        return {
+            "prefix_cache": {
+                "hits": self.prefix_cache_hits,
+                "prefill_tokens_saved": self.prefill_tokens_saved,
+            }
+        }
+
+    def _record_prefix_cache(self, cached_tokens: int):
+        """
+        接頭辞キャッシュで評価を省略できたトークン数を記録する
+
+        Args:
+            cached_tokens: 評価を省略できた接頭辞のトークン数
+        """
+        if not cached_tokens:
+            return
+        self.prefix_cache_hits += 1
+        self.prefill_tokens_saved += cached_tokens
+        self._prefill_tokens_saved.inc(cached_tokens)
+
+    def _build_metadata(
+        self,
+        request: VLMRequest,
+        finish_reason: Optional[str],
+        prefix_cached_tokens: int = 0
+    ) -> Dict[str, any]:
+        """
+        レスポンスのメタデータを作成する
+
+        Args:
+            request: VLMリクエスト
+            finish_reason: 生成終了の理由
+            prefix_cached_tokens: 接頭辞キャッシュで評価を省略できたトークン数
+
+        Returns:
+            メタデータの辞書
+        """
+        parameters = request.parameters
+        metadata = {
+            "model": self.model_id,
+            "max_tokens": parameters.max_tokens if parameters else 1024,
+            "finish_reason": finish_reason
+        }
+        if self.prefix_cache:
+            metadata["prefix_cached_tokens"] = prefix_cached_tokens
+        return metadata
+
     async def _execute_request(self, request: VLMRequest) -> Dict[str, any]:
         """
         LLaMAモデルにリクエストを実行する
-        
+
         Args:
             request: VLMリクエスト
-            
+
         Returns:
             レスポンスデータの辞書
-            
+
         Raises:
-            VLMConnectionError: VLMとの接続に問題がある場合
             VLMProcessingError: VLMの処理中にエラーが発生した場合
         """
+        # 呼び出し元がキャンセルされたらワーカーでの生成も打ち切る
+        # （イベントはプロセス間で共有できないため、processモードでは生成を最後まで行う）
+        cancelled = threading.Event() if self.executor.mode == "thread" else None
         try:
-            # 実際の実装では、ここでモデルにリクエストを送信する
-            # response = self.model.generate(...)
-            
-            # モックの実装（実際のモデル呼び出しの代わり）
             logger.debug(f"Executing request to LLaMA model {self.model_id}")
-            
-            # 非同期処理をシミュレート
-            await asyncio.sleep(0.5)
-            
-            # モックレスポンスの生成
-            parameters = request.parameters
-            max_tokens = parameters.max_tokens if parameters else 1024
-            
-            # プロンプトに基づいた簡単なレスポンス生成
-            prompt_lower = request.prompt_text.lower()
-            if "hello" in prompt_lower or "こんにちは" in prompt_lower:
-                response_text = "こんにちは！LLaMAモデルです。どのようにお手伝いできますか？"
-            elif "help" in prompt_lower or "助けて" in prompt_lower:
-                response_text = "どのようなことでお困りですか？具体的に教えていただければ、お手伝いします。"
+
+            parameters = request.parameters or ModelParameters()
+            if request.images:
+                completion = await self.executor.run(
+                    _chat, request.prompt_text, [image.to_data_url() for image in request.images],
+                    parameters.to_dict(), cancelled
+                )
             else:
-                response_text = f"あなたのプロンプト「{request.prompt_text[:30]}...」を受け取りました。LLaMAモデルからの応答です。"
-            
-            # トークン数の計算（実際には文字数÷4程度）
-            tokens_used = len(response_text) // 4
-            
-            return {
-                "text": response_text,
-                "tokens_used": tokens_used,
-                "metadata": {
-                    "model": self.model_id,
-                    "max_tokens": max_tokens,
-                    "finish_reason": "stop"
-                }
-            }
-            
+                completion = await self.executor.run(
+                    _complete, request.prompt_text, parameters.to_dict(), cancelled
+                )
+
+            return self._to_response_data(request, completion)
+
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.set()
+            logger.info(f"Cancelled request to LLaMA model {self.model_id}")
+            raise
+        except VLMOverloadedError:
+            raise
         except Exception as e:
             logger.exception(f"Error executing request to LLaMA model {self.model_id}")
-            raise VLMProcessingError(self.model_id, str(e))
\ No newline at end of file
+            raise VLMProcessingError(self.model_id, str(e))
+
+    async def _execute_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[Dict[str, any], Exception]]:
+        """
+        LLaMAモデルに複数のリクエストを1回のワーカー呼び出しとして実行する
+
+        バッチ全体で1つのレプリカを借り、モデルがバッチ推論に対応していれば1回の推論で処理する。
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            リクエストと同じ順序のレスポンスデータの辞書または例外のリスト
+
+        Raises:
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        cancelled = threading.Event() if self.executor.mode == "thread" else None
+        items = [
+            (
+                request.prompt_text,
+                [image.to_data_url() for image in request.images],
+                (request.parameters or ModelParameters()).to_dict()
+            )
+            for request in requests
+        ]
+        try:
+            logger.debug(f"Executing batch of {len(requests)} requests to LLaMA model {self.model_id}")
+            completions = await self.executor.run(_complete_batch, items, cancelled)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.set()
+            logger.info(f"Cancelled batch to LLaMA model {self.model_id}")
+            raise
+        except VLMOverloadedError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error executing batch to LLaMA model {self.model_id}")
+            raise VLMProcessingError(self.model_id, str(e))
+
+        return [
+            VLMProcessingError(self.model_id, str(completion)) if isinstance(completion, Exception)
+            else self._to_response_data(request, completion)
+            for request, completion in zip(requests, completions)
+        ]
+
+    def _to_response_data(self, request: VLMRequest, completion: Dict[str, any]) -> Dict[str, any]:
+        """
+        補完結果をレスポンスデータの辞書に変換する
+
+        Args:
+            request: VLMリクエスト
+            completion: create_completionと同じ形式の補完結果
+
+        Returns:
+            レスポンスデータの辞書
+        """
+        choice = completion["choices"][0]
+        text = choice["text"]
+        usage = completion.get("usage") or {}
+        cached_tokens = completion.get("prefix_cached_tokens", 0)
+        self._record_prefix_cache(cached_tokens)
+        return {
+            "text": text,
+            "tokens_used": usage.get("total_tokens", len(text) // 4),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "metadata": self._build_metadata(request, choice.get("finish_reason"), cached_tokens)
+        }
+
+    async def _execute_stream(self, request: VLMRequest) -> AsyncIterator[Dict[str, any]]:
+        """
+        LLaMAモデルにリクエストを実行し、生成されたトークンを順に返す
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            断片データの辞書
+
+        Raises:
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        try:
+            logger.debug(f"Executing streaming request to LLaMA model {self.model_id}")
+
+            parameters = request.parameters or ModelParameters()
+            if request.images:
+                events = self.executor.stream(
+                    _chat_stream, request.prompt_text, [image.to_data_url() for image in request.images],
+                    parameters.to_dict()
+                )
+            else:
+                events = self.executor.stream(_complete_stream, request.prompt_text, parameters.to_dict())
+            tokens = 0
+            async for event in events:
+                choice = event["choices"][0]
+                finish_reason = choice.get("finish_reason")
+                tokens += 1
+                if finish_reason is None:
+                    yield {"text": choice["text"]}
+                    continue
+
+                # 非ストリーミングと同じく、プロンプトと生成のトークン数の合計を返す
+                usage = event.get("usage") or {}
+                cached_tokens = event.get("prefix_cached_tokens", 0)
+                self._record_prefix_cache(cached_tokens)
+                yield {
+                    "text": choice["text"],
+                    "finish_reason": finish_reason,
+                    "tokens_used": usage.get("total_tokens", tokens),
+                    "metadata": self._build_metadata(request, finish_reason, cached_tokens)
+                }
+
+        except VLMOverloadedError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error executing streaming request to LLaMA model {self.model_id}")
+            raise VLMProcessingError(self.model_id, str(e))
@@ -0,0 +1,308 @@
+"""Ollama VLMクライアントの実装モジュール"""
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional, Union
+
+import httpx
+
+from ....domain.exceptions import VLMConnectionError, VLMProcessingError
+from ....domain.value_objects import ModelParameters, VLMRequest
+from ..http_client import HTTPVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+
+# ナノ秒単位で返される処理時間のフィールドとメタデータのキー
+_DURATION_FIELDS = {
+    "total_duration": "total_duration_ms",
+    "load_duration": "load_duration_ms",
+    "prompt_eval_duration": "prompt_eval_duration_ms",
+    "eval_duration": "eval_duration_ms",
+}
+
+
+class OllamaVLMClient(HTTPVLMClient):
+    """
+    Ollamaの/api/generateを使用するVLMクライアント
+
+    リクエストごとにkeep_aliveを送り、利用中のモデルをOllamaのメモリに常駐させ続ける。
+    画像はBase64エンコードしてimagesに渡す。
+    """
+
+    backend_name = "Ollama"
+
+    default_api_base = "http://localhost:11434"
+
+    def __init__(
+        self,
+        model_id: str,
+        config: Optional[Dict[str, any]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        初期化
+
+        Args:
+            model_id: VLMモデルのID
+            config: クライアント設定（オプション。HTTPVLMClientの設定に加えて以下を指定できる）
+                - model_name: Ollamaのモデル名（例: "gemma3:4b"、デフォルトはmodel_id）
+                - keep_alive: 最後のリクエストの後にモデルを常駐させておく時間
+                  （"30m"などの文字列または秒数。-1の場合は無期限）
+                - preload: open()時にモデルをOllamaにロードさせるかどうか
+                - unload_on_close: close()時にモデルをOllamaからアンロードさせるかどうか
+                - options: Ollamaに渡すその他のオプション（num_ctxなど）
+                - system: システムプロンプト
+                - format: 出力形式（"json"またはJSONスキーマ）
+            transport: HTTPトランスポート（テスト用のスタブサーバーなど）
+        """
+        super().__init__(model_id, config, transport)
+        self.keep_alive: Union[str, int, None] = self.config.get("keep_alive", "30m")
+        self.preload = bool(self.config.get("preload", False))
+        self.unload_on_close = bool(self.config.get("unload_on_close", False))
+        self.options: Dict[str, any] = self.config.get("options", {})
+        self.loads = 0
+        logger.info(f"Initialized OllamaVLMClient for model {model_id}")
+
+    async def open(self):
+        """
+        HTTPクライアントを作成し、preloadが有効な場合はモデルをロードさせる
+
+        Ollamaに接続できない場合もロードを諦めるだけで例外にはしない
+        （最初のリクエスト時にロードされる）。
+        """
+        await super().open()
+        if not self.preload:
+            return
+        try:
+            response = await self.client.post(
+                "/api/generate",
+                json={"model": self.model_name, "keep_alive": self.keep_alive}
+            )
+            response.raise_for_status()
+            logger.info(f"Preloaded Ollama model {self.model_name} for {self.model_id}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to preload Ollama model {self.model_name}: {e!r}")
+
+    async def close(self):
+        """unload_on_closeが有効な場合はモデルをアンロードさせ、HTTPクライアントを閉じる"""
+        if self.client is not None and self.unload_on_close:
+            try:
+                await self.client.post("/api/generate", json={"model": self.model_name, "keep_alive": 0})
+                logger.info(f"Unloaded Ollama model {self.model_name} for {self.model_id}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to unload Ollama model {self.model_name}: {e!r}")
+        await super().close()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        クライアントの統計情報を取得する
+
+        Returns:
+            Ollamaがモデルをロードし直した回数を含む辞書
+        """
+        return {"ollama": {"keep_alive": self.keep_alive, "loads": self.loads}}
+
+    def _build_payload(self, request: VLMRequest, stream: bool) -> Dict[str, any]:
+        """
+        /api/generateのリクエストボディを作成する
+
+        Args:
+            request: VLMリクエスト
+            stream: ストリーミングで受け取るかどうか
+
+        Returns:
+            リクエストボディの辞書
+        """
+        parameters = request.parameters or ModelParameters()
+        payload = {
+            "model": self.model_name,
+            "prompt": request.prompt_text,
+            "stream": stream,
+            "options": {
+                **self.options,
+                "temperature": parameters.temperature,
+                "top_p": parameters.top_p,
+                "num_predict": parameters.max_tokens,
+                "frequency_penalty": parameters.frequency_penalty,
+                "presence_penalty": parameters.presence_penalty,
+            },
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if request.images:
+            payload["images"] = [image.to_base64() for image in request.images]
+        for name in ("system", "format"):
+            if name in self.config:
+                payload[name] = self.config[name]
+        return payload
+
+    def _build_metadata(self, request: VLMRequest, data: Dict[str, any]) -> Dict[str, any]:
+        """
+        最後の応答からレスポンスのメタデータを作成する
+
+        Args:
+            request: VLMリクエスト
+            data: doneが真の応答
+
+        Returns:
+            メタデータの辞書
+        """
+        parameters = request.parameters
+        metadata = {
+            "model": self.model_id,
+            "max_tokens": parameters.max_tokens if parameters else 1024,
+            "temperature": parameters.temperature if parameters else 0.7,
+            "finish_reason": data.get("done_reason", "stop"),
+        }
+        for field, key in _DURATION_FIELDS.items():
+            if data.get(field) is not None:
+                metadata[key] = round(data[field] / 1_000_000, 3)
+        return metadata
+
+    def _record_load(self, data: Dict[str, any]):
+        """
+        応答の処理時間から、Ollamaがモデルをロードし直したかどうかを記録する
+
+        Args:
+            data: doneが真の応答
+        """
+        # 常駐中のモデルのロード時間はミリ秒未満になる
+        if (data.get("load_duration") or 0) > 100_000_000:
+            self.loads += 1
+            logger.info(
+                f"Ollama loaded model {self.model_name} in {data['load_duration'] / 1e9:.2f}s; "
+                f"consider a longer keep_alive"
+            )
+
+    def _usage(self, data: Dict[str, any], text: str) -> Dict[str, any]:
+        """
+        最後の応答からトークン数を取得する
+
+        Args:
+            data: doneが真の応答
+            text: 生成されたテキスト全体
+
+        Returns:
+            tokens_used・prompt_tokens・completion_tokensの辞書
+        """
+        prompt_tokens = data.get("prompt_eval_count")
+        completion_tokens = data.get("eval_count")
+        if prompt_tokens is None or completion_tokens is None:
+            tokens_used = len(text) // 4
+        else:
+            tokens_used = prompt_tokens + completion_tokens
+        return {
+            "tokens_used": tokens_used,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+
+    async def _raise_for_status(self, response: httpx.Response):
+        """
+        エラーのステータスコードの場合に、Ollamaのエラーメッセージを含むドメイン例外を送出する
+
+        Args:
+            response: HTTPレスポンス
+
+        Raises:
+            VLMConnectionError: Ollamaが一時的に利用できない場合
+            VLMProcessingError: モデルが存在しないなど、リクエストを処理できない場合
+        """
+        if response.is_success:
+            return
+        await response.aread()
+        try:
+            message = response.json().get("error")
+        except ValueError:
+            message = None
+        raise self._status_error(response, message)
+
+    async def _execute_request(self, request: VLMRequest) -> Dict[str, any]:
+        """
+        Ollamaにリクエストを実行する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            レスポンスデータの辞書
+
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        try:
+            logger.debug(f"Executing request to Ollama model {self.model_name}")
+
+            client = await self._get_client()
+            response = await client.post("/api/generate", json=self._build_payload(request, stream=False))
+            await self._raise_for_status(response)
+            data = response.json()
+
+            text = data.get("response") or ""
+            self._record_load(data)
+            return {
+                "text": text,
+                **self._usage(data, text),
+                "metadata": self._build_metadata(request, data)
+            }
+
+        except (VLMConnectionError, VLMProcessingError):
+            raise
+        except Exception as e:
+            logger.error(f"Error executing request to Ollama model {self.model_name}: {e!r}")
+            raise self._convert_error(e)
+
+    async def _execute_stream(self, request: VLMRequest) -> AsyncIterator[Dict[str, any]]:
+        """
+        Ollamaにリクエストを実行し、改行区切りJSONで届く断片を順に返す
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            断片データの辞書
+
+        Raises:
+            VLMConnectionError: VLMとの接続に問題がある場合
+            VLMProcessingError: VLMの処理中にエラーが発生した場合
+        """
+        try:
+            logger.debug(f"Executing streaming request to Ollama model {self.model_name}")
+
+            client = await self._get_client()
+            received = []
+            async with client.stream(
+                "POST",
+                "/api/generate",
+                json=self._build_payload(request, stream=True)
+            ) as response:
+                await self._raise_for_status(response)
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise VLMProcessingError(self.model_id, data["error"])
+
+                    text = data.get("response") or ""
+                    received.append(text)
+                    if not data.get("done"):
+                        yield {"text": text}
+                        continue
+
+                    self._record_load(data)
+                    yield {
+                        "text": text,
+                        "finish_reason": data.get("done_reason", "stop"),
+                        "tokens_used": self._usage(data, "".join(received))["tokens_used"],
+                        "metadata": self._build_metadata(request, data)
+                    }
+                    break
+
+        except (VLMConnectionError, VLMProcessingError):
+            raise
+        except Exception as e:
+            logger.error(f"Error executing streaming request to Ollama model {self.model_name}: {e!r}")
+            raise self._convert_error(e)
@@ -0,0 +1,158 @@
+"""リクエスト数・エラー数・レイテンシを記録するVLMクライアントラッパーの定義モジュール"""
+import asyncio
+import time
+from typing import AsyncIterator, List, Union
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse, VLMResponseChunk
+from ...domain.value_objects import VLMRequest
+from ..metrics import (
+    CANCELLED_REQUESTS_TOTAL,
+    REQUEST_DURATION_SECONDS,
+    REQUEST_ERRORS_TOTAL,
+    REQUESTS_TOTAL,
+)
+from .base import DelegatingVLMClient
+
+
+class InstrumentedVLMClient(DelegatingVLMClient):
+    """
+    モデルごとのリクエスト数・エラー数・キャンセル数・エンドツーエンドのレイテンシを記録するVLMクライアント
+
+    キャッシュヒットや待機中の拒否も含めて計測するため、ラッパーの最も外側に置く。
+    処理中のリクエスト数も保持しており、アンロード前の処理完了の待機に使用される。
+    """
+
+    def __init__(self, client: VLMClientInterface):
+        """
+        初期化
+
+        Args:
+            client: 委譲先のVLMクライアント
+        """
+        super().__init__(client)
+        model_id = self.model_id or ""
+        # リクエストごとの記録で割り当てが発生しないよう、メトリクスを事前に取得しておく
+        self._requests = {
+            mode: REQUESTS_TOTAL.labels(model_id, mode)
+            for mode in ("generate", "stream", "batch")
+        }
+        self._durations = {
+            mode: REQUEST_DURATION_SECONDS.labels(model_id, mode)
+            for mode in ("generate", "stream", "batch")
+        }
+        self._cancelled = {
+            mode: CANCELLED_REQUESTS_TOTAL.labels(model_id, mode)
+            for mode in ("generate", "stream", "batch")
+        }
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def wait_idle(self):
+        """処理中のリクエストがなくなるまで待つ"""
+        await self._idle.wait()
+
+    def _enter(self):
+        """処理中のリクエストを1件増やす"""
+        self.in_flight += 1
+        self._idle.clear()
+
+    def _exit(self):
+        """処理中のリクエストを1件減らす"""
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    def _record_error(self, error: BaseException):
+        """
+        エラーを例外の型ごとに記録する
+
+        Args:
+            error: 発生した例外
+        """
+        REQUEST_ERRORS_TOTAL.labels(self.model_id or "", error.__class__.__name__).inc()
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        委譲先でレスポンスを生成し、リクエスト数とレイテンシを記録する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+        """
+        self._requests["generate"].inc()
+        self._enter()
+        started_at = time.perf_counter()
+        try:
+            return await self._client.generate_response(request)
+        except asyncio.CancelledError:
+            self._cancelled["generate"].inc()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            self._durations["generate"].observe(time.perf_counter() - started_at)
+            self._exit()
+
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        委譲先でストリーミング生成し、最後の断片までのレイテンシを記録する
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            VLMレスポンスの断片
+        """
+        self._requests["stream"].inc()
+        self._enter()
+        started_at = time.perf_counter()
+        try:
+            async for chunk in self._client.generate_stream(request):
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # 呼び出し元が途中で読み出しをやめた場合もキャンセルとして記録する
+            self._cancelled["stream"].inc()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            self._durations["stream"].observe(time.perf_counter() - started_at)
+            self._exit()
+
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        委譲先で複数のリクエストを処理し、リクエストごとの結果を記録する
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            VLMレスポンスまたは例外のリスト
+        """
+        self._requests["batch"].inc(len(requests))
+        self._enter()
+        started_at = time.perf_counter()
+        try:
+            results = await self._client.generate_batch(requests)
+        except asyncio.CancelledError:
+            self._cancelled["batch"].inc(len(requests))
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            self._durations["batch"].observe(time.perf_counter() - started_at)
+            self._exit()
+
+        for result in results:
+            if isinstance(result, Exception):
+                self._record_error(result)
+        return results
@@ -0,0 +1,236 @@
+"""共通のプロンプト接頭辞の計算結果（KVキャッシュ）を再利用するモデルラッパーの定義モジュール"""
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixCachingModel:
+    """
+    プロンプトの共通接頭辞を評価した後のモデルの状態を保持し、再利用するラッパー
+
+    llama_cpp.Llamaと同じtokenize・eval・save_state・load_state・resetを持つモデルを包む。
+    プロンプトをblock_sizeトークンごとの境界で区切り、min_hits回以上現れた接頭辞を
+    評価した直後の状態（KVキャッシュ）を最大max_entries件までLRUで保持する。
+    以降のリクエストでは最も長く一致する接頭辞の状態を復元し、残りの部分だけを評価させる。
+
+    モデルと同じワーカー内で使用されるため、スレッドセーフではない。
+    """
+
+    def __init__(
+        self,
+        model,
+        block_size: int = 64,
+        max_entries: int = 8,
+        min_hits: int = 2,
+        max_candidates: int = 1024
+    ):
+        """
+        初期化
+
+        Args:
+            model: 包むモデル
+            block_size: 接頭辞の境界の間隔（トークン数）
+            max_entries: 保持する状態の最大数
+            min_hits: 状態を保存するまでに接頭辞が現れる必要がある回数
+            max_candidates: 出現回数を数える接頭辞の最大数
+        """
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.model = model
+        self.block_size = block_size
+        self.max_entries = max_entries
+        self.min_hits = min_hits
+        self.max_candidates = max_candidates
+        self._states: "OrderedDict[int, Tuple[Tuple[int, ...], any]]" = OrderedDict()
+        self._candidates: "OrderedDict[int, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def _prefix_keys(self, tokens: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        ブロック境界ごとの接頭辞のキーを計算する
+
+        接頭辞のキーは直前の境界のキーと次のブロックから計算するため、
+        プロンプト長に比例する時間で求まる。プロンプト全体は含めない
+        （生成のために少なくとも1トークンは評価する必要があるため）。
+
+        Args:
+            tokens: プロンプトのトークン列
+
+        Returns:
+            (接頭辞の長さ, キー)のリスト（短い順）
+        """
+        keys = []
+        key = 0
+        for end in range(self.block_size, len(tokens), self.block_size):
+            key = hash((key, tuple(tokens[end - self.block_size:end])))
+            keys.append((end, key))
+        return keys
+
+    def _restore(self, tokens: Sequence[int], keys: List[Tuple[int, int]]) -> int:
+        """
+        最も長く一致する接頭辞の状態をモデルに復元する
+
+        Args:
+            tokens: プロンプトのトークン列
+            keys: ブロック境界ごとの接頭辞のキー
+
+        Returns:
+            復元した接頭辞のトークン数（一致しない場合は0）
+        """
+        for length, key in reversed(keys):
+            entry = self._states.get(key)
+            if entry is None:
+                continue
+            prefix, state = entry
+            if tuple(tokens[:length]) != prefix:
+                continue
+            self._states.move_to_end(key)
+            self.model.load_state(state)
+            return length
+        return 0
+
+    def _remember(self, tokens: Sequence[int], keys: List[Tuple[int, int]], restored: int):
+        """
+        繰り返し現れる接頭辞を数え、min_hits回に達した最長の接頭辞の状態を保存する
+
+        Args:
+            tokens: プロンプトのトークン列
+            keys: ブロック境界ごとの接頭辞のキー
+            restored: 復元済みの接頭辞のトークン数
+        """
+        target = None
+        for length, key in keys:
+            if length <= restored or key in self._states:
+                continue
+            hits = self._candidates.pop(key, 0) + 1
+            self._candidates[key] = hits
+            if hits >= self.min_hits:
+                target = (length, key)
+        while len(self._candidates) > self.max_candidates:
+            self._candidates.popitem(last=False)
+        if target is None:
+            return
+
+        # 復元済みの状態に続けて接頭辞の残りだけを評価し、その時点の状態を保存する
+        length, key = target
+        if restored == 0:
+            self.model.reset()
+        self.model.eval(list(tokens[restored:length]))
+        self._states[key] = (tuple(tokens[:length]), self.model.save_state())
+        self._candidates.pop(key, None)
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
+        logger.debug(f"Cached state for a {length}-token prompt prefix")
+
+    def _prepare(self, prompt: str) -> int:
+        """
+        プロンプトの接頭辞の状態を復元または保存し、モデルの評価を残りの部分だけにする
+
+        Args:
+            prompt: プロンプト
+
+        Returns:
+            このリクエストで評価を省略できた接頭辞のトークン数
+        """
+        tokens = self.model.tokenize(prompt.encode("utf-8"))
+        keys = self._prefix_keys(tokens)
+        restored = self._restore(tokens, keys)
+        if restored:
+            self.hits += 1
+            self.tokens_saved += restored
+        else:
+            self.misses += 1
+        self._remember(tokens, keys, restored)
+        return restored
+
+    def create_completion(self, prompt: str, stream: bool = False, **parameters):
+        """
+        共通の接頭辞の状態を再利用してプロンプトに対する補完結果を生成する
+
+        Args:
+            prompt: プロンプト
+            stream: 断片ごとに返すかどうか
+            **parameters: モデルのcreate_completionに渡すパラメータ
+
+        Returns:
+            補完結果の辞書（streamがTrueの場合は断片の辞書のイテレータ）。
+            prefix_cached_tokensに評価を省略できた接頭辞のトークン数を含む
+        """
+        cached_tokens = self._prepare(prompt)
+        if stream:
+            return self._stream(
+                self.model.create_completion(prompt, stream=True, **parameters),
+                cached_tokens
+            )
+
+        completion = self.model.create_completion(prompt, **parameters)
+        completion["prefix_cached_tokens"] = cached_tokens
+        return completion
+
+    def create_chat_completion(self, messages: List[Dict[str, any]], stream: bool = False, **parameters):
+        """
+        メッセージに対するチャット補完結果を生成する
+
+        画像の埋め込みはトークン列で表せないため、接頭辞キャッシュは使用しない。
+
+        Args:
+            messages: メッセージのリスト
+            stream: 断片ごとに返すかどうか
+            **parameters: モデルのcreate_chat_completionに渡すパラメータ
+
+        Returns:
+            チャット補完結果の辞書（streamがTrueの場合は断片の辞書のイテレータ）
+        """
+        return self.model.create_chat_completion(messages, stream=stream, **parameters)
+
+    def _stream(self, events: Iterator[Dict[str, any]], cached_tokens: int) -> Iterator[Dict[str, any]]:
+        """
+        最後の断片に評価を省略できた接頭辞のトークン数を付けて返す
+
+        Args:
+            events: モデルが返す断片のイテレータ
+            cached_tokens: 評価を省略できた接頭辞のトークン数
+
+        Yields:
+            断片の辞書
+        """
+        for event in events:
+            if event["choices"][0].get("finish_reason") is not None:
+                event["prefix_cached_tokens"] = cached_tokens
+            yield event
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        接頭辞キャッシュの統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            "entries": len(self._states),
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def load_prefix_caching_model(loader, options: Optional[Dict[str, any]] = None) -> PrefixCachingModel:
+    """
+    モデルをロードし、接頭辞キャッシュで包む
+
+    ModelExecutorのローダーとして使用するため、プロセスワーカーに渡せるよう
+    モジュールレベルの関数として定義する。
+
+    Args:
+        loader: モデルをロードして返す関数
+        options: PrefixCachingModelの引数
+
+    Returns:
+        接頭辞キャッシュで包んだモデル
+    """
+    return PrefixCachingModel(loader(), **(options or {}))
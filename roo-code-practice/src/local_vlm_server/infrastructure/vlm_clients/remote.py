@@ -0,0 +1,262 @@
+"""別プロセスのモデルホストにリクエストを転送するVLMクライアントの定義モジュール"""
+import asyncio
+import itertools
+import logging
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse, VLMResponseChunk
+from ...domain.exceptions import VLMConnectionError
+from ...domain.value_objects import VLMRequest
+from ..model_host import MAX_MESSAGE_BYTES, encode_message, read_message
+from ..serialization import chunk_from_dict, error_from_dict, request_to_dict, response_from_dict
+
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteVLMClient(VLMClientInterface):
+    """
+    Unixドメインソケットでモデルホストにリクエストを転送するVLMクライアント
+
+    複数ワーカー構成のAPIワーカーが使用する。モデルはモデルホストのプロセスだけが保持するため、
+    ワーカーを増やしてもモデルのメモリは増えない。1つの接続で複数のリクエストを同時に送り、
+    接続が切れた場合は次のリクエストで接続し直す。
+    """
+
+    def __init__(self, model_id: str, config: Optional[Dict[str, any]] = None):
+        """
+        初期化
+
+        Args:
+            model_id: VLMモデルのID
+            config: クライアント設定
+                - socket_path: モデルホストのソケットのパス
+                - connect_timeout: 接続のタイムアウト秒数
+        """
+        config = config or {}
+        self.model_id = model_id
+        self.socket_path: str = config["socket_path"]
+        self.connect_timeout = config.get("connect_timeout", 5.0)
+        self.connects = 0
+        self._reader_task: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # リクエストのidごとに、送信した接続のストリームライターと応答を受け取るキューを保持する
+        self._pending: Dict[int, Tuple[asyncio.StreamWriter, asyncio.Queue]] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        """モデルホストに接続しているかどうか"""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def open(self):
+        """
+        モデルホストに接続する
+
+        Raises:
+            VLMConnectionError: モデルホストに接続できない場合
+        """
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path, limit=MAX_MESSAGE_BYTES),
+                    self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise VLMConnectionError(
+                    self.model_id, f"model host at {self.socket_path} is unavailable: {e!r}"
+                )
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_loop(reader, writer))
+            self.connects += 1
+            logger.info(f"Connected to model host for {self.model_id} at {self.socket_path}")
+
+    async def close(self):
+        """モデルホストとの接続を閉じる"""
+        task, self._reader_task = self._reader_task, None
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        モデルホストからのメッセージを受信し、リクエストごとのキューに振り分ける
+
+        Args:
+            reader: ストリームリーダー
+            writer: この接続のストリームライター
+        """
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                pending = self._pending.get(message.get("id"))
+                if pending is not None and pending[0] is writer:
+                    pending[1].put_nowait(message)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Lost connection to model host for {self.model_id}: {e}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            # この接続で応答を待っているリクエストだけに接続が切れたことを知らせる
+            # （接続し直した後の新しい接続のリクエストには影響させない）
+            for pending_writer, queue in self._pending.values():
+                if pending_writer is writer:
+                    queue.put_nowait(None)
+
+    async def _send(self, message: Dict[str, any]) -> Tuple[int, asyncio.Queue]:
+        """
+        リクエストのメッセージを送信する
+
+        Args:
+            message: idを除くメッセージ
+
+        Returns:
+            リクエストのidと、応答を受け取るキュー
+
+        Raises:
+            VLMConnectionError: モデルホストに接続できない場合
+        """
+        await self.open()
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            raise VLMConnectionError(self.model_id, "connection to model host was lost")
+        request_id = next(self._ids)
+        queue = asyncio.Queue()
+        self._pending[request_id] = (writer, queue)
+        try:
+            async with self._write_lock:
+                writer.write(encode_message({**message, "id": request_id}))
+                await writer.drain()
+        except (ConnectionError, OSError) as e:
+            del self._pending[request_id]
+            raise VLMConnectionError(self.model_id, f"failed to send request to model host: {e!r}")
+        return request_id, queue
+
+    async def _receive(self, queue: asyncio.Queue) -> Dict[str, any]:
+        """
+        リクエストへの応答を1つ受け取る
+
+        Args:
+            queue: 応答を受け取るキュー
+
+        Returns:
+            応答のメッセージ
+
+        Raises:
+            VLMConnectionError: 応答の前に接続が切れた場合
+            DomainException: モデルホストでの処理中にエラーが発生した場合
+        """
+        message = await queue.get()
+        if message is None:
+            raise VLMConnectionError(self.model_id, "connection to model host was lost")
+        if "error" in message:
+            raise error_from_dict(message["error"], self.model_id)
+        return message
+
+    def _finish(self, request_id: int, completed: bool):
+        """
+        リクエストの後処理を行う（完了していない場合はモデルホストに中断を伝える）
+
+        Args:
+            request_id: リクエストのid
+            completed: 応答をすべて受け取ったかどうか
+        """
+        pending = self._pending.pop(request_id, None)
+        if not completed and pending is not None and not pending[0].is_closing():
+            # キャンセル中でも送れるよう、完了を待たずにリクエストを送った接続に書き込む
+            pending[0].write(encode_message({"id": request_id, "op": "cancel"}))
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        モデルホストでレスポンスを生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+
+        Raises:
+            VLMConnectionError: モデルホストに接続できない場合
+        """
+        request_id, queue = await self._send({"op": "generate", "request": request_to_dict(request)})
+        completed = False
+        try:
+            message = await self._receive(queue)
+            completed = True
+        except Exception:
+            # エラーの応答や切断の後はモデルホストに中断を伝える必要がない
+            completed = True
+            raise
+        finally:
+            self._finish(request_id, completed)
+        return response_from_dict(message["response"])
+
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        モデルホストでレスポンスを生成し、断片を順に返す
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            レスポンスの断片
+
+        Raises:
+            VLMConnectionError: モデルホストに接続できない場合
+        """
+        request_id, queue = await self._send({"op": "stream", "request": request_to_dict(request)})
+        completed = False
+        try:
+            while True:
+                try:
+                    message = await self._receive(queue)
+                except Exception:
+                    completed = True
+                    raise
+                if message.get("end"):
+                    completed = True
+                    return
+                yield chunk_from_dict(message["chunk"])
+        finally:
+            self._finish(request_id, completed)
+
+    async def fetch_host_stats(self) -> Dict[str, any]:
+        """
+        モデルホストのクライアントの統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        request_id, queue = await self._send({"op": "stats"})
+        try:
+            return (await self._receive(queue))["stats"]
+        finally:
+            self._finish(request_id, True)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        クライアントの統計情報を取得する
+
+        Returns:
+            接続状態と応答待ちのリクエスト数を含む辞書
+        """
+        return {
+            "remote": {
+                "socket_path": self.socket_path,
+                "connected": self.connected,
+                "connects": self.connects,
+                "pending": len(self._pending),
+            }
+        }
@@ -0,0 +1,445 @@
+"""一時的な障害に対する再試行とサーキットブレーカーを行うVLMクライアントラッパーの定義モジュール"""
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse, VLMResponseChunk
+from ...domain.exceptions import (
+    DeadlineExceededError,
+    VLMConnectionError,
+    VLMOverloadedError,
+)
+from ...domain.value_objects import VLMRequest
+from ..metrics import CIRCUIT_BREAKER_REJECTIONS_TOTAL, CIRCUIT_BREAKER_STATE, RETRIES_TOTAL
+from .base import DelegatingVLMClient
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    バックエンドの接続エラーが続いた場合にリクエストを遮断するサーキットブレーカー
+
+    閉（closed）状態で接続エラーがfailure_threshold回連続すると開（open）状態になり、
+    reset_timeout秒の間はすべてのリクエストを遮断する。その後は半開（half_open）状態となり、
+    最大half_open_max_calls件の試行リクエストだけを通す。試行が成功すれば閉状態に戻り、
+    接続エラーになれば再び開状態になる。
+
+    イベントループ上で同期的に更新するため、ロックは不要。
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    # メトリクスに記録する状態の値
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        model_id: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        初期化
+
+        Args:
+            model_id: VLMモデルのID（ログとメトリクスに使用する）
+            failure_threshold: 開状態にするまでの連続した接続エラーの回数
+            reset_timeout: 開状態を続ける時間（秒）
+            half_open_max_calls: 半開状態で同時に通す試行リクエストの数
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if half_open_max_calls < 1:
+            raise ValueError("half_open_max_calls must be at least 1")
+        self.model_id = model_id
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self._state_metric = CIRCUIT_BREAKER_STATE.labels(model_id)
+        self._state_metric.set(0)
+
+    def _transition(self, state: str):
+        """状態を変更してメトリクスに記録する"""
+        if state == self._state:
+            return
+        logger.info(f"Circuit breaker for {self.model_id} changed from {self._state} to {state}")
+        self._state = state
+        self._state_metric.set(self._STATE_VALUES[state])
+
+    @property
+    def state(self) -> str:
+        """現在の状態（開状態でreset_timeoutが経過していれば半開状態とみなす）"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """
+        開状態が終わるまでの時間を取得する
+
+        Returns:
+            半開状態になるまでの時間（秒、最小1秒）
+        """
+        remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        return max(1.0, remaining)
+
+    def allow(self) -> bool:
+        """
+        リクエストを通してよいかどうかを判定する
+
+        Trueを返した場合、呼び出し元はrecord_success・record_failure・record_ignoredの
+        いずれかで結果を必ず記録する。
+
+        Returns:
+            リクエストを通す場合はTrue
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        return False
+
+    def _finish_probe(self):
+        """半開状態の試行リクエストが終了したことを記録する"""
+        if self._state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self):
+        """バックエンドが応答したことを記録する"""
+        self._finish_probe()
+        self._consecutive_failures = 0
+        if self._state == self.HALF_OPEN:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        """接続エラーを記録し、必要であれば開状態にする"""
+        self._finish_probe()
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened += 1
+                logger.warning(
+                    f"Opening circuit breaker for {self.model_id} for {self.reset_timeout}s "
+                    f"after {self._consecutive_failures} consecutive connection errors"
+                )
+            self._opened_at = time.monotonic()
+            self._consecutive_failures = 0
+            self._transition(self.OPEN)
+
+    def record_ignored(self):
+        """バックエンドの状態を判断できない結果（キャンセルや待機中の拒否など）を記録する"""
+        self._finish_probe()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        サーキットブレーカーの統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            "state": self.state,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "consecutive_failures": self._consecutive_failures,
+            "opened": self.opened,
+        }
+
+
+class ResilientVLMClient(DelegatingVLMClient):
+    """
+    一時的な障害を再試行し、バックエンドの停止中はリクエストを早期に失敗させるVLMクライアント
+
+    VLMConnectionErrorになったリクエストは最大max_attempts回まで、
+    指数的に増える上限（base_delay * 2^(試行回数-1)、最大max_delay）の範囲で
+    ランダムに選んだ時間（full jitter）だけ待ってから再試行する。
+    リクエストの期限までに再試行できない場合は再試行しない。
+    VLMOverloadedErrorは待機キューでの拒否であり、呼び出し元がRetry-Afterに従って
+    再試行できるため、ここでは再試行しない。
+
+    サーキットブレーカーが開いている間は委譲先を呼び出さずに
+    VLMOverloadedErrorを送出する（APIでは503とRetry-Afterになる）。
+    待機キューに入る前に遮断できるよう、同時実行数制限より外側に置く。
+    ストリーミングでは最初の断片を返す前のエラーに限り再試行する。
+    """
+
+    def __init__(
+        self,
+        client: VLMClientInterface,
+        max_attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        failure_threshold: Optional[int] = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        初期化
+
+        Args:
+            client: 委譲先のVLMクライアント
+            max_attempts: 1リクエストあたりの最大試行回数（1の場合は再試行しない）
+            base_delay: 最初の再試行までの待ち時間の上限（秒）
+            max_delay: 再試行までの待ち時間の上限（秒）
+            failure_threshold: サーキットブレーカーを開くまでの連続した接続エラーの回数
+                （Noneの場合はサーキットブレーカーを使用しない）
+            reset_timeout: サーキットブレーカーを開いておく時間（秒）
+            half_open_max_calls: 半開状態で同時に通す試行リクエストの数
+        """
+        super().__init__(client)
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        model_id = self.model_id or ""
+        self.breaker = (
+            CircuitBreaker(model_id, failure_threshold, reset_timeout, half_open_max_calls)
+            if failure_threshold is not None else None
+        )
+        self.retries = 0
+        self.rejected = 0
+        self._retries_metric = RETRIES_TOTAL.labels(model_id)
+        self._rejections_metric = CIRCUIT_BREAKER_REJECTIONS_TOTAL.labels(model_id)
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        再試行までの待ち時間を計算する（full jitter）
+
+        Args:
+            attempt: これまでの試行回数
+
+        Returns:
+            待ち時間（秒）
+        """
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _check_circuit(self):
+        """
+        サーキットブレーカーが開いている場合にリクエストを遮断する
+
+        Raises:
+            VLMOverloadedError: サーキットブレーカーが開いている場合
+        """
+        if self.breaker is None or self.breaker.allow():
+            return
+        self.rejected += 1
+        self._rejections_metric.inc()
+        raise VLMOverloadedError(self.model_id, self.breaker.retry_after(), "circuit breaker is open")
+
+    def _record(self, error: Optional[BaseException]):
+        """
+        リクエストの結果をサーキットブレーカーに記録する
+
+        バックエンドが応答した場合（VLMProcessingErrorを含む）は成功とみなす。
+        キャンセルや待機中の拒否、期限切れは成功にも失敗にも数えない。
+
+        Args:
+            error: 発生した例外（成功した場合はNone）
+        """
+        if self.breaker is None:
+            return
+        if isinstance(error, VLMConnectionError):
+            self.breaker.record_failure()
+        elif error is None or (
+            isinstance(error, Exception)
+            and not isinstance(error, (VLMOverloadedError, DeadlineExceededError))
+        ):
+            self.breaker.record_success()
+        else:
+            # キャンセルや待機中の拒否からはバックエンドの状態を判断できない
+            self.breaker.record_ignored()
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """
+        再試行するかどうかを判定し、再試行までの待ち時間を計算する
+
+        Args:
+            error: 発生した例外
+            attempt: これまでの試行回数
+            deadline: リクエストの期限（UNIX時間）
+
+        Returns:
+            再試行する場合は待ち時間（秒）、再試行しない場合はNone
+        """
+        if not isinstance(error, VLMConnectionError) or attempt >= self.max_attempts:
+            return None
+        if self.breaker is not None and self.breaker.state == CircuitBreaker.OPEN:
+            return None
+        delay = self._backoff(attempt)
+        if deadline is not None and time.time() + delay >= deadline:
+            return None
+        self.retries += 1
+        self._retries_metric.inc()
+        return delay
+
+    async def _call(self, deadline: Optional[float], operation: Callable[[], Awaitable[T]]) -> T:
+        """
+        サーキットブレーカーを確認しながら処理を再試行する
+
+        Args:
+            deadline: リクエストの期限（UNIX時間）
+            operation: 委譲先を呼び出すコルーチン関数
+
+        Returns:
+            処理の結果
+        """
+        attempt = 0
+        while True:
+            self._check_circuit()
+            attempt += 1
+            try:
+                result = await operation()
+            except BaseException as e:
+                self._record(e)
+                delay = self._retry_delay(e, attempt, deadline) if isinstance(e, Exception) else None
+                if delay is None:
+                    raise
+                logger.info(f"Retrying request to {self.model_id} in {delay:.3f}s after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self._record(None)
+            return result
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        一時的な障害を再試行しながらレスポンスを生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+
+        Raises:
+            VLMOverloadedError: サーキットブレーカーが開いている場合
+            VLMConnectionError: 再試行してもバックエンドに接続できなかった場合
+        """
+        return await self._call(request.deadline, lambda: self._client.generate_response(request))
+
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        最初の断片を返す前の一時的な障害を再試行しながらレスポンスをストリーミング生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            VLMレスポンスの断片
+
+        Raises:
+            VLMOverloadedError: サーキットブレーカーが開いている場合
+            VLMConnectionError: 再試行してもバックエンドに接続できなかった場合
+        """
+        attempt = 0
+        while True:
+            self._check_circuit()
+            attempt += 1
+            started = False
+            try:
+                async for chunk in self._client.generate_stream(request):
+                    started = True
+                    yield chunk
+            except BaseException as e:
+                self._record(e)
+                # 断片を返し始めた後は再試行すると出力が重複するため再試行しない
+                if started or not isinstance(e, Exception):
+                    raise
+                delay = self._retry_delay(e, attempt, request.deadline)
+                if delay is None:
+                    raise
+                logger.info(f"Retrying stream to {self.model_id} in {delay:.3f}s after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self._record(None)
+            return
+
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        接続エラーになったリクエストだけを再試行しながら複数のリクエストを処理する
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            リクエストと同じ順序のVLMレスポンスまたは例外のリスト
+
+        Raises:
+            VLMOverloadedError: サーキットブレーカーが開いている場合
+        """
+        results: List[Union[VLMResponse, Exception]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        deadlines = [request.deadline for request in requests]
+        deadline = None if None in deadlines else max(deadlines, default=None)
+        attempt = 0
+        while pending:
+            if attempt == 0:
+                self._check_circuit()
+            elif self.breaker is not None and not self.breaker.allow():
+                # 再試行の前に遮断された場合は、それまでの結果をそのまま返す
+                break
+            attempt += 1
+            try:
+                batch_results = await self._client.generate_batch([requests[i] for i in pending])
+            except BaseException as e:
+                self._record(e)
+                if not isinstance(e, VLMConnectionError):
+                    raise
+                batch_results = [e] * len(pending)
+            else:
+                # 一部でも応答があればバックエンドは稼働しているとみなす
+                if all(isinstance(result, VLMConnectionError) for result in batch_results):
+                    self._record(batch_results[0] if batch_results else None)
+                else:
+                    self._record(None)
+
+            retry = []
+            for index, result in zip(pending, batch_results):
+                results[index] = result
+                if isinstance(result, VLMConnectionError):
+                    retry.append(index)
+            if not retry:
+                break
+            delay = self._retry_delay(results[retry[0]], attempt, deadline)
+            if delay is None:
+                break
+            logger.info(f"Retrying {len(retry)} batched requests to {self.model_id} in {delay:.3f}s")
+            await asyncio.sleep(delay)
+            pending = retry
+        return results
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        再試行とサーキットブレーカーの統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        stats = super().get_stats()
+        stats["resilience"] = {
+            "max_attempts": self.max_attempts,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "circuit_breaker": self.breaker.get_stats() if self.breaker is not None else None,
+        }
+        return stats
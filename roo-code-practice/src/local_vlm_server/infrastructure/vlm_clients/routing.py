@@ -0,0 +1,459 @@
+"""複数のレプリカにリクエストを振り分けるVLMクライアントの定義モジュール"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Union
+
+from ...application.interfaces import VLMClientInterface
+from ...domain.entities import VLMResponse, VLMResponseChunk
+from ...domain.exceptions import VLMConnectionError, VLMOverloadedError
+from ...domain.value_objects import VLMRequest
+from ..metrics import HEDGED_REQUESTS_TOTAL
+
+
+logger = logging.getLogger(__name__)
+
+
+# 別のレプリカで再試行できる例外（レプリカ側の障害や混雑であり、リクエスト自体の問題ではない）
+RETRYABLE_ERRORS = (VLMConnectionError, VLMOverloadedError)
+
+
+def _consume_result(task: "asyncio.Future"):
+    """使用しなかった試行の例外を取得済みにする（未取得の例外の警告を出さないため）"""
+    if not task.cancelled():
+        task.exception()
+
+
+class Replica:
+    """ルーティング対象の1つのレプリカとその状態"""
+
+    def __init__(self, name: str, client: VLMClientInterface):
+        """
+        初期化
+
+        Args:
+            name: レプリカ名（ログと統計情報に使用する）
+            client: レプリカのVLMクライアント
+        """
+        self.name = name
+        self.client = client
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def is_available(self, now: float) -> bool:
+        """
+        リクエストを振り分けられる状態かどうかを判定する
+
+        Args:
+            now: 現在時刻（time.monotonic()）
+
+        Returns:
+            除外されていない場合はTrue
+        """
+        return now >= self.ejected_until
+
+
+class ReplicaRouterVLMClient(VLMClientInterface):
+    """
+    1つの論理モデルに対する複数のレプリカにリクエストを振り分けるVLMクライアント
+
+    レプリカは処理中のリクエスト数が最も少ないもの（least_outstanding）、
+    またはレイテンシの指数移動平均に処理中のリクエスト数を加味した値が最も小さいもの（ewma）を選ぶ。
+    接続エラーが連続したレプリカは一定時間振り分け対象から除外し、
+    再試行できるエラーの場合は別のレプリカで再試行する。
+    ストリーミングでは最初の断片を返す前のエラーに限り再試行する。
+
+    hedge_percentileを指定すると、レスポンスの生成（generate_response）が
+    最近のレイテンシのその百分位数（例えば95）を超えても終わらない場合に、
+    別のレプリカにも同じリクエストを送り（ヘッジ）、先に成功した方を返して他方をキャンセルする。
+    遅いレプリカに当たったリクエストのテールレイテンシを抑える代わりに、
+    最大で(100 - hedge_percentile)%のリクエストが重複して処理される。
+    ストリーミングと一括処理はヘッジしない。
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        strategy: str = "least_outstanding",
+        max_attempts: Optional[int] = None,
+        failure_threshold: int = 3,
+        ejection_seconds: float = 30.0,
+        ewma_alpha: float = 0.3,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        hedge_window: int = 200
+    ):
+        """
+        初期化
+
+        Args:
+            replicas: レプリカのリスト
+            strategy: "least_outstanding"または"ewma"
+            max_attempts: 1リクエストあたりの最大試行回数（Noneの場合はレプリカ数）
+            failure_threshold: 除外するまでの連続失敗回数
+            ejection_seconds: 除外する時間（秒）
+            ewma_alpha: レイテンシの指数移動平均の平滑化係数
+            hedge_percentile: ヘッジするまでの待ち時間とするレイテンシの百分位数
+                （Noneの場合はヘッジしない）
+            hedge_min_samples: ヘッジを始めるまでに必要なレイテンシの標本数
+            hedge_window: 百分位数の計算に使用する直近のレイテンシの標本数
+        """
+        if not replicas:
+            raise ValueError("At least one replica is required")
+        if strategy not in ("least_outstanding", "ewma"):
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be between 0 and 100")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_attempts = max_attempts or len(replicas)
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        self.ewma_alpha = ewma_alpha
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Deque[float] = deque(maxlen=hedge_window)
+        self._next = 0
+        self.retries = 0
+        self.ejections = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        model_id = self.model_id or ""
+        self._hedge_metrics = {
+            winner: HEDGED_REQUESTS_TOTAL.labels(model_id, winner)
+            for winner in ("primary", "hedge", "none")
+        }
+
+    @property
+    def model_id(self) -> Optional[str]:
+        """レプリカのモデルID"""
+        return getattr(self.replicas[0].client, "model_id", None)
+
+    def _score(self, replica: Replica) -> float:
+        """
+        レプリカの負荷の指標を計算する（小さいほど優先される）
+
+        Args:
+            replica: レプリカ
+
+        Returns:
+            負荷の指標
+        """
+        if self.strategy == "least_outstanding" or replica.ewma_latency is None:
+            return replica.outstanding
+        return replica.ewma_latency * (replica.outstanding + 1)
+
+    def _select(self, exclude: List[Replica]) -> Replica:
+        """
+        リクエストを振り分けるレプリカを選ぶ
+
+        すべてのレプリカが除外されている場合は、除外期間が最も早く終わるものを選ぶ。
+
+        Args:
+            exclude: このリクエストで既に試行したレプリカのリスト
+
+        Returns:
+            レプリカ
+        """
+        now = time.monotonic()
+        candidates = [replica for replica in self.replicas if replica not in exclude]
+        if not candidates:
+            candidates = list(self.replicas)
+        available = [replica for replica in candidates if replica.is_available(now)]
+        if not available:
+            return min(candidates, key=lambda replica: replica.ejected_until)
+
+        # 同じ指標のレプリカが複数ある場合は順番に選ぶ
+        start = self._next
+        self._next = (self._next + 1) % len(self.replicas)
+        ordered = available[start % len(available):] + available[:start % len(available)]
+        return min(ordered, key=self._score)
+
+    def _on_success(self, replica: Replica, elapsed: float):
+        """
+        成功したリクエストの結果を記録する
+
+        Args:
+            replica: レプリカ
+            elapsed: 処理時間（秒）
+        """
+        replica.consecutive_failures = 0
+        if replica.ewma_latency is None:
+            replica.ewma_latency = elapsed
+        else:
+            replica.ewma_latency += self.ewma_alpha * (elapsed - replica.ewma_latency)
+
+    def _on_failure(self, replica: Replica, error: Exception):
+        """
+        失敗したリクエストの結果を記録し、必要であればレプリカを除外する
+
+        Args:
+            replica: レプリカ
+            error: 発生した例外
+        """
+        replica.failures += 1
+        if not isinstance(error, VLMConnectionError):
+            return
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.failure_threshold:
+            replica.ejected_until = time.monotonic() + self.ejection_seconds
+            replica.consecutive_failures = 0
+            self.ejections += 1
+            logger.warning(
+                f"Ejecting replica {replica.name} of {self.model_id} for {self.ejection_seconds}s "
+                f"after {self.failure_threshold} consecutive connection errors"
+            )
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        別のレプリカで再試行するかどうかを判定する
+
+        Args:
+            error: 発生した例外
+            attempt: これまでの試行回数
+
+        Returns:
+            再試行する場合はTrue
+        """
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_attempts:
+            return False
+        self.retries += 1
+        return True
+
+    def _hedge_delay(self) -> Optional[float]:
+        """
+        ヘッジするまでの待ち時間を計算する
+
+        Returns:
+            直近のレイテンシのhedge_percentile百分位数（秒）。
+            ヘッジしない設定の場合や標本が不足している場合はNone
+        """
+        if self.hedge_percentile is None or len(self.replicas) < 2:
+            return None
+        if len(self._latencies) < self.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, math.ceil(len(latencies) * self.hedge_percentile / 100) - 1)
+        return latencies[max(0, index)]
+
+    async def _generate_with_retries(self, request: VLMRequest, tried: List[Replica]) -> VLMResponse:
+        """
+        レプリカを選んでレスポンスを生成し、再試行できるエラーの場合は別のレプリカで再試行する
+
+        Args:
+            request: VLMリクエスト
+            tried: このリクエストで既に試行したレプリカのリスト（ヘッジと共有する）
+
+        Returns:
+            VLMレスポンス
+        """
+        attempts = 0
+        while True:
+            replica = self._select(tried)
+            tried.append(replica)
+            attempts += 1
+            replica.outstanding += 1
+            replica.requests += 1
+            started_at = time.perf_counter()
+            try:
+                response = await replica.client.generate_response(request)
+            except Exception as e:
+                self._on_failure(replica, e)
+                if not self._should_retry(e, attempts):
+                    raise
+                logger.info(f"Retrying request to {self.model_id} after {replica.name} failed: {e}")
+                continue
+            finally:
+                replica.outstanding -= 1
+            elapsed = time.perf_counter() - started_at
+            self._on_success(replica, elapsed)
+            self._latencies.append(elapsed)
+            return response
+
+    async def generate_response(self, request: VLMRequest) -> VLMResponse:
+        """
+        レプリカを選んでレスポンスを生成する
+
+        ヘッジが有効な場合、待ち時間を過ぎても終わらなければ別のレプリカにも同じリクエストを送る。
+
+        Args:
+            request: VLMリクエスト
+
+        Returns:
+            VLMレスポンス
+        """
+        tried: List[Replica] = []
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._generate_with_retries(request, tried)
+
+        primary = asyncio.ensure_future(self._generate_with_retries(request, tried))
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            logger.debug(f"Hedging request to {self.model_id} after {delay:.3f}s")
+            hedge = asyncio.ensure_future(self._generate_with_retries(request, tried))
+            attempts.append(hedge)
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        winner = "hedge" if attempt is hedge else "primary"
+                        if attempt is hedge:
+                            self.hedge_wins += 1
+                        self._hedge_metrics[winner].inc()
+                        return attempt.result()
+                    error = attempt.exception()
+            self._hedge_metrics["none"].inc()
+            # ループを抜けるのはすべての試行が例外で終わった場合だけ
+            assert error is not None
+            raise error
+        finally:
+            # 先に終わらなかった方はキャンセルし、レプリカでの処理を中断させる
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+                attempt.add_done_callback(_consume_result)
+
+    async def generate_stream(self, request: VLMRequest) -> AsyncIterator[VLMResponseChunk]:
+        """
+        レプリカを選んでレスポンスをストリーミング生成する
+
+        Args:
+            request: VLMリクエスト
+
+        Yields:
+            VLMレスポンスの断片
+        """
+        tried: List[Replica] = []
+        while True:
+            replica = self._select(tried)
+            tried.append(replica)
+            replica.outstanding += 1
+            replica.requests += 1
+            started_at = time.perf_counter()
+            started = False
+            try:
+                async for chunk in replica.client.generate_stream(request):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                self._on_failure(replica, e)
+                # 断片を返し始めた後は再試行すると出力が重複するため再試行しない
+                if started or not self._should_retry(e, len(tried)):
+                    raise
+                logger.info(f"Retrying stream to {self.model_id} after {replica.name} failed: {e}")
+                continue
+            finally:
+                replica.outstanding -= 1
+            self._on_success(replica, time.perf_counter() - started_at)
+            return
+
+    async def generate_batch(
+        self, requests: List[VLMRequest]
+    ) -> List[Union[VLMResponse, Exception]]:
+        """
+        レプリカを選んで複数のリクエストをまとめて処理する
+
+        再試行できるエラーで失敗したリクエストは、まとめて別のレプリカで再試行する。
+
+        Args:
+            requests: VLMリクエストのリスト
+
+        Returns:
+            リクエストと同じ順序のVLMレスポンスまたは例外のリスト
+        """
+        results: Dict[int, Union[VLMResponse, Exception]] = {}
+        pending = list(range(len(requests)))
+        tried: List[Replica] = []
+        while pending:
+            replica = self._select(tried)
+            tried.append(replica)
+            replica.outstanding += len(pending)
+            replica.requests += len(pending)
+            started_at = time.perf_counter()
+            try:
+                batch_results = await replica.client.generate_batch([requests[i] for i in pending])
+            except Exception as e:
+                batch_results = [e] * len(pending)
+            finally:
+                replica.outstanding -= len(pending)
+
+            retry = []
+            retry_error: Optional[Exception] = None
+            for index, result in zip(pending, batch_results):
+                results[index] = result
+                if isinstance(result, RETRYABLE_ERRORS):
+                    retry.append(index)
+                    retry_error = retry_error or result
+
+            if len(retry) < len(pending):
+                self._on_success(replica, time.perf_counter() - started_at)
+            if retry_error is not None:
+                self._on_failure(replica, retry_error)
+                if not self._should_retry(retry_error, len(tried)):
+                    break
+            pending = retry
+        return [results[index] for index in range(len(requests))]
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        レプリカごとの状態を含む統計情報を取得する
+
+        Returns:
+            統計情報の辞書
+        """
+        now = time.monotonic()
+        stats = dict(self.replicas[0].client.get_stats())
+        stats["routing"] = {
+            "strategy": self.strategy,
+            "retries": self.retries,
+            "ejections": self.ejections,
+            "hedging": {
+                "percentile": self.hedge_percentile,
+                "delay": self._hedge_delay(),
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+            },
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "available": replica.is_available(now),
+                    "outstanding": replica.outstanding,
+                    "ewma_latency": replica.ewma_latency,
+                    "requests": replica.requests,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            ],
+        }
+        return stats
+
+    def memory_footprint(self) -> int:
+        """すべてのレプリカのメモリ使用量の見積もりの合計を取得する"""
+        return sum(replica.client.memory_footprint() for replica in self.replicas)
+
+    async def open(self):
+        """すべてのレプリカのリソースを確保する"""
+        for replica in self.replicas:
+            await replica.client.open()
+
+    async def close(self):
+        """すべてのレプリカのリソースを解放する"""
+        for replica in self.replicas:
+            try:
+                await replica.client.close()
+            except Exception:
+                logger.exception(f"Error closing replica {replica.name} of {self.model_id}")
@@ -1,69 +1,75 @@
 """VLMリポジトリの実装モジュール"""
+import asyncio
+import dataclasses
+import itertools
 import logging
-from typing import Dict, List, Optional, Type
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
 
 from ..application.interfaces import VLMClientInterface, VLMRepositoryInterface
 from ..domain.entities import VLMModel
 from ..domain.exceptions import VLMModelNotFoundError
+from ..infrastructure.model_host import socket_path_for
+from ..infrastructure.model_registry import ModelSpec
+from ..infrastructure.model_residency import ModelResidencyManager
+from ..infrastructure.response_cache import create_response_cache
+from ..infrastructure.vlm_clients.admission import AdmissionControlledVLMClient
 from ..infrastructure.vlm_clients.base import BaseVLMClient
+from ..infrastructure.vlm_clients.batching import BatchingVLMClient
+from ..infrastructure.vlm_clients.caching import CachingVLMClient
 from ..infrastructure.vlm_clients.implementations.gpt import GPTVLMClient
 from ..infrastructure.vlm_clients.implementations.llama import LlamaVLMClient
+from ..infrastructure.vlm_clients.implementations.ollama import OllamaVLMClient
+from ..infrastructure.vlm_clients.instrumented import InstrumentedVLMClient
+from ..infrastructure.vlm_clients.remote import RemoteVLMClient
+from ..infrastructure.vlm_clients.resilience import ResilientVLMClient
+from ..infrastructure.vlm_clients.routing import Replica, ReplicaRouterVLMClient
 
 
 logger = logging.getLogger(__name__)
 
 
+# モデルの登録のバージョン（別のリポジトリのバージョンと重複しないようモジュールで共有する）
+_models_versions = itertools.count(1)
+
+
 class VLMRepository(VLMRepositoryInterface):
     """VLMリポジトリの実装"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(self, memory_budget_mb: Optional[float] = None, model_host_dir: Optional[str] = None):
+        """
+        初期化
+        
+        モデルはregister_model()またはapply_registry()で登録する。
+        
+        Args:
+            memory_budget_mb: ロード済みモデル全体のメモリ予算（MB、Noneの場合は無制限）
+            model_host_dir: モデルホストのソケットを置くディレクトリ（指定した場合はモデルを
+                このプロセスにロードせず、モデルごとのモデルホストにリクエストを転送する）
+        """
+        self.model_host_dir = model_host_dir
         self._models: Dict[str, VLMModel] = {}
+        self._models_version = next(_models_versions)
         self._client_factories: Dict[str, Type[BaseVLMClient]] = {
             "llama": LlamaVLMClient,
             "gpt": GPTVLMClient,
+            "ollama": OllamaVLMClient,
         }
         self._client_configs: Dict[str, Dict[str, any]] = {}
-        self._clients: Dict[str, VLMClientInterface] = {}
-        
-        # デフォルトモデルの登録
-        self._register_default_models()
-        
-        logger.info(f"Initialized VLMRepository with {len(self._models)} models")
-    
-    def _register_default_models(self):
-        """デフォルトモデルを登録する"""
-        # LLaMAモデル
-        self._models["llama-7b"] = VLMModel(
-            id="llama-7b",
-            name="LLaMA 7B",
-            description="Meta AI's LLaMA 7B parameter model",
-            parameters={
-                "context_size": 2048,
-                "gpu_layers": 32
-            }
+        self._client_types: Dict[str, str] = {}
+        self._residency = ModelResidencyManager(
+            int(memory_budget_mb * 1024 * 1024) if memory_budget_mb is not None else None
         )
-        self._client_configs["llama-7b"] = {
-            "model_path": "/path/to/llama-7b.bin",
-            "context_size": 2048,
-            "gpu_layers": 32
-        }
+        # 同じモデルのクライアントを並行して作成しないためのモデルごとのロック
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        # クライアント設定が変更・削除されたときに呼び出す関数（トークナイザーの破棄など）
+        self._config_listeners: List[Callable[[str], None]] = []
+        # 処理中のリクエストの完了を待ってクライアントを閉じるタスク（close()で完了を待つ）
+        self._closing: Set[asyncio.Task] = set()
+        # イベントループの外で置き換えられ、close()で閉じるクライアント
+        self._unclosed: List[Tuple[str, VLMClientInterface]] = []
         
-        # GPTモデル
-        self._models["gpt-local"] = VLMModel(
-            id="gpt-local",
-            name="GPT Local",
-            description="Locally hosted GPT compatible model",
-            parameters={
-                "max_tokens": 4096
-            }
-        )
-        self._client_configs["gpt-local"] = {
-            "api_base": "http://localhost:8000",
-            "api_key": "dummy-key"
-        }
-        
-        logger.debug(f"Registered default models: {list(self._models.keys())}")
+        logger.info(f"Initialized VLMRepository with {len(self._models)} models")
     
     def register_model(
         self, 
@@ -76,15 +82,24 @@ class VLMRepository(VLMRepositoryInterface):
         
         Args:
             model: VLMモデル
-            client_type: クライアントタイプ（"llama"や"gpt"など）
+            client_type: クライアントタイプ（"llama"、"gpt"や"ollama"など）
             config: クライアント設定
+            
+        Raises:
+            ValueError: クライアントタイプが登録されていない場合、またはクライアント設定が正しくない場合
         """
+        self._check_client_type(model.id, client_type)
+        self._check_batching(model.id, config)
         self._models[model.id] = model
         self._client_configs[model.id] = config
+        self._client_types[model.id] = client_type
+        self._models_version = next(_models_versions)
+        self._notify_config_changed([model.id])
         
-        # すでにクライアントが作成されている場合は削除
-        if model.id in self._clients:
-            del self._clients[model.id]
+        # すでにクライアントが作成されている場合は削除し、次の利用時に新しい設定で作り直す
+        client = self._residency.discard(model.id)
+        if client is not None:
+            self._close_later(model.id, client)
             
         logger.info(f"Registered model {model.id} with client type {client_type}")
     
@@ -109,6 +124,15 @@ class VLMRepository(VLMRepositoryInterface):
         """
         return self._models.get(model_id)
     
+    def get_models_version(self) -> Optional[int]:
+        """
+        モデルの登録のバージョンを取得する
+        
+        Returns:
+            モデルが登録・削除されるか、名前などの情報が変更されるたびに変わる値
+        """
+        return self._models_version
+    
     async def get_client_for_model(self, model_id: str) -> VLMClientInterface:
         """
         指定されたモデルIDに対応するVLMクライアントを取得する
@@ -126,36 +150,533 @@ class VLMRepository(VLMRepositoryInterface):
         if model_id not in self._models:
             raise VLMModelNotFoundError(model_id)
         
-        # クライアントがキャッシュされていればそれを返す
-        if model_id in self._clients:
-            return self._clients[model_id]
+        # ロード済みのクライアントがあればロックを取らずに返す（ロード中の場合はロックで完了を待つ）
+        client = self._residency.get(model_id)
+        lock = self._load_locks.get(model_id)
+        if client is not None and not (lock and lock.locked()):
+            return client
+        
+        if lock is None:
+            lock = self._load_locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            # ロックを待っている間に他のリクエストがロードを完了している場合はそれを返す
+            client = self._residency.get(model_id)
+            if client is not None:
+                return client
+            return await self._create_client(model_id)
+    
+    async def _create_client(self, model_id: str) -> VLMClientInterface:
+        """
+        クライアントを作成してロードし、常駐モデルとして登録する
+        
+        モデルごとのロックを保持した状態で呼び出す。
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            VLMクライアント
+        """
+        client_type = self._client_types[model_id]
+        config = self._client_configs.get(model_id, {})
+        
+        # クライアントの作成（メモリ予算が足りない場合は他のモデルをアンロードしてからロードする）
+        started_at = time.perf_counter()
+        client = self._build_client(model_id)
+        await self._residency.admit(model_id, client, pinned=config.get("pinned", False))
+        try:
+            await client.open()
+        except Exception:
+            self._residency.discard(model_id)
+            raise
+        
+        logger.info(
+            f"Created {client_type} client for model {model_id} "
+            f"in {time.perf_counter() - started_at:.2f}s"
+        )
+        return client
+    
+    async def apply_registry(self, specs: List[ModelSpec], warm: bool = True) -> Dict[str, List[str]]:
+        """
+        モデルレジストリの内容を登録済みモデルに反映する
+        
+        レジストリにないモデルは登録を解除し、処理中のリクエストの完了後にクライアントを閉じる。
+        クライアントタイプや設定が変わったロード済みのモデルは、新しい設定のクライアントを
+        作成してロードしてから置き換えるため、置き換えまでのリクエストは古いクライアントで処理される。
+        
+        Args:
+            specs: モデルの定義のリスト
+            warm: 追加されたモデルのクライアントを作成しておくかどうか
+            
+        新しい設定のクライアントのロードに失敗したモデルは、古いクライアントと設定を使い続け、
+        次に反映したときに再びロードを試みる。
+        
+        Returns:
+            追加・削除・変更されたモデルIDと、変更の反映に失敗したモデルIDの辞書
+            （added, removed, updated, failed）
+            
+        Raises:
+            ValueError: 登録されていないクライアントタイプや正しくないクライアント設定が含まれる場合
+            （何も反映しない）
+        """
+        for spec in specs:
+            self._check_client_type(spec.model.id, spec.client_type)
+            self._check_batching(spec.model.id, spec.config)
+        
+        registry = {spec.model.id: spec for spec in specs}
+        removed = [model_id for model_id in self._models if model_id not in registry]
+        added = [model_id for model_id in registry if model_id not in self._models]
+        updated = [
+            model_id for model_id, spec in registry.items()
+            if model_id in self._models and (
+                spec.client_type != self._client_types.get(model_id)
+                or spec.config != self._client_configs.get(model_id)
+            )
+        ]
+        
+        models_changed = bool(added or removed) or any(
+            dataclasses.astuple(self._models[model_id]) != dataclasses.astuple(spec.model)
+            for model_id, spec in registry.items() if model_id in self._models
+        )
+        
+        for model_id in removed:
+            del self._models[model_id]
+            self._client_configs.pop(model_id, None)
+            self._client_types.pop(model_id, None)
+            self._load_locks.pop(model_id, None)
+            client = self._residency.discard(model_id)
+            if client is not None:
+                self._close_later(model_id, client)
         
-        # モデルタイプの判定
-        model = self._models[model_id]
-        client_type = None
+        # ロード済みのモデルの設定は新しいクライアントに置き換えたときに反映する
+        reloading = [model_id for model_id in updated if model_id in self._residency]
         
-        # モデルIDからクライアントタイプを推測
-        if "llama" in model_id.lower():
-            client_type = "llama"
-        elif "gpt" in model_id.lower():
-            client_type = "gpt"
-        else:
-            # デフォルトはLLaMA
-            client_type = "llama"
+        # 名前や説明だけの変更はクライアントを作り直さずに反映する
+        for model_id, spec in registry.items():
+            self._models[model_id] = spec.model
+            if model_id not in reloading:
+                self._client_configs[model_id] = spec.config
+                self._client_types[model_id] = spec.client_type
+        if models_changed:
+            self._models_version = next(_models_versions)
         
-        # クライアントファクトリの取得
+        reloaded = await asyncio.gather(
+            *(self._replace_client(model_id, registry[model_id]) for model_id in reloading)
+        )
+        failed = [model_id for model_id, ok in zip(reloading, reloaded) if not ok]
+        updated = [model_id for model_id in updated if model_id not in failed]
+        self._notify_config_changed(removed + updated)
+        if warm:
+            await self._load_all(added)
+        
+        logger.info(
+            f"Applied model registry: {len(added)} added, {len(removed)} removed, "
+            f"{len(updated)} updated ({len(reloading) - len(failed)} reloaded, {len(failed)} failed)"
+        )
+        return {"added": added, "removed": removed, "updated": updated, "failed": failed}
+    
+    async def _replace_client(self, model_id: str, spec: ModelSpec) -> bool:
+        """
+        ロード済みのモデルのクライアントを新しい設定で作り直して置き換える
+        
+        新しいクライアントのロードが完了してから置き換えてクライアント設定を更新し、古いクライアントは
+        処理中のリクエストの完了後に閉じる。ロードに失敗した場合は古いクライアントと設定を使い続ける。
+        
+        Args:
+            model_id: VLMモデルのID
+            spec: 新しいモデルの定義
+            
+        Returns:
+            置き換えた場合はTrue、ロードに失敗した場合はFalse
+        """
+        started_at = time.perf_counter()
+        client = self._build_client(model_id, spec.client_type, spec.config)
+        try:
+            await client.open()
+            lock = self._load_locks.setdefault(model_id, asyncio.Lock())
+            async with lock:
+                previous = await self._residency.replace(
+                    model_id, client, pinned=spec.config.get("pinned", False)
+                )
+                self._client_configs[model_id] = spec.config
+                self._client_types[model_id] = spec.client_type
+        except Exception as e:
+            logger.error(f"Failed to reload model {model_id}; keeping the current client: {e}")
+            await client.close()
+            return False
+        
+        if previous is not None:
+            self._close_later(model_id, previous)
+        logger.info(
+            f"Reloaded {self._client_types.get(model_id)} client for model {model_id} "
+            f"in {time.perf_counter() - started_at:.2f}s"
+        )
+        return True
+    
+    def add_config_listener(self, listener: Callable[[str], None]):
+        """
+        モデルのクライアント設定が変更・削除されたときに呼び出す関数を登録する
+        
+        Args:
+            listener: モデルIDを引数にとる関数
+        """
+        self._config_listeners.append(listener)
+    
+    def _notify_config_changed(self, model_ids: List[str]):
+        """
+        クライアント設定が変更・削除されたことを登録された関数に通知する
+        
+        Args:
+            model_ids: 設定が変更・削除されたモデルIDのリスト
+        """
+        for model_id in model_ids:
+            for listener in self._config_listeners:
+                listener(model_id)
+    
+    def register_client_factory(self, client_type: str, factory: Type[BaseVLMClient]):
+        """
+        クライアントタイプに対応するクライアントのクラスを登録する
+        
+        Args:
+            client_type: クライアントタイプ
+            factory: クライアントのクラス（モデルIDとクライアント設定を引数にとる）
+        """
+        self._client_factories[client_type] = factory
+    
+    def _check_client_type(self, model_id: str, client_type: str):
+        """
+        クライアントタイプが登録されていることを確認する
+        
+        Args:
+            model_id: VLMモデルのID
+            client_type: クライアントタイプ
+            
+        Raises:
+            ValueError: クライアントタイプが登録されていない場合
+        """
         if client_type not in self._client_factories:
-            logger.warning(f"Unknown client type {client_type}, falling back to llama")
-            client_type = "llama"
+            raise ValueError(
+                f"Unknown client type {client_type!r} for model {model_id} "
+                f"(available: {', '.join(sorted(self._client_factories))})"
+            )
+    
+    def _check_batching(self, model_id: str, config: Dict[str, any]):
+        """
+        動的バッチングと同時実行数制限の設定が両立することを確認する
+        
+        同時実行数制限はバッチングより外側でリクエストごとに枠を取るため、
+        バッチの待ち時間の間も枠を占有し、同時実行数を超える大きさのバッチは作られない。
+        
+        Args:
+            model_id: VLMモデルのID
+            config: クライアント設定
             
-        factory = self._client_factories[client_type]
+        Raises:
+            ValueError: max_batch_sizeがmax_concurrencyを超える場合
+        """
+        batching = config.get("batching")
+        concurrency = config.get("concurrency")
+        if not batching or not concurrency:
+            return
+        # 省略時はBatchingVLMClient・AdmissionControlledVLMClientのデフォルト値
+        max_batch_size = batching.get("max_batch_size", 8)
+        max_concurrency = concurrency.get("max_concurrency", 1)
+        if max_batch_size > max_concurrency:
+            raise ValueError(
+                f"batching.max_batch_size ({max_batch_size}) must not exceed "
+                f"concurrency.max_concurrency ({max_concurrency}) for model {model_id}"
+            )
+    
+    def get_tokenizer_config(self, model_id: str) -> Dict[str, any]:
+        """
+        モデルのトークナイザー設定を取得する
+        
+        クライアント設定に"tokenizer"がない場合は、クライアントタイプに応じて
+        LLaMAはモデルファイルの語彙、GPTはtiktoken、Ollamaは推定値を使用する。
         
-        # クライアント設定の取得
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            トークナイザー設定
+        """
         config = self._client_configs.get(model_id, {})
+        if "tokenizer" in config:
+            return config["tokenizer"]
+        client_type = self._client_types.get(model_id)
+        if client_type == "gpt":
+            return {"backend": "tiktoken", "model_name": config.get("model_name", model_id)}
+        if client_type == "ollama":
+            # Ollamaのモデルファイルはサーバー側にあるため、トークン数は推定する
+            return {"backend": "heuristic"}
+        return {"backend": "llama", "model_path": config.get("model_path")}
+        
+    def get_image_config(self, model_id: str) -> Dict[str, any]:
+        """
+        モデルに渡す画像の前処理設定を取得する
+        
+        クライアント設定の"images"（max_size, format, max_pixels）を返す。
+        指定されていない項目は画像プロセッサーのデフォルト設定が使われる。
+        
+        Args:
+            model_id: VLMモデルのID
+        
+        Returns:
+            画像の前処理設定
+        """
+        return self._client_configs.get(model_id, {}).get("images", {})
+    
+    def _build_client(
+        self,
+        model_id: str,
+        client_type: Optional[str] = None,
+        config: Optional[Dict[str, any]] = None
+    ) -> VLMClientInterface:
+        """
+        ラッパーを含むクライアントを作成する（ロードはしない）
+        
+        model_host_dirが指定されている場合は、モデルホストに転送するクライアントを作成する
+        （クライアント設定の"remote"で接続のタイムアウトなどを指定できる）。
+        
+        Args:
+            model_id: VLMモデルのID
+            client_type: クライアントタイプ（Noneの場合は登録済みのクライアントタイプ）
+            config: クライアント設定（Noneの場合は登録済みのクライアント設定）
+            
+        Returns:
+            VLMクライアント
+        """
+        if config is None:
+            config = self._client_configs.get(model_id, {})
+        if client_type is None:
+            client_type = self._client_types[model_id]
+        if self.model_host_dir is not None:
+            # バッチングやキャッシュはモデルホスト側で全ワーカーのリクエストをまとめて行う
+            return InstrumentedVLMClient(RemoteVLMClient(
+                model_id,
+                {
+                    **config.get("remote", {}),
+                    "socket_path": socket_path_for(self.model_host_dir, model_id)
+                }
+            ))
+        
+        factory = self._client_factories[client_type]
+        return self._wrap_client(self._build_base_client(factory, model_id, config), config)
+    
+    def _build_base_client(
+        self,
+        factory: Type[BaseVLMClient],
+        model_id: str,
+        config: Dict[str, any]
+    ) -> VLMClientInterface:
+        """
+        モデルのクライアントを作成する
+        
+        設定に"endpoints"がある場合は、エンドポイントごとの設定で上書きした
+        レプリカを作成し、それらに振り分けるルーターを返す。
         
-        # クライアントの作成
-        client = factory(model_id, config)
-        self._clients[model_id] = client
+        Args:
+            factory: クライアントのクラス
+            model_id: VLMモデルのID
+            config: クライアント設定
+                - endpoints: レプリカごとの設定の上書き（api_baseやmodel_pathなど）のリスト
+                - routing: ルーティングとヘッジの設定（ReplicaRouterVLMClientの引数）
+            
+        Returns:
+            VLMクライアント
+        """
+        endpoints = config.get("endpoints")
+        if not endpoints:
+            return factory(model_id, config)
+        
+        replicas = []
+        for i, endpoint in enumerate(endpoints):
+            replica_config = {**config, **endpoint}
+            name = endpoint.get("name") or endpoint.get("api_base") or f"{model_id}-{i}"
+            replicas.append(Replica(name, factory(model_id, replica_config)))
+        return ReplicaRouterVLMClient(replicas, **config.get("routing", {}))
+    
+    def _wrap_client(
+        self, 
+        client: VLMClientInterface, 
+        config: Dict[str, any]
+    ) -> VLMClientInterface:
+        """
+        クライアント設定に応じてクライアントをラッパーで包む
+        
+        Args:
+            client: VLMクライアント
+            config: クライアント設定
+                - batching: 動的バッチングの設定（max_batch_size, max_wait_ms）
+                  （同時実行数制限の内側に置くため、max_batch_sizeはmax_concurrency以下にする）
+                - concurrency: 同時実行数制限と優先度スケジューリングの設定
+                  （max_concurrency, max_queue, queue_timeout, aging_seconds）
+                - resilience: 再試行とサーキットブレーカーの設定（max_attempts, base_delay,
+                  max_delay, failure_threshold, reset_timeout, half_open_max_calls）
+                - cache: レスポンスキャッシュの設定（backend, max_entries, ttl_seconds,
+                  path, max_temperature）
+            
+        Returns:
+            ラップされたVLMクライアント
+        """
+        batching = config.get("batching")
+        if batching:
+            client = BatchingVLMClient(client, **batching)
+        
+        concurrency = config.get("concurrency")
+        if concurrency:
+            client = AdmissionControlledVLMClient(client, **concurrency)
+        
+        # バックエンドの停止中は待機キューに入る前に遮断する
+        resilience = config.get("resilience")
+        if resilience:
+            client = ResilientVLMClient(client, **resilience)
+        
+        # キャッシュヒット時に後段の処理を一切行わないよう最も外側に置く
+        cache = config.get("cache")
+        if cache:
+            client = CachingVLMClient(
+                client,
+                create_response_cache(cache),
+                max_temperature=cache.get("max_temperature", 0.0)
+            )
+        
+        # キャッシュヒットや過負荷による拒否も含めて計測する
+        return InstrumentedVLMClient(client)
+    
+    async def warm_up(self):
+        """
+        登録済みモデルのクライアントを作成し、モデルのロードや接続プールの確保を行う
+        
+        アプリケーションの起動時に呼び出し、最初のリクエストがロード時間を負担しないようにする。
+        固定（pinned）されたモデルを先にロードし、残りのモデルは他のモデルを
+        アンロードせずにメモリ予算に収まる分だけ並行してロードする。
+        ロードできなかったモデルは最初のリクエスト時にロードされる。
+        """
+        pinned = [
+            model_id for model_id in self._models
+            if self._client_configs.get(model_id, {}).get("pinned")
+        ]
+        await self._load_all(pinned)
         
-        logger.info(f"Created {client_type} client for model {model_id}")
-        return client
\ No newline at end of file
+        planned_bytes = 0
+        others = []
+        for model_id in self._models:
+            if model_id in self._residency:
+                continue
+            memory_mb = self._client_configs.get(model_id, {}).get("memory_mb", 0)
+            memory_bytes = int(memory_mb * 1024 * 1024)
+            if not self._residency.fits(planned_bytes + memory_bytes):
+                logger.info(f"Deferring load of model {model_id}: memory budget is exhausted")
+                continue
+            planned_bytes += memory_bytes
+            others.append(model_id)
+        await self._load_all(others)
+        
+        logger.info(f"Warmed up clients for {len(self._residency)} models")
+    
+    async def _load_all(self, model_ids: List[str]):
+        """
+        複数のモデルを並行してロードする（失敗したモデルはログに記録して読み飛ばす）
+        
+        Args:
+            model_ids: VLMモデルのIDのリスト
+        """
+        results = await asyncio.gather(
+            *(self.get_client_for_model(model_id) for model_id in model_ids),
+            return_exceptions=True
+        )
+        for model_id, result in zip(model_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to warm up model {model_id}: {result}")
+    
+    async def close(self):
+        """
+        ロード済みのクライアントのリソースを解放する
+        
+        アプリケーションの終了時に呼び出す。置き換え・削除されたクライアントのうち
+        処理中のリクエストの完了を待っているものも、閉じ終わるまで待つ。
+        """
+        await self._residency.evict_all()
+        while self._closing:
+            await asyncio.gather(*list(self._closing))
+        unclosed, self._unclosed = self._unclosed, []
+        await asyncio.gather(
+            *(self._residency.release_client(model_id, client) for model_id, client in unclosed)
+        )
+        
+        logger.info("Closed all VLM clients")
+    
+    async def list_resident_models(self) -> List[Dict[str, any]]:
+        """
+        ロード済みのモデルとそのメモリ使用量などの状態を取得する
+        
+        Returns:
+            ロード済みモデルの状態の辞書のリスト（最も長く使われていない順）
+        """
+        return self._residency.snapshot()
+    
+    async def load_model(self, model_id: str):
+        """
+        モデルをロードし、常駐させる
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+            ModelTooLargeError: モデルがメモリ予算より大きい場合
+            VLMOverloadedError: 他のモデルをアンロードしてもメモリ予算内にロードできない場合
+        """
+        await self.get_client_for_model(model_id)
+    
+    async def unload_model(self, model_id: str) -> bool:
+        """
+        モデルをアンロードし、メモリを解放する（次のリクエスト時に再ロードされる）
+        
+        Args:
+            model_id: VLMモデルのID
+            
+        Returns:
+            アンロードした場合はTrue、ロードされていなかった場合はFalse
+            
+        Raises:
+            VLMModelNotFoundError: 指定されたモデルが見つからない場合
+        """
+        if model_id not in self._models:
+            raise VLMModelNotFoundError(model_id)
+        return await self._residency.evict(model_id)
+    
+    def _close_later(self, model_id: str, client: VLMClientInterface):
+        """
+        処理中のリクエストの完了後にクライアントを閉じるタスクを起動する
+        
+        イベントループの外で呼び出された場合は、close()の呼び出し時に閉じる。
+        
+        Args:
+            model_id: VLMモデルのID
+            client: VLMクライアント
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning(
+                f"No running event loop to close the client for model {model_id}; closing it on shutdown"
+            )
+            self._unclosed.append((model_id, client))
+            return
+        task = loop.create_task(self._residency.release_client(model_id, client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    async def get_stats(self) -> Dict[str, Dict[str, any]]:
+        """
+        生成済みクライアントの統計情報をモデルごとに取得する
+        
+        Returns:
+            モデルIDをキーとする統計情報の辞書
+        """
+        return {
+            model_id: client.get_stats()
+            for model_id, client in self._residency.clients().items()
+        }
\ No newline at end of file
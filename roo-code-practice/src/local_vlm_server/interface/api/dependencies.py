@@ -1,21 +1,114 @@
 """API依存関係の定義モジュール"""
+import asyncio
 import logging
-from typing import Annotated
+import os
+import time
+from typing import Annotated, List, Optional, Tuple
 
-from fastapi import Depends
+from fastapi import Depends, Header, UploadFile
 
+from ...application.interfaces import JobStoreInterface
+from ...application.job_queue import JobQueue
 from ...application.services import VLMService
-from ...domain.value_objects import ModelParameters
+from ...domain.exceptions import InvalidImageError
+from ...domain.value_objects import ImageInput, ModelParameters
+from ...infrastructure.image_processing import (
+    ImageProcessor,
+    decode_base64_image,
+    image_from_bytes,
+    read_image_file,
+)
+from ...infrastructure.job_store import create_job_store
+from ...infrastructure.model_registry import ModelRegistryWatcher
+from ...infrastructure.rate_limit import RateLimiter, create_rate_limit_store
+from ...infrastructure.tokenizers import TokenizerService
 from ...infrastructure.vlm_repository import VLMRepository
-from .schemas import ModelParametersSchema
+from .schemas import ImageInputSchema, ModelParametersSchema
 
 
 logger = logging.getLogger(__name__)
 
 
+# モデルの常駐管理の設定（memory_budget_mbがNoneの場合は無制限）
+MODEL_RESIDENCY_CONFIG = {
+    "memory_budget_mb": None,
+    # 起動時に登録済みモデルをロードしておくかどうか
+    "warm_up": True
+}
+
+# モデルレジストリの設定
+MODEL_REGISTRY_CONFIG = {
+    # モデルの定義を記述したTOMLまたはYAMLのファイル
+    "path": os.environ.get("VLM_MODEL_REGISTRY", "models.toml"),
+    # ファイルの変更を監視して再読み込みするかどうかと、変更を確認する間隔（秒）
+    "watch": True,
+    "poll_interval": 2.0
+}
+
+# 複数ワーカー構成の設定（socket_dirを指定した場合、このプロセスはモデルをロードせず、
+# ディレクトリ内のソケットで待ち受けるモデルごとのモデルホストにリクエストを転送する）
+MODEL_HOST_CONFIG = {
+    "socket_dir": os.environ.get("VLM_MODEL_HOST_DIR")
+}
+
+# トークナイザーの設定
+TOKENIZER_CONFIG = {
+    "max_entries": 4096
+}
+
+# 画像入力の設定
+IMAGE_CONFIG = {
+    # 1枚あたりの画像データの最大バイト数
+    "max_bytes": 20 * 1024 * 1024,
+    # file:// URLで読み込みを許可するディレクトリ（空の場合はローカルファイルを読み込まない）
+    "allowed_dirs": [],
+    # 前処理のワーカー（"thread"または"process"）とワーカー数
+    "executor": "thread",
+    "workers": 2,
+    # 前処理済み画像のキャッシュ
+    "max_entries": 256,
+    "max_cache_bytes": 256 * 1024 * 1024
+}
+
+# レート制限の設定（Noneの制限は適用しない）
+# 複数のワーカープロセスで制限を共有する場合はstoreのbackendに"sqlite"を指定する
+RATE_LIMIT_CONFIG = {
+    "requests_per_second": None,
+    "burst": None,
+    "tokens_per_minute": None,
+    # APIキーごとの制限値の上書き
+    "tenants": {},
+    "store": {
+        "backend": "memory",
+        # メモリに状態を保持する最大のAPIキー数
+        "max_keys": 100000
+    }
+}
+
+# APIキーが指定されていないリクエストに使用するキー
+ANONYMOUS_API_KEY = "anonymous"
+
+# ジョブキューの設定
+JOB_QUEUE_CONFIG = {
+    "workers": 4,
+    "max_pending": 1000,
+    # モデルが過負荷の場合にジョブを再試行する最大回数
+    "max_retries": 30,
+    "store": {
+        "backend": "memory",
+        "max_finished": 10000
+    }
+}
+
 # シングルトンインスタンス
 _vlm_repository = None
+_model_registry = None
 _vlm_service = None
+_tokenizer_service = None
+_image_processor = None
+_job_store = None
+_job_queue = None
+_rate_limiter = None
 
 
 def get_vlm_repository() -> VLMRepository:
@@ -28,18 +121,97 @@ def get_vlm_repository() -> VLMRepository:
     global _vlm_repository
     if _vlm_repository is None:
         logger.info("Creating VLMRepository instance")
-        _vlm_repository = VLMRepository()
+        _vlm_repository = VLMRepository(
+            memory_budget_mb=MODEL_RESIDENCY_CONFIG["memory_budget_mb"],
+            model_host_dir=MODEL_HOST_CONFIG["socket_dir"]
+        )
     return _vlm_repository
 
 
-def get_vlm_service(
+def get_model_registry(
+    repository: Annotated[VLMRepository, Depends(get_vlm_repository)]
+) -> ModelRegistryWatcher:
+    """
+    モデルレジストリの監視のシングルトンインスタンスを取得する
+    
+    Args:
+        repository: VLMリポジトリ
+        
+    Returns:
+        モデルレジストリの監視
+    """
+    global _model_registry
+    if _model_registry is None:
+        logger.info("Creating ModelRegistryWatcher instance")
+        _model_registry = ModelRegistryWatcher(
+            MODEL_REGISTRY_CONFIG["path"],
+            repository,
+            poll_interval=MODEL_REGISTRY_CONFIG["poll_interval"]
+        )
+    return _model_registry
+
+
+def get_tokenizer_service(
+    repository: Annotated[VLMRepository, Depends(get_vlm_repository)]
+) -> TokenizerService:
+    """
+    トークナイザーサービスのシングルトンインスタンスを取得する
+    
+    Args:
+        repository: VLMリポジトリ
+        
+    Returns:
+        トークナイザーサービス
+    """
+    global _tokenizer_service
+    if _tokenizer_service is None:
+        logger.info("Creating TokenizerService instance")
+        _tokenizer_service = TokenizerService(
+            repository.get_tokenizer_config,
+            max_entries=TOKENIZER_CONFIG["max_entries"]
+        )
+        # モデルの設定が変わったら古いトークナイザーを破棄する
+        repository.add_config_listener(_tokenizer_service.invalidate)
+    return _tokenizer_service
+
+
+def get_image_processor(
     repository: Annotated[VLMRepository, Depends(get_vlm_repository)]
+) -> ImageProcessor:
+    """
+    画像プロセッサーのシングルトンインスタンスを取得する
+    
+    Args:
+        repository: VLMリポジトリ
+        
+    Returns:
+        画像プロセッサー
+    """
+    global _image_processor
+    if _image_processor is None:
+        logger.info("Creating ImageProcessor instance")
+        _image_processor = ImageProcessor(
+            repository.get_image_config,
+            max_entries=IMAGE_CONFIG["max_entries"],
+            max_cache_bytes=IMAGE_CONFIG["max_cache_bytes"],
+            workers=IMAGE_CONFIG["workers"],
+            mode=IMAGE_CONFIG["executor"]
+        )
+    return _image_processor
+
+
+def get_vlm_service(
+    repository: Annotated[VLMRepository, Depends(get_vlm_repository)],
+    tokenizer: Annotated[TokenizerService, Depends(get_tokenizer_service)],
+    image_processor: Annotated[ImageProcessor, Depends(get_image_processor)]
 ) -> VLMService:
     """
     VLMサービスのシングルトンインスタンスを取得する
     
     Args:
         repository: VLMリポジトリ
+        tokenizer: トークナイザーサービス
+        image_processor: 画像プロセッサー
         
     Returns:
         VLMサービス
@@ -47,10 +219,109 @@ def get_vlm_service(
     global _vlm_service
     if _vlm_service is None:
         logger.info("Creating VLMService instance")
-        _vlm_service = VLMService(repository)
+        _vlm_service = VLMService(repository, tokenizer=tokenizer, image_processor=image_processor)
     return _vlm_service
 
 
+def get_job_store() -> JobStoreInterface:
+    """
+    ジョブの保存先のシングルトンインスタンスを取得する
+    
+    Returns:
+        ジョブの保存先
+    """
+    global _job_store
+    if _job_store is None:
+        logger.info("Creating job store instance")
+        _job_store = create_job_store(JOB_QUEUE_CONFIG["store"])
+    return _job_store
+
+
+def get_job_queue(
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    store: Annotated[JobStoreInterface, Depends(get_job_store)]
+) -> JobQueue:
+    """
+    ジョブキューのシングルトンインスタンスを取得する
+    
+    Args:
+        service: VLMサービス
+        store: ジョブの保存先
+        
+    Returns:
+        ジョブキュー
+    """
+    global _job_queue
+    if _job_queue is None:
+        logger.info("Creating JobQueue instance")
+        _job_queue = JobQueue(
+            service,
+            store,
+            workers=JOB_QUEUE_CONFIG["workers"],
+            max_pending=JOB_QUEUE_CONFIG["max_pending"],
+            max_retries=JOB_QUEUE_CONFIG["max_retries"]
+        )
+    return _job_queue
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    レート制限器のシングルトンインスタンスを取得する
+    
+    Returns:
+        レート制限器
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        logger.info("Creating RateLimiter instance")
+        _rate_limiter = RateLimiter(
+            create_rate_limit_store(RATE_LIMIT_CONFIG["store"]),
+            requests_per_second=RATE_LIMIT_CONFIG["requests_per_second"],
+            burst=RATE_LIMIT_CONFIG["burst"],
+            tokens_per_minute=RATE_LIMIT_CONFIG["tokens_per_minute"],
+            tenants=RATE_LIMIT_CONFIG["tenants"]
+        )
+    return _rate_limiter
+
+
+def get_api_key(
+    x_api_key: Annotated[Optional[str], Header()] = None,
+    authorization: Annotated[Optional[str], Header()] = None
+) -> str:
+    """
+    リクエストのAPIキーを取得する
+    
+    X-API-Keyヘッダー、またはAuthorizationヘッダーのBearerトークンを使用する。
+    
+    Args:
+        x_api_key: X-API-Keyリクエストヘッダー
+        authorization: Authorizationリクエストヘッダー
+        
+    Returns:
+        APIキー（指定されていない場合はANONYMOUS_API_KEY）
+    """
+    if x_api_key:
+        return x_api_key
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[len("bearer "):].strip()
+    return ANONYMOUS_API_KEY
+
+
+def convert_deadline(deadline: Optional[float] = None) -> Optional[float]:
+    """
+    APIスキーマの相対的な期限（秒数）をドメインモデルの期限（UNIX時間）に変換する
+    
+    Args:
+        deadline: リクエストを受け付けてからの秒数
+        
+    Returns:
+        期限のUNIX時間（期限が指定されていない場合はNone）
+    """
+    if deadline is None:
+        return None
+    return time.time() + deadline
+
+
 def convert_parameters(
     parameters: ModelParametersSchema = None
 ) -> ModelParameters:
@@ -72,4 +343,63 @@ def convert_parameters(
         top_p=parameters.top_p,
         frequency_penalty=parameters.frequency_penalty,
         presence_penalty=parameters.presence_penalty
-    )
\ No newline at end of file
+    )
+
+
+async def convert_images(
+    images: Optional[List[ImageInputSchema]] = None
+) -> Tuple[ImageInput, ...]:
+    """
+    APIスキーマの画像入力をドメインモデルの画像に変換する
+    
+    Base64やdata URLはそのままデコードし、file:// URLのファイルは
+    イベントループを塞がないようスレッドで読み込む。
+    
+    Args:
+        images: APIスキーマの画像入力のリスト
+        
+    Returns:
+        画像のタプル
+        
+    Raises:
+        InvalidImageError: 画像をデコードまたは読み込みできない場合
+    """
+    if not images:
+        return ()
+    
+    converted = []
+    for image in images:
+        source = image.data if image.data is not None else image.url
+        if image.data is not None or source.startswith("data:"):
+            converted.append(decode_base64_image(source, IMAGE_CONFIG["max_bytes"]))
+        elif not source.startswith("file:"):
+            raise InvalidImageError("only file:// and data: image URLs are supported")
+        else:
+            converted.append(await asyncio.to_thread(
+                read_image_file, source, IMAGE_CONFIG["allowed_dirs"], IMAGE_CONFIG["max_bytes"]
+            ))
+    return tuple(converted)
+
+
+async def convert_uploaded_images(files: List[UploadFile]) -> Tuple[ImageInput, ...]:
+    """
+    multipart/form-dataでアップロードされたファイルをドメインモデルの画像に変換する
+    
+    Args:
+        files: アップロードされたファイルのリスト
+        
+    Returns:
+        画像のタプル
+        
+    Raises:
+        InvalidImageError: 大きすぎるファイル、または対応していない形式の場合
+    """
+    max_bytes = IMAGE_CONFIG["max_bytes"]
+    converted = []
+    for file in files:
+        if file.size is not None and file.size > max_bytes:
+            raise InvalidImageError(f"{file.filename} exceeds {max_bytes} bytes")
+        # 上限を1バイト超えて読み、サイズが不明なファイルでも上限を超えた分を読み込まない
+        data = await file.read(max_bytes + 1)
+        converted.append(image_from_bytes(data, max_bytes))
+    return tuple(converted)
@@ -0,0 +1,174 @@
+"""APIレスポンスのJSONエンコードの定義モジュール
+
+頻繁に呼ばれるルートでは、ドメインオブジェクトをAPIスキーマのインスタンスに変換せずに
+直接JSONのバイト列にする。orjsonがインストールされている場合はorjsonを、
+インストールされていない場合は標準ライブラリのjsonを使用する。
+"""
+import importlib.util
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from ...domain.entities import VLMModel, VLMResponse
+
+
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+
+if ORJSON_AVAILABLE:
+    import orjson
+
+    # メタデータのキーに文字列以外が含まれていてもエンコードできるようにする
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """
+    JSONでエンコードできない値を変換する
+
+    Args:
+        value: エンコードできない値
+
+    Returns:
+        エンコードできる値（集合はリスト、それ以外は文字列）
+    """
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    値をJSONのバイト列にエンコードする
+
+    Args:
+        content: エンコードする値
+
+    Returns:
+        UTF-8のJSONのバイト列
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    orjsonでエンコードするJSONレスポンス（orjsonがない場合は標準ライブラリのjsonを使用する）
+
+    アプリケーションのデフォルトのレスポンスクラスとして使用する。
+    """
+
+    def render(self, content: Any) -> bytes:
+        """
+        レスポンスの本文をエンコードする
+
+        Args:
+            content: レスポンスの内容
+
+        Returns:
+            JSONのバイト列
+        """
+        return dumps(content)
+
+
+def vlm_response_to_dict(vlm_response: VLMResponse) -> Dict[str, Any]:
+    """
+    VLMレスポンスをVLMResponseSchemaと同じ形式の辞書に変換する
+
+    Args:
+        vlm_response: VLMレスポンス
+
+    Returns:
+        APIのレスポンスの辞書
+    """
+    return {
+        "model_id": vlm_response.model_id,
+        "prompt": vlm_response.prompt.text,
+        "text": vlm_response.text,
+        "tokens_used": vlm_response.tokens_used,
+        "prompt_tokens": vlm_response.prompt_tokens,
+        "completion_tokens": vlm_response.completion_tokens,
+        "metadata": vlm_response.metadata,
+    }
+
+
+def encode_vlm_response(vlm_response: VLMResponse) -> bytes:
+    """
+    VLMレスポンスをVLMResponseSchemaと同じ形式のJSONのバイト列にする
+
+    Args:
+        vlm_response: VLMレスポンス
+
+    Returns:
+        JSONのバイト列
+    """
+    return dumps(vlm_response_to_dict(vlm_response))
+
+
+def encode_models_list(models: List[VLMModel]) -> bytes:
+    """
+    VLMモデルの一覧をModelsListResponseSchemaと同じ形式のJSONのバイト列にする
+
+    Args:
+        models: VLMモデルのリスト
+
+    Returns:
+        JSONのバイト列
+    """
+    return dumps({
+        "models": [
+            {
+                "id": model.id,
+                "name": model.name,
+                "description": model.description,
+                "parameters": model.parameters,
+            }
+            for model in models
+        ]
+    })
+
+
+class ModelsListCache:
+    """
+    モデル一覧のレスポンスの本文をモデルの登録のバージョンごとにキャッシュするクラス
+
+    モデルの登録が変わるまでは、リクエストごとにモデル一覧をエンコードせずに同じ本文を返す。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._version: Optional[int] = None
+        self._body: Optional[bytes] = None
+        self.builds = 0
+
+    def get(self, version: Optional[int]) -> Optional[bytes]:
+        """
+        キャッシュされた本文を取得する
+
+        Args:
+            version: 現在のモデルの登録のバージョン（Noneの場合はキャッシュしない）
+
+        Returns:
+            本文（キャッシュされていない場合はNone）
+        """
+        if version is None or version != self._version:
+            return None
+        return self._body
+
+    def put(self, version: Optional[int], models: List[VLMModel]) -> bytes:
+        """
+        モデル一覧をエンコードし、バージョンに対応づけてキャッシュする
+
+        Args:
+            version: モデルの一覧を取得したときのモデルの登録のバージョン
+            models: VLMモデルのリスト
+
+        Returns:
+            本文
+        """
+        body = encode_models_list(models)
+        self.builds += 1
+        if version is not None:
+            self._version, self._body = version, body
+        return body
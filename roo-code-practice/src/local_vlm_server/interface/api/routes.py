@@ -1,32 +1,123 @@
 """APIルートの定義モジュール"""
+import asyncio
+import importlib.util
 import logging
-from typing import Annotated, List
+import math
+import time
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
+from ...application.job_queue import JobQueue
 from ...application.services import VLMService
-from ...domain.entities import VLMModel
+from ...domain.entities import Job, VLMModel, VLMResponse, VLMResponseChunk
 from ...domain.exceptions import (
+    DeadlineExceededError,
     DomainException,
+    InvalidImageError,
     InvalidPromptError,
+    JobNotFoundError,
+    JobQueueFullError,
+    ModelTooLargeError,
+    RateLimitExceededError,
+    RequestCancelledError,
     VLMConnectionError,
     VLMModelNotFoundError,
+    VLMOverloadedError,
     VLMProcessingError,
 )
-from .dependencies import convert_parameters, get_vlm_service
+from ...domain.value_objects import ImageInput, VLMRequest
+from ...infrastructure.metrics import REGISTRY, SCHEMA_CONVERSION_SECONDS
+from ...infrastructure.model_registry import ModelRegistryWatcher
+from ...infrastructure.rate_limit import RateLimiter
+from .dependencies import (
+    convert_deadline,
+    convert_images,
+    convert_parameters,
+    convert_uploaded_images,
+    get_api_key,
+    get_job_queue,
+    get_model_registry,
+    get_rate_limiter,
+    get_vlm_service,
+)
+from .responses import ModelsListCache, encode_vlm_response
 from .schemas import (
+    MAX_IMAGES_PER_REQUEST,
+    BatchItemResultSchema,
+    BatchPromptRequestSchema,
+    BatchResponseSchema,
     ErrorResponseSchema,
+    JobSchema,
+    JobSubmitRequestSchema,
+    ModelParametersSchema,
+    ModelResidencyListResponseSchema,
+    ModelResidencySchema,
     ModelsListResponseSchema,
     PromptRequestSchema,
+    RegistryReloadResponseSchema,
+    StatsResponseSchema,
+    TokenizeRequestSchema,
+    TokenizeResponseSchema,
+    TokenizeResultSchema,
     VLMModelSchema,
+    VLMResponseChunkSchema,
     VLMResponseSchema,
 )
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# クライアントが応答を待たずに切断したことを表すステータスコード（nginxの慣例に従う）
+CLIENT_CLOSED_REQUEST = 499
+
 router = APIRouter(prefix="/api/v1", tags=["vlm"])
 
+metrics_router = APIRouter(tags=["metrics"])
+
+admin_router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+# multipart/form-dataの解析にはpython-multipartが必要なため、インストールされている場合だけ
+# 画像アップロードのルートを登録する
+MULTIPART_AVAILABLE = any(
+    importlib.util.find_spec(name) is not None for name in ("python_multipart", "multipart")
+)
+
+# ルートごとのスキーマ変換時間（リクエストごとの割り当てを避けるため事前に取得する）
+_schema_conversion = {
+    route: SCHEMA_CONVERSION_SECONDS.labels(route)
+    for route in ("generate", "generate_upload", "generate_batch", "generate_stream", "jobs")
+}
+
+# エンコード済みのモデル一覧（モデルの登録が変わるまで再利用する）
+_models_list_cache = ModelsListCache()
+
 
 @router.get(
     "/models",
@@ -36,29 +127,24 @@ router = APIRouter(prefix="/api/v1", tags=["vlm"])
 )
 async def list_models(
     service: Annotated[VLMService, Depends(get_vlm_service)]
-) -> ModelsListResponseSchema:
+) -> Response:
     """
     利用可能なVLMモデルの一覧を取得する
     
+    モデル一覧のJSONはモデルの登録が変わるまでキャッシュし、リクエストごとにはエンコードしない。
+    
     Args:
         service: VLMサービス
         
     Returns:
-        モデル一覧レスポンス
+        モデル一覧レスポンスのJSONを本文とするHTTPレスポンス
     """
     try:
-        models = await service.get_available_models()
-        return ModelsListResponseSchema(
-            models=[
-                VLMModelSchema(
-                    id=model.id,
-                    name=model.name,
-                    description=model.description,
-                    parameters=model.parameters
-                )
-                for model in models
-            ]
-        )
+        version = service.get_models_version()
+        body = _models_list_cache.get(version)
+        if body is None:
+            body = _models_list_cache.put(version, await service.get_available_models())
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logger.exception("Error listing models")
         raise HTTPException(
@@ -133,92 +219,1012 @@ async def get_model(
 )
 async def generate_text(
     request: PromptRequestSchema,
-    service: Annotated[VLMService, Depends(get_vlm_service)]
-) -> VLMResponseSchema:
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)],
+    api_key: Annotated[str, Depends(get_api_key)],
+    http_request: Request,
+    cache_control: Annotated[Optional[str], Header()] = None
+) -> Response:
     """
     VLMを使用してテキストを生成する
     
+    Cache-Controlヘッダーにno-cacheまたはno-storeを指定すると
+    レスポンスキャッシュを使用せずに生成する。
+    クライアントが応答を待たずに切断した場合は生成を中断する。
+    
+    Args:
+        request: プロンプトリクエスト
+        service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        http_request: HTTPリクエスト（切断の検知用）
+        cache_control: Cache-Controlリクエストヘッダー
+        
+    Returns:
+        VLMレスポンスのJSONを本文とするHTTPレスポンス
+        
+    Raises:
+        HTTPException: リクエスト処理中にエラーが発生した場合
+    """
+    return await _generate_text(
+        request, None, "generate", service, rate_limiter, api_key, http_request, cache_control
+    )
+
+
+async def _generate_text(
+    request: PromptRequestSchema,
+    uploads: Optional[List[UploadFile]],
+    route: str,
+    service: VLMService,
+    rate_limiter: RateLimiter,
+    api_key: str,
+    http_request: Request,
+    cache_control: Optional[str]
+) -> Response:
+    """
+    テキストを生成する（JSONと画像アップロードのルートで共通の処理）
+    
+    VLMレスポンスはAPIスキーマのインスタンスを経由せずに直接JSONにエンコードする。
+    
     Args:
         request: プロンプトリクエスト
+        uploads: アップロードされた画像ファイル（JSONのルートの場合はNoneで、request.imagesを使用する）
+        route: スキーマ変換時間を記録するルート名
         service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        http_request: HTTPリクエスト（切断の検知用）
+        cache_control: Cache-Controlリクエストヘッダー
         
     Returns:
-        VLMレスポンス
+        VLMレスポンスのJSONを本文とするHTTPレスポンス
         
     Raises:
         HTTPException: リクエスト処理中にエラーが発生した場合
     """
     try:
-        # パラメータの変換
+        await _enforce_rate_limit(rate_limiter, service, api_key, [request])
+        
+        # パラメータと画像の変換
+        started_at = time.perf_counter()
         parameters = convert_parameters(request.parameters)
+        conversion_seconds = time.perf_counter() - started_at
+        if uploads is None:
+            images = await convert_images(request.images)
+        else:
+            images = await convert_uploaded_images(uploads)
         
         # プロンプト処理
-        response = await service.process_prompt(
+        vlm_response = await _cancel_on_disconnect(http_request, service.process_prompt(
             model_id=request.model_id,
             prompt_text=request.prompt,
-            parameters=parameters
+            parameters=parameters,
+            use_cache=not _is_cache_disabled(cache_control),
+            priority=request.priority,
+            deadline=convert_deadline(request.deadline),
+            images=images
+        ))
+        
+        cached = bool(vlm_response.metadata and vlm_response.metadata.get("cached"))
+        
+        started_at = time.perf_counter()
+        body = encode_vlm_response(vlm_response)
+        _schema_conversion[route].observe(conversion_seconds + time.perf_counter() - started_at)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"X-Cache": "HIT" if cached else "MISS"}
+        )
+        
+    except DomainException as e:
+        raise _to_http_exception(e)
+    except Exception as e:
+        logger.exception("Unexpected error during text generation")
+        raise HTTPException(
+            status_code=500,
+            detail=ErrorResponseSchema(
+                error="InternalServerError",
+                message="An unexpected error occurred",
+                details={"error": str(e)}
+            ).dict()
+        )
+
+
+async def generate_text_upload(
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)],
+    api_key: Annotated[str, Depends(get_api_key)],
+    http_request: Request,
+    model_id: Annotated[str, Form(description="使用するVLMモデルのID")],
+    prompt: Annotated[str, Form(description="プロンプトテキスト")],
+    images: Annotated[List[UploadFile], File(description="プロンプトと一緒に渡す画像ファイル")],
+    parameters: Annotated[Optional[str], Form(description="モデルパラメータのJSON")] = None,
+    priority: Annotated[int, Form(description="優先度（大きいほど先に処理される）", ge=-100, le=100)] = 0,
+    deadline: Annotated[
+        Optional[float], Form(description="処理を開始しなければならない期限（リクエストを受け付けてからの秒数）", gt=0)
+    ] = None,
+    cache_control: Annotated[Optional[str], Header()] = None
+) -> Response:
+    """
+    アップロードされた画像とプロンプトを使用してテキストを生成する
+    
+    Args:
+        service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        http_request: HTTPリクエスト（切断の検知用）
+        model_id: 使用するVLMモデルのID
+        prompt: プロンプトテキスト
+        images: 画像ファイル
+        parameters: モデルパラメータのJSON文字列
+        priority: 優先度
+        deadline: 処理を開始しなければならない期限（秒数）
+        cache_control: Cache-Controlリクエストヘッダー
+        
+    Returns:
+        VLMレスポンスのJSONを本文とするHTTPレスポンス
+        
+    Raises:
+        HTTPException: リクエスト処理中にエラーが発生した場合
+    """
+    try:
+        request = PromptRequestSchema(
+            model_id=model_id,
+            prompt=prompt,
+            parameters=ModelParametersSchema.model_validate_json(parameters) if parameters else None,
+            priority=priority,
+            deadline=deadline
         )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    if len(images) > MAX_IMAGES_PER_REQUEST:
+        raise RequestValidationError([{
+            "type": "too_long",
+            "loc": ("body", "images"),
+            "msg": "Too many images",
+            "input": None,
+        }])
+    return await _generate_text(
+        request, images, "generate_upload", service, rate_limiter, api_key, http_request, cache_control
+    )
+
+
+if MULTIPART_AVAILABLE:
+    router.post(
+        "/generate/upload",
+        response_model=VLMResponseSchema,
+        summary="アップロードした画像を使用してテキストを生成",
+        description=(
+            "multipart/form-dataで画像ファイルとプロンプトを受け取り、テキストを生成します。"
+            "モデルパラメータはJSON文字列として指定します。"
+        ),
+    )(generate_text_upload)
+
+
+@router.post(
+    "/generate/batch",
+    response_model=BatchResponseSchema,
+    summary="VLMを使用して複数のプロンプトを一括生成",
+    description=(
+        "複数のプロンプトリクエスト（異なるモデルを混在可能）をまとめて処理し、"
+        "リクエストと同じ順序で結果を返します。失敗したリクエストは結果ごとに"
+        "エラーとして返され、他のリクエストの処理には影響しません。"
+    ),
+)
+async def generate_text_batch(
+    request: BatchPromptRequestSchema,
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)],
+    api_key: Annotated[str, Depends(get_api_key)],
+    http_request: Request,
+    cache_control: Annotated[Optional[str], Header()] = None
+) -> BatchResponseSchema:
+    """
+    VLMを使用して複数のプロンプトを一括生成する
+    
+    クライアントが応答を待たずに切断した場合は残りの生成を中断する。
+    
+    Args:
+        request: 一括プロンプトリクエスト
+        service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        http_request: HTTPリクエスト（切断の検知用）
+        cache_control: Cache-Controlリクエストヘッダー
+        
+    Returns:
+        一括処理レスポンス
         
-        return VLMResponseSchema(
-            model_id=response.model_id,
-            prompt=response.prompt.text,
-            text=response.text,
-            tokens_used=response.tokens_used,
-            metadata=response.metadata
+    Raises:
+        HTTPException: レート制限を超えた場合、画像を読み込めない場合、またはクライアントが切断した場合
+    """
+    try:
+        await _enforce_rate_limit(rate_limiter, service, api_key, request.requests)
+        images: List[Tuple[ImageInput, ...]] = [
+            await convert_images(item.images) for item in request.requests
+        ]
+    except DomainException as e:
+        raise _to_http_exception(e)
+    
+    use_cache = not _is_cache_disabled(cache_control)
+    started_at = time.perf_counter()
+    vlm_requests = [
+        VLMRequest(
+            prompt_text=item.prompt,
+            model_id=item.model_id,
+            parameters=convert_parameters(item.parameters),
+            use_cache=use_cache,
+            priority=item.priority,
+            deadline=convert_deadline(item.deadline),
+            images=item_images
         )
+        for item, item_images in zip(request.requests, images)
+    ]
+    conversion_seconds = time.perf_counter() - started_at
+    
+    try:
+        outcomes = await _cancel_on_disconnect(http_request, service.process_prompts(vlm_requests))
+    except DomainException as e:
+        raise _to_http_exception(e)
+    
+    started_at = time.perf_counter()
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, VLMResponse):
+            results.append(BatchItemResultSchema(
+                index=index,
+                status_code=200,
+                response=_to_response_schema(outcome)
+            ))
+            continue
         
-    except VLMModelNotFoundError as e:
-        logger.warning(f"Model not found: {e}")
+        if isinstance(outcome, DomainException):
+            http_exception = _to_http_exception(outcome)
+            error = ErrorResponseSchema(**http_exception.detail)
+            status_code = http_exception.status_code
+        else:
+            logger.error(f"Unexpected error in batch item {index}: {outcome!r}")
+            error = ErrorResponseSchema(
+                error="InternalServerError",
+                message="An unexpected error occurred",
+                details={"error": str(outcome)}
+            )
+            status_code = 500
+        results.append(BatchItemResultSchema(index=index, status_code=status_code, error=error))
+    
+    succeeded = sum(1 for result in results if result.error is None)
+    response_schema = BatchResponseSchema(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
+    _schema_conversion["generate_batch"].observe(conversion_seconds + time.perf_counter() - started_at)
+    return response_schema
+
+
+@router.post(
+    "/generate/stream",
+    summary="VLMを使用してテキストをストリーミング生成",
+    description=(
+        "指定されたモデルとプロンプトを使用してテキストを生成し、"
+        "生成された断片を改行区切りJSON（NDJSON）として順次返します。"
+    ),
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def generate_text_stream(
+    request: PromptRequestSchema,
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)],
+    api_key: Annotated[str, Depends(get_api_key)]
+) -> StreamingResponse:
+    """
+    VLMを使用してテキストをストリーミング生成する
+    
+    Args:
+        request: プロンプトリクエスト
+        service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        
+    Returns:
+        NDJSON形式のストリーミングレスポンス
+        
+    Raises:
+        HTTPException: ストリーミング開始前にエラーが発生した場合
+    """
+    try:
+        await _enforce_rate_limit(rate_limiter, service, api_key, [request])
+        
+        # パラメータと画像の変換
+        parameters = convert_parameters(request.parameters)
+        images = await convert_images(request.images)
+        
+        # プロンプト処理（検証はストリーミング開始前に行われる）
+        chunks = await service.process_prompt_stream(
+            model_id=request.model_id,
+            prompt_text=request.prompt,
+            parameters=parameters,
+            priority=request.priority,
+            deadline=convert_deadline(request.deadline),
+            images=images
+        )
+    except DomainException as e:
+        raise _to_http_exception(e)
+    except Exception as e:
+        logger.exception("Unexpected error before streaming text generation")
         raise HTTPException(
+            status_code=500,
+            detail=ErrorResponseSchema(
+                error="InternalServerError",
+                message="An unexpected error occurred",
+                details={"error": str(e)}
+            ).dict()
+        )
+    
+    return StreamingResponse(
+        _encode_ndjson(chunks),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=JobSchema,
+    status_code=202,
+    summary="生成ジョブを投入",
+    description=(
+        "生成リクエストをジョブとして受け付け、処理を待たずにジョブIDを返します。"
+        "結果はGET /api/v1/jobs/{job_id}で取得します。"
+    ),
+)
+async def submit_job(
+    request: JobSubmitRequestSchema,
+    job_queue: Annotated[JobQueue, Depends(get_job_queue)],
+    service: Annotated[VLMService, Depends(get_vlm_service)],
+    rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)],
+    api_key: Annotated[str, Depends(get_api_key)],
+    response: Response,
+    cache_control: Annotated[Optional[str], Header()] = None
+) -> JobSchema:
+    """
+    生成ジョブを投入する
+    
+    Args:
+        request: ジョブ投入リクエスト
+        job_queue: ジョブキュー
+        service: VLMサービス
+        rate_limiter: レート制限器
+        api_key: APIキー
+        response: HTTPレスポンス（ヘッダー設定用）
+        cache_control: Cache-Controlリクエストヘッダー
+        
+    Returns:
+        投入されたジョブ
+        
+    Raises:
+        HTTPException: ジョブを受け付けられない場合
+    """
+    try:
+        await _enforce_rate_limit(rate_limiter, service, api_key, [request])
+        job = await job_queue.submit(
+            VLMRequest(
+                prompt_text=request.prompt,
+                model_id=request.model_id,
+                parameters=convert_parameters(request.parameters),
+                use_cache=not _is_cache_disabled(cache_control),
+                priority=request.priority,
+                deadline=convert_deadline(request.deadline),
+                images=await convert_images(request.images)
+            ),
+            priority=request.priority
+        )
+    except DomainException as e:
+        raise _to_http_exception(e)
+    
+    response.headers["Location"] = f"{router.prefix}/jobs/{job.id}"
+    started_at = time.perf_counter()
+    job_schema = _to_job_schema(job)
+    _schema_conversion["jobs"].observe(time.perf_counter() - started_at)
+    return job_schema
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobSchema,
+    summary="生成ジョブの状態と結果を取得",
+    description=(
+        "ジョブの状態と、終了している場合はその結果を返します。"
+        "waitを指定すると、ジョブが終了するまで最大wait秒待ってから返します（ロングポーリング）。"
+    ),
+)
+async def get_job(
+    job_id: Annotated[str, Path(description="ジョブID")],
+    job_queue: Annotated[JobQueue, Depends(get_job_queue)],
+    wait: Annotated[float, Query(description="ジョブの終了を待つ最大秒数", ge=0.0, le=60.0)] = 0.0
+) -> JobSchema:
+    """
+    生成ジョブの状態と結果を取得する
+    
+    Args:
+        job_id: ジョブID
+        job_queue: ジョブキュー
+        wait: ジョブの終了を待つ最大秒数
+        
+    Returns:
+        ジョブ
+        
+    Raises:
+        HTTPException: ジョブが見つからない場合
+    """
+    try:
+        job = await job_queue.wait(job_id, wait)
+    except DomainException as e:
+        raise _to_http_exception(e)
+    
+    return _to_job_schema(job)
+
+
+async def _encode_ndjson(chunks: AsyncIterator[VLMResponseChunk]) -> AsyncIterator[str]:
+    """
+    レスポンスの断片をNDJSONの行に変換する
+    
+    ストリーミング開始後に発生したエラーはエラー行として送信する。
+    
+    Args:
+        chunks: VLMレスポンスの断片のイテレータ
+        
+    Yields:
+        NDJSONの1行
+    """
+    conversion = _schema_conversion["generate_stream"]
+    try:
+        async for chunk in chunks:
+            started_at = time.perf_counter()
+            line = VLMResponseChunkSchema(
+                model_id=chunk.model_id,
+                index=chunk.index,
+                text=chunk.text,
+                finish_reason=chunk.finish_reason,
+                tokens_used=chunk.tokens_used,
+                metadata=chunk.metadata
+            ).model_dump_json() + "\n"
+            conversion.observe(time.perf_counter() - started_at)
+            yield line
+    except Exception as e:
+        logger.error(f"Error during text streaming: {e}")
+        error_type = e.__class__.__name__ if isinstance(e, DomainException) else "InternalServerError"
+        yield ErrorResponseSchema(
+            error=error_type,
+            message=str(e)
+        ).model_dump_json() + "\n"
+    finally:
+        # クライアントの切断で読み出しが中断された場合も、バックエンドの生成を直ちに終了させる
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def _to_response_schema(vlm_response: VLMResponse) -> VLMResponseSchema:
+    """
+    VLMレスポンスをAPIスキーマに変換する
+    
+    Args:
+        vlm_response: VLMレスポンス
+        
+    Returns:
+        VLMレスポンスのスキーマ
+    """
+    return VLMResponseSchema(
+        model_id=vlm_response.model_id,
+        prompt=vlm_response.prompt.text,
+        text=vlm_response.text,
+        tokens_used=vlm_response.tokens_used,
+        prompt_tokens=vlm_response.prompt_tokens,
+        completion_tokens=vlm_response.completion_tokens,
+        metadata=vlm_response.metadata
+    )
+
+
+def _to_job_schema(job: Job) -> JobSchema:
+    """
+    ジョブをAPIスキーマに変換する
+    
+    Args:
+        job: ジョブ
+        
+    Returns:
+        ジョブのスキーマ
+    """
+    return JobSchema(
+        id=job.id,
+        status=job.status.value,
+        model_id=job.request.model_id,
+        priority=job.priority,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        response=_to_response_schema(job.response) if job.response else None,
+        error=ErrorResponseSchema(**job.error) if job.error else None
+    )
+
+
+async def _wait_for_disconnect(http_request: Request):
+    """
+    クライアントが切断するまで待つ
+    
+    リクエストボディは読み込み済みのため、以降に届くのは切断の通知だけである。
+    
+    Args:
+        http_request: HTTPリクエスト
+    """
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _cancel_on_disconnect(http_request: Request, operation: Awaitable[T]) -> T:
+    """
+    処理の完了を待ち、その前にクライアントが切断した場合は処理をキャンセルする
+    
+    キャンセルはサービスを通じてバックエンドまで伝わり、生成が中断される。
+    
+    Args:
+        http_request: HTTPリクエスト
+        operation: 処理を行うコルーチン
+        
+    Returns:
+        処理の結果
+        
+    Raises:
+        RequestCancelledError: 処理の完了前にクライアントが切断した場合
+    """
+    task = asyncio.ensure_future(operation)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # キャンセルがバックエンドまで伝わるのを待つ
+            await asyncio.gather(task, return_exceptions=True)
+    
+    if task.cancelled():
+        logger.info(f"Client disconnected; cancelled {http_request.method} {http_request.url.path}")
+        raise RequestCancelledError("client disconnected")
+    return task.result()
+
+
+async def _enforce_rate_limit(
+    rate_limiter: RateLimiter,
+    service: VLMService,
+    api_key: str,
+    requests: List[PromptRequestSchema]
+):
+    """
+    モデルの処理を行う前にAPIキーのレート制限を適用する
+    
+    トークン数はプロンプトのトークン数と生成する最大トークン数の合計で見積もる。
+    トークン数の制限がない場合はトークナイズを行わない。
+    
+    Args:
+        rate_limiter: レート制限器
+        service: VLMサービス
+        api_key: APIキー
+        requests: プロンプトリクエストのリスト
+        
+    Raises:
+        RateLimitExceededError: 制限を超えた場合
+    """
+    tokens = 0
+    if rate_limiter.limits_tokens(api_key):
+        prompts: Dict[str, List[str]] = {}
+        for item in requests:
+            prompts.setdefault(item.model_id, []).append(item.prompt)
+            tokens += item.parameters.max_tokens if item.parameters else ModelParametersSchema().max_tokens
+        for model_id, texts in prompts.items():
+            try:
+                tokens += sum(await service.count_tokens(model_id, texts))
+            except DomainException:
+                # 存在しないモデルなどはこの後の処理でエラーとして返される
+                continue
+    await rate_limiter.acquire(api_key, requests=len(requests), tokens=tokens)
+
+
+def _is_cache_disabled(cache_control: Optional[str]) -> bool:
+    """
+    Cache-Controlヘッダーがキャッシュの使用を禁止しているか判定する
+    
+    Args:
+        cache_control: Cache-Controlリクエストヘッダー
+        
+    Returns:
+        no-cacheまたはno-storeが指定されている場合はTrue
+    """
+    if not cache_control:
+        return False
+    directives = {directive.strip().lower() for directive in cache_control.split(",")}
+    return bool(directives & {"no-cache", "no-store"})
+
+
+def _to_http_exception(e: DomainException) -> HTTPException:
+    """
+    ドメイン例外をHTTP例外に変換する
+    
+    Args:
+        e: ドメイン例外
+        
+    Returns:
+        HTTP例外
+    """
+    if isinstance(e, VLMModelNotFoundError):
+        logger.warning(f"Model not found: {e}")
+        return HTTPException(
             status_code=404,
             detail=ErrorResponseSchema(
                 error="ModelNotFound",
                 message=str(e)
             ).dict()
         )
-    except InvalidPromptError as e:
+    if isinstance(e, JobNotFoundError):
+        logger.warning(f"Job not found: {e}")
+        return HTTPException(
+            status_code=404,
+            detail=ErrorResponseSchema(
+                error="JobNotFound",
+                message=str(e)
+            ).dict()
+        )
+    if isinstance(e, InvalidPromptError):
         logger.warning(f"Invalid prompt: {e}")
-        raise HTTPException(
+        return HTTPException(
             status_code=400,
             detail=ErrorResponseSchema(
                 error="InvalidPrompt",
                 message=str(e)
             ).dict()
         )
-    except VLMConnectionError as e:
+    if isinstance(e, InvalidImageError):
+        logger.warning(f"Invalid image: {e}")
+        return HTTPException(
+            status_code=400,
+            detail=ErrorResponseSchema(
+                error="InvalidImage",
+                message=str(e)
+            ).dict()
+        )
+    if isinstance(e, VLMOverloadedError):
+        logger.warning(f"VLM overloaded: {e}")
+        return HTTPException(
+            status_code=503,
+            detail=ErrorResponseSchema(
+                error="VLMOverloadedError",
+                message=str(e),
+                details={"retry_after": e.retry_after}
+            ).dict(),
+            headers={"Retry-After": str(int(math.ceil(e.retry_after)))}
+        )
+    if isinstance(e, ModelTooLargeError):
+        logger.error(f"Model too large: {e}")
+        return HTTPException(
+            status_code=507,
+            detail=ErrorResponseSchema(
+                error="ModelTooLarge",
+                message=str(e),
+                details={"memory_bytes": e.memory_bytes, "memory_budget_bytes": e.memory_budget_bytes}
+            ).dict()
+        )
+    if isinstance(e, RequestCancelledError):
+        return HTTPException(
+            status_code=CLIENT_CLOSED_REQUEST,
+            detail=ErrorResponseSchema(
+                error="RequestCancelled",
+                message=str(e)
+            ).dict()
+        )
+    if isinstance(e, DeadlineExceededError):
+        logger.info(f"Deadline exceeded: {e}")
+        return HTTPException(
+            status_code=504,
+            detail=ErrorResponseSchema(
+                error="DeadlineExceeded",
+                message=str(e)
+            ).dict()
+        )
+    if isinstance(e, RateLimitExceededError):
+        return HTTPException(
+            status_code=429,
+            detail=ErrorResponseSchema(
+                error="RateLimitExceeded",
+                message=str(e),
+                details={"retry_after": e.retry_after}
+            ).dict(),
+            headers={"Retry-After": str(int(math.ceil(e.retry_after)))}
+        )
+    if isinstance(e, JobQueueFullError):
+        logger.warning(f"Job queue full: {e}")
+        return HTTPException(
+            status_code=503,
+            detail=ErrorResponseSchema(
+                error="JobQueueFullError",
+                message=str(e),
+                details={"retry_after": e.retry_after}
+            ).dict(),
+            headers={"Retry-After": str(int(math.ceil(e.retry_after)))}
+        )
+    if isinstance(e, VLMConnectionError):
         logger.error(f"VLM connection error: {e}")
-        raise HTTPException(
+        return HTTPException(
             status_code=503,
             detail=ErrorResponseSchema(
                 error="VLMConnectionError",
                 message=str(e)
             ).dict()
         )
-    except VLMProcessingError as e:
+    if isinstance(e, VLMProcessingError):
         logger.error(f"VLM processing error: {e}")
-        raise HTTPException(
+        return HTTPException(
             status_code=500,
             detail=ErrorResponseSchema(
                 error="VLMProcessingError",
                 message=str(e)
             ).dict()
         )
+    logger.error(f"Domain error: {e}")
+    return HTTPException(
+        status_code=400,
+        detail=ErrorResponseSchema(
+            error="DomainError",
+            message=str(e)
+        ).dict()
+    )
+
+
+@router.post(
+    "/tokenize",
+    response_model=TokenizeResponseSchema,
+    summary="テキストのトークン数を計算",
+    description=(
+        "指定されたモデルのトークナイザーで複数のテキストのトークン数を計算します。"
+        "推論を行う前にコンテキスト長に収まるかどうかを確認するために使用できます。"
+    ),
+)
+async def tokenize(
+    request: TokenizeRequestSchema,
+    service: Annotated[VLMService, Depends(get_vlm_service)]
+) -> TokenizeResponseSchema:
+    """
+    テキストのトークン数を計算する
+    
+    Args:
+        request: トークン数計算リクエスト
+        service: VLMサービス
+        
+    Returns:
+        トークン数計算レスポンス
+        
+    Raises:
+        HTTPException: モデルが見つからない場合など
+    """
+    try:
+        counts = await service.count_tokens(request.model_id, request.texts)
+        model = await service.get_model_by_id(request.model_id)
     except DomainException as e:
-        logger.error(f"Domain error: {e}")
+        raise _to_http_exception(e)
+    
+    context_size = (model.parameters or {}).get("context_size")
+    return TokenizeResponseSchema(
+        model_id=request.model_id,
+        context_size=context_size,
+        results=[
+            TokenizeResultSchema(
+                index=index,
+                tokens=count,
+                fits=count + request.max_tokens <= context_size if context_size else None
+            )
+            for index, count in enumerate(counts)
+        ],
+        total_tokens=sum(counts)
+    )
+
+
+@router.get(
+    "/stats",
+    response_model=StatsResponseSchema,
+    summary="VLMクライアントの統計情報を取得",
+    description=(
+        "モデルごとのバッチサイズやキュー待ち時間、同時実行数の上限と"
+        "実行中・待機中のリクエスト数などの統計情報を返します。"
+    ),
+)
+async def get_stats(
+    service: Annotated[VLMService, Depends(get_vlm_service)]
+) -> StatsResponseSchema:
+    """
+    VLMクライアントの統計情報を取得する
+    
+    Args:
+        service: VLMサービス
+        
+    Returns:
+        統計情報レスポンス
+    """
+    try:
+        return StatsResponseSchema(models=await service.get_stats())
+    except Exception as e:
+        logger.exception("Error retrieving stats")
         raise HTTPException(
-            status_code=400,
+            status_code=500,
             detail=ErrorResponseSchema(
-                error="DomainError",
-                message=str(e)
+                error="InternalServerError",
+                message="Failed to retrieve stats",
+                details={"error": str(e)}
             ).dict()
         )
-    except Exception as e:
-        logger.exception("Unexpected error during text generation")
+
+
+@metrics_router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus形式のメトリクスを取得",
+    description=(
+        "モデルごとのリクエスト数・エラー数・レイテンシ・生成速度・キュー待ち時間と、"
+        "ルートでのスキーマ変換時間をPrometheusのテキスト形式で返します。"
+    ),
+)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Prometheus形式のメトリクスを取得する
+    
+    Returns:
+        テキスト形式のメトリクス
+    """
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@admin_router.get(
+    "/models",
+    response_model=ModelResidencyListResponseSchema,
+    summary="モデルのロード状態の一覧を取得",
+    description="登録済みのすべてのモデルについて、メモリへのロード状態とメモリ使用量を返します。",
+)
+async def list_model_residency(
+    service: Annotated[VLMService, Depends(get_vlm_service)]
+) -> ModelResidencyListResponseSchema:
+    """
+    モデルのロード状態の一覧を取得する
+    
+    Args:
+        service: VLMサービス
+        
+    Returns:
+        ロード状態一覧レスポンス
+    """
+    models = []
+    for model, resident in await service.get_model_residency():
+        resident = resident or {}
+        models.append(
+            ModelResidencySchema(
+                id=model.id,
+                name=model.name,
+                resident=bool(resident),
+                pinned=resident.get("pinned", False),
+                memory_bytes=resident.get("memory_bytes", 0),
+                in_flight=resident.get("in_flight", 0),
+                loaded_at=resident.get("loaded_at"),
+                last_used=resident.get("last_used")
+            )
+        )
+    return ModelResidencyListResponseSchema(
+        models=models,
+        used_bytes=sum(model.memory_bytes for model in models)
+    )
+
+
+@admin_router.post(
+    "/models/{model_id}/load",
+    response_model=ModelResidencyListResponseSchema,
+    summary="モデルをロード",
+    description=(
+        "指定されたモデルをメモリにロードします。メモリ予算が足りない場合は、"
+        "固定されていないモデルを最も長く使われていないものから順にアンロードします。"
+    ),
+)
+async def load_model(
+    model_id: Annotated[str, Path(description="VLMモデルのID")],
+    service: Annotated[VLMService, Depends(get_vlm_service)]
+) -> ModelResidencyListResponseSchema:
+    """
+    モデルをロードする
+    
+    Args:
+        model_id: VLMモデルのID
+        service: VLMサービス
+        
+    Returns:
+        ロード後のロード状態一覧レスポンス
+        
+    Raises:
+        HTTPException: モデルが見つからない場合やメモリ予算内にロードできない場合
+    """
+    try:
+        await service.load_model(model_id)
+    except DomainException as e:
+        raise _to_http_exception(e)
+    return await list_model_residency(service)
+
+
+@admin_router.post(
+    "/models/{model_id}/unload",
+    response_model=ModelResidencyListResponseSchema,
+    summary="モデルをアンロード",
+    description=(
+        "指定されたモデルを処理中のリクエストの完了後にアンロードします。"
+        "アンロードされたモデルは次のリクエスト時に再ロードされます。"
+    ),
+)
+async def unload_model(
+    model_id: Annotated[str, Path(description="VLMモデルのID")],
+    service: Annotated[VLMService, Depends(get_vlm_service)]
+) -> ModelResidencyListResponseSchema:
+    """
+    モデルをアンロードする
+    
+    Args:
+        model_id: VLMモデルのID
+        service: VLMサービス
+        
+    Returns:
+        アンロード後のロード状態一覧レスポンス
+        
+    Raises:
+        HTTPException: モデルが見つからない場合
+    """
+    try:
+        await service.unload_model(model_id)
+    except DomainException as e:
+        raise _to_http_exception(e)
+    return await list_model_residency(service)
+
+
+@admin_router.post(
+    "/registry/reload",
+    response_model=RegistryReloadResponseSchema,
+    summary="モデルレジストリを再読み込み",
+    description=(
+        "モデルレジストリのファイルを読み込み直し、モデルの追加・削除・設定の変更を反映します。"
+        "設定が変わったロード済みのモデルは、新しいクライアントのロード後に切り替わります。"
+    ),
+)
+async def reload_model_registry(
+    registry: Annotated[ModelRegistryWatcher, Depends(get_model_registry)]
+) -> RegistryReloadResponseSchema:
+    """
+    モデルレジストリを再読み込みする
+    
+    Args:
+        registry: モデルレジストリの監視
+        
+    Returns:
+        追加・削除・変更されたモデルIDのレスポンス
+        
+    Raises:
+        HTTPException: ファイルを読み込めない場合や形式が正しくない場合
+    """
+    try:
+        changes = await registry.reload()
+    except (OSError, ValueError) as e:
         raise HTTPException(
-            status_code=500,
+            status_code=400,
             detail=ErrorResponseSchema(
-                error="InternalServerError",
-                message="An unexpected error occurred",
+                error="InvalidRegistry",
+                message=f"Failed to reload model registry {registry.path}",
                 details={"error": str(e)}
             ).dict()
-        )
\ No newline at end of file
+        )
+    return RegistryReloadResponseSchema(**changes)
@@ -1,7 +1,11 @@
 """APIスキーマの定義モジュール"""
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+
+# 1リクエストで渡せる画像の最大数
+MAX_IMAGES_PER_REQUEST = 16
 
 
 class ModelParametersSchema(BaseModel):
@@ -18,7 +22,22 @@ class VLMModelSchema(BaseModel):
     id: str = Field(..., description="モデルID")
     name: str = Field(..., description="モデル名")
     description: Optional[str] = Field(None, description="モデルの説明")
-    parameters: Optional[Dict[str, any]] = Field(None, description="モデルのパラメータ")
+    parameters: Optional[Dict[str, Any]] = Field(None, description="モデルのパラメータ")
+
+
+class ImageInputSchema(BaseModel):
+    """画像入力のスキーマ（dataまたはurlのどちらか一方を指定する）"""
+    data: Optional[str] = Field(None, description="Base64エンコードされた画像、またはdata URL")
+    url: Optional[str] = Field(
+        None, description="サーバーのローカルファイルのfile:// URL（許可されたディレクトリのみ）またはdata URL"
+    )
+    
+    @model_validator(mode="after")
+    def check_source(self) -> "ImageInputSchema":
+        """dataとurlのどちらか一方だけが指定されていることを検証する"""
+        if (self.data is None) == (self.url is None):
+            raise ValueError("exactly one of data or url must be specified")
+        return self
 
 
 class PromptRequestSchema(BaseModel):
@@ -26,6 +45,13 @@ class PromptRequestSchema(BaseModel):
     model_id: str = Field(..., description="使用するVLMモデルのID")
     prompt: str = Field(..., description="プロンプトテキスト")
     parameters: Optional[ModelParametersSchema] = Field(None, description="モデルパラメータ")
+    priority: int = Field(0, description="優先度（大きいほど先に処理される）", ge=-100, le=100)
+    deadline: Optional[float] = Field(
+        None, description="処理を開始しなければならない期限（リクエストを受け付けてからの秒数）", gt=0
+    )
+    images: Optional[List[ImageInputSchema]] = Field(
+        None, description="プロンプトと一緒に渡す画像のリスト", max_length=MAX_IMAGES_PER_REQUEST
+    )
 
 
 class VLMResponseSchema(BaseModel):
@@ -34,16 +60,122 @@ class VLMResponseSchema(BaseModel):
     prompt: str = Field(..., description="入力プロンプト")
     text: str = Field(..., description="生成されたテキスト")
     tokens_used: int = Field(..., description="使用されたトークン数")
-    metadata: Optional[Dict[str, any]] = Field(None, description="レスポンスのメタデータ")
+    prompt_tokens: Optional[int] = Field(None, description="プロンプトのトークン数")
+    completion_tokens: Optional[int] = Field(None, description="生成されたテキストのトークン数")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="レスポンスのメタデータ")
+
+
+class VLMResponseChunkSchema(BaseModel):
+    """ストリーミングレスポンスの断片のスキーマ"""
+    model_id: str = Field(..., description="使用したVLMモデルのID")
+    index: int = Field(..., description="断片の通し番号")
+    text: str = Field(..., description="生成されたテキストの断片")
+    finish_reason: Optional[str] = Field(None, description="生成終了の理由（最後の断片のみ）")
+    tokens_used: int = Field(0, description="使用されたトークン数（最後の断片のみ）")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="レスポンスのメタデータ（最後の断片のみ）")
 
 
 class ErrorResponseSchema(BaseModel):
     """エラーレスポンスのスキーマ"""
     error: str = Field(..., description="エラータイプ")
     message: str = Field(..., description="エラーメッセージ")
-    details: Optional[Dict[str, any]] = Field(None, description="エラーの詳細情報")
+    details: Optional[Dict[str, Any]] = Field(None, description="エラーの詳細情報")
+
+
+class BatchPromptRequestSchema(BaseModel):
+    """一括プロンプトリクエストのスキーマ"""
+    requests: List[PromptRequestSchema] = Field(
+        ..., description="プロンプトリクエストのリスト（異なるモデルを混在可能）", min_length=1, max_length=10000
+    )
+
+
+class BatchItemResultSchema(BaseModel):
+    """一括処理の各リクエストの結果のスキーマ"""
+    index: int = Field(..., description="リクエストリスト内の位置")
+    status_code: int = Field(..., description="単独で処理した場合のHTTPステータスコード")
+    response: Optional[VLMResponseSchema] = Field(None, description="成功した場合のレスポンス")
+    error: Optional[ErrorResponseSchema] = Field(None, description="失敗した場合のエラー")
+
+
+class BatchResponseSchema(BaseModel):
+    """一括処理レスポンスのスキーマ"""
+    results: List[BatchItemResultSchema] = Field(..., description="リクエストと同じ順序の結果のリスト")
+    succeeded: int = Field(..., description="成功したリクエスト数")
+    failed: int = Field(..., description="失敗したリクエスト数")
+
+
+class JobSubmitRequestSchema(PromptRequestSchema):
+    """ジョブ投入リクエストのスキーマ"""
+
+
+class JobSchema(BaseModel):
+    """非同期ジョブのスキーマ"""
+    id: str = Field(..., description="ジョブID")
+    status: str = Field(..., description="ジョブの状態（pending, running, succeeded, failed）")
+    model_id: str = Field(..., description="使用するVLMモデルのID")
+    priority: int = Field(..., description="優先度")
+    created_at: float = Field(..., description="投入時刻（UNIX時間）")
+    started_at: Optional[float] = Field(None, description="実行開始時刻（UNIX時間）")
+    finished_at: Optional[float] = Field(None, description="終了時刻（UNIX時間）")
+    response: Optional[VLMResponseSchema] = Field(None, description="成功した場合のレスポンス")
+    error: Optional[ErrorResponseSchema] = Field(None, description="失敗した場合のエラー")
+
+
+class ModelResidencySchema(BaseModel):
+    """モデルのロード状態のスキーマ"""
+    id: str = Field(..., description="モデルID")
+    name: str = Field(..., description="モデル名")
+    resident: bool = Field(..., description="メモリにロードされているかどうか")
+    pinned: bool = Field(False, description="アンロードの対象外かどうか")
+    memory_bytes: int = Field(0, description="メモリ使用量（バイト）")
+    in_flight: int = Field(0, description="処理中のリクエスト数")
+    loaded_at: Optional[float] = Field(None, description="ロード時刻（UNIX時間）")
+    last_used: Optional[float] = Field(None, description="最終使用時刻（UNIX時間）")
+
+
+class ModelResidencyListResponseSchema(BaseModel):
+    """モデルのロード状態一覧レスポンスのスキーマ"""
+    models: List[ModelResidencySchema] = Field(..., description="登録済みモデルのロード状態のリスト")
+    used_bytes: int = Field(..., description="ロード済みモデルのメモリ使用量の合計（バイト）")
+
+
+class RegistryReloadResponseSchema(BaseModel):
+    """モデルレジストリの再読み込みレスポンスのスキーマ"""
+    added: List[str] = Field(..., description="追加されたモデルIDのリスト")
+    removed: List[str] = Field(..., description="削除されたモデルIDのリスト")
+    updated: List[str] = Field(..., description="設定が変更されたモデルIDのリスト")
+    failed: List[str] = Field([], description="新しい設定のロードに失敗し、現在の設定を使い続けているモデルIDのリスト")
+
+
+class TokenizeRequestSchema(BaseModel):
+    """トークン数計算リクエストのスキーマ"""
+    model_id: str = Field(..., description="トークナイザーを使用するVLMモデルのID")
+    texts: List[str] = Field(..., description="トークン数を数えるテキストのリスト", min_length=1, max_length=1000)
+    max_tokens: int = Field(0, description="コンテキスト長の判定で加算する生成トークン数", ge=0)
+
+
+class TokenizeResultSchema(BaseModel):
+    """テキストごとのトークン数のスキーマ"""
+    index: int = Field(..., description="リクエスト内での位置")
+    tokens: int = Field(..., description="トークン数")
+    fits: Optional[bool] = Field(
+        None, description="生成トークン数を含めてコンテキスト長に収まるかどうか（コンテキスト長が不明な場合はnull）"
+    )
+
+
+class TokenizeResponseSchema(BaseModel):
+    """トークン数計算レスポンスのスキーマ"""
+    model_id: str = Field(..., description="VLMモデルのID")
+    context_size: Optional[int] = Field(None, description="モデルのコンテキスト長")
+    results: List[TokenizeResultSchema] = Field(..., description="リクエストと同じ順序の結果のリスト")
+    total_tokens: int = Field(..., description="トークン数の合計")
 
 
 class ModelsListResponseSchema(BaseModel):
     """モデル一覧レスポンスのスキーマ"""
-    models: List[VLMModelSchema] = Field(..., description="利用可能なモデルのリスト")
\ No newline at end of file
+    models: List[VLMModelSchema] = Field(..., description="利用可能なモデルのリスト")
+
+
+class StatsResponseSchema(BaseModel):
+    """統計情報レスポンスのスキーマ"""
+    models: Dict[str, Dict[str, Any]] = Field(..., description="モデルIDをキーとするクライアント統計情報")
\ No newline at end of file
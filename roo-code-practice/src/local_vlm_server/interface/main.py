@@ -1,5 +1,6 @@
 """FastAPIメインアプリケーションモジュール"""
 import logging
+import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -7,6 +8,20 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from ..domain.exceptions import DomainException
+from .api.dependencies import (
+    MODEL_REGISTRY_CONFIG,
+    MODEL_RESIDENCY_CONFIG,
+    get_image_processor,
+    get_job_queue,
+    get_job_store,
+    get_model_registry,
+    get_rate_limiter,
+    get_tokenizer_service,
+    get_vlm_repository,
+    get_vlm_service,
+)
+from .api.responses import ORJSONResponse
+from .api.routes import admin_router, metrics_router
 from .api.routes import router as api_router
 
 
@@ -28,11 +43,32 @@ async def lifespan(app: FastAPI):
     """
     # 起動時の処理
     logger.info("Starting Local VLM Server")
+    repository = get_vlm_repository()
+    registry = get_model_registry(repository)
+    if os.path.exists(registry.path):
+        await registry.reload(warm=False)
+    else:
+        logger.warning(f"Model registry {registry.path} does not exist; no models are registered")
+    if MODEL_REGISTRY_CONFIG["watch"]:
+        await registry.start()
+    if MODEL_RESIDENCY_CONFIG["warm_up"]:
+        await repository.warm_up()
+    job_store = get_job_store()
+    image_processor = get_image_processor(repository)
+    service = get_vlm_service(repository, get_tokenizer_service(repository), image_processor)
+    job_queue = get_job_queue(service, job_store)
+    await job_queue.start()
     
     yield
     
     # シャットダウン時の処理
     logger.info("Shutting down Local VLM Server")
+    await registry.stop()
+    await job_queue.stop()
+    await job_store.close()
+    await get_rate_limiter().store.close()
+    image_processor.close()
+    await repository.close()
 
 
 # FastAPIアプリケーションの作成
@@ -41,6 +77,7 @@ app = FastAPI(
     description="複数のローカルVLMとプロンプトを引数にとり、引数に応じて別のVLMを呼び出すWebAPI",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORSミドルウェアの追加
@@ -54,6 +91,8 @@ app.add_middleware(
 
 # ルーターの登録
 app.include_router(api_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 # ルートエンドポイント
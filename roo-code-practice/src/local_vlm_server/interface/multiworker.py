@@ -0,0 +1,223 @@
+"""複数ワーカー構成でサーバーを起動するモジュール
+
+モデルレジストリのモデルごとにモデルホストのプロセスを起動してから、uvicornの複数のワーカーで
+APIを起動する。APIワーカーはモデルをロードせず、Unixドメインソケットでモデルホストに
+リクエストを転送するため、ワーカーを増やしてもモデルのメモリは増えない。
+
+    python -m src.local_vlm_server.interface.multiworker --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from ..infrastructure.model_host import ModelHostServer, socket_path_for
+from ..infrastructure.model_registry import ModelRegistryWatcher, load_registry_file
+from ..infrastructure.vlm_repository import VLMRepository
+from .api.dependencies import MODEL_REGISTRY_CONFIG
+
+
+logger = logging.getLogger(__name__)
+
+
+async def serve_model_host(
+    model_id: str,
+    registry_path: str,
+    socket_path: str,
+    watch: bool = True,
+    poll_interval: float = 2.0,
+    stop_event: Optional[asyncio.Event] = None
+):
+    """
+    1つのモデルをロードし、ソケットでAPIワーカーに提供する
+
+    モデルレジストリのこのモデルの設定の変更は、再起動せずに反映する。
+
+    Args:
+        model_id: 提供するVLMモデルのID
+        registry_path: モデルレジストリのファイルのパス
+        socket_path: 待ち受けるUnixドメインソケットのパス
+        watch: モデルレジストリの変更を監視するかどうか
+        poll_interval: モデルレジストリの変更を確認する間隔（秒）
+        stop_event: 停止を指示するイベント（Noneの場合はSIGTERMまたはSIGINTで停止する）
+
+    Raises:
+        ValueError: モデルがモデルレジストリにない場合
+    """
+    repository = VLMRepository()
+    registry = ModelRegistryWatcher(
+        registry_path, repository, poll_interval=poll_interval, model_ids=[model_id]
+    )
+    server = ModelHostServer(repository, model_id, socket_path)
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop_event.set)
+
+    try:
+        await registry.reload()
+        if await repository.get_model_by_id(model_id) is None:
+            raise ValueError(f"Model {model_id} is not defined in {registry_path}")
+        # モデルのロードが完了してから待ち受けを開始する
+        await repository.get_client_for_model(model_id)
+        await server.start()
+        if watch:
+            await registry.start()
+        await stop_event.wait()
+    finally:
+        await registry.stop()
+        await server.stop()
+        await repository.close()
+
+
+def run_model_host(model_id: str, registry_path: str, socket_path: str, watch: bool, poll_interval: float):
+    """
+    モデルホストのプロセスのエントリーポイント
+
+    Args:
+        model_id: 提供するVLMモデルのID
+        registry_path: モデルレジストリのファイルのパス
+        socket_path: 待ち受けるUnixドメインソケットのパス
+        watch: モデルレジストリの変更を監視するかどうか
+        poll_interval: モデルレジストリの変更を確認する間隔（秒）
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - model-host[{model_id}] - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(serve_model_host(model_id, registry_path, socket_path, watch, poll_interval))
+
+
+def start_model_hosts(
+    registry_path: str,
+    socket_dir: str,
+    startup_timeout: float = 300.0,
+    watch: bool = True,
+    poll_interval: float = 2.0
+) -> Dict[str, multiprocessing.Process]:
+    """
+    モデルレジストリのモデルごとにモデルホストのプロセスを起動し、待ち受けの開始を待つ
+
+    Args:
+        registry_path: モデルレジストリのファイルのパス
+        socket_dir: ソケットを置くディレクトリ
+        startup_timeout: モデルのロードと待ち受けの開始を待つ最大時間（秒）
+        watch: モデルレジストリの変更をモデルホストで監視するかどうか
+        poll_interval: モデルレジストリの変更を確認する間隔（秒）
+
+    Returns:
+        モデルIDをキーとするプロセスの辞書
+
+    Raises:
+        RuntimeError: モデルホストが起動できなかった場合（起動したプロセスは停止する）
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    for spec in load_registry_file(registry_path):
+        model_id = spec.model.id
+        socket_path = socket_path_for(socket_dir, model_id)
+        # 前回の起動で残ったソケットを待ち受けの開始と誤認しないよう、起動前に削除する
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        process = context.Process(
+            target=run_model_host,
+            args=(model_id, registry_path, socket_path, watch, poll_interval),
+            name=f"model-host-{model_id}"
+        )
+        process.start()
+        processes[model_id] = process
+        logger.info(f"Started model host for {model_id} (pid {process.pid})")
+
+    waiting: List[str] = list(processes)
+    deadline = time.monotonic() + startup_timeout
+    try:
+        while waiting:
+            for model_id in list(waiting):
+                if os.path.exists(socket_path_for(socket_dir, model_id)):
+                    waiting.remove(model_id)
+                elif not processes[model_id].is_alive():
+                    raise RuntimeError(
+                        f"Model host for {model_id} exited with code {processes[model_id].exitcode}"
+                    )
+            if waiting and time.monotonic() > deadline:
+                raise RuntimeError(f"Model hosts for {waiting} did not start within {startup_timeout}s")
+            time.sleep(0.1)
+    except Exception:
+        stop_model_hosts(processes)
+        raise
+    return processes
+
+
+def stop_model_hosts(processes: Dict[str, multiprocessing.Process], timeout: float = 30.0):
+    """
+    モデルホストのプロセスを停止する
+
+    SIGTERMで停止を指示し、時間内に終了しないプロセスは強制終了する。
+
+    Args:
+        processes: モデルIDをキーとするプロセスの辞書
+        timeout: 終了を待つ最大時間（秒）
+    """
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + timeout
+    for model_id, process in processes.items():
+        process.join(max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            logger.warning(f"Model host for {model_id} did not stop within {timeout}s; killing it")
+            process.kill()
+            process.join()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    モデルホストとAPIワーカーを起動する
+
+    Args:
+        argv: コマンドライン引数（Noneの場合はsys.argv）
+    """
+    parser = argparse.ArgumentParser(description="Run the Local VLM Server with several API workers")
+    parser.add_argument("--host", default="0.0.0.0", help="bind address of the API")
+    parser.add_argument("--port", type=int, default=8000, help="port of the API")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of API workers")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_CONFIG["path"], help="model registry file")
+    parser.add_argument("--socket-dir", help="directory for the model host sockets (default: a new temporary directory)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0, help="seconds to wait for models to load")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    registry_path = os.path.abspath(args.registry)
+    socket_dir = args.socket_dir or tempfile.mkdtemp(prefix="vlm-hosts-")
+    processes = start_model_hosts(
+        registry_path,
+        socket_dir,
+        startup_timeout=args.startup_timeout,
+        watch=MODEL_REGISTRY_CONFIG["watch"],
+        poll_interval=MODEL_REGISTRY_CONFIG["poll_interval"]
+    )
+
+    # APIワーカーは環境変数でモデルホストのソケットとモデルレジストリを受け取る
+    os.environ["VLM_MODEL_HOST_DIR"] = socket_dir
+    os.environ["VLM_MODEL_REGISTRY"] = registry_path
+    try:
+        uvicorn.run(
+            "src.local_vlm_server.interface.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+        )
+    finally:
+        stop_model_hosts(processes)
+
+
+if __name__ == "__main__":
+    main()
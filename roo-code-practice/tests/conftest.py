@@ -1,9 +1,11 @@
 """pytest設定ファイル"""
 import asyncio
+import json
 from typing import Dict, List, Optional
 
 import pytest
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.testclient import TestClient
 
 from src.local_vlm_server.application.interfaces import VLMClientInterface, VLMRepositoryInterface
@@ -11,6 +13,7 @@ from src.local_vlm_server.application.services import VLMService
 from src.local_vlm_server.domain.entities import Prompt, VLMModel, VLMResponse
 from src.local_vlm_server.domain.exceptions import VLMModelNotFoundError
 from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.tokenizers import TokenizerService
 from src.local_vlm_server.interface.main import app as main_app
 
 
@@ -37,6 +40,124 @@ class MockVLMClient(VLMClientInterface):
         )
 
 
+def make_request(i: int = 0, priority: int = 0, deadline: Optional[float] = None) -> VLMRequest:
+    """テスト用のVLMリクエストを作成する"""
+    return VLMRequest(prompt_text=f"prompt {i}", model_id="test-model", priority=priority, deadline=deadline)
+
+
+# OpenAI互換APIのスタブサーバー
+def create_openai_stub_app() -> FastAPI:
+    """Chat Completions APIを模したスタブASGIアプリケーションを作成する"""
+    stub_app = FastAPI()
+    stub_app.state.requests = []
+    
+    def reply_for(prompt: str) -> str:
+        prompt_lower = prompt.lower()
+        if "hello" in prompt_lower or "こんにちは" in prompt_lower:
+            return "こんにちは！GPTモデルです。どのようにお手伝いできますか？"
+        if "help" in prompt_lower or "助けて" in prompt_lower:
+            return "どのようなことでお困りですか？具体的に教えていただければ、お手伝いします。"
+        return f"あなたのプロンプト「{prompt[:30]}...」を受け取りました。GPTモデルからの応答です。"
+    
+    @stub_app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub_app.state.requests.append({"body": body, "headers": dict(request.headers)})
+        content = body["messages"][-1]["content"]
+        if isinstance(content, list):
+            # 画像を含むコンテンツはテキストのパートだけを使う
+            content = " ".join(part["text"] for part in content if part["type"] == "text")
+        text = reply_for(content)
+        
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"total_tokens": len(text) // 4}
+            }
+        
+        async def events():
+            pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+            for i, piece in enumerate(pieces):
+                finish_reason = "stop" if i == len(pieces) - 1 else None
+                event = {"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": finish_reason}]}
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    return stub_app
+
+
+@pytest.fixture
+def openai_stub_app():
+    """OpenAI互換APIのスタブサーバーのフィクスチャ"""
+    return create_openai_stub_app()
+
+
+# Ollama APIのスタブサーバー
+def create_ollama_stub_app(models: Optional[List[str]] = None) -> FastAPI:
+    """Ollamaの/api/generateを模したスタブASGIアプリケーションを作成する"""
+    stub_app = FastAPI()
+    stub_app.state.requests = []
+    stub_app.state.loaded = set()
+    available = set(models or ["gemma3:4b"])
+    
+    @stub_app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        stub_app.state.requests.append(body)
+        model = body["model"]
+        if model == "unavailable":
+            return JSONResponse({"error": "server busy"}, status_code=503)
+        if model not in available:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        
+        # 未ロードのモデルは最初のリクエストでロードされる
+        load_duration = 1_000_000 if model in stub_app.state.loaded else 2_000_000_000
+        if body.get("keep_alive") == 0:
+            stub_app.state.loaded.discard(model)
+            return {"model": model, "response": "", "done": True, "done_reason": "unload"}
+        stub_app.state.loaded.add(model)
+        if "prompt" not in body:
+            return {"model": model, "response": "", "done": True, "done_reason": "load"}
+        
+        text = f"{len(body.get('images', []))}枚の画像とプロンプト「{body['prompt']}」を受け取りました。"
+        final = {
+            "model": model,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": load_duration + 50_000_000,
+            "load_duration": load_duration,
+            "prompt_eval_count": len(body["prompt"]),
+            "eval_count": len(text),
+            "eval_duration": 40_000_000,
+        }
+        if not body.get("stream", True):
+            return {**final, "response": text}
+        
+        async def lines():
+            for i in range(0, len(text), 4):
+                yield json.dumps({"model": model, "response": text[i:i + 4], "done": False}, ensure_ascii=False) + "\n"
+            yield json.dumps({**final, "response": ""}) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    return stub_app
+
+
+@pytest.fixture
+def ollama_stub_app():
+    """Ollama APIのスタブサーバーのフィクスチャ"""
+    return create_ollama_stub_app()
+
+
 # モックVLMリポジトリ
 class MockVLMRepository(VLMRepositoryInterface):
     """テスト用のモックVLMリポジトリ"""
@@ -87,20 +208,19 @@ def mock_vlm_service(mock_vlm_repository):
 
 
 @pytest.fixture
-def test_app(mock_vlm_repository, monkeypatch):
+def test_app(mock_vlm_repository):
     """テスト用アプリケーションのフィクスチャ"""
     # 依存関係の注入をモックに置き換え
-    from src.local_vlm_server.interface.api.dependencies import get_vlm_repository
-    
-    async def mock_get_vlm_repository():
-        return mock_vlm_repository
+    from src.local_vlm_server.interface.api.dependencies import get_vlm_service
     
-    monkeypatch.setattr(
-        "src.local_vlm_server.interface.api.dependencies.get_vlm_repository",
-        mock_get_vlm_repository
+    tokenizer = TokenizerService(lambda model_id: {"backend": "heuristic"})
+    main_app.dependency_overrides[get_vlm_service] = lambda: VLMService(
+        mock_vlm_repository, tokenizer=tokenizer
     )
     
-    return main_app
+    yield main_app
+    
+    main_app.dependency_overrides.clear()
 
 
 @pytest.fixture
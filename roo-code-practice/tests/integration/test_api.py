@@ -1,4 +1,5 @@
 """APIの統合テスト"""
+import base64
 import json
 
 import pytest
@@ -52,8 +53,8 @@ class TestAPIEndpoints:
         # レスポンスの検証
         assert response.status_code == 404
         data = response.json()
-        assert "error" in data
-        assert "ModelNotFound" in data["error"]
+        assert "error" in data["detail"]
+        assert "ModelNotFound" in data["detail"]["error"]
     
     def test_generate_text_success(self, test_client):
         """テキスト生成エンドポイント成功のテスト"""
@@ -102,8 +103,8 @@ class TestAPIEndpoints:
         # レスポンスの検証
         assert response.status_code == 404
         data = response.json()
-        assert "error" in data
-        assert "ModelNotFound" in data["error"]
+        assert "error" in data["detail"]
+        assert "ModelNotFound" in data["detail"]["error"]
     
     def test_generate_text_empty_prompt(self, test_client):
         """空プロンプトでのテキスト生成テスト"""
@@ -122,8 +123,8 @@ class TestAPIEndpoints:
         # レスポンスの検証
         assert response.status_code == 400
         data = response.json()
-        assert "error" in data
-        assert "InvalidPrompt" in data["error"]
+        assert "error" in data["detail"]
+        assert "InvalidPrompt" in data["detail"]["error"]
     
     def test_generate_text_invalid_parameters(self, test_client):
         """無効なパラメータでのテキスト生成テスト"""
@@ -145,4 +146,423 @@ class TestAPIEndpoints:
         # レスポンスの検証
         assert response.status_code == 422  # バリデーションエラー
         data = response.json()
-        assert "detail" in data
\ No newline at end of file
+        assert "detail" in data
+    
+    def test_generate_text_cache_control(self, test_client):
+        """Cache-Controlヘッダーでキャッシュを無効化できることのテスト"""
+        request_data = {
+            "model_id": "test-model-1",
+            "prompt": "Hello, world!",
+            "parameters": {"temperature": 0.0}
+        }
+        
+        # リクエスト送信
+        response = test_client.post(
+            "/api/v1/generate",
+            json=request_data,
+            headers={"Cache-Control": "no-cache"}
+        )
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+    
+    def test_generate_text_overloaded(self, test_client, mock_vlm_repository):
+        """モデル過負荷時に503とRetry-Afterが返ることのテスト"""
+        from src.local_vlm_server.domain.exceptions import VLMOverloadedError
+        
+        async def overloaded(request):
+            raise VLMOverloadedError("test-model-1", retry_after=3, details="queue is full")
+        
+        mock_vlm_repository.clients["test-model-1"].generate_response = overloaded
+        
+        # リクエスト送信
+        response = test_client.post(
+            "/api/v1/generate",
+            json={"model_id": "test-model-1", "prompt": "Hello, world!"}
+        )
+        
+        # レスポンスの検証
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+    
+    def test_generate_text_batch(self, test_client):
+        """一括生成エンドポイントのテスト"""
+        request_data = {
+            "requests": [
+                {"model_id": "test-model-1", "prompt": "Hello, world!"},
+                {"model_id": "nonexistent-model", "prompt": "Hello, world!"},
+                {"model_id": "test-model-2", "prompt": "Good night"},
+                {"model_id": "test-model-1", "prompt": ""},
+            ]
+        }
+        
+        # リクエスト送信
+        response = test_client.post("/api/v1/generate/batch", json=request_data)
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        results = data["results"]
+        assert [result["index"] for result in results] == [0, 1, 2, 3]
+        assert [result["status_code"] for result in results] == [200, 404, 200, 400]
+        assert results[0]["response"]["model_id"] == "test-model-1"
+        assert results[1]["error"]["error"] == "ModelNotFound"
+        assert results[2]["response"]["prompt"] == "Good night"
+        assert results[3]["error"]["error"] == "InvalidPrompt"
+    
+    def test_generate_text_with_image(self, test_client, mock_vlm_repository):
+        """Base64の画像を含むリクエストで画像がモデルに渡されることのテスト"""
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8 + b"IHDR" + b"\x00\x00\x00\x01" * 2
+        request_data = {
+            "model_id": "test-model-1",
+            "prompt": "What is in this image?",
+            "images": [{"data": base64.b64encode(png).decode("ascii")}]
+        }
+        
+        response = test_client.post("/api/v1/generate", json=request_data)
+        
+        assert response.status_code == 200
+        sent = mock_vlm_repository.clients["test-model-1"].requests[-1]
+        assert len(sent.images) == 1
+        assert sent.images[0].data == png
+        assert sent.images[0].media_type == "image/png"
+    
+    def test_generate_text_invalid_image(self, test_client):
+        """不正な画像や許可されていないファイルが拒否されることのテスト"""
+        base_request = {"model_id": "test-model-1", "prompt": "What is in this image?"}
+        
+        not_image = test_client.post("/api/v1/generate", json={
+            **base_request, "images": [{"data": base64.b64encode(b"text").decode("ascii")}]
+        })
+        local_file = test_client.post("/api/v1/generate", json={
+            **base_request, "images": [{"url": "file:///etc/passwd"}]
+        })
+        both = test_client.post("/api/v1/generate", json={
+            **base_request, "images": [{"data": "AAAA", "url": "file:///etc/passwd"}]
+        })
+        
+        assert not_image.status_code == 400
+        assert not_image.json()["detail"]["error"] == "InvalidImage"
+        assert local_file.status_code == 400
+        assert both.status_code == 422
+    
+    def test_generate_text_upload(self, test_client, mock_vlm_repository):
+        """multipart/form-dataでアップロードした画像がモデルに渡されることのテスト"""
+        pytest.importorskip("python_multipart")
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8 + b"IHDR" + b"\x00\x00\x00\x01" * 2
+        
+        response = test_client.post(
+            "/api/v1/generate/upload",
+            data={"model_id": "test-model-1", "prompt": "What is in this image?", "parameters": '{"max_tokens": 64}'},
+            files=[("images", ("cat.png", png, "image/png"))]
+        )
+        
+        assert response.status_code == 200
+        sent = mock_vlm_repository.clients["test-model-1"].requests[-1]
+        assert sent.images[0].data == png
+        assert sent.parameters.max_tokens == 64
+    
+    def test_generate_text_batch_empty(self, test_client):
+        """空の一括リクエストが拒否されることのテスト"""
+        response = test_client.post("/api/v1/generate/batch", json={"requests": []})
+        
+        assert response.status_code == 422
+    
+    def test_generate_text_stream(self, test_client):
+        """ストリーミング生成エンドポイントのテスト"""
+        request_data = {
+            "model_id": "test-model-1",
+            "prompt": "Hello, world!"
+        }
+        
+        # リクエスト送信
+        response = test_client.post(
+            "/api/v1/generate/stream",
+            json=request_data
+        )
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        assert len(lines) >= 1
+        assert all(line["model_id"] == "test-model-1" for line in lines)
+        assert lines[-1]["finish_reason"] == "stop"
+    
+    def test_generate_text_stream_invalid_model(self, test_client):
+        """存在しないモデルでのストリーミング生成テスト"""
+        response = test_client.post(
+            "/api/v1/generate/stream",
+            json={"model_id": "nonexistent-model", "prompt": "Hello, world!"}
+        )
+        
+        # ストリーミング開始前にエラーが返ること
+        assert response.status_code == 404
+    
+    def test_submit_and_poll_job(self, test_app, mock_vlm_repository):
+        """ジョブの投入とロングポーリングによる結果取得のテスト"""
+        from src.local_vlm_server.application.job_queue import JobQueue
+        from src.local_vlm_server.application.services import VLMService
+        from src.local_vlm_server.infrastructure.job_store import InMemoryJobStore
+        from src.local_vlm_server.interface.api.dependencies import get_job_queue
+        
+        job_queue = JobQueue(VLMService(mock_vlm_repository), InMemoryJobStore())
+        test_app.dependency_overrides[get_job_queue] = lambda: job_queue
+        
+        # ワーカーが動き続けるようにアプリケーションのライフスパン内でリクエストする
+        with TestClient(test_app) as client:
+            response = client.post(
+                "/api/v1/jobs",
+                json={"model_id": "test-model-1", "prompt": "Hello, world!", "priority": 5}
+            )
+            assert response.status_code == 202
+            job = response.json()
+            assert job["status"] in ("pending", "running")
+            assert response.headers["Location"] == f"/api/v1/jobs/{job['id']}"
+            
+            response = client.get(f"/api/v1/jobs/{job['id']}", params={"wait": 5})
+            assert response.status_code == 200
+            data = response.json()
+            assert data["status"] == "succeeded"
+            assert data["priority"] == 5
+            assert data["response"]["model_id"] == "test-model-1"
+            
+            # 存在しないジョブ・モデル
+            assert client.get("/api/v1/jobs/missing").status_code == 404
+            response = client.post(
+                "/api/v1/jobs",
+                json={"model_id": "nonexistent-model", "prompt": "Hello, world!"}
+            )
+            assert response.status_code == 404
+    
+    def test_get_stats(self, test_client):
+        """統計情報取得エンドポイントのテスト"""
+        response = test_client.get("/api/v1/stats")
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        data = response.json()
+        assert "models" in data
+    
+    def test_metrics(self, test_client):
+        """Prometheus形式のメトリクスエンドポイントのテスト"""
+        test_client.post(
+            "/api/v1/generate",
+            json={"model_id": "test-model-1", "prompt": "Hello, world!"}
+        )
+        
+        response = test_client.get("/metrics")
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE vlm_requests_total counter" in response.text
+        assert 'vlm_schema_conversion_seconds_count{route="generate"}' in response.text
+    
+    def test_admin_models(self, test_client, mock_vlm_repository):
+        """モデルのロード状態の管理エンドポイントのテスト"""
+        response = test_client.get("/api/v1/admin/models")
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        data = response.json()
+        assert [model["id"] for model in data["models"]] == ["test-model-1", "test-model-2"]
+        assert all(not model["resident"] for model in data["models"])
+        
+        # モックリポジトリはアンロードに対応していない
+        response = test_client.post("/api/v1/admin/models/test-model-1/load")
+        assert response.status_code == 200
+        response = test_client.post("/api/v1/admin/models/test-model-1/unload")
+        assert response.status_code == 200
+        
+        response = test_client.post("/api/v1/admin/models/nonexistent-model/load")
+        assert response.status_code == 404
+    
+    def test_tokenize(self, test_client):
+        """トークン数計算エンドポイントのテスト"""
+        response = test_client.post(
+            "/api/v1/tokenize",
+            json={"model_id": "test-model-1", "texts": ["こんにちは", "Hello, world!"]}
+        )
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        data = response.json()
+        assert [result["tokens"] for result in data["results"]] == [5, 6]
+        assert data["total_tokens"] == 11
+        # テスト用モデルにはコンテキスト長が設定されていない
+        assert data["context_size"] is None
+        assert data["results"][0]["fits"] is None
+        
+        # 存在しないモデル
+        response = test_client.post(
+            "/api/v1/tokenize",
+            json={"model_id": "nonexistent-model", "texts": ["Hello"]}
+        )
+        assert response.status_code == 404
+    
+    def test_generate_text_token_counts(self, test_client):
+        """生成レスポンスにプロンプトと生成結果のトークン数が含まれることのテスト"""
+        response = test_client.post(
+            "/api/v1/generate",
+            json={"model_id": "test-model-1", "prompt": "Hello, world!"}
+        )
+        
+        # レスポンスの検証
+        assert response.status_code == 200
+        data = response.json()
+        assert data["prompt_tokens"] == 6
+        assert data["tokens_used"] == data["prompt_tokens"] + data["completion_tokens"]    
+    def test_generate_text_rate_limited(self, test_app):
+        """APIキーごとのレート制限を超えたリクエストが429で拒否されることのテスト"""
+        from src.local_vlm_server.infrastructure.rate_limit import InMemoryRateLimitStore, RateLimiter
+        from src.local_vlm_server.interface.api.dependencies import get_rate_limiter
+        
+        rate_limiter = RateLimiter(
+            InMemoryRateLimitStore(),
+            requests_per_second=0.01,
+            burst=1,
+            tenants={"premium-key": {"requests_per_second": 100, "burst": 100}}
+        )
+        test_app.dependency_overrides[get_rate_limiter] = lambda: rate_limiter
+        client = TestClient(test_app)
+        payload = {"model_id": "test-model-1", "prompt": "Hello, world!"}
+        
+        response = client.post("/api/v1/generate", json=payload, headers={"X-API-Key": "free-key"})
+        assert response.status_code == 200
+        
+        response = client.post("/api/v1/generate", json=payload, headers={"X-API-Key": "free-key"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["detail"]["error"] == "RateLimitExceeded"
+        
+        # 別のAPIキーの制限は独立している
+        for _ in range(3):
+            response = client.post(
+                "/api/v1/generate",
+                json=payload,
+                headers={"Authorization": "Bearer premium-key"}
+            )
+            assert response.status_code == 200
+    
+    @pytest.mark.asyncio
+    async def test_generate_text_cancelled_on_disconnect(self, test_app, mock_vlm_repository):
+        """クライアントが切断すると生成がキャンセルされ、メトリクスに記録されることのテスト"""
+        import asyncio
+        
+        from src.local_vlm_server.infrastructure.metrics import CANCELLED_REQUESTS_TOTAL
+        from src.local_vlm_server.infrastructure.vlm_clients.instrumented import InstrumentedVLMClient
+        from tests.conftest import MockVLMClient
+        
+        class SlowMockVLMClient(MockVLMClient):
+            def __init__(self, model_id):
+                super().__init__(model_id)
+                self.cancelled = False
+            
+            async def generate_response(self, request):
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    self.cancelled = True
+                    raise
+                return await super().generate_response(request)
+        
+        backend = SlowMockVLMClient("test-model-1")
+        mock_vlm_repository.clients["test-model-1"] = InstrumentedVLMClient(backend)
+        cancelled_metric = CANCELLED_REQUESTS_TOTAL.labels("test-model-1", "generate")
+        cancelled_before = cancelled_metric.value
+        
+        # 本文を送った後、応答を待たずに切断するクライアントをASGIレベルで再現する
+        body = json.dumps({"model_id": "test-model-1", "prompt": "Hello, world!"}).encode()
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+        
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/api/v1/generate",
+            "raw_path": b"/api/v1/generate",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+        }
+        await asyncio.wait_for(test_app(scope, receive, send), timeout=2.0)
+        
+        assert backend.cancelled
+        assert sent[0]["status"] == 499
+        assert cancelled_metric.value == cancelled_before + 1
+
+
+class TestResponseEncoding:
+    """レスポンスのエンコードのテスト"""
+    
+    def test_generate_response_matches_schema(self):
+        """直接エンコードしたVLMレスポンスがスキーマを経由した場合と同じJSONになることのテスト"""
+        from src.local_vlm_server.domain.entities import Prompt, VLMResponse
+        from src.local_vlm_server.interface.api.responses import encode_vlm_response
+        from src.local_vlm_server.interface.api.routes import _to_response_schema
+        
+        vlm_response = VLMResponse(
+            model_id="test-model-1",
+            prompt=Prompt(text="こんにちは \"world\""),
+            text="生成されたテキスト\n",
+            tokens_used=12,
+            prompt_tokens=4,
+            completion_tokens=8,
+            metadata={"cached": False, "latency_ms": 1.5, "stop": ["\n"], "nested": {"a": None}}
+        )
+        
+        assert json.loads(encode_vlm_response(vlm_response)) == (
+            _to_response_schema(vlm_response).model_dump(mode="json")
+        )
+    
+    def test_list_models_cached_until_registry_changes(self, test_app):
+        """モデル一覧のJSONがモデルの登録が変わるまで再利用されることのテスト"""
+        from src.local_vlm_server.application.services import VLMService
+        from src.local_vlm_server.domain.entities import VLMModel
+        from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+        from src.local_vlm_server.interface.api.dependencies import get_vlm_service
+        from src.local_vlm_server.interface.api.routes import _models_list_cache
+        
+        repository = VLMRepository()
+        repository.register_model(VLMModel(id="model-a", name="Model A"), "llama", {})
+        test_app.dependency_overrides[get_vlm_service] = lambda: VLMService(repository)
+        client = TestClient(test_app)
+        
+        builds = _models_list_cache.builds
+        first = client.get("/api/v1/models")
+        second = client.get("/api/v1/models")
+        assert first.status_code == 200
+        assert first.content == second.content
+        assert _models_list_cache.builds == builds + 1
+        assert first.json() == {
+            "models": [{"id": "model-a", "name": "Model A", "description": None, "parameters": None}]
+        }
+        
+        # モデルを登録すると次のリクエストで作り直される
+        repository.register_model(VLMModel(id="model-b", name="Model B"), "llama", {})
+        response = client.get("/api/v1/models")
+        assert [model["id"] for model in response.json()["models"]] == ["model-a", "model-b"]
+        assert _models_list_cache.builds == builds + 2
@@ -0,0 +1,231 @@
+"""モデルホストとAPIワーカーのプロセス間通信の統合テスト"""
+import asyncio
+import shutil
+import socket
+import tempfile
+import time
+
+import pytest
+import pytest_asyncio
+
+from src.local_vlm_server.domain.entities import VLMModel
+from src.local_vlm_server.domain.exceptions import DeadlineExceededError, VLMConnectionError
+from src.local_vlm_server.domain.value_objects import ImageInput, ModelParameters, VLMRequest
+from src.local_vlm_server.infrastructure.model_host import ModelHostServer, socket_path_for
+from src.local_vlm_server.infrastructure.vlm_clients.remote import RemoteVLMClient
+from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+from src.local_vlm_server.interface.multiworker import serve_model_host, start_model_hosts, stop_model_hosts
+
+
+@pytest.fixture
+def socket_dir():
+    """ソケットを置く一時ディレクトリのフィクスチャ（ソケットのパスの長さ制限のため短いパスにする）"""
+    path = tempfile.mkdtemp(prefix="vlm-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest_asyncio.fixture
+async def host(socket_dir):
+    """モックのLLaMAモデルを提供するモデルホストのフィクスチャ"""
+    repository = VLMRepository()
+    repository.register_model(VLMModel(id="llama-a", name="llama-a"), "llama", {"mock_latency": 0.05})
+    server = ModelHostServer(repository, "llama-a", socket_path_for(socket_dir, "llama-a"))
+    await server.start()
+    yield server
+    await server.stop()
+    await repository.close()
+
+
+@pytest_asyncio.fixture
+async def remote(host):
+    """モデルホストに接続するRemoteVLMClientのフィクスチャ"""
+    client = RemoteVLMClient("llama-a", {"socket_path": host.socket_path})
+    yield client
+    await client.close()
+
+
+class TestModelHost:
+    """ModelHostServerとRemoteVLMClientの統合テスト"""
+
+    @pytest.mark.asyncio
+    async def test_generate_response(self, remote):
+        """リクエストとレスポンスがモデルホストとの間で受け渡されることのテスト"""
+        image = ImageInput(data=b"\x89PNG\r\n\x1a\n", media_type="image/png", width=1, height=1)
+        request = VLMRequest(
+            prompt_text="Hello",
+            model_id="llama-a",
+            parameters=ModelParameters(temperature=0.2, max_tokens=32),
+            images=(image,)
+        )
+
+        response = await remote.generate_response(request)
+
+        assert response.model_id == "llama-a"
+        assert response.prompt.text == "Hello"
+        assert response.text
+        assert response.metadata["max_tokens"] == 32
+
+    @pytest.mark.asyncio
+    async def test_generate_stream(self, remote):
+        """ストリーミング生成の断片が順に届くことのテスト"""
+        request = VLMRequest(prompt_text="Hello", model_id="llama-a")
+
+        chunks = [chunk async for chunk in remote.generate_stream(request)]
+
+        assert len(chunks) > 1
+        assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+        assert chunks[-1].finish_reason == "stop"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_connection(self, remote, host):
+        """同時に送ったリクエストが1つの接続で多重化されることのテスト"""
+        requests = [VLMRequest(prompt_text=f"Hello {i}", model_id="llama-a") for i in range(8)]
+
+        responses = await asyncio.gather(*(remote.generate_response(request) for request in requests))
+
+        assert [response.prompt.text for response in responses] == [f"Hello {i}" for i in range(8)]
+        assert remote.connects == 1
+        assert host.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_domain_errors_are_preserved(self, remote):
+        """モデルホストで発生したドメイン例外が同じクラスとメッセージで送出されることのテスト"""
+        request = VLMRequest(prompt_text="Hello", model_id="llama-a", deadline=time.time() - 1)
+
+        with pytest.raises(DeadlineExceededError) as excinfo:
+            await remote.generate_response(request)
+
+        assert excinfo.value.model_id == "llama-a"
+        assert str(excinfo.value) == str(DeadlineExceededError("llama-a"))
+
+    @pytest.mark.asyncio
+    async def test_cancellation_is_forwarded(self, remote, host):
+        """APIワーカーでのキャンセルがモデルホストの生成の中断として伝わることのテスト"""
+        host_client = await host.repository.get_client_for_model("llama-a")
+        task = asyncio.create_task(
+            remote.generate_response(VLMRequest(prompt_text="Hello", model_id="llama-a"))
+        )
+        for _ in range(100):
+            if host_client.in_flight:
+                break
+            await asyncio.sleep(0.001)
+        assert host_client.in_flight == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.wait_for(host_client.wait_idle(), timeout=0.04)
+
+    @pytest.mark.asyncio
+    async def test_reconnects_after_host_restart(self, remote, host):
+        """モデルホストの停止中は接続エラーになり、再起動後に接続し直すことのテスト"""
+        request = VLMRequest(prompt_text="Hello", model_id="llama-a")
+        await remote.generate_response(request)
+
+        await host.stop()
+        with pytest.raises(VLMConnectionError):
+            await remote.generate_response(request)
+
+        await host.start()
+        response = await remote.generate_response(request)
+        assert response.text
+        assert remote.connects == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_connection_teardown_keeps_current_requests(self, remote):
+        """古い接続の受信ループが後から終了しても、現在の接続のリクエストが失敗しないことのテスト"""
+
+        class ClosedWriter:
+            """接続し直す前の接続のストリームライター"""
+
+            def close(self):
+                pass
+
+        task = asyncio.create_task(
+            remote.generate_response(VLMRequest(prompt_text="Hello", model_id="llama-a"))
+        )
+        for _ in range(100):
+            if remote._pending:
+                break
+            await asyncio.sleep(0.001)
+
+        stale_reader = asyncio.StreamReader()
+        stale_reader.feed_eof()
+        await remote._read_loop(stale_reader, ClosedWriter())
+
+        response = await task
+        assert response.text
+
+
+class TestMultiWorkerRepository:
+    """APIワーカーとしてのVLMRepositoryのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_worker_forwards_to_model_host(self, socket_dir, tmp_path):
+        """model_host_dirを指定したリポジトリがモデルをロードせずにモデルホストに転送することのテスト"""
+        registry_path = tmp_path / "models.toml"
+        registry_path.write_text(
+            '[[models]]\nid = "llama-a"\nclient_type = "llama"\nmock_latency = 0\n'
+            "[models.cache]\nbackend = \"memory\"\nmax_entries = 16\n",
+            encoding="utf-8"
+        )
+        stop = asyncio.Event()
+        host = asyncio.create_task(serve_model_host(
+            "llama-a", str(registry_path), socket_path_for(socket_dir, "llama-a"), stop_event=stop
+        ))
+        workers = [VLMRepository(model_host_dir=socket_dir) for _ in range(2)]
+        try:
+            for _ in range(200):
+                if all(await asyncio.gather(*(self._ready(worker) for worker in workers))):
+                    break
+                await asyncio.sleep(0.01)
+
+            request = VLMRequest(prompt_text="Hello", model_id="llama-a", parameters=ModelParameters(temperature=0))
+            first = await (await workers[0].get_client_for_model("llama-a")).generate_response(request)
+            second = await (await workers[1].get_client_for_model("llama-a")).generate_response(request)
+
+            # キャッシュはモデルホストにあるため、別のワーカーからの同じリクエストもキャッシュから返される
+            assert first.text == second.text
+            assert (await workers[0].list_resident_models())[0]["memory_bytes"] == 0
+            stats = await (await workers[1].get_client_for_model("llama-a"))._client.fetch_host_stats()
+            assert stats["cache"]["hits"] == 1
+        finally:
+            for worker in workers:
+                await worker.close()
+            stop.set()
+            await host
+
+    @staticmethod
+    async def _ready(worker: VLMRepository) -> bool:
+        """ワーカーにモデルを登録し、モデルホストに接続できるかどうかを確認する"""
+        if await worker.get_model_by_id("llama-a") is None:
+            worker.register_model(VLMModel(id="llama-a", name="llama-a"), "llama", {})
+        try:
+            await worker.get_client_for_model("llama-a")
+        except VLMConnectionError:
+            return False
+        return True
+
+
+class TestStartModelHosts:
+    """start_model_hostsのテスト"""
+
+    def test_stale_socket_is_not_mistaken_for_ready_host(self, socket_dir, tmp_path):
+        """前回の起動で残ったソケットがあっても、モデルホストが待ち受けを始めるまで待つことのテスト"""
+        registry_path = tmp_path / "models.toml"
+        registry_path.write_text(
+            '[[models]]\nid = "llama-a"\nclient_type = "llama"\nmock_latency = 0\n', encoding="utf-8"
+        )
+        socket_path = socket_path_for(socket_dir, "llama-a")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+
+        processes = start_model_hosts(str(registry_path), socket_dir, startup_timeout=60.0, watch=False)
+        try:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(socket_path)
+            connection.close()
+        finally:
+            stop_model_hosts(processes)
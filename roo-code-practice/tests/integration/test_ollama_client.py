@@ -0,0 +1,137 @@
+"""Ollamaクライアントとスタブサーバーの統合テスト"""
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.local_vlm_server.domain.exceptions import VLMConnectionError, VLMProcessingError
+from src.local_vlm_server.domain.value_objects import ImageInput, ModelParameters, VLMRequest
+from src.local_vlm_server.infrastructure.vlm_clients.implementations.ollama import OllamaVLMClient
+
+
+def make_client(stub_app, **config) -> OllamaVLMClient:
+    """スタブサーバーに接続するOllamaVLMClientを作成する"""
+    return OllamaVLMClient(
+        model_id="ollama-gemma3",
+        config={"api_base": "http://localhost:11434", "model_name": "gemma3:4b", **config},
+        transport=httpx.ASGITransport(app=stub_app)
+    )
+
+
+class TestOllamaVLMClient:
+    """OllamaVLMClientの統合テスト"""
+    
+    @pytest_asyncio.fixture
+    async def ollama_client(self, ollama_stub_app):
+        """スタブサーバーに接続するOllamaVLMClientのフィクスチャ"""
+        client = make_client(ollama_stub_app, keep_alive="1h", options={"num_ctx": 8192})
+        yield client
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_generate_response(self, ollama_client, ollama_stub_app):
+        """レスポンス生成とリクエストボディのテスト"""
+        request = VLMRequest(
+            prompt_text="Hello",
+            model_id="ollama-gemma3",
+            parameters=ModelParameters(temperature=0.2, max_tokens=64)
+        )
+        
+        response = await ollama_client.generate_response(request)
+        
+        assert "Hello" in response.text
+        assert response.model_id == "ollama-gemma3"
+        assert response.tokens_used == len("Hello") + len(response.text)
+        assert response.metadata["finish_reason"] == "stop"
+        assert response.metadata["eval_duration_ms"] == 40.0
+        
+        # keep_aliveとオプションが送信されること
+        sent = ollama_stub_app.state.requests[0]
+        assert sent["model"] == "gemma3:4b"
+        assert sent["stream"] is False
+        assert sent["keep_alive"] == "1h"
+        assert sent["options"]["num_ctx"] == 8192
+        assert sent["options"]["temperature"] == 0.2
+        assert sent["options"]["num_predict"] == 64
+        assert "images" not in sent
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream(self, ollama_client):
+        """改行区切りJSONのストリーミング生成のテスト"""
+        request = VLMRequest(prompt_text="Hello", model_id="ollama-gemma3")
+        
+        chunks = [chunk async for chunk in ollama_client.generate_stream(request)]
+        
+        assert len(chunks) > 2
+        assert chunks[-1].finish_reason == "stop"
+        assert chunks[-1].metadata["model"] == "ollama-gemma3"
+        assert "Hello" in "".join(chunk.text for chunk in chunks)
+    
+    @pytest.mark.asyncio
+    async def test_images_are_sent_as_base64(self, ollama_client, ollama_stub_app):
+        """画像がBase64文字列のリストとして送信されることのテスト"""
+        image = ImageInput(data=b"\x89PNG\r\n\x1a\n", media_type="image/png")
+        request = VLMRequest(prompt_text="describe", model_id="ollama-gemma3", images=(image, image))
+        
+        response = await ollama_client.generate_response(request)
+        
+        assert ollama_stub_app.state.requests[0]["images"] == [image.to_base64()] * 2
+        assert response.text.startswith("2枚の画像")
+    
+    @pytest.mark.asyncio
+    async def test_requests_reuse_pooled_client_and_resident_model(self, ollama_client):
+        """リクエスト間でHTTPクライアントが再利用され、モデルのロードが1回で済むことのテスト"""
+        request = VLMRequest(prompt_text="Hello", model_id="ollama-gemma3")
+        
+        await ollama_client.generate_response(request)
+        pooled = ollama_client.client
+        await ollama_client.generate_response(request)
+        
+        assert ollama_client.client is pooled
+        assert ollama_client.get_stats()["ollama"] == {"keep_alive": "1h", "loads": 1}
+    
+    @pytest.mark.asyncio
+    async def test_preload_and_unload(self, ollama_stub_app):
+        """open()でモデルをロードさせ、close()でアンロードさせることのテスト"""
+        client = make_client(ollama_stub_app, preload=True, unload_on_close=True)
+        
+        await client.open()
+        assert ollama_stub_app.state.loaded == {"gemma3:4b"}
+        await client.generate_response(VLMRequest(prompt_text="Hello", model_id="ollama-gemma3"))
+        await client.close()
+        
+        # 事前にロード済みのため、リクエストでのロードは記録されないこと
+        assert client.loads == 0
+        assert ollama_stub_app.state.loaded == set()
+        assert ollama_stub_app.state.requests[-1] == {"model": "gemma3:4b", "keep_alive": 0}
+    
+    @pytest.mark.asyncio
+    async def test_error_mapping(self, ollama_stub_app):
+        """Ollamaのエラーがメッセージ付きのドメイン例外に変換されることのテスト"""
+        missing = make_client(ollama_stub_app, model_name="missing:latest")
+        unavailable = make_client(ollama_stub_app, model_name="unavailable")
+        request = VLMRequest(prompt_text="Hello", model_id="ollama-gemma3")
+        
+        try:
+            with pytest.raises(VLMProcessingError, match="not found"):
+                await missing.generate_response(request)
+            with pytest.raises(VLMProcessingError, match="not found"):
+                async for _ in missing.generate_stream(request):
+                    pass
+            with pytest.raises(VLMConnectionError, match="server busy"):
+                await unavailable.generate_response(request)
+        finally:
+            await missing.close()
+            await unavailable.close()
+    
+    @pytest.mark.asyncio
+    async def test_connection_refused(self):
+        """Ollamaに接続できない場合にVLMConnectionErrorになることのテスト"""
+        def refuse(request):
+            raise httpx.ConnectError("connection refused", request=request)
+        
+        client = OllamaVLMClient("ollama-gemma3", transport=httpx.MockTransport(refuse))
+        try:
+            with pytest.raises(VLMConnectionError):
+                await client.generate_response(VLMRequest(prompt_text="Hello", model_id="ollama-gemma3"))
+        finally:
+            await client.close()
@@ -0,0 +1,235 @@
+"""非同期ジョブキューのテスト"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.local_vlm_server.application.job_queue import JobQueue
+from src.local_vlm_server.application.services import VLMService
+from src.local_vlm_server.domain.entities import Job, VLMModel
+from src.local_vlm_server.domain.exceptions import (
+    InvalidPromptError,
+    JobNotFoundError,
+    JobQueueFullError,
+    VLMOverloadedError,
+    VLMProcessingError,
+)
+from src.local_vlm_server.domain.value_objects import JobStatus, VLMRequest
+from src.local_vlm_server.infrastructure.job_store import InMemoryJobStore, SQLiteJobStore
+from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+
+
+def make_request(prompt: str, model_id: str = "test-model-1") -> VLMRequest:
+    """テスト用のVLMリクエストを作成する"""
+    return VLMRequest(prompt_text=prompt, model_id=model_id)
+
+
+class TestJobQueue:
+    """JobQueueのテスト"""
+    
+    @pytest_asyncio.fixture
+    async def job_queue(self, mock_vlm_service):
+        """ジョブキューのフィクスチャ"""
+        queue = JobQueue(mock_vlm_service, InMemoryJobStore(), workers=1)
+        yield queue
+        await queue.stop()
+    
+    @pytest.mark.asyncio
+    async def test_submit_and_wait(self, job_queue):
+        """投入したジョブの終了を待って結果を取得できることのテスト"""
+        job = await job_queue.submit(make_request("Hello, world!"))
+        assert job.status == JobStatus.PENDING
+        
+        finished = await job_queue.wait(job.id, timeout=1.0)
+        
+        assert finished.status == JobStatus.SUCCEEDED
+        assert finished.response.prompt.text == "Hello, world!"
+        assert finished.finished_at >= finished.started_at >= finished.created_at
+    
+    @pytest.mark.asyncio
+    async def test_wait_times_out_for_running_job(self, job_queue, mock_vlm_repository):
+        """終了しないジョブの待機がタイムアウトで返ることのテスト"""
+        release = asyncio.Event()
+        client = mock_vlm_repository.clients["test-model-1"]
+        original = client.generate_response
+        
+        async def blocked(request):
+            await release.wait()
+            return await original(request)
+        
+        client.generate_response = blocked
+        job = await job_queue.submit(make_request("slow"))
+        
+        pending = await job_queue.wait(job.id, timeout=0.05)
+        assert not pending.is_finished
+        
+        release.set()
+        assert (await job_queue.wait(job.id, timeout=1.0)).status == JobStatus.SUCCEEDED
+    
+    @pytest.mark.asyncio
+    async def test_jobs_run_in_priority_order(self, job_queue, mock_vlm_repository):
+        """優先度の高いジョブから処理されることのテスト"""
+        client = mock_vlm_repository.clients["test-model-1"]
+        
+        # ワーカーが最初のジョブを処理している間に残りのジョブを投入する
+        release = asyncio.Event()
+        original = client.generate_response
+        
+        async def gated(request):
+            await release.wait()
+            return await original(request)
+        
+        client.generate_response = gated
+        first = await job_queue.submit(make_request("first"))
+        await asyncio.sleep(0.01)
+        jobs = [
+            await job_queue.submit(make_request("low"), priority=0),
+            await job_queue.submit(make_request("high"), priority=10),
+            await job_queue.submit(make_request("middle"), priority=5),
+        ]
+        release.set()
+        for job in [first, *jobs]:
+            await job_queue.wait(job.id, timeout=1.0)
+        
+        assert [r.prompt_text for r in client.requests] == ["first", "high", "middle", "low"]
+    
+    @pytest.mark.asyncio
+    async def test_failed_job_records_error(self, job_queue, mock_vlm_repository):
+        """処理に失敗したジョブにエラーが記録されることのテスト"""
+        async def failing(request):
+            raise VLMProcessingError("test-model-1", "boom")
+        
+        mock_vlm_repository.clients["test-model-1"].generate_response = failing
+        job = await job_queue.submit(make_request("Hello"))
+        
+        finished = await job_queue.wait(job.id, timeout=1.0)
+        
+        assert finished.status == JobStatus.FAILED
+        assert finished.error["error"] == "VLMProcessingError"
+        assert job_queue.get_stats()["failed"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_overloaded_job_is_retried(self, job_queue, mock_vlm_repository):
+        """モデルが過負荷の場合にジョブが再試行されることのテスト"""
+        client = mock_vlm_repository.clients["test-model-1"]
+        original = client.generate_response
+        attempts = []
+        
+        async def busy_once(request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise VLMOverloadedError("test-model-1", retry_after=0.01)
+            return await original(request)
+        
+        client.generate_response = busy_once
+        job = await job_queue.submit(make_request("Hello"))
+        
+        finished = await job_queue.wait(job.id, timeout=1.0)
+        
+        assert finished.status == JobStatus.SUCCEEDED
+        assert len(attempts) == 2
+    
+    @pytest.mark.asyncio
+    async def test_overloaded_job_gives_up_after_max_retries(self, mock_vlm_service, mock_vlm_repository):
+        """モデルが過負荷のままの場合に再試行が上限で打ち切られることのテスト"""
+        attempts = []
+        
+        async def always_busy(request):
+            attempts.append(request)
+            raise VLMOverloadedError("test-model-1", retry_after=0.01)
+        
+        mock_vlm_repository.clients["test-model-1"].generate_response = always_busy
+        queue = JobQueue(mock_vlm_service, InMemoryJobStore(), workers=1, max_retries=2)
+        try:
+            job = await queue.submit(make_request("Hello"))
+            finished = await queue.wait(job.id, timeout=1.0)
+        finally:
+            await queue.stop()
+        
+        assert finished.status == JobStatus.FAILED
+        assert finished.error["error"] == "VLMOverloadedError"
+        assert len(attempts) == 3
+    
+    @pytest.mark.asyncio
+    async def test_model_too_large_is_not_retried(self):
+        """メモリ予算より大きいモデルのジョブが再試行されずに失敗することのテスト"""
+        repository = VLMRepository(memory_budget_mb=100)
+        repository.register_model(VLMModel(id="huge", name="huge"), "llama", {"memory_mb": 500})
+        queue = JobQueue(VLMService(repository), InMemoryJobStore(), workers=1)
+        try:
+            job = await queue.submit(make_request("Hello", model_id="huge"))
+            finished = await queue.wait(job.id, timeout=1.0)
+        finally:
+            await queue.stop()
+            await repository.close()
+        
+        assert finished.status == JobStatus.FAILED
+        assert finished.error["error"] == "ModelTooLargeError"
+    
+    @pytest.mark.asyncio
+    async def test_submit_validates_request(self, job_queue):
+        """無効なリクエストが投入時に拒否されることのテスト"""
+        with pytest.raises(InvalidPromptError):
+            await job_queue.submit(make_request(""))
+        with pytest.raises(JobNotFoundError):
+            await job_queue.get("missing")
+    
+    @pytest.mark.asyncio
+    async def test_submit_rejects_when_full(self, mock_vlm_service):
+        """未完了のジョブが上限に達すると投入が拒否されることのテスト"""
+        queue = JobQueue(mock_vlm_service, InMemoryJobStore(), workers=1, max_pending=1)
+        await queue.submit(make_request("first"))
+        try:
+            with pytest.raises(JobQueueFullError):
+                await queue.submit(make_request("second"))
+        finally:
+            await queue.stop()
+    
+    @pytest.mark.asyncio
+    async def test_unfinished_jobs_are_recovered(self, mock_vlm_service, tmp_path):
+        """再起動時に保存先の未完了ジョブが再実行されることのテスト"""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = SQLiteJobStore(path)
+        await store.save(Job(
+            id="interrupted",
+            request=make_request("Hello"),
+            status=JobStatus.RUNNING,
+            created_at=1.0,
+            started_at=2.0
+        ))
+        await store.close()
+        
+        store = SQLiteJobStore(path)
+        queue = JobQueue(mock_vlm_service, store, workers=1)
+        await queue.start()
+        try:
+            finished = await queue.wait("interrupted", timeout=1.0)
+        finally:
+            await queue.stop()
+            await store.close()
+        
+        assert finished.status == JobStatus.SUCCEEDED
+        assert finished.response.text.startswith("Mock response")
+    
+    @pytest.mark.asyncio
+    async def test_sqlite_store_prunes_finished_jobs(self, tmp_path):
+        """SQLiteの保存先で上限を超えた古い終了済みジョブが破棄されることのテスト"""
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), max_finished=2)
+        try:
+            await store.save(Job(id="pending", request=make_request("Hello"), created_at=0.0))
+            for i in range(4):
+                await store.save(Job(
+                    id=f"finished-{i}",
+                    request=make_request("Hello"),
+                    status=JobStatus.SUCCEEDED if i % 2 else JobStatus.FAILED,
+                    created_at=float(i + 1)
+                ))
+            
+            assert await store.get("finished-0") is None
+            assert await store.get("finished-1") is None
+            assert (await store.get("finished-3")).status == JobStatus.SUCCEEDED
+            assert (await store.get("finished-2")).status == JobStatus.FAILED
+            # 未完了のジョブは破棄されない
+            assert [job.id for job in await store.list_unfinished()] == ["pending"]
+        finally:
+            await store.close()
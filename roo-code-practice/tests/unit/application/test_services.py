@@ -1,8 +1,14 @@
 """アプリケーションサービスのテスト"""
+import asyncio
+import time
+
 import pytest
 
-from src.local_vlm_server.domain.exceptions import InvalidPromptError, VLMModelNotFoundError
-from src.local_vlm_server.domain.value_objects import ModelParameters
+from src.local_vlm_server.domain.exceptions import DeadlineExceededError, InvalidPromptError, VLMModelNotFoundError
+from src.local_vlm_server.application.services import VLMService
+from src.local_vlm_server.domain.entities import VLMResponse
+from src.local_vlm_server.domain.value_objects import ModelParameters, VLMRequest
+from src.local_vlm_server.infrastructure.tokenizers import TokenizerService
 
 
 class TestVLMService:
@@ -117,4 +123,209 @@ class TestVLMService:
         client = await mock_vlm_repository.get_client_for_model(model_id)
         assert len(client.requests) == 1
         # デフォルトパラメータが使用されていることを確認
-        assert client.requests[0].parameters is None
\ No newline at end of file
+        assert client.requests[0].parameters is None
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_stream(self, mock_vlm_service, mock_vlm_repository):
+        """ストリーミングでのプロンプト処理テスト"""
+        # ストリーミング処理
+        chunks = await mock_vlm_service.process_prompt_stream(
+            model_id="test-model-1",
+            prompt_text="Hello, world!"
+        )
+        received = [chunk async for chunk in chunks]
+        
+        # 結果の検証
+        assert len(received) >= 1
+        assert received[-1].finish_reason == "stop"
+        assert "Mock response" in "".join(chunk.text for chunk in received)
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_stream_validates_before_streaming(self, mock_vlm_service):
+        """ストリーミング開始前に入力が検証されることのテスト"""
+        with pytest.raises(InvalidPromptError):
+            await mock_vlm_service.process_prompt_stream(
+                model_id="test-model-1",
+                prompt_text=""
+            )
+        
+        with pytest.raises(VLMModelNotFoundError):
+            await mock_vlm_service.process_prompt_stream(
+                model_id="nonexistent-model",
+                prompt_text="Hello, world!"
+            )
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_coalesces_identical_requests(self, mock_vlm_service, mock_vlm_repository):
+        """実行中の同一リクエストが1回の処理にまとめられることのテスト"""
+        parameters = ModelParameters(temperature=0.0)
+        
+        # 同一リクエストを同時に処理
+        responses = await asyncio.gather(*(
+            mock_vlm_service.process_prompt(
+                model_id="test-model-1",
+                prompt_text="Hello, world!",
+                parameters=parameters
+            )
+            for _ in range(3)
+        ))
+        
+        # モッククライアントへのリクエストは1回だけであること
+        client = await mock_vlm_repository.get_client_for_model("test-model-1")
+        assert len(client.requests) == 1
+        assert all(response.text == responses[0].text for response in responses)
+        
+        stats = await mock_vlm_service.get_stats()
+        assert stats["test-model-1"]["coalescing"]["coalesced"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_without_coalescing(self, mock_vlm_repository):
+        """相乗りを無効にした場合に個別に処理されることのテスト"""
+        service = VLMService(mock_vlm_repository, coalesce_requests=False)
+        
+        await asyncio.gather(*(
+            service.process_prompt(model_id="test-model-1", prompt_text="Hello, world!")
+            for _ in range(3)
+        ))
+        
+        client = await mock_vlm_repository.get_client_for_model("test-model-1")
+        assert len(client.requests) == 3
+    
+    @pytest.mark.asyncio
+    async def test_process_prompts_preserves_order_with_per_item_errors(self, mock_vlm_service):
+        """一括処理の結果がリクエスト順に並び、失敗が個別に返ることのテスト"""
+        requests = [
+            VLMRequest(prompt_text="first", model_id="test-model-1"),
+            VLMRequest(prompt_text="second", model_id="test-model-2"),
+            VLMRequest(prompt_text="", model_id="test-model-1"),
+            VLMRequest(prompt_text="fourth", model_id="nonexistent-model"),
+            VLMRequest(prompt_text="fifth", model_id="test-model-1"),
+        ]
+        
+        results = await mock_vlm_service.process_prompts(requests)
+        
+        assert len(results) == 5
+        assert [r.prompt.text for r in results if isinstance(r, VLMResponse)] == ["first", "second", "fifth"]
+        assert results[1].model_id == "test-model-2"
+        assert isinstance(results[2], InvalidPromptError)
+        assert isinstance(results[3], VLMModelNotFoundError)
+    
+    @pytest.mark.asyncio
+    async def test_process_prompts_bounds_parallelism(self, mock_vlm_repository):
+        """一括処理の同時実行数がモデルごとに制限されることのテスト"""
+        service = VLMService(mock_vlm_repository, batch_concurrency=2)
+        client = await mock_vlm_repository.get_client_for_model("test-model-1")
+        original = client.generate_response
+        active = 0
+        peak = 0
+        
+        async def tracking(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return await original(request)
+        
+        client.generate_response = tracking
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-model-1")
+            for i in range(6)
+        ]
+        
+        results = await service.process_prompts(requests)
+        
+        assert [r.prompt.text for r in results] == [f"prompt {i}" for i in range(6)]
+        assert peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_counts_tokens(self, mock_vlm_repository):
+        """バックエンドが報告しないトークン数がトークナイザーで補完されることのテスト"""
+        service = VLMService(
+            mock_vlm_repository,
+            tokenizer=TokenizerService(lambda model_id: {"backend": "heuristic"})
+        )
+        
+        response = await service.process_prompt("test-model-1", "こんにちは")
+        
+        assert response.prompt_tokens == 5
+        assert response.completion_tokens > 0
+        assert response.tokens_used == response.prompt_tokens + response.completion_tokens
+    
+    @pytest.mark.asyncio
+    async def test_count_tokens_nonexistent_model(self, mock_vlm_service):
+        """存在しないモデルのトークン数計算のテスト"""
+        with pytest.raises(VLMModelNotFoundError):
+            await mock_vlm_service.count_tokens("nonexistent-model", ["Hello"])
+    
+    @pytest.mark.asyncio
+    async def test_process_prompt_expired_deadline(self, mock_vlm_service, mock_vlm_repository):
+        """期限を過ぎたリクエストがモデルに渡されないことのテスト"""
+        with pytest.raises(DeadlineExceededError):
+            await mock_vlm_service.process_prompt(
+                model_id="test-model-1",
+                prompt_text="Hello, world!",
+                deadline=time.time() - 1
+            )
+        
+        assert mock_vlm_repository.clients["test-model-1"].requests == []
+    
+    @pytest.mark.asyncio
+    async def test_process_prompts_runs_higher_priority_first(self, mock_vlm_repository):
+        """一括処理で優先度の高いリクエストから実行されることのテスト"""
+        service = VLMService(mock_vlm_repository, batch_concurrency=1)
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-model-1", priority=priority)
+            for i, priority in enumerate([0, 10, -10, 10])
+        ]
+        
+        results = await service.process_prompts(requests)
+        
+        # 結果はリクエストと同じ順序
+        assert [result.prompt.text for result in results] == [f"prompt {i}" for i in range(4)]
+        executed = [request.prompt_text for request in mock_vlm_repository.clients["test-model-1"].requests]
+        assert executed == ["prompt 1", "prompt 3", "prompt 0", "prompt 2"]
+    
+    @pytest.mark.asyncio
+    async def test_coalesced_request_does_not_inherit_deadline_failure(self, mock_vlm_repository):
+        """相乗りしたリクエストが先行リクエストの期限切れで失敗せず、単独で実行し直されることのテスト"""
+        from src.local_vlm_server.infrastructure.vlm_clients.admission import AdmissionControlledVLMClient
+        from tests.conftest import MockVLMClient
+        
+        class SlowMockVLMClient(MockVLMClient):
+            async def generate_response(self, request):
+                await asyncio.sleep(0.2)
+                return await super().generate_response(request)
+        
+        backend = SlowMockVLMClient("test-model-1")
+        mock_vlm_repository.clients["test-model-1"] = AdmissionControlledVLMClient(backend, max_concurrency=1)
+        service = VLMService(mock_vlm_repository)
+        
+        # 実行枠を埋めるリクエスト
+        running = asyncio.create_task(service.process_prompt(model_id="test-model-1", prompt_text="running"))
+        await asyncio.sleep(0.01)
+        
+        with_deadline = asyncio.create_task(service.process_prompt(
+            model_id="test-model-1", prompt_text="Hello, world!", deadline=time.time() + 0.1
+        ))
+        await asyncio.sleep(0.01)
+        without_deadline = asyncio.create_task(service.process_prompt(
+            model_id="test-model-1", prompt_text="Hello, world!"
+        ))
+        
+        with pytest.raises(DeadlineExceededError):
+            await with_deadline
+        response = await without_deadline
+        await running
+        
+        assert response.prompt.text == "Hello, world!"
+    
+    @pytest.mark.asyncio
+    async def test_requests_with_different_priority_are_not_coalesced(self, mock_vlm_service, mock_vlm_repository):
+        """優先度が異なる同一リクエストが相乗りしないことのテスト"""
+        await asyncio.gather(*(
+            mock_vlm_service.process_prompt(model_id="test-model-1", prompt_text="Hello, world!", priority=priority)
+            for priority in (0, 10)
+        ))
+        
+        assert len(mock_vlm_repository.clients["test-model-1"].requests) == 2
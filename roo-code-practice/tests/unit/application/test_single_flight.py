@@ -0,0 +1,96 @@
+"""シングルフライトのテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.application.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """SingleFlightのテスト"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """同じキーの同時呼び出しが1回の実行を共有することのテスト"""
+        single_flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*(single_flight.do("key", work) for _ in range(5)))
+        
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ["result"] * 5
+        assert [shared for _, shared in results] == [False, True, True, True, True]
+        assert single_flight.in_flight() == 0
+    
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """異なるキーの呼び出しが個別に実行されることのテスト"""
+        single_flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+        
+        await asyncio.gather(single_flight.do("a", work), single_flight.do("b", work))
+        
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """実行中の例外が全ての待機者に伝播することのテスト"""
+        single_flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("failure")
+        
+        results = await asyncio.gather(
+            *(single_flight.do("key", work) for _ in range(3)),
+            return_exceptions=True
+        )
+        
+        assert all(isinstance(result, ValueError) for result in results)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_work(self):
+        """1つの待機者のキャンセルが共有中の処理を止めないことのテスト"""
+        single_flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+        
+        first = asyncio.ensure_future(single_flight.do("key", work))
+        second = asyncio.ensure_future(single_flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == ("result", True)
+    
+    @pytest.mark.asyncio
+    async def test_work_is_cancelled_when_all_waiters_are_cancelled(self):
+        """すべての待機者がキャンセルされた場合に共有中の処理がキャンセルされることのテスト"""
+        single_flight = SingleFlight()
+        cancelled = asyncio.Event()
+        
+        async def work():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        waiters = [asyncio.ensure_future(single_flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        
+        await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+        await asyncio.sleep(0)
+        assert single_flight.in_flight() == 0
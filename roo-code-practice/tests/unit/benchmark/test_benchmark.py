@@ -0,0 +1,155 @@
+"""ベンチマークハーネスのテスト"""
+import asyncio
+import json
+
+import pytest
+
+from src.local_vlm_server.benchmark.encoding import run_encoding_benchmark
+from src.local_vlm_server.benchmark.fake_clients import LatencyDistribution, SyntheticVLMClient
+from src.local_vlm_server.benchmark.load_generator import LoadGenerator, percentile, summarize_latencies
+from src.local_vlm_server.benchmark.runner import run_benchmark
+from src.local_vlm_server.domain.value_objects import VLMRequest
+
+
+class TestLatencyDistribution:
+    """LatencyDistributionのテスト"""
+
+    @pytest.mark.parametrize("distribution", ["uniform", "exponential", "lognormal"])
+    def test_sample_mean_matches_configuration(self, distribution):
+        """取り出したレイテンシの平均が設定した平均に近いことのテスト"""
+        latency = LatencyDistribution(distribution, mean_ms=20.0, seed=1)
+
+        samples = [latency.sample() for _ in range(20000)]
+
+        assert sum(samples) / len(samples) == pytest.approx(0.020, rel=0.05)
+
+    def test_samples_are_clamped(self):
+        """レイテンシが下限と上限に収まることのテスト"""
+        latency = LatencyDistribution("exponential", mean_ms=20.0, min_ms=5.0, max_ms=30.0, seed=1)
+
+        samples = [latency.sample() for _ in range(1000)]
+
+        assert min(samples) == 0.005
+        assert max(samples) == 0.030
+
+    def test_unknown_distribution_raises(self):
+        """未知の分布を指定した場合にValueErrorが送出されることのテスト"""
+        with pytest.raises(ValueError):
+            LatencyDistribution("pareto")
+
+
+class TestSyntheticVLMClient:
+    """SyntheticVLMClientのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_batch_shares_one_latency(self):
+        """一括処理が1回分のレイテンシで全件を返すことのテスト"""
+        client = SyntheticVLMClient("synthetic", {
+            "latency": {"distribution": "constant", "mean_ms": 30.0},
+            "output_tokens": 4,
+        })
+        requests = [VLMRequest(prompt_text=f"prompt {i}", model_id="synthetic") for i in range(8)]
+
+        started_at = asyncio.get_running_loop().time()
+        responses = await client.generate_batch(requests)
+        elapsed = asyncio.get_running_loop().time() - started_at
+
+        assert elapsed < 0.1
+        assert [response.completion_tokens for response in responses] == [4] * 8
+
+
+class TestLoadGenerator:
+    """LoadGeneratorのテスト"""
+
+    def test_percentile_uses_nearest_rank(self):
+        """最近接順位法で百分位数が計算されることのテスト"""
+        values = [i / 1000 for i in range(1, 101)]
+
+        assert percentile(values, 50) == 0.05
+        assert percentile(values, 99) == 0.099
+        assert percentile([], 50) is None
+        assert summarize_latencies(values)["p95"] == 95.0
+
+    @pytest.mark.asyncio
+    async def test_closed_loop_limits_concurrency(self):
+        """クローズドループで同時に送るリクエスト数がconcurrencyを超えないことのテスト"""
+        active = 0
+        max_active = 0
+
+        async def send(endpoint):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return 200
+
+        report = await LoadGenerator(send, {"generate": 1}, concurrency=4, duration=0.2).run()
+
+        assert max_active == 4
+        assert report["errors"] == 0
+        assert report["requests"] > 0
+        assert report["latency_ms"]["p50"] >= 10.0
+
+    @pytest.mark.asyncio
+    async def test_open_loop_sends_at_fixed_rate(self):
+        """オープンループでレスポンスを待たずに一定の間隔でリクエストが送られることのテスト"""
+        statuses = iter([200, 503] * 100)
+
+        async def send(endpoint):
+            await asyncio.sleep(0.05)
+            return next(statuses)
+
+        report = await LoadGenerator(send, {"generate": 1}, mode="open", rps=100, duration=0.3).run()
+
+        assert report["requests"] == 30
+        assert report["status_codes"] == {"200": 15, "503": 15}
+        assert report["errors"] == 15
+
+    def test_open_loop_requires_rps(self):
+        """オープンループでrpsを指定しない場合にValueErrorが送出されることのテスト"""
+        async def send(endpoint):
+            return 200
+
+        with pytest.raises(ValueError):
+            LoadGenerator(send, {"generate": 1}, mode="open")
+        with pytest.raises(ValueError):
+            LoadGenerator(send, {"generate": 1}, mode="open", rps=-1)
+
+
+class TestRunBenchmark:
+    """run_benchmarkのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_in_process_benchmark_reports_json(self):
+        """プロセス内で起動したアプリケーションに負荷をかけ、JSONにできる結果が得られることのテスト"""
+        report = await run_benchmark(
+            mix={"generate": 2, "batch": 1, "models": 1},
+            concurrency=4,
+            duration=0.3,
+            warmup=0.05,
+            seed=0
+        )
+
+        json.dumps(report)
+        assert report["errors"] == 0
+        assert report["throughput_rps"] > 0
+        assert set(report["endpoints"]) == {"generate", "batch", "models"}
+        assert report["latency_ms"]["p99"] >= report["latency_ms"]["p50"]
+        assert report["event_loop_lag_ms"]["count"] > 0
+
+
+class TestEncodingBenchmark:
+    """run_encoding_benchmarkのテスト"""
+
+    def test_reports_small_and_large_generations(self):
+        """短い生成と長い生成のそれぞれでエンコード時間が計測されることのテスト"""
+        report = run_encoding_benchmark(iterations=20, repeats=1, models=2)
+
+        json.dumps(report)
+        assert set(report["generate"]) == {"small", "large"}
+        for result in report["generate"].values():
+            assert set(result["us_per_request"]) == {"schema_jsonable", "schema_dump_json", "direct"}
+            assert all(value > 0 for value in result["us_per_request"].values())
+        assert report["generate"]["large"]["body_bytes"] > report["generate"]["small"]["body_bytes"]
+        assert set(report["models"]["us_per_request"]) == {"schema", "cached"}
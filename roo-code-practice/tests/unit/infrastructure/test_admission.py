@@ -0,0 +1,161 @@
+"""同時実行数制限のテスト"""
+import asyncio
+import time
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import DeadlineExceededError, VLMOverloadedError
+from src.local_vlm_server.infrastructure.vlm_clients.admission import AdmissionControlledVLMClient
+from tests.conftest import MockVLMClient, make_request
+
+
+class SlowMockVLMClient(MockVLMClient):
+    """同時実行数を記録する低速なモッククライアント"""
+    
+    def __init__(self, model_id: str, delay: float = 0.02):
+        super().__init__(model_id)
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+    
+    async def generate_response(self, request):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return await super().generate_response(request)
+        finally:
+            self.active -= 1
+
+
+class TestAdmissionControlledVLMClient:
+    """AdmissionControlledVLMClientのテスト"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrency_is_limited(self):
+        """同時実行数が上限を超えないことのテスト"""
+        backend = SlowMockVLMClient("test-model")
+        client = AdmissionControlledVLMClient(backend, max_concurrency=2, max_queue=10)
+        
+        responses = await asyncio.gather(*(client.generate_response(make_request(i)) for i in range(6)))
+        
+        assert len(responses) == 6
+        assert backend.max_active == 2
+        stats = client.get_stats()["admission"]
+        assert stats["admitted"] == 6
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected(self):
+        """待機キューが満杯の場合に即座に拒否されることのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.05)
+        client = AdmissionControlledVLMClient(backend, max_concurrency=1, max_queue=1)
+        
+        results = await asyncio.gather(
+            *(client.generate_response(make_request(i)) for i in range(3)),
+            return_exceptions=True
+        )
+        
+        rejected = [result for result in results if isinstance(result, VLMOverloadedError)]
+        assert len(rejected) == 1
+        assert rejected[0].retry_after >= 1
+        assert client.get_stats()["admission"]["rejected"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """待機時間が上限を超えた場合に拒否されることのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.2)
+        client = AdmissionControlledVLMClient(
+            backend, max_concurrency=1, max_queue=5, queue_timeout=0.01
+        )
+        
+        results = await asyncio.gather(
+            client.generate_response(make_request(0)),
+            client.generate_response(make_request(1)),
+            return_exceptions=True
+        )
+        
+        assert not isinstance(results[0], Exception)
+        assert isinstance(results[1], VLMOverloadedError)
+        assert client.get_stats()["admission"]["timed_out"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases_queue_position(self):
+        """待機中にキャンセルされたリクエストが枠を消費しないことのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.05)
+        client = AdmissionControlledVLMClient(backend, max_concurrency=1, max_queue=5)
+        
+        first = asyncio.ensure_future(client.generate_response(make_request(0)))
+        second = asyncio.ensure_future(client.generate_response(make_request(1)))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        await first
+        
+        # キャンセル後も次のリクエストが実行できること
+        await client.generate_response(make_request(2))
+        stats = client.get_stats()["admission"]
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_higher_priority_runs_first(self):
+        """待機中のリクエストが優先度の高い順に実行されることのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.02)
+        client = AdmissionControlledVLMClient(backend, max_concurrency=1, max_queue=10, aging_seconds=None)
+        
+        first = asyncio.ensure_future(client.generate_response(make_request(0)))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.ensure_future(client.generate_response(make_request(i, priority=priority)))
+            for i, priority in ((1, 0), (2, 5), (3, -5), (4, 5))
+        ]
+        await asyncio.sleep(0.005)
+        assert client.get_stats()["admission"]["queued_by_priority"] == {"5": 2, "0": 1, "-5": 1}
+        
+        await asyncio.gather(first, *waiting)
+        
+        # 同じ優先度の場合は到着順
+        assert [request.prompt_text for request in backend.requests] == [
+            "prompt 0", "prompt 2", "prompt 4", "prompt 1", "prompt 3"
+        ]
+        assert client.get_stats()["admission"]["queued_by_priority"] == {}
+    
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self):
+        """長く待機した低優先度のリクエストが後から来た高優先度のリクエストより先に実行されることのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.1)
+        client = AdmissionControlledVLMClient(backend, max_concurrency=1, max_queue=10, aging_seconds=0.01)
+        
+        first = asyncio.ensure_future(client.generate_response(make_request(0)))
+        await asyncio.sleep(0)
+        low = asyncio.ensure_future(client.generate_response(make_request(1, priority=0)))
+        await asyncio.sleep(0.05)
+        # 待ち時間0.05秒は優先度5段階分に相当するため、優先度2のリクエストより先になる
+        high = asyncio.ensure_future(client.generate_response(make_request(2, priority=2)))
+        
+        await asyncio.gather(first, low, high)
+        
+        assert [request.prompt_text for request in backend.requests] == ["prompt 0", "prompt 1", "prompt 2"]
+    
+    @pytest.mark.asyncio
+    async def test_expired_requests_are_dropped(self):
+        """期限を過ぎたリクエストがバックエンドに渡されずに破棄されることのテスト"""
+        backend = SlowMockVLMClient("test-model", delay=0.1)
+        client = AdmissionControlledVLMClient(backend, max_concurrency=1, max_queue=10)
+        
+        results = await asyncio.gather(
+            client.generate_response(make_request(0)),
+            client.generate_response(make_request(1, deadline=time.time() + 0.02)),
+            client.generate_response(make_request(2, deadline=time.time() - 1)),
+            return_exceptions=True
+        )
+        
+        assert not isinstance(results[0], Exception)
+        assert isinstance(results[1], DeadlineExceededError)
+        assert isinstance(results[2], DeadlineExceededError)
+        assert [request.prompt_text for request in backend.requests] == ["prompt 0"]
+        stats = client.get_stats()["admission"]
+        assert stats["expired"] == 2
+        assert stats["timed_out"] == 0
+        assert stats["active"] == 0
@@ -0,0 +1,141 @@
+"""動的バッチングのテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import VLMProcessingError
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.vlm_clients.base import BaseVLMClient
+from src.local_vlm_server.infrastructure.vlm_clients.batching import BatchingVLMClient
+
+
+class RecordingBatchClient(BaseVLMClient):
+    """バッチ呼び出しを記録するVLMクライアント"""
+
+    def __init__(self, *args, fail: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+        self.fail = fail
+
+    async def _execute_request(self, request):
+        return (await self._execute_batch([request]))[0]
+
+    async def _execute_batch(self, requests):
+        self.batches.append([request.prompt_text for request in requests])
+        if self.fail:
+            raise RuntimeError("backend failure")
+        return [
+            {
+                "text": f"reply to {request.prompt_text}",
+                "tokens_used": 1,
+                "metadata": {"batch_size": len(requests)}
+            }
+            for request in requests
+        ]
+
+
+class SlowBatchClient(RecordingBatchClient):
+    """バッチの実行に時間がかかり、キャンセルを記録するVLMクライアント"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cancelled = asyncio.Event()
+
+    async def _execute_batch(self, requests):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+        return await super()._execute_batch(requests)
+
+
+class TestBatchingVLMClient:
+    """BatchingVLMClientのテスト"""
+
+    @pytest.fixture
+    def backend(self):
+        """記録用バックエンドのフィクスチャ"""
+        return RecordingBatchClient(model_id="test-llama")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_batched(self, backend):
+        """同時リクエストが1回のバックエンド呼び出しにまとめられることのテスト"""
+        client = BatchingVLMClient(backend, max_batch_size=8, max_wait_ms=20)
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")
+            for i in range(5)
+        ]
+
+        responses = await asyncio.gather(*(client.generate_response(r) for r in requests))
+
+        # 1バッチで処理され、結果が元の順序で返ること
+        assert backend.batches == [[f"prompt {i}" for i in range(5)]]
+        assert [r.prompt.text for r in responses] == [f"prompt {i}" for i in range(5)]
+        assert all(r.metadata["batch_size"] == 5 for r in responses)
+
+    @pytest.mark.asyncio
+    async def test_batch_is_split_by_max_batch_size(self, backend):
+        """max_batch_sizeを超えるリクエストが分割されることのテスト"""
+        client = BatchingVLMClient(backend, max_batch_size=2, max_wait_ms=20)
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")
+            for i in range(5)
+        ]
+
+        await asyncio.gather(*(client.generate_response(r) for r in requests))
+
+        assert sorted(len(batch) for batch in backend.batches) == [1, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_backend_error_is_fanned_out(self):
+        """バックエンドのエラーが全ての待機中リクエストに伝播することのテスト"""
+        backend = RecordingBatchClient(model_id="test-llama", fail=True)
+        client = BatchingVLMClient(backend, max_batch_size=4, max_wait_ms=5)
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")
+            for i in range(3)
+        ]
+
+        results = await asyncio.gather(
+            *(client.generate_response(r) for r in requests),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, VLMProcessingError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_stats_report_histograms(self, backend):
+        """統計情報にヒストグラムが含まれることのテスト"""
+        client = BatchingVLMClient(backend, max_batch_size=8, max_wait_ms=5)
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")
+            for i in range(3)
+        ]
+
+        await asyncio.gather(*(client.generate_response(r) for r in requests))
+        stats = client.get_stats()["batching"]
+
+        assert stats["batch_size"]["count"] == 1
+        assert stats["batch_size"]["sum"] == 3
+        assert stats["queue_wait_seconds"]["count"] == 3
+        assert stats["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_is_abandoned_when_all_callers_cancel(self):
+        """バッチ内のすべての呼び出し元がキャンセルされるとバックエンドの実行が中断されることのテスト"""
+        backend = SlowBatchClient(model_id="test-llama")
+        client = BatchingVLMClient(backend, max_batch_size=2, max_wait_ms=1)
+        callers = [
+            asyncio.ensure_future(client.generate_response(VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.02)
+
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        # まだ結果を待つ呼び出し元がいる間は実行を続ける
+        assert not backend.cancelled.is_set()
+
+        callers[1].cancel()
+        await asyncio.wait_for(backend.cancelled.wait(), timeout=1.0)
@@ -0,0 +1,160 @@
+"""モデルエグゼキュータのテスト"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import VLMOverloadedError
+from src.local_vlm_server.infrastructure.vlm_clients.executor import ModelExecutor
+
+
+class FakeModel:
+    """ロードされたスレッドと呼び出し回数を記録するモデル"""
+
+    def __init__(self):
+        self.loaded_in = threading.current_thread().name
+        self.calls = 0
+
+
+def _predict(model: FakeModel, delay: float) -> str:
+    time.sleep(delay)
+    model.calls += 1
+    return threading.current_thread().name
+
+
+def _tokens(model: FakeModel, text: str):
+    for token in text.split():
+        time.sleep(0.01)
+        yield token
+
+
+def _counted_tokens(model: FakeModel, count: int, progress: dict):
+    try:
+        for i in range(count):
+            time.sleep(0.01)
+            progress["produced"] = i + 1
+            yield i
+    finally:
+        progress["closed"] = True
+
+
+def _fail(model: FakeModel):
+    raise RuntimeError("inference failure")
+
+
+class TestModelExecutor:
+    """ModelExecutorのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_models_are_loaded_once_per_replica(self):
+        """モデルがレプリカ数分だけロードされ、リクエスト間で再利用されることのテスト"""
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return FakeModel()
+
+        executor = ModelExecutor("fake", loader, replicas=2)
+        await executor.start()
+        try:
+            for _ in range(4):
+                await executor.run(_predict, 0)
+            assert len(loads) == 2
+            assert sum(model.calls for model in executor._models) == 4
+        finally:
+            await executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_run_executes_outside_event_loop(self):
+        """関数がイベントループとは別のスレッドで実行されることのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        try:
+            thread_name = await executor.run(_predict, 0)
+        finally:
+            await executor.shutdown()
+
+        assert thread_name.startswith("model-fake")
+        assert thread_name != threading.current_thread().name
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_items_in_order(self):
+        """イテレータの要素が順に届くことのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        try:
+            tokens = [token async for token in executor.stream(_tokens, "a b c")]
+        finally:
+            await executor.shutdown()
+
+        assert tokens == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_error_is_propagated(self):
+        """ワーカーでの例外が呼び出し元に伝播し、レプリカが返却されることのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        try:
+            with pytest.raises(RuntimeError):
+                await executor.run(_fail)
+            # レプリカが返却されていれば次のリクエストも処理できる
+            await asyncio.wait_for(executor.run(_predict, 0), timeout=1.0)
+        finally:
+            await executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_share_busy_replica(self):
+        """キャンセルされた呼び出しの処理が終わるまでレプリカが貸し出されないことのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        await executor.start()
+        try:
+            task = asyncio.create_task(executor.run(_predict, 0.2))
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+            loop = asyncio.get_running_loop()
+            started_at = loop.time()
+            await executor.run(_predict, 0)
+            assert loop.time() - started_at >= 0.1
+        finally:
+            await executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_stream_stops_when_caller_stops_reading(self):
+        """呼び出し元が読み出しをやめるとワーカーでの生成が打ち切られることのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        progress = {"produced": 0, "closed": False}
+        try:
+            stream = executor.stream(_counted_tokens, 100, progress)
+            assert await stream.__anext__() == 0
+            await stream.aclose()
+
+            # レプリカが返却されていれば次のリクエストも処理できる
+            await asyncio.wait_for(executor.run(_predict, 0), timeout=1.0)
+        finally:
+            await executor.shutdown()
+
+        assert progress["closed"]
+        assert progress["produced"] < 100
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_released_on_shutdown(self):
+        """停止時にレプリカを待っている呼び出し元がエラーで終了することのテスト"""
+        executor = ModelExecutor("fake", FakeModel)
+        await executor.start()
+        busy = asyncio.create_task(executor.run(_predict, 0.2))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.create_task(executor.run(_predict, 0)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        await executor.shutdown()
+
+        for waiter in waiters:
+            with pytest.raises(VLMOverloadedError):
+                await asyncio.wait_for(waiter, timeout=1.0)
+        await busy
+
+    def test_invalid_configuration(self):
+        """不正な設定が拒否されることのテスト"""
+        with pytest.raises(ValueError):
+            ModelExecutor("fake", FakeModel, replicas=0)
+        with pytest.raises(ValueError):
+            ModelExecutor("fake", FakeModel, mode="gpu")
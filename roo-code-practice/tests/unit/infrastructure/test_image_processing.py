@@ -0,0 +1,150 @@
+"""画像入力の読み込みと前処理のテスト"""
+import asyncio
+import base64
+import struct
+import zlib
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import InvalidImageError
+from src.local_vlm_server.domain.value_objects import ImageInput, VLMRequest
+from src.local_vlm_server.infrastructure.image_processing import (
+    ImageProcessor,
+    decode_base64_image,
+    detect_media_type,
+    read_image_file,
+    read_image_size,
+)
+
+
+def make_png(width: int = 2, height: int = 3, color: bytes = b"\xff\x00\x00") -> bytes:
+    """テスト用の単色のPNG画像を作成する"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + color * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+class TestImageDecoding:
+    """画像の判定と読み込みのテスト"""
+
+    def test_detect_media_type_and_size(self):
+        """先頭のバイト列から形式を判定し、ヘッダーから大きさを読み取れることのテスト"""
+        png = make_png(4, 5)
+        gif = b"GIF89a" + struct.pack("<HH", 7, 8) + b"\x00" * 8
+
+        assert detect_media_type(png) == "image/png"
+        assert read_image_size(png) == (4, 5)
+        assert detect_media_type(gif) == "image/gif"
+        assert read_image_size(gif) == (7, 8)
+        assert detect_media_type(b"not an image") is None
+
+    def test_decode_base64_and_data_url(self):
+        """Base64文字列とdata URLのどちらからでも同じ画像になることのテスト"""
+        png = make_png()
+        encoded = base64.b64encode(png).decode("ascii")
+
+        image = decode_base64_image(encoded)
+        from_url = decode_base64_image(f"data:image/png;base64,{encoded}")
+
+        assert image.data == png
+        assert image.media_type == "image/png"
+        assert from_url.digest == image.digest
+
+    def test_decode_rejects_invalid_data(self):
+        """Base64でないデータ、画像でないデータ、大きすぎるデータを拒否することのテスト"""
+        with pytest.raises(InvalidImageError):
+            decode_base64_image("not base64!")
+        with pytest.raises(InvalidImageError):
+            decode_base64_image(base64.b64encode(b"plain text").decode("ascii"))
+        with pytest.raises(InvalidImageError):
+            decode_base64_image(base64.b64encode(make_png()).decode("ascii"), max_bytes=10)
+
+    def test_read_image_file_is_restricted_to_allowed_dirs(self, tmp_path):
+        """許可されたディレクトリのファイルだけを読み込めることのテスト"""
+        allowed = tmp_path / "images"
+        allowed.mkdir()
+        (allowed / "cat.png").write_bytes(make_png())
+        (tmp_path / "secret.png").write_bytes(make_png())
+
+        image = read_image_file(f"file://{allowed / 'cat.png'}", [str(allowed)])
+
+        assert image.media_type == "image/png"
+        with pytest.raises(InvalidImageError):
+            read_image_file(f"file://{allowed}/../secret.png", [str(allowed)])
+        with pytest.raises(InvalidImageError):
+            read_image_file(str(allowed / "cat.png"), [])
+        with pytest.raises(InvalidImageError):
+            read_image_file("http://example.com/cat.png", [str(allowed)])
+
+    def test_cache_key_depends_on_image_content(self):
+        """リクエストのキーに画像の内容が含まれることのテスト"""
+        red = ImageInput(data=make_png(color=b"\xff\x00\x00"))
+        blue = ImageInput(data=make_png(color=b"\x00\x00\xff"))
+
+        def key(*images):
+            return VLMRequest(prompt_text="describe", model_id="m", images=images).cache_key()
+
+        assert key() != key(red)
+        assert key(red) != key(blue)
+        assert key(red) == key(ImageInput(data=red.data))
+
+
+class TestImageProcessor:
+    """ImageProcessorのテスト"""
+
+    @pytest.fixture
+    def processor(self):
+        """ImageProcessorのフィクスチャ"""
+        processor = ImageProcessor(lambda model_id: {"max_size": 64}, max_entries=2)
+        yield processor
+        processor.close()
+
+    @pytest.mark.asyncio
+    async def test_repeated_image_is_served_from_cache(self, processor):
+        """同じ画像の2回目以降の前処理がキャッシュから返されることのテスト"""
+        image = ImageInput(data=make_png())
+
+        first = await processor.preprocess("m", [image])
+        second = await processor.preprocess("m", [ImageInput(data=make_png())])
+
+        assert first[0].width == 2 and first[0].height == 3
+        assert second[0] is first[0]
+        assert processor.hits == 1
+        assert processor.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_images_are_processed_once(self, processor):
+        """同時に届いた同じ画像の前処理が1回にまとめられることのテスト"""
+        images = [ImageInput(data=make_png()) for _ in range(5)]
+
+        results = await asyncio.gather(*(processor.preprocess("m", [image]) for image in images))
+
+        assert len({id(result[0]) for result in results}) == 1
+        assert processor.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self, processor):
+        """キャッシュが最大件数を超えると古い画像から取り除かれることのテスト"""
+        for width in (1, 2, 3):
+            await processor.preprocess("m", [ImageInput(data=make_png(width=width))])
+
+        assert processor.get_stats()["entries"] == 2
+        await processor.preprocess("m", [ImageInput(data=make_png(width=1))])
+        assert processor.misses == 4
+
+    @pytest.mark.asyncio
+    async def test_oversized_image_is_rejected(self):
+        """ピクセル数の上限を超える画像がデコードされずに拒否されることのテスト"""
+        processor = ImageProcessor(lambda model_id: {"max_pixels": 100})
+        try:
+            with pytest.raises(InvalidImageError):
+                await processor.preprocess("m", [ImageInput(data=make_png(20, 20))])
+        finally:
+            processor.close()
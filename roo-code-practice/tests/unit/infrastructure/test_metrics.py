@@ -0,0 +1,100 @@
+"""メトリクスのテスト"""
+import pytest
+
+from src.local_vlm_server.domain.exceptions import VLMProcessingError
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.metrics import (
+    EXECUTE_DURATION_SECONDS,
+    GENERATED_TOKENS_TOTAL,
+    REQUEST_ERRORS_TOTAL,
+    REQUESTS_TOTAL,
+    MetricsRegistry,
+)
+from src.local_vlm_server.infrastructure.vlm_clients.implementations.llama import LlamaVLMClient
+from src.local_vlm_server.infrastructure.vlm_clients.instrumented import InstrumentedVLMClient
+from tests.conftest import MockVLMClient
+
+
+class TestMetricsRegistry:
+    """MetricsRegistryのテスト"""
+
+    def test_render_counter_and_gauge(self):
+        """カウンタとゲージがテキスト形式で出力されることのテスト"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests.", ("model",))
+        in_flight = registry.gauge("in_flight", "In flight.")
+        requests.labels('a"b').inc(2)
+        in_flight.labels().set(3)
+
+        text = registry.render()
+
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{model="a\\"b"} 2' in text
+        assert "in_flight 3" in text
+
+    def test_render_histogram(self):
+        """ヒストグラムが累積バケット・合計・件数として出力されることのテスト"""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1.0))
+        child = latency.labels("m")
+        child.observe(0.05)
+        child.observe(0.5)
+        child.observe(5.0)
+
+        lines = registry.render().splitlines()
+
+        assert 'latency_seconds_bucket{model="m",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{model="m",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{model="m",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{model="m"} 5.55' in lines
+        assert 'latency_seconds_count{model="m"} 3' in lines
+
+    def test_labels_are_reused(self):
+        """同じラベル値に対して同じ子メトリクスが返ることのテスト"""
+        registry = MetricsRegistry()
+        family = registry.counter("requests_total", "Requests.", ("model",))
+
+        assert family.labels("m") is family.labels("m")
+        with pytest.raises(ValueError):
+            family.labels("m", "extra")
+        with pytest.raises(ValueError):
+            registry.counter("requests_total", "Duplicate.")
+
+
+class TestClientInstrumentation:
+    """VLMクライアントの計測のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_instrumented_client_counts_requests_and_errors(self):
+        """リクエスト数とエラー数が例外の型ごとに記録されることのテスト"""
+        backend = MockVLMClient("instrumented-model")
+        client = InstrumentedVLMClient(backend)
+        request = VLMRequest(prompt_text="Hello", model_id="instrumented-model")
+
+        await client.generate_response(request)
+
+        async def failing(request):
+            raise VLMProcessingError("instrumented-model", "boom")
+
+        backend.generate_response = failing
+        with pytest.raises(VLMProcessingError):
+            await client.generate_response(request)
+
+        assert REQUESTS_TOTAL.labels("instrumented-model", "generate").value == 2
+        assert REQUEST_ERRORS_TOTAL.labels("instrumented-model", "VLMProcessingError").value == 1
+
+    @pytest.mark.asyncio
+    async def test_base_client_records_execution(self):
+        """バックエンドの実行時間と生成トークン数が記録されることのテスト"""
+        client = LlamaVLMClient(model_id="metrics-llama", config={"mock_latency": 0.01})
+        try:
+            response = await client.generate_response(
+                VLMRequest(prompt_text="Hello", model_id="metrics-llama")
+            )
+        finally:
+            await client.close()
+
+        execute = EXECUTE_DURATION_SECONDS.labels("metrics-llama", "single")
+        assert execute.count == 1
+        assert execute.sum >= 0.01
+        assert GENERATED_TOKENS_TOTAL.labels("metrics-llama").value == response.tokens_used
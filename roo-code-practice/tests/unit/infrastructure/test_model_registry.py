@@ -0,0 +1,343 @@
+"""モデルレジストリのテスト"""
+import asyncio
+import os
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import VLMModelNotFoundError
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.model_registry import (
+    ModelRegistryWatcher,
+    load_registry_file,
+    parse_registry,
+)
+from src.local_vlm_server.infrastructure.tokenizers import TokenizerService
+from src.local_vlm_server.infrastructure.vlm_clients.implementations.llama import LlamaVLMClient
+from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+
+
+REGISTRY_TOML = """
+[[models]]
+id = "llama-a"
+client_type = "llama"
+name = "LLaMA A"
+mock_latency = {latency}
+
+[models.concurrency]
+max_concurrency = 4
+max_queue = 8
+
+[models.batching]
+max_batch_size = 2
+max_wait_ms = 1
+
+[[models]]
+id = "llama-b"
+client_type = "llama"
+mock_latency = 0
+"""
+
+
+class TrackingLlamaVLMClient(LlamaVLMClient):
+    """作成したクライアントのロードと解放を記録するLLaMAクライアント"""
+
+    instances = []
+
+    def __init__(self, model_id, config=None):
+        super().__init__(model_id, config)
+        self.opened = False
+        self.closed = False
+        TrackingLlamaVLMClient.instances.append(self)
+
+    async def open(self):
+        await asyncio.sleep(0.02)
+        if self.config.get("fail_open"):
+            raise RuntimeError("failed to load model")
+        await super().open()
+        self.opened = True
+
+    async def close(self):
+        await super().close()
+        self.closed = True
+
+
+def write_registry(path, content: str):
+    """レジストリのファイルを書き込み、更新時刻を確実に進める"""
+    previous = os.stat(path).st_mtime_ns if path.exists() else 0
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, ns=(previous + 1_000_000_000, previous + 1_000_000_000))
+
+
+@pytest.fixture
+def repository():
+    """作成したクライアントを記録するVLMリポジトリのフィクスチャ"""
+    TrackingLlamaVLMClient.instances = []
+    repository = VLMRepository()
+    repository.register_client_factory("llama", TrackingLlamaVLMClient)
+    return repository
+
+
+class TestRegistryParsing:
+    """モデルレジストリの読み込みのテスト"""
+
+    def test_load_toml(self, tmp_path):
+        """TOMLのエントリからモデルとクライアント設定が作成されることのテスト"""
+        path = tmp_path / "models.toml"
+        write_registry(path, REGISTRY_TOML.format(latency=0))
+
+        specs = load_registry_file(str(path))
+
+        assert [spec.model.id for spec in specs] == ["llama-a", "llama-b"]
+        assert specs[0].model.name == "LLaMA A"
+        assert specs[1].model.name == "llama-b"
+        assert specs[0].client_type == "llama"
+        assert specs[0].config == {
+            "mock_latency": 0,
+            "concurrency": {"max_concurrency": 4, "max_queue": 8},
+            "batching": {"max_batch_size": 2, "max_wait_ms": 1},
+        }
+
+    def test_load_yaml(self, tmp_path):
+        """YAMLのレジストリを読み込めることのテスト"""
+        pytest.importorskip("yaml")
+        path = tmp_path / "models.yaml"
+        path.write_text(
+            "models:\n"
+            "  - id: gpt-a\n"
+            "    client_type: gpt\n"
+            "    api_base: http://localhost:8000\n"
+            "    cache: {backend: memory, max_entries: 16}\n",
+            encoding="utf-8"
+        )
+
+        specs = load_registry_file(str(path))
+
+        assert specs[0].client_type == "gpt"
+        assert specs[0].config["cache"] == {"backend": "memory", "max_entries": 16}
+
+    @pytest.mark.parametrize("data, message", [
+        ({"models": {"id": "a"}}, "must be a list"),
+        ({"models": [{"client_type": "llama"}]}, "has no 'id'"),
+        ({"models": [{"id": "a"}]}, "has no 'client_type'"),
+        ({"models": [{"id": "a", "client_type": "llama"}] * 2}, "more than once"),
+    ])
+    def test_invalid_entries_are_rejected(self, data, message):
+        """形式が正しくないエントリを拒否することのテスト"""
+        with pytest.raises(ValueError, match=message):
+            parse_registry(data)
+
+    def test_unsupported_extension_is_rejected(self, tmp_path):
+        """対応していない拡張子のファイルを拒否することのテスト"""
+        path = tmp_path / "models.json"
+        path.write_text("{}", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="unsupported"):
+            load_registry_file(str(path))
+
+
+class TestApplyRegistry:
+    """VLMRepository.apply_registryのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_models_are_added_and_removed(self, repository):
+        """レジストリの内容に合わせてモデルが追加・削除されることのテスト"""
+        try:
+            changes = await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama", "mock_latency": 0},
+                    {"id": "llama-b", "client_type": "llama", "mock_latency": 0},
+                ]})
+            )
+            assert changes == {"added": ["llama-a", "llama-b"], "removed": [], "updated": [], "failed": []}
+            # 追加されたモデルはウォームアップされる
+            assert all(client.opened for client in TrackingLlamaVLMClient.instances)
+            removed_client = TrackingLlamaVLMClient.instances[1]
+
+            changes = await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama", "mock_latency": 0, "name": "Renamed"},
+                ]})
+            )
+            await asyncio.sleep(0.01)
+
+            assert changes == {"added": [], "removed": ["llama-b"], "updated": [], "failed": []}
+            assert removed_client.closed
+            assert (await repository.get_model_by_id("llama-a")).name == "Renamed"
+            # 名前だけの変更ではクライアントを作り直さない
+            assert len(TrackingLlamaVLMClient.instances) == 2
+            with pytest.raises(VLMModelNotFoundError):
+                await repository.get_client_for_model("llama-b")
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_unknown_client_type_is_rejected(self, repository):
+        """登録されていないクライアントタイプを含むレジストリは何も反映しないことのテスト"""
+        with pytest.raises(ValueError, match="Unknown client type"):
+            await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama"},
+                    {"id": "other", "client_type": "unknown"},
+                ]})
+            )
+
+        assert await repository.get_all_models() == []
+
+    @pytest.mark.asyncio
+    async def test_updated_model_is_warmed_before_switching(self, repository):
+        """設定の変更時に新しいクライアントのロード後に切り替わり、古いクライアントが処理中のリクエストを完了することのテスト"""
+        try:
+            await repository.apply_registry(
+                parse_registry({"models": [{"id": "llama-a", "client_type": "llama", "mock_latency": 0.1}]})
+            )
+            old = await repository.get_client_for_model("llama-a")
+            old_base = TrackingLlamaVLMClient.instances[0]
+            in_flight = asyncio.create_task(
+                old.generate_response(VLMRequest(prompt_text="Hello", model_id="llama-a"))
+            )
+            await asyncio.sleep(0.01)
+
+            reload = asyncio.create_task(repository.apply_registry(
+                parse_registry({"models": [{"id": "llama-a", "client_type": "llama", "mock_latency": 0}]})
+            ))
+            await asyncio.sleep(0)
+            # 新しいクライアントのロード中は古いクライアントが使われる
+            assert await repository.get_client_for_model("llama-a") is old
+
+            changes = await reload
+            new = await repository.get_client_for_model("llama-a")
+
+            assert changes["updated"] == ["llama-a"]
+            assert new is not old
+            assert TrackingLlamaVLMClient.instances[1].opened
+            assert not old_base.closed
+            assert (await in_flight).model_id == "llama-a"
+            await asyncio.sleep(0.01)
+            assert old_base.closed
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_reload_keeps_current_config(self, repository):
+        """新しいクライアントのロードに失敗した場合に現在のクライアントと設定が維持されることのテスト"""
+        try:
+            await repository.apply_registry(
+                parse_registry({"models": [{"id": "llama-a", "client_type": "llama", "model_path": "old.gguf"}]})
+            )
+            old = await repository.get_client_for_model("llama-a")
+
+            changes = await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama", "model_path": "new.gguf", "fail_open": True},
+                ]})
+            )
+
+            assert changes == {"added": [], "removed": [], "updated": [], "failed": ["llama-a"]}
+            assert await repository.get_client_for_model("llama-a") is old
+            assert repository.get_tokenizer_config("llama-a")["model_path"] == "old.gguf"
+
+            # 追い出された後に再びロードしても現在の設定が使われる
+            await repository.unload_model("llama-a")
+            await repository.get_client_for_model("llama-a")
+            assert TrackingLlamaVLMClient.instances[-1].config["model_path"] == "old.gguf"
+
+            # 同じ内容を再び反映するとロードをやり直す
+            changes = await repository.apply_registry(
+                parse_registry({"models": [{"id": "llama-a", "client_type": "llama", "model_path": "new.gguf"}]})
+            )
+            assert changes["updated"] == ["llama-a"]
+            assert repository.get_tokenizer_config("llama-a")["model_path"] == "new.gguf"
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_updated_model_invalidates_tokenizer(self, repository):
+        """モデルの設定が変わるとトークナイザーが新しい設定でロードし直されることのテスト"""
+        service = TokenizerService(repository.get_tokenizer_config)
+        repository.add_config_listener(service.invalidate)
+        try:
+            await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama", "tokenizer": {"backend": "heuristic"}},
+                ]}),
+                warm=False
+            )
+            await service.count_tokens("llama-a", ["Hello"])
+
+            await repository.apply_registry(
+                parse_registry({"models": [
+                    {"id": "llama-a", "client_type": "llama", "tokenizer": {"backend": "unknown"}},
+                ]}),
+                warm=False
+            )
+
+            assert service._counts == {}
+            with pytest.raises(ValueError, match="Unknown tokenizer backend"):
+                await service.count_tokens("llama-a", ["Hello"])
+        finally:
+            await repository.close()
+
+
+class TestModelRegistryWatcher:
+    """ModelRegistryWatcherのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_file_changes_are_reloaded(self, repository, tmp_path):
+        """ファイルの変更が検出されて反映され、不正な内容の場合は現在のモデルが維持されることのテスト"""
+        path = tmp_path / "models.toml"
+        write_registry(path, REGISTRY_TOML.format(latency=0))
+        watcher = ModelRegistryWatcher(str(path), repository, poll_interval=0.01)
+        try:
+            await watcher.reload(warm=False)
+            assert not await watcher.check()
+
+            write_registry(path, REGISTRY_TOML.format(latency=0).split("[[models]]\nid = \"llama-b\"")[0])
+            assert await watcher.check()
+            assert [model.id for model in await repository.get_all_models()] == ["llama-a"]
+
+            write_registry(path, "[[models]\nbroken")
+            assert not await watcher.check()
+            assert [model.id for model in await repository.get_all_models()] == ["llama-a"]
+            assert watcher.get_stats()["failures"] == 1
+            # 同じ内容のファイルは再び読み込まない
+            assert not await watcher.check()
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_model_reload_is_retried(self, repository, tmp_path):
+        """モデルのロードに失敗した場合にファイルが変わらなくても次の確認で再び反映することのテスト"""
+        path = tmp_path / "models.toml"
+        write_registry(path, REGISTRY_TOML.format(latency=0))
+        watcher = ModelRegistryWatcher(str(path), repository, poll_interval=0.01)
+        try:
+            await watcher.reload()
+
+            write_registry(path, REGISTRY_TOML.format(latency=0) + "fail_open = true\n")
+            assert await watcher.check()
+            assert watcher.get_stats()["last_error"] is not None
+            # ファイルが変わっていなくても再び反映を試みる
+            assert await watcher.check()
+            assert len(TrackingLlamaVLMClient.instances) == 4
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_watch_task_picks_up_changes(self, repository, tmp_path):
+        """監視タスクがファイルの変更を反映することのテスト"""
+        path = tmp_path / "models.toml"
+        watcher = ModelRegistryWatcher(str(path), repository, poll_interval=0.01)
+        await watcher.start()
+        try:
+            write_registry(path, REGISTRY_TOML.format(latency=0))
+            for _ in range(100):
+                if watcher.reloads:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert {model.id for model in await repository.get_all_models()} == {"llama-a", "llama-b"}
+            resident = {entry["model_id"] for entry in await repository.list_resident_models()}
+            assert resident == {"llama-a", "llama-b"}
+        finally:
+            await watcher.stop()
+            await repository.close()
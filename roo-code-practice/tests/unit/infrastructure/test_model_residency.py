@@ -0,0 +1,160 @@
+"""モデルの常駐管理のテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.domain.entities import VLMModel
+from src.local_vlm_server.domain.exceptions import ModelTooLargeError, VLMOverloadedError
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.model_residency import ModelResidencyManager
+from src.local_vlm_server.infrastructure.vlm_clients.instrumented import InstrumentedVLMClient
+from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+from tests.conftest import MockVLMClient
+
+
+MB = 1024 * 1024
+
+
+class SizedMockVLMClient(MockVLMClient):
+    """メモリ使用量を持ち、閉じられたかどうかを記録するモッククライアント"""
+
+    def __init__(self, model_id: str, memory_bytes: int, delay: float = 0.0):
+        super().__init__(model_id)
+        self.memory_bytes = memory_bytes
+        self.delay = delay
+        self.closed = False
+
+    def memory_footprint(self) -> int:
+        return self.memory_bytes
+
+    async def generate_response(self, request):
+        await asyncio.sleep(self.delay)
+        return await super().generate_response(request)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestModelResidencyManager:
+    """ModelResidencyManagerのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_model_is_evicted(self):
+        """予算を超える場合に最も長く使われていないモデルがアンロードされることのテスト"""
+        manager = ModelResidencyManager(memory_budget_bytes=200)
+        a = SizedMockVLMClient("a", 100)
+        b = SizedMockVLMClient("b", 100)
+        c = SizedMockVLMClient("c", 100)
+
+        await manager.admit("a", a)
+        await manager.admit("b", b)
+        manager.get("a")
+        await manager.admit("c", c)
+
+        assert "a" in manager
+        assert "b" not in manager
+        assert "c" in manager
+        assert b.closed
+        assert not a.closed
+        assert manager.used_bytes == 200
+        assert manager.evictions == 1
+
+    @pytest.mark.asyncio
+    async def test_pinned_model_is_kept(self):
+        """固定されたモデルがアンロードされないことのテスト"""
+        manager = ModelResidencyManager(memory_budget_bytes=200)
+        pinned = SizedMockVLMClient("pinned", 100)
+        other = SizedMockVLMClient("other", 100)
+
+        await manager.admit("pinned", pinned, pinned=True)
+        await manager.admit("other", other)
+        await manager.admit("new", SizedMockVLMClient("new", 100))
+
+        assert "pinned" in manager
+        assert "other" not in manager
+        assert not pinned.closed
+
+        # 固定されたモデルだけでは予算内に収まらない場合は拒否される
+        with pytest.raises(VLMOverloadedError):
+            await manager.admit("large", SizedMockVLMClient("large", 150))
+        assert "new" in manager
+
+    @pytest.mark.asyncio
+    async def test_model_larger_than_budget_is_rejected(self):
+        """メモリ予算より大きいモデルが一時的な過負荷ではないエラーで拒否されることのテスト"""
+        manager = ModelResidencyManager(memory_budget_bytes=200)
+        small = SizedMockVLMClient("small", 100)
+        await manager.admit("small", small)
+
+        with pytest.raises(ModelTooLargeError) as excinfo:
+            await manager.admit("huge", SizedMockVLMClient("huge", 500))
+
+        assert not isinstance(excinfo.value, VLMOverloadedError)
+        assert excinfo.value.memory_budget_bytes == 200
+        assert "small" in manager
+        assert not small.closed
+
+    @pytest.mark.asyncio
+    async def test_unlimited_budget(self):
+        """予算が無制限の場合にアンロードされないことのテスト"""
+        manager = ModelResidencyManager()
+        for i in range(5):
+            await manager.admit(f"m{i}", SizedMockVLMClient(f"m{i}", 10 ** 12))
+
+        assert len(manager) == 5
+        assert manager.fits(10 ** 15)
+
+    @pytest.mark.asyncio
+    async def test_eviction_waits_for_in_flight_requests(self):
+        """アンロード時に処理中のリクエストの完了を待ってから閉じることのテスト"""
+        manager = ModelResidencyManager(memory_budget_bytes=100)
+        backend = SizedMockVLMClient("slow", 100, delay=0.05)
+        client = InstrumentedVLMClient(backend)
+        await manager.admit("slow", client)
+
+        request = VLMRequest(prompt_text="Hello", model_id="slow")
+        in_flight = asyncio.create_task(client.generate_response(request))
+        await asyncio.sleep(0)
+        assert manager.snapshot()[0]["in_flight"] == 1
+
+        evicted = await manager.evict("slow")
+
+        assert evicted
+        assert in_flight.done()
+        assert (await in_flight).text
+        assert backend.closed
+        assert not await manager.evict("slow")
+
+
+class TestVLMRepositoryResidency:
+    """VLMRepositoryのモデル常駐管理のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_evicted_model_is_reloaded_lazily(self):
+        """アンロードされたモデルが次のリクエスト時に再ロードされることのテスト"""
+        repository = VLMRepository(memory_budget_mb=1)
+        for model_id in ("small-a", "small-b"):
+            repository.register_model(
+                VLMModel(id=model_id, name=model_id),
+                "llama",
+                {"memory_mb": 1, "mock_latency": 0}
+            )
+
+        try:
+            first = await repository.get_client_for_model("small-a")
+            await repository.get_client_for_model("small-b")
+
+            resident = [entry["model_id"] for entry in await repository.list_resident_models()]
+            assert resident == ["small-b"]
+
+            reloaded = await repository.get_client_for_model("small-a")
+            assert reloaded is not first
+            response = await reloaded.generate_response(
+                VLMRequest(prompt_text="Hello", model_id="small-a")
+            )
+            assert response.model_id == "small-a"
+
+            assert await repository.unload_model("small-a")
+            assert await repository.list_resident_models() == []
+        finally:
+            await repository.close()
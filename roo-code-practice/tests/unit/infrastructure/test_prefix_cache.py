@@ -0,0 +1,86 @@
+"""接頭辞キャッシュのテスト"""
+import pytest
+
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.vlm_clients.implementations.llama import (
+    LlamaVLMClient,
+    MockLlamaModel,
+)
+from src.local_vlm_server.infrastructure.vlm_clients.prefix_cache import PrefixCachingModel
+
+
+# 4バイトで1トークンとなるため、400文字で100トークン
+SYSTEM_PROMPT = "You are a helpful assistant. " * 13 + "x" * 23
+
+
+class TestPrefixCachingModel:
+    """PrefixCachingModelのテスト"""
+
+    def test_shared_prefix_is_reused(self):
+        """繰り返し現れる接頭辞の状態が保存され、以降のリクエストで再利用されることのテスト"""
+        backend = MockLlamaModel(latency=0)
+        model = PrefixCachingModel(backend, block_size=16, min_hits=2)
+
+        first = model.create_completion(SYSTEM_PROMPT + "Question 1")
+        second = model.create_completion(SYSTEM_PROMPT + "Question 2")
+        evaluated = backend.evaluated_tokens
+        third = model.create_completion(SYSTEM_PROMPT + "Question 3")
+
+        assert first["prefix_cached_tokens"] == 0
+        assert second["prefix_cached_tokens"] == 0
+        # 100トークンの接頭辞のうち、16トークン境界の96トークンが再利用される
+        assert third["prefix_cached_tokens"] == 96
+        assert backend.evaluated_tokens - evaluated == third["usage"]["prompt_tokens"] - 96
+        assert model.get_stats() == {"entries": 1, "hits": 1, "misses": 2, "tokens_saved": 96}
+
+    def test_different_prefix_is_not_reused(self):
+        """異なる接頭辞の状態が再利用されないことのテスト"""
+        model = PrefixCachingModel(MockLlamaModel(latency=0), block_size=16, min_hits=1)
+
+        model.create_completion(SYSTEM_PROMPT + "Question 1")
+        completion = model.create_completion("Another system prompt. " * 10 + "Question 2")
+
+        assert completion["prefix_cached_tokens"] == 0
+
+    def test_entries_are_bounded(self):
+        """保持する状態の数が上限を超えないことのテスト"""
+        model = PrefixCachingModel(MockLlamaModel(latency=0), block_size=16, max_entries=2, min_hits=1)
+
+        for i in range(4):
+            model.create_completion(f"System prompt number {i}. " * 10 + "Question")
+
+        assert model.get_stats()["entries"] == 2
+
+    def test_stream_reports_cached_tokens(self):
+        """ストリーミングの最後の断片に再利用したトークン数が含まれることのテスト"""
+        model = PrefixCachingModel(MockLlamaModel(latency=0), block_size=16, min_hits=1)
+
+        list(model.create_completion(SYSTEM_PROMPT + "Question 1", stream=True))
+        events = list(model.create_completion(SYSTEM_PROMPT + "Question 2", stream=True))
+
+        assert events[-1]["prefix_cached_tokens"] == 96
+        assert all("prefix_cached_tokens" not in event for event in events[:-1])
+
+
+class TestLlamaPrefixCache:
+    """LlamaVLMClientの接頭辞キャッシュのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_client_reports_prefill_tokens_saved(self):
+        """クライアントのメタデータと統計情報に再利用したトークン数が含まれることのテスト"""
+        client = LlamaVLMClient(
+            "llama-test",
+            {"mock_latency": 0, "prefix_cache": {"block_size": 16, "min_hits": 1}}
+        )
+        try:
+            await client.generate_response(
+                VLMRequest(prompt_text=SYSTEM_PROMPT + "Question 1", model_id="llama-test")
+            )
+            response = await client.generate_response(
+                VLMRequest(prompt_text=SYSTEM_PROMPT + "Question 2", model_id="llama-test")
+            )
+
+            assert response.metadata["prefix_cached_tokens"] == 96
+            assert client.get_stats()["prefix_cache"] == {"hits": 1, "prefill_tokens_saved": 96}
+        finally:
+            await client.close()
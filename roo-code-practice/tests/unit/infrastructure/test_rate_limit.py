@@ -0,0 +1,125 @@
+"""レート制限のテスト"""
+import pytest
+
+from src.local_vlm_server.domain.exceptions import RateLimitExceededError
+from src.local_vlm_server.infrastructure.rate_limit import (
+    BucketSpec,
+    InMemoryRateLimitStore,
+    RateLimiter,
+    SQLiteRateLimitStore,
+    _take,
+    create_rate_limit_store,
+)
+
+
+class TestTokenBucket:
+    """トークンバケットの計算のテスト"""
+
+    def test_refill_over_time(self):
+        """経過時間に応じてバケットが補充されることのテスト"""
+        spec = BucketSpec("requests", rate=2.0, capacity=4.0, cost=1.0)
+
+        allowed, retry_after, levels = _take({"requests": (0.0, 100.0)}, [spec], 100.25)
+        assert not allowed
+        assert retry_after == pytest.approx(0.25)
+
+        allowed, _, levels = _take(levels, [spec], 101.0)
+        assert allowed
+        assert levels["requests"][0] == pytest.approx(1.0)
+
+        # 容量を超えて補充されない
+        _, _, levels = _take(levels, [spec], 1000.0)
+        assert levels["requests"][0] == pytest.approx(3.0)
+
+    def test_all_or_nothing(self):
+        """いずれかのバケットが足りない場合はどのバケットからも消費しないことのテスト"""
+        specs = [
+            BucketSpec("requests", rate=1.0, capacity=10.0, cost=1.0),
+            BucketSpec("tokens", rate=1.0, capacity=100.0, cost=80.0),
+        ]
+
+        allowed, _, levels = _take({"tokens": (50.0, 0.0)}, specs, 0.0)
+
+        assert not allowed
+        assert levels["requests"][0] == pytest.approx(10.0)
+        assert levels["tokens"][0] == pytest.approx(50.0)
+
+
+class TestRateLimiter:
+    """RateLimiterのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_requests_per_second(self):
+        """バースト分を超えたリクエストが拒否されることのテスト"""
+        limiter = RateLimiter(InMemoryRateLimitStore(), requests_per_second=1, burst=3)
+
+        for _ in range(3):
+            await limiter.acquire("key")
+        with pytest.raises(RateLimitExceededError) as exc_info:
+            await limiter.acquire("key")
+
+        assert 0 < exc_info.value.retry_after <= 1.0
+        assert "key" not in str(exc_info.value)
+        assert limiter.rejected == 1
+        # 別のAPIキーは影響を受けない
+        await limiter.acquire("other-key")
+
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_and_tenant_overrides(self):
+        """トークン数の制限とAPIキーごとの上書きのテスト"""
+        limiter = RateLimiter(
+            InMemoryRateLimitStore(),
+            tokens_per_minute=1000,
+            tenants={"unlimited": {"tokens_per_minute": None}}
+        )
+
+        assert limiter.limits_tokens("key")
+        assert not limiter.limits_tokens("unlimited")
+
+        await limiter.acquire("key", tokens=800)
+        with pytest.raises(RateLimitExceededError):
+            await limiter.acquire("key", tokens=300)
+        await limiter.acquire("key", tokens=100)
+        await limiter.acquire("unlimited", tokens=10 ** 6)
+
+    @pytest.mark.asyncio
+    async def test_idle_keys_are_evicted(self, monkeypatch):
+        """補充されて満杯になったキーと、上限を超えた古いキーが破棄されることのテスト"""
+        now = [1000.0]
+        monkeypatch.setattr("src.local_vlm_server.infrastructure.rate_limit.time.time", lambda: now[0])
+        store = InMemoryRateLimitStore(max_keys=3)
+        spec = BucketSpec("requests", rate=1.0, capacity=2.0, cost=1.0)
+
+        for i in range(3):
+            await store.take(f"key-{i}", [spec])
+        assert list(store._levels) == ["key-0", "key-1", "key-2"]
+
+        # 満杯まで補充されたキーは破棄される
+        now[0] += 10.0
+        await store.take("key-3", [spec])
+        assert list(store._levels) == ["key-3"]
+
+        # 補充されていないキーも上限を超えると古い順に破棄される
+        for i in range(4, 8):
+            await store.take(f"key-{i}", [spec])
+        assert list(store._levels) == ["key-5", "key-6", "key-7"]
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_is_shared(self, tmp_path):
+        """同じSQLiteファイルを使う複数のレート制限器で制限が共有されることのテスト"""
+        path = str(tmp_path / "rate_limits.sqlite3")
+        stores = [SQLiteRateLimitStore(path), create_rate_limit_store({"backend": "sqlite", "path": path})]
+        limiters = [RateLimiter(store, requests_per_second=0.01, burst=2) for store in stores]
+        try:
+            await limiters[0].acquire("key")
+            await limiters[1].acquire("key")
+            with pytest.raises(RateLimitExceededError):
+                await limiters[0].acquire("key")
+        finally:
+            for store in stores:
+                await store.close()
+
+    def test_unknown_backend(self):
+        """未知のバックエンドを指定した場合のテスト"""
+        with pytest.raises(ValueError):
+            create_rate_limit_store({"backend": "redis"})
@@ -0,0 +1,157 @@
+"""再試行とサーキットブレーカーのテスト"""
+import asyncio
+import time
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import (
+    VLMConnectionError,
+    VLMOverloadedError,
+    VLMProcessingError,
+)
+from src.local_vlm_server.infrastructure.vlm_clients.resilience import (
+    CircuitBreaker,
+    ResilientVLMClient,
+)
+from tests.conftest import MockVLMClient, make_request
+
+
+class FlakyMockVLMClient(MockVLMClient):
+    """最初のfailures回だけ例外を送出するモッククライアント"""
+
+    def __init__(self, model_id: str, failures: int = 0, error: Exception = None):
+        super().__init__(model_id)
+        self.failures = failures
+        self.error = error or VLMConnectionError(model_id, "down")
+        self.calls = 0
+
+    async def generate_response(self, request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return await super().generate_response(request)
+
+
+class TestResilientVLMClient:
+    """ResilientVLMClientのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_are_retried(self):
+        """一時的な接続エラーが再試行されて成功することのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=2)
+        client = ResilientVLMClient(backend, max_attempts=3, base_delay=0.001)
+
+        response = await client.generate_response(make_request())
+
+        assert response.model_id == "test-model"
+        assert backend.calls == 3
+        assert client.retries == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_are_bounded(self):
+        """再試行回数がmax_attemptsで打ち切られることのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=10)
+        client = ResilientVLMClient(backend, max_attempts=3, base_delay=0.001, failure_threshold=None)
+
+        with pytest.raises(VLMConnectionError):
+            await client.generate_response(make_request())
+
+        assert backend.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_processing_error_is_not_retried(self):
+        """リクエスト自体の問題によるエラーは再試行されないことのテスト"""
+        backend = FlakyMockVLMClient(
+            "test-model", failures=1, error=VLMProcessingError("test-model", "bad")
+        )
+        client = ResilientVLMClient(backend, base_delay=0.001)
+
+        with pytest.raises(VLMProcessingError):
+            await client.generate_response(make_request())
+
+        assert backend.calls == 1
+        assert client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_backoff_uses_jitter_within_bounds(self):
+        """再試行までの待ち時間が指数的に増える上限の範囲に収まることのテスト"""
+        client = ResilientVLMClient(MockVLMClient("test-model"), base_delay=0.1, max_delay=0.3)
+
+        delays = [client._backoff(attempt) for attempt in (1, 2, 3, 4) for _ in range(50)]
+
+        assert all(0.0 <= delay <= 0.1 for delay in delays[:50])
+        assert all(0.0 <= delay <= 0.3 for delay in delays[100:])
+        assert len(set(delays)) > 1
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_and_fails_fast(self):
+        """接続エラーが続くとサーキットブレーカーが開き、バックエンドを呼ばずに失敗することのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=100)
+        client = ResilientVLMClient(
+            backend, max_attempts=1, failure_threshold=2, reset_timeout=60.0
+        )
+
+        for i in range(2):
+            with pytest.raises(VLMConnectionError):
+                await client.generate_response(make_request(i))
+        with pytest.raises(VLMOverloadedError) as exc_info:
+            await client.generate_response(make_request(2))
+
+        assert backend.calls == 2
+        assert exc_info.value.retry_after > 1.0
+        stats = client.get_stats()["resilience"]
+        assert stats["rejected"] == 1
+        assert stats["circuit_breaker"]["state"] == CircuitBreaker.OPEN
+
+    @pytest.mark.asyncio
+    async def test_circuit_closes_after_successful_probe(self):
+        """開状態の後の試行リクエストが成功するとサーキットブレーカーが閉じることのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=1)
+        client = ResilientVLMClient(
+            backend, max_attempts=1, failure_threshold=1, reset_timeout=0.05
+        )
+
+        with pytest.raises(VLMConnectionError):
+            await client.generate_response(make_request())
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        await asyncio.sleep(0.06)
+        assert client.breaker.state == CircuitBreaker.HALF_OPEN
+        await client.generate_response(make_request())
+
+        assert client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_limited_probes(self):
+        """半開状態では試行リクエストだけが通り、失敗すると再び開くことのテスト"""
+        breaker = CircuitBreaker("test-model", failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.opened == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_stops_before_deadline(self):
+        """期限までに再試行できない場合は再試行しないことのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=1)
+        client = ResilientVLMClient(backend, base_delay=10.0, max_delay=10.0)
+        # full jitterでも必ず期限を超えるよう、待ち時間を上限に固定する
+        client._backoff = lambda attempt: 10.0
+        request = make_request(deadline=time.time() + 1.0)
+
+        with pytest.raises(VLMConnectionError):
+            await client.generate_response(request)
+
+        assert backend.calls == 1
+        assert client.retries == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_retried_before_first_chunk(self):
+        """ストリーミングで最初の断片を返す前の接続エラーが再試行されることのテスト"""
+        backend = FlakyMockVLMClient("test-model", failures=1)
+        client = ResilientVLMClient(backend, base_delay=0.001)
+
+        chunks = [chunk async for chunk in client.generate_stream(make_request())]
+
+        assert chunks[-1].finish_reason == "stop"
+        assert backend.calls == 2
@@ -0,0 +1,171 @@
+"""レスポンスキャッシュのテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.domain.entities import Prompt, VLMResponse
+from src.local_vlm_server.domain.value_objects import ModelParameters, VLMRequest
+from src.local_vlm_server.infrastructure.response_cache import (
+    InMemoryResponseCache,
+    SQLiteResponseCache,
+)
+from src.local_vlm_server.infrastructure.vlm_clients.caching import CachingVLMClient
+from tests.conftest import MockVLMClient
+
+
+def make_response(text: str) -> VLMResponse:
+    """テスト用のVLMレスポンスを作成する"""
+    return VLMResponse(
+        model_id="test-model",
+        prompt=Prompt(text="prompt"),
+        text=text,
+        tokens_used=3,
+        metadata={"finish_reason": "stop"}
+    )
+
+
+class TestInMemoryResponseCache:
+    """InMemoryResponseCacheのテスト"""
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """最も古く使われたエントリが追い出されることのテスト"""
+        cache = InMemoryResponseCache(max_entries=2, ttl_seconds=None)
+        await cache.set("a", make_response("a"))
+        await cache.set("b", make_response("b"))
+        
+        # aを参照してからcを追加するとbが追い出される
+        assert await cache.get("a") is not None
+        await cache.set("c", make_response("c"))
+        
+        assert await cache.get("b") is None
+        assert (await cache.get("a")).text == "a"
+        assert (await cache.get("c")).text == "c"
+        assert cache.evictions == 1
+    
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self, monkeypatch):
+        """有効期限切れのエントリが返されないことのテスト"""
+        import src.local_vlm_server.infrastructure.response_cache as module
+        
+        now = [1000.0]
+        monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+        cache = InMemoryResponseCache(max_entries=10, ttl_seconds=5)
+        await cache.set("a", make_response("a"))
+        
+        now[0] += 10
+        
+        assert await cache.get("a") is None
+        assert cache.evictions == 1
+
+
+class TestSQLiteResponseCache:
+    """SQLiteResponseCacheのテスト"""
+    
+    @pytest.mark.asyncio
+    async def test_round_trip_and_persistence(self, tmp_path):
+        """保存したレスポンスが再オープン後も取得できることのテスト"""
+        path = str(tmp_path / "cache.sqlite3")
+        cache = SQLiteResponseCache(path)
+        await cache.set("a", make_response("こんにちは"))
+        cache.close()
+        
+        reopened = SQLiteResponseCache(path)
+        response = await reopened.get("a")
+        
+        assert response == make_response("こんにちは")
+        assert response.prompt.text == "prompt"
+        assert reopened.size() == 1
+    
+    @pytest.mark.asyncio
+    async def test_max_entries(self, tmp_path):
+        """上限を超えたエントリが追い出されることのテスト"""
+        cache = SQLiteResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+        for key in ("a", "b", "c"):
+            await cache.set(key, make_response(key))
+        
+        assert cache.size() == 2
+        assert cache.evictions == 1
+    
+    @pytest.mark.asyncio
+    async def test_size_tracks_overwrites_and_expired_entries(self, tmp_path):
+        """上書きや期限切れの削除でエントリ数がテーブルの行数と一致し続けることのテスト"""
+        cache = SQLiteResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=3, ttl_seconds=0.05)
+        await cache.set("a", make_response("a"))
+        await cache.set("a", make_response("a2"))
+        await cache.set("b", make_response("b"))
+        assert cache.size() == 2
+        
+        await asyncio.sleep(0.06)
+        assert await cache.get("a") is None
+        
+        rows = cache._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        assert cache.size() == rows == 1
+
+
+class TestCachingVLMClient:
+    """CachingVLMClientのテスト"""
+    
+    @pytest.fixture
+    def backend_client(self):
+        """委譲先のモッククライアントのフィクスチャ"""
+        return MockVLMClient("test-model")
+    
+    @pytest.mark.asyncio
+    async def test_deterministic_requests_are_cached(self, backend_client):
+        """temperature=0のリクエストがキャッシュされることのテスト"""
+        client = CachingVLMClient(backend_client, InMemoryResponseCache())
+        request = VLMRequest(
+            prompt_text="Hello, world!",
+            model_id="test-model",
+            parameters=ModelParameters(temperature=0.0)
+        )
+        
+        first = await client.generate_response(request)
+        second = await client.generate_response(request)
+        
+        assert len(backend_client.requests) == 1
+        assert second.text == first.text
+        assert second.metadata["cached"] is True
+        assert "cached" not in first.metadata
+        
+        stats = client.get_stats()["cache"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_sampling_requests_bypass_cache(self, backend_client):
+        """サンプリング温度のリクエストがキャッシュされないことのテスト"""
+        client = CachingVLMClient(backend_client, InMemoryResponseCache())
+        request = VLMRequest(
+            prompt_text="Hello, world!",
+            model_id="test-model",
+            parameters=ModelParameters(temperature=0.7)
+        )
+        
+        await client.generate_response(request)
+        await client.generate_response(request)
+        
+        assert len(backend_client.requests) == 2
+        assert client.get_stats()["cache"]["bypasses"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_opt_out(self, backend_client):
+        """use_cache=Falseのリクエストがキャッシュを使用しないことのテスト"""
+        client = CachingVLMClient(backend_client, InMemoryResponseCache())
+        parameters = ModelParameters(temperature=0.0)
+        
+        await client.generate_response(
+            VLMRequest(prompt_text="Hello", model_id="test-model", parameters=parameters)
+        )
+        response = await client.generate_response(
+            VLMRequest(
+                prompt_text="Hello",
+                model_id="test-model",
+                parameters=parameters,
+                use_cache=False
+            )
+        )
+        
+        assert len(backend_client.requests) == 2
+        assert "cached" not in response.metadata
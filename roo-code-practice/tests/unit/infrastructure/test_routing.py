@@ -0,0 +1,167 @@
+"""レプリカへのルーティングのテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.domain.exceptions import VLMConnectionError, VLMProcessingError
+from src.local_vlm_server.infrastructure.vlm_clients.routing import Replica, ReplicaRouterVLMClient
+from tests.conftest import MockVLMClient, make_request
+
+
+class ReplicaMockVLMClient(MockVLMClient):
+    """遅延と失敗を設定できるレプリカのモッククライアント"""
+
+    def __init__(self, model_id: str, delay: float = 0.0, error: Exception = None):
+        super().__init__(model_id)
+        self.delay = delay
+        self.error = error
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_response(self, request):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                self.requests.append(request)
+                raise self.error
+            return await super().generate_response(request)
+        finally:
+            self.active -= 1
+
+
+def make_router(*backends, **kwargs) -> ReplicaRouterVLMClient:
+    """モッククライアントをレプリカとするルーターを作成する"""
+    replicas = [Replica(f"replica-{i}", backend) for i, backend in enumerate(backends)]
+    return ReplicaRouterVLMClient(replicas, **kwargs)
+
+
+class TestReplicaRouterVLMClient:
+    """ReplicaRouterVLMClientのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_least_outstanding_spreads_load(self):
+        """処理中のリクエスト数が少ないレプリカに振り分けられることのテスト"""
+        backends = [ReplicaMockVLMClient("test-model", delay=0.02) for _ in range(3)]
+        router = make_router(*backends)
+
+        await asyncio.gather(*(router.generate_response(make_request(i)) for i in range(6)))
+
+        assert [len(backend.requests) for backend in backends] == [2, 2, 2]
+        assert all(backend.max_active == 2 for backend in backends)
+
+    @pytest.mark.asyncio
+    async def test_ewma_prefers_faster_replica(self):
+        """レイテンシの指数移動平均が小さいレプリカが優先されることのテスト"""
+        slow = ReplicaMockVLMClient("test-model", delay=0.03)
+        fast = ReplicaMockVLMClient("test-model", delay=0.0)
+        router = make_router(slow, fast, strategy="ewma")
+
+        for i in range(10):
+            await router.generate_response(make_request(i))
+
+        assert len(fast.requests) > len(slow.requests)
+        assert len(slow.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_on_another_replica(self):
+        """接続エラーの場合に別のレプリカで再試行されることのテスト"""
+        broken = ReplicaMockVLMClient("test-model", error=VLMConnectionError("test-model", "down"))
+        healthy = ReplicaMockVLMClient("test-model")
+        router = make_router(broken, healthy)
+
+        responses = [await router.generate_response(make_request(i)) for i in range(4)]
+
+        assert all(response.model_id == "test-model" for response in responses)
+        assert len(healthy.requests) == 4
+        assert router.retries >= 1
+
+    @pytest.mark.asyncio
+    async def test_processing_error_is_not_retried(self):
+        """リクエスト自体の問題によるエラーは再試行されないことのテスト"""
+        broken = ReplicaMockVLMClient("test-model", error=VLMProcessingError("test-model", "bad"))
+        healthy = ReplicaMockVLMClient("test-model")
+        router = make_router(broken, healthy)
+
+        with pytest.raises(VLMProcessingError):
+            await router.generate_response(make_request())
+
+        assert healthy.requests == []
+        assert router.retries == 0
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_replica_is_ejected(self):
+        """接続エラーが続いたレプリカが振り分け対象から除外されることのテスト"""
+        broken = ReplicaMockVLMClient("test-model", error=VLMConnectionError("test-model", "down"))
+        healthy = ReplicaMockVLMClient("test-model")
+        router = make_router(broken, healthy, failure_threshold=2, ejection_seconds=60)
+
+        for i in range(10):
+            await router.generate_response(make_request(i))
+
+        assert len(broken.requests) == 2
+        assert router.ejections == 1
+        replicas = router.get_stats()["routing"]["replicas"]
+        assert [replica["available"] for replica in replicas] == [False, True]
+
+    @pytest.mark.asyncio
+    async def test_all_replicas_failing_raises(self):
+        """すべてのレプリカで失敗した場合は最後のエラーが送出されることのテスト"""
+        backends = [
+            ReplicaMockVLMClient("test-model", error=VLMConnectionError("test-model", "down"))
+            for _ in range(2)
+        ]
+        router = make_router(*backends)
+
+        with pytest.raises(VLMConnectionError):
+            await router.generate_response(make_request())
+
+        assert [len(backend.requests) for backend in backends] == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_batch_retries_failed_items(self):
+        """一括処理で再試行できるエラーになったリクエストが別のレプリカで再試行されることのテスト"""
+        broken = ReplicaMockVLMClient("test-model", error=VLMConnectionError("test-model", "down"))
+        healthy = ReplicaMockVLMClient("test-model")
+        router = make_router(broken, healthy)
+
+        results = await router.generate_batch([make_request(i) for i in range(3)])
+
+        assert all(not isinstance(result, Exception) for result in results)
+        assert [result.prompt.text for result in results] == ["prompt 0", "prompt 1", "prompt 2"]
+
+    @pytest.mark.asyncio
+    async def test_slow_request_is_hedged(self):
+        """レイテンシの百分位数を超えたリクエストが別のレプリカにも送られ、先に終わった方が返ることのテスト"""
+        slow = ReplicaMockVLMClient("test-model", delay=0.0)
+        fast = ReplicaMockVLMClient("test-model", delay=0.0)
+        router = make_router(slow, fast, hedge_percentile=95, hedge_min_samples=4)
+        for i in range(4):
+            await router.generate_response(make_request(i))
+        assert router._hedge_delay() is not None
+
+        # 最初に選ばれるレプリカだけを遅くする
+        slow.delay = 1.0
+        router._next = 0
+        response = await asyncio.wait_for(router.generate_response(make_request(4)), timeout=0.5)
+
+        assert response.prompt.text == "prompt 4"
+        assert router.hedged == 1
+        assert router.hedge_wins == 1
+        await asyncio.sleep(0)
+        # 遅い方の試行はキャンセルされる
+        assert slow.active == 0
+        hedging = router.get_stats()["routing"]["hedging"]
+        assert hedging["hedged"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedging_without_enough_samples(self):
+        """レイテンシの標本が不足している間はヘッジしないことのテスト"""
+        backends = [ReplicaMockVLMClient("test-model", delay=0.01) for _ in range(2)]
+        router = make_router(*backends, hedge_percentile=95, hedge_min_samples=100)
+
+        await asyncio.gather(*(router.generate_response(make_request(i)) for i in range(4)))
+
+        assert router.hedged == 0
+        assert sum(len(backend.requests) for backend in backends) == 4
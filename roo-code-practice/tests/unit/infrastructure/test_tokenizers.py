@@ -0,0 +1,121 @@
+"""トークナイザーのテスト"""
+import threading
+
+import pytest
+
+from src.local_vlm_server.infrastructure.tokenizers import (
+    HeuristicTokenizer,
+    Tokenizer,
+    TokenizerService,
+    create_tokenizer,
+)
+
+
+class CountingTokenizer(HeuristicTokenizer):
+    """トークナイズした回数を記録するトークナイザー"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return super().count(text)
+
+
+class ThreadRecordingTokenizer(Tokenizer):
+    """トークナイズしたスレッドを記録するトークナイザー"""
+
+    def __init__(self):
+        self.threads = set()
+
+    def count(self, text: str) -> int:
+        self.threads.add(threading.get_ident())
+        return len(text)
+
+
+class TestHeuristicTokenizer:
+    """HeuristicTokenizerのテスト"""
+
+    def test_japanese_text(self):
+        """全角文字が1文字1トークンとして数えられることのテスト"""
+        tokenizer = HeuristicTokenizer()
+
+        assert tokenizer.count("こんにちは、世界！") == 9
+        # 文字数÷4では2トークンと大幅に少なく見積もられる
+        assert len("こんにちは、世界！") // 4 == 2
+
+    def test_english_text(self):
+        """英単語が4文字1トークン、記号が1トークンとして数えられることのテスト"""
+        tokenizer = HeuristicTokenizer()
+
+        assert tokenizer.count("Hello, world!") == 6
+        assert tokenizer.count("") == 0
+
+
+class TestCreateTokenizer:
+    """create_tokenizerのテスト"""
+
+    def test_unavailable_backend_falls_back_to_heuristic(self):
+        """ライブラリやモデルファイルがない場合に近似トークナイザーが使用されることのテスト"""
+        tokenizer = create_tokenizer({"backend": "llama", "model_path": "/nonexistent/model.gguf"})
+
+        assert isinstance(tokenizer, HeuristicTokenizer)
+
+    def test_unknown_backend(self):
+        """未知のバックエンドが指定された場合のテスト"""
+        with pytest.raises(ValueError):
+            create_tokenizer({"backend": "unknown"})
+
+
+class TestTokenizerService:
+    """TokenizerServiceのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_tokenizer_is_loaded_once_and_counts_are_cached(self, monkeypatch):
+        """トークナイザーが一度だけロードされ、同じテキストのトークン数がキャッシュされることのテスト"""
+        tokenizer = CountingTokenizer()
+        loaded = []
+
+        def fake_create_tokenizer(config):
+            loaded.append(config)
+            return tokenizer
+
+        monkeypatch.setattr(
+            "src.local_vlm_server.infrastructure.tokenizers.create_tokenizer",
+            fake_create_tokenizer
+        )
+        service = TokenizerService(lambda model_id: {"backend": "heuristic", "model": model_id})
+
+        first = await service.count_tokens("test-model", ["システムプロンプト", "Hello"])
+        second = await service.count_tokens("test-model", ["システムプロンプト", "World"])
+
+        assert first == [9, 2]
+        assert second == [9, 2]
+        assert len(loaded) == 1
+        assert tokenizer.calls == 3
+        assert service.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self):
+        """キャッシュの件数が上限を超えないことのテスト"""
+        service = TokenizerService(lambda model_id: None, max_entries=2)
+
+        await service.count_tokens("test-model", ["a", "b", "c"])
+
+        assert len(service._counts) == 2
+
+    @pytest.mark.asyncio
+    async def test_tokenization_runs_off_the_event_loop(self, monkeypatch):
+        """キャッシュにないテキストのトークナイズがイベントループのスレッドで実行されないことのテスト"""
+        tokenizer = ThreadRecordingTokenizer()
+        monkeypatch.setattr(
+            "src.local_vlm_server.infrastructure.tokenizers.create_tokenizer",
+            lambda config: tokenizer
+        )
+        service = TokenizerService(lambda model_id: None)
+
+        counts = await service.count_tokens("test-model", ["abc", "de", "abc"])
+
+        assert counts == [3, 2, 3]
+        assert tokenizer.threads
+        assert threading.get_ident() not in tokenizer.threads
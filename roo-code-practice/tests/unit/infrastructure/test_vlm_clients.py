@@ -1,8 +1,12 @@
 """VLMクライアントのテスト"""
+import asyncio
+import time
+
+import httpx
 import pytest
 
-from src.local_vlm_server.domain.exceptions import VLMProcessingError
-from src.local_vlm_server.domain.value_objects import ModelParameters, VLMRequest
+from src.local_vlm_server.domain.exceptions import DeadlineExceededError, VLMConnectionError, VLMProcessingError
+from src.local_vlm_server.domain.value_objects import ImageInput, ModelParameters, VLMRequest
 from src.local_vlm_server.infrastructure.vlm_clients.implementations.gpt import GPTVLMClient
 from src.local_vlm_server.infrastructure.vlm_clients.implementations.llama import LlamaVLMClient
 
@@ -66,20 +70,207 @@ class TestLlamaVLMClient:
         # 結果の検証
         assert "こんにちは" in response.text
         assert "LLaMA" in response.text
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream(self, llama_client):
+        """ストリーミング生成のテスト"""
+        request = VLMRequest(
+            prompt_text="こんにちは",
+            model_id="test-llama"
+        )
+        
+        # ストリーミング生成
+        chunks = [chunk async for chunk in llama_client.generate_stream(request)]
+        
+        # 複数の断片に分かれて届き、最後の断片だけに終了理由が付くこと
+        assert len(chunks) > 1
+        assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+        assert all(chunk.finish_reason is None for chunk in chunks[:-1])
+        assert chunks[-1].finish_reason == "stop"
+        assert chunks[-1].tokens_used > 0
+        
+        # 連結したテキストが通常の生成結果と一致すること
+        response = await llama_client.generate_response(request)
+        assert "".join(chunk.text for chunk in chunks) == response.text
+        # 非ストリーミングと同じく、プロンプトのトークン数を含むこと
+        assert chunks[-1].tokens_used == response.prompt_tokens + len(chunks)
+
+    
+    @pytest.mark.asyncio
+    async def test_generate_with_images(self):
+        """画像を含むリクエストがチャット補完で処理されることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 0.01})
+        request = VLMRequest(
+            prompt_text="Describe this",
+            model_id="test-llama",
+            images=(ImageInput(data=b"\x89PNG\r\n\x1a\n"),)
+        )
+        
+        response = await client.generate_response(request)
+        chunks = [chunk async for chunk in client.generate_stream(request)]
+        await client.close()
+        
+        assert "[1 image(s)]" in response.text
+        assert "".join(chunk.text for chunk in chunks) == response.text
+        assert chunks[-1].finish_reason == "stop"
+    
+    @pytest.mark.asyncio
+    async def test_generate_does_not_block_event_loop(self):
+        """推論中もイベントループが他の処理を進められることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 0.2})
+        await client.open()
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.create_task(ticker())
+        try:
+            await client.generate_response(VLMRequest(prompt_text="Hello", model_id="test-llama"))
+        finally:
+            task.cancel()
+            await client.close()
+        
+        # ブロッキングする推論中もティッカーが動き続けること
+        assert ticks >= 5
+    
+    @pytest.mark.asyncio
+    async def test_replicas_run_in_parallel(self):
+        """レプリカ数分のリクエストが並列に処理されることのテスト"""
+        client = LlamaVLMClient(
+            model_id="test-llama",
+            config={"mock_latency": 0.2, "replicas": 2}
+        )
+        await client.open()
+        requests = [
+            VLMRequest(prompt_text=f"prompt {i}", model_id="test-llama")
+            for i in range(2)
+        ]
+        
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        try:
+            responses = await asyncio.gather(*(client.generate_response(r) for r in requests))
+        finally:
+            await client.close()
+        
+        assert [r.prompt.text for r in responses] == ["prompt 0", "prompt 1"]
+        assert loop.time() - started_at < 0.35
+    
+    @pytest.mark.asyncio
+    async def test_close_unloads_model(self):
+        """close後に再度リクエストするとモデルが再ロードされることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 0.01})
+        await client.open()
+        assert client.executor.started
+        
+        await client.close()
+        assert not client.executor.started
+        
+        response = await client.generate_response(VLMRequest(prompt_text="Hello", model_id="test-llama"))
+        assert "LLaMA" in response.text
+        assert client.executor.started
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_expired_requests_are_not_executed(self, llama_client):
+        """期限を過ぎたリクエストがバックエンドで実行されないことのテスト"""
+        expired = VLMRequest(prompt_text="Hello", model_id="test-llama", deadline=time.time() - 1)
+        
+        with pytest.raises(DeadlineExceededError):
+            await llama_client.generate_response(expired)
+        
+        results = await llama_client.generate_batch([
+            expired,
+            VLMRequest(prompt_text="Hello", model_id="test-llama")
+        ])
+        assert isinstance(results[0], DeadlineExceededError)
+        assert "LLaMA" in results[1].text
+        await llama_client.close()
+    
+    @pytest.mark.asyncio
+    async def test_batch_runs_as_one_inference(self):
+        """バッチが1回のワーカー呼び出し・1回分の推論時間で処理されることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 0.2})
+        await client.open()
+        try:
+            started_at = time.perf_counter()
+            results = await client.generate_batch([
+                VLMRequest(prompt_text=f"Hello {i}", model_id="test-llama") for i in range(4)
+            ] + [
+                VLMRequest(
+                    prompt_text="Describe",
+                    model_id="test-llama",
+                    images=(ImageInput(data=b"\x89PNG\r\n\x1a\n"),)
+                )
+            ])
+            elapsed = time.perf_counter() - started_at
+            
+            assert all("LLaMA" in result.text for result in results[:4])
+            assert "[1 image(s)]" in results[4].text
+            # テキストの4件で1回分、画像の1件で1回分の推論時間
+            assert elapsed < 0.6
+        finally:
+            await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_request_aborts_generation(self):
+        """呼び出し元がキャンセルされるとワーカーでの生成が途中で打ち切られることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 1.0})
+        await client.open()
+        try:
+            task = asyncio.create_task(
+                client.generate_response(VLMRequest(prompt_text="Hello", model_id="test-llama"))
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            
+            # 生成が打ち切られ、レプリカがすぐに返却されること
+            await asyncio.wait_for(client.executor._idle.get(), timeout=0.5)
+            assert client.executor._models[0].aborted == 1
+        finally:
+            await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_image_request_aborts_generation(self):
+        """画像を含むリクエストでも呼び出し元がキャンセルされると生成が打ち切られることのテスト"""
+        client = LlamaVLMClient(model_id="test-llama", config={"mock_latency": 1.0})
+        await client.open()
+        try:
+            task = asyncio.create_task(client.generate_response(VLMRequest(
+                prompt_text="Describe the drawing",
+                model_id="test-llama",
+                images=(ImageInput(data=b"\x89PNG\r\n\x1a\n"),)
+            )))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            
+            await asyncio.wait_for(client.executor._idle.get(), timeout=0.5)
+            assert client.executor._models[0].aborted == 1
+        finally:
+            await client.close()
 
 
 class TestGPTVLMClient:
     """GPTVLMClientのテスト"""
     
     @pytest.fixture
-    def gpt_client(self):
-        """GPTVLMClientのフィクスチャ"""
+    def gpt_client(self, openai_stub_app):
+        """スタブサーバーに接続するGPTVLMClientのフィクスチャ"""
         return GPTVLMClient(
             model_id="test-gpt",
             config={
                 "api_base": "http://localhost:8000",
                 "api_key": "test-key"
-            }
+            },
+            transport=httpx.ASGITransport(app=openai_stub_app)
         )
     
     @pytest.mark.asyncio
@@ -125,4 +316,99 @@ class TestGPTVLMClient:
         response = await gpt_client.generate_response(request)
         
         # 結果の検証
-        assert "お困り" in response.text or "助け" in response.text
\ No newline at end of file
+        assert "お困り" in response.text or "助け" in response.text
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream(self, gpt_client):
+        """ストリーミング生成のテスト"""
+        request = VLMRequest(
+            prompt_text="Hello, world!",
+            model_id="test-gpt",
+            parameters=ModelParameters(temperature=0.7, max_tokens=100)
+        )
+        
+        # ストリーミング生成
+        chunks = [chunk async for chunk in gpt_client.generate_stream(request)]
+        
+        # 結果の検証
+        assert len(chunks) > 1
+        assert chunks[-1].finish_reason == "stop"
+        assert chunks[-1].metadata.get("temperature") == 0.7
+        assert "GPT" in "".join(chunk.text for chunk in chunks)
+    
+    @pytest.mark.asyncio
+    async def test_requests_reuse_pooled_client(self, gpt_client, openai_stub_app):
+        """リクエスト間でHTTPクライアントが再利用されることのテスト"""
+        request = VLMRequest(prompt_text="Hello, world!", model_id="test-gpt")
+        
+        await gpt_client.generate_response(request)
+        pooled = gpt_client.client
+        await gpt_client.generate_response(request)
+        
+        # 同じHTTPクライアントが使われ、認証ヘッダーとパラメータが送信されること
+        assert gpt_client.client is pooled
+        assert len(openai_stub_app.state.requests) == 2
+        sent = openai_stub_app.state.requests[0]
+        assert sent["headers"]["authorization"] == "Bearer test-key"
+        assert sent["body"]["model"] == "test-gpt"
+        assert sent["body"]["max_tokens"] == 1024
+        
+        # クローズ後はHTTPクライアントが解放されること
+        await gpt_client.close()
+        assert gpt_client.client is None
+    
+    @pytest.mark.asyncio
+    async def test_images_are_sent_as_content_parts(self, gpt_client, openai_stub_app):
+        """画像がdata URLのimage_urlパートとして送信されることのテスト"""
+        image = ImageInput(data=b"\x89PNG\r\n\x1a\n", media_type="image/png")
+        request = VLMRequest(prompt_text="Hello, world!", model_id="test-gpt", images=(image,))
+        
+        response = await gpt_client.generate_response(request)
+        
+        content = openai_stub_app.state.requests[0]["body"]["messages"][0]["content"]
+        assert content[0] == {"type": "text", "text": "Hello, world!"}
+        assert content[1]["image_url"]["url"] == image.to_data_url()
+        assert "こんにちは" in response.text
+    
+    def test_pool_and_timeout_config(self):
+        """接続プールとタイムアウトの設定のテスト"""
+        client = GPTVLMClient(
+            model_id="test-gpt",
+            config={
+                "timeout": {"default": 30.0, "connect": 2.0},
+                "pool": {"max_connections": 4, "max_keepalive_connections": 2},
+                "http2": False
+            }
+        )
+        
+        assert client.timeout.connect == 2.0
+        assert client.timeout.read == 30.0
+        assert client.limits.max_connections == 4
+        assert client.limits.max_keepalive_connections == 2
+    
+    @pytest.mark.asyncio
+    async def test_connection_error(self):
+        """接続エラーがVLMConnectionErrorに変換されることのテスト"""
+        def refuse(request):
+            raise httpx.ConnectError("Connection refused", request=request)
+        
+        client = GPTVLMClient(
+            model_id="test-gpt",
+            transport=httpx.MockTransport(refuse)
+        )
+        request = VLMRequest(prompt_text="Hello, world!", model_id="test-gpt")
+        
+        with pytest.raises(VLMConnectionError):
+            await client.generate_response(request)
+    
+    @pytest.mark.asyncio
+    async def test_server_error(self):
+        """バックエンドのエラー応答がドメイン例外に変換されることのテスト"""
+        client = GPTVLMClient(
+            model_id="test-gpt",
+            transport=httpx.MockTransport(lambda request: httpx.Response(500))
+        )
+        request = VLMRequest(prompt_text="Hello, world!", model_id="test-gpt")
+        
+        with pytest.raises(VLMProcessingError):
+            await client.generate_response(request)
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""VLMリポジトリのテスト"""
+import asyncio
+
+import pytest
+
+from src.local_vlm_server.domain.entities import VLMModel
+from src.local_vlm_server.domain.value_objects import VLMRequest
+from src.local_vlm_server.infrastructure.response_cache import SQLiteResponseCache
+from src.local_vlm_server.infrastructure.vlm_clients.implementations.llama import LlamaVLMClient
+from src.local_vlm_server.infrastructure.vlm_repository import VLMRepository
+
+
+class CountingLlamaVLMClient(LlamaVLMClient):
+    """作成回数とロード回数と解放回数を記録するLLaMAクライアント"""
+
+    created = 0
+    opened = 0
+    closed = 0
+
+    def __init__(self, model_id, config=None):
+        super().__init__(model_id, config)
+        CountingLlamaVLMClient.created += 1
+
+    async def open(self):
+        CountingLlamaVLMClient.opened += 1
+        # モデルのロードに時間がかかる状況を再現する
+        await asyncio.sleep(0.05)
+        await super().open()
+
+    async def close(self):
+        await super().close()
+        CountingLlamaVLMClient.closed += 1
+
+
+@pytest.fixture
+def repository():
+    """作成回数を記録するクライアントを使うVLMリポジトリのフィクスチャ"""
+    CountingLlamaVLMClient.created = 0
+    CountingLlamaVLMClient.opened = 0
+    CountingLlamaVLMClient.closed = 0
+    repository = VLMRepository()
+    repository._client_factories["llama"] = CountingLlamaVLMClient
+    for model_id in ("llama-a", "llama-b"):
+        repository.register_model(
+            VLMModel(id=model_id, name=model_id),
+            "llama",
+            {"mock_latency": 0}
+        )
+    return repository
+
+
+class TestVLMRepository:
+    """VLMRepositoryのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_load_model_once(self, repository):
+        """同じモデルへの同時リクエストでクライアントが1回だけ作成されることのテスト"""
+        try:
+            clients = await asyncio.gather(
+                *(repository.get_client_for_model("llama-a") for _ in range(10))
+            )
+
+            assert CountingLlamaVLMClient.created == 1
+            assert CountingLlamaVLMClient.opened == 1
+            assert all(client is clients[0] for client in clients)
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_registered_models(self, repository):
+        """起動時のウォームアップで登録済みモデルがロードされることのテスト"""
+        try:
+            await repository.warm_up()
+            created = CountingLlamaVLMClient.created
+
+            resident = {entry["model_id"] for entry in await repository.list_resident_models()}
+            assert {"llama-a", "llama-b"} <= resident
+
+            # ウォームアップ後のリクエストでは新たにロードしない
+            await repository.get_client_for_model("llama-a")
+            assert CountingLlamaVLMClient.created == created
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_endpoints_create_replica_router(self, repository):
+        """設定にエンドポイントがある場合にレプリカごとのクライアントが作成されることのテスト"""
+        repository.register_model(
+            VLMModel(id="llama-replicated", name="llama-replicated"),
+            "llama",
+            {
+                "mock_latency": 0,
+                "endpoints": [{"name": "first"}, {"name": "second"}],
+                "routing": {"strategy": "ewma"}
+            }
+        )
+        try:
+            client = await repository.get_client_for_model("llama-replicated")
+            response = await client.generate_response(
+                VLMRequest(prompt_text="Hello", model_id="llama-replicated")
+            )
+
+            assert response.model_id == "llama-replicated"
+            assert CountingLlamaVLMClient.created == 2
+            routing = client.get_stats()["routing"]
+            assert routing["strategy"] == "ewma"
+            assert [replica["name"] for replica in routing["replicas"]] == ["first", "second"]
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_models_version_changes_with_model_list(self, repository):
+        """モデル一覧が変わった場合だけモデルの登録のバージョンが変わることのテスト"""
+        from src.local_vlm_server.infrastructure.model_registry import ModelSpec
+
+        def spec(model_id, config, description=None):
+            return ModelSpec(VLMModel(id=model_id, name=model_id, description=description), "llama", config)
+
+        try:
+            version = repository.get_models_version()
+            assert VLMRepository().get_models_version() != version
+
+            # クライアント設定だけの変更ではモデル一覧は変わらない
+            await repository.apply_registry(
+                [spec("llama-a", {"mock_latency": 0}), spec("llama-b", {"mock_latency": 0.01})], warm=False
+            )
+            assert repository.get_models_version() == version
+
+            await repository.apply_registry(
+                [spec("llama-a", {"mock_latency": 0}, "updated"), spec("llama-b", {"mock_latency": 0.01})],
+                warm=False
+            )
+            assert repository.get_models_version() != version
+
+            version = repository.get_models_version()
+            repository.register_model(VLMModel(id="llama-c", name="llama-c"), "llama", {})
+            assert repository.get_models_version() != version
+        finally:
+            await repository.close()
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_replaced_clients(self, repository):
+        """置き換えられたクライアントが処理中のリクエストの完了後に閉じられるまでclose()が待つことのテスト"""
+        repository.register_model(VLMModel(id="llama-a", name="llama-a"), "llama", {"mock_latency": 0.1})
+        client = await repository.get_client_for_model("llama-a")
+        in_flight = asyncio.create_task(
+            client.generate_response(VLMRequest(prompt_text="Hello", model_id="llama-a"))
+        )
+        await asyncio.sleep(0.01)
+
+        repository.register_model(VLMModel(id="llama-a", name="llama-a"), "llama", {"mock_latency": 0})
+        await repository.close()
+
+        assert in_flight.done()
+        assert (await in_flight).model_id == "llama-a"
+        assert CountingLlamaVLMClient.closed == 1
+
+    def test_client_replaced_outside_event_loop_is_closed_on_close(self, repository):
+        """イベントループの外で置き換えられたクライアントがclose()で閉じられることのテスト"""
+        asyncio.run(repository.get_client_for_model("llama-a"))
+
+        repository.register_model(VLMModel(id="llama-a", name="llama-a"), "llama", {"mock_latency": 0})
+        assert CountingLlamaVLMClient.closed == 0
+
+        asyncio.run(repository.close())
+        assert CountingLlamaVLMClient.closed == 1
+
+    def test_batch_larger_than_concurrency_is_rejected(self, repository):
+        """バッチの大きさが同時実行数の上限を超える設定を拒否することのテスト"""
+        with pytest.raises(ValueError, match="max_batch_size"):
+            repository.register_model(
+                VLMModel(id="llama-c", name="llama-c"),
+                "llama",
+                {"batching": {"max_batch_size": 8}, "concurrency": {"max_concurrency": 2}}
+            )
+
+        assert "llama-c" not in repository._models
+
+    @pytest.mark.asyncio
+    async def test_unloaded_model_closes_response_cache(self, repository, tmp_path, monkeypatch):
+        """モデルをアンロードするとレスポンスキャッシュのSQLite接続が閉じられることのテスト"""
+        closed = []
+        close = SQLiteResponseCache.close
+
+        def recording_close(cache):
+            close(cache)
+            closed.append(cache.path)
+
+        monkeypatch.setattr(SQLiteResponseCache, "close", recording_close)
+        path = str(tmp_path / "cache.sqlite3")
+        repository.register_model(
+            VLMModel(id="llama-cached", name="llama-cached"),
+            "llama",
+            {"mock_latency": 0, "cache": {"backend": "sqlite", "path": path}}
+        )
+        try:
+            await repository.get_client_for_model("llama-cached")
+            await repository.unload_model("llama-cached")
+
+            assert closed == [path]
+        finally:
+            await repository.close()